@@ -3,6 +3,7 @@ from typing import Annotated, Any
 from fastapi import Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..core.auth_cache import user_cache
 from ..core.config import settings
 from ..core.db.database import async_get_db
 from ..core.exceptions.http_exceptions import ForbiddenException, RateLimitException, UnauthorizedException
@@ -22,12 +23,18 @@ async def get_current_user(
     if token_data is None:
         raise UnauthorizedException("User not authenticated.")
 
-    if "@" in token_data.username_or_email:
-        user: dict | None = await crud_users.get(db=db, email=token_data.username_or_email, is_deleted=False)
+    subject = token_data.username_or_email
+    user: dict | None = user_cache.get(subject)
+    if user:
+        return user
+
+    if "@" in subject:
+        user = await crud_users.get(db=db, email=subject, is_deleted=False)
     else:
-        user = await crud_users.get(db=db, username=token_data.username_or_email, is_deleted=False)
+        user = await crud_users.get(db=db, username=subject, is_deleted=False)
 
     if user:
+        user_cache.set(subject, user)
         return user
 
     raise UnauthorizedException("User not authenticated.")
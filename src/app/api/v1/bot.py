@@ -1,8 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, Request, BackgroundTasks, Response, Cookie, Query
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.api.deps import get_db
+from app.core.db.database import async_get_db
+from app.core.bot_settings import get_bot_settings_model
+from app.core.config import settings
 from app.schemas.bot import BotMessageRequest, BotMessageResponse, QuickAction, ProductInfo, OrderInfo
 from app.schemas.coupon_request import CouponRequestModel, CouponResponseModel
 from app.services.bot_service import BotService
@@ -12,6 +16,7 @@ from app.services.graph_service.state import ConversationState
 from app.services.graph_service.graph import graph_app
 from app.services.graph_service.history import load_history, save_history
 from app.services.graph_service.llm import llm
+from app.services.providers import deadline_scope
 from langchain_core.messages import HumanMessage, AIMessage
 import random
 import json
@@ -184,14 +189,14 @@ async def request_coupon(
     request: CouponRequestModel,
     response: Response,
     session_id: str = Depends(get_session_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(async_get_db)
 ):
     """Request a specific coupon code. Users can only request one coupon per session."""
     coupon_service = CouponService(db)
     language = request.language or "en"
     
     # Request the coupon
-    result = coupon_service.request_coupon(session_id, request.coupon_code.upper())
+    result = await coupon_service.async_request_coupon(session_id, request.coupon_code.upper())
     
     # Set cookie to maintain session
     response.set_cookie(key="session_id", value=session_id, httponly=True, samesite="Lax", max_age=3600*24*7)
@@ -761,8 +766,9 @@ async def langgraph_bot_message(
             # Add a thinking step to mark the start of processing
             thinking_steps.append({"type": "text", "content": f"Processing message: {user_message}"})
             
-        # Execute the graph
-        final_state = await graph_app.ainvoke(initial_state)
+        # Execute the graph; its LLM and embedding calls share the turn's time budget
+        with deadline_scope(settings.BOT_TURN_DEADLINE_SECONDS):
+            final_state = await graph_app.ainvoke(initial_state)
         
         # Restore original print function if debug was enabled
         if debug:
@@ -774,6 +780,12 @@ async def langgraph_bot_message(
             
         print("--- Graph Invocation Complete ---")
 
+    except TimeoutError as e:
+        if debug:
+            import builtins
+            builtins.print = original_print
+        print(f"--- Graph Timeout: {e} ---")
+        raise HTTPException(status_code=504, detail="The assistant took too long to respond, please try again.")
     except Exception as e:
         print(f"--- Graph Error: {e} ---")
         # Handle graph execution error
@@ -1057,7 +1069,7 @@ async def test_knowledge_bot_message(
     search_results = rag_service.search_similar(user_message, top_k=2, language=language)
     
     # If no good results, try searching across all languages
-    if not search_results or len(search_results) == 0 or search_results[0].get('score', 1.0) > 0.7:
+    if not search_results or len(search_results) == 0 or not search_results[0].get('relevant'):
         print(f"No good results in {language}, searching across all languages")
         search_results = rag_service.search_similar(user_message, top_k=3, language=None)
     
@@ -1124,9 +1136,13 @@ User: {user_message}
     final_state = None
     try:
         print("--- Invoking Graph ---")
-        final_state = await graph_app.ainvoke(initial_state)
+        with deadline_scope(settings.BOT_TURN_DEADLINE_SECONDS):
+            final_state = await graph_app.ainvoke(initial_state)
         print("--- Graph Invocation Complete ---")
 
+    except TimeoutError as e:
+        print(f"--- Graph Timeout: {e} ---")
+        raise HTTPException(status_code=504, detail="The assistant took too long to respond, please try again.")
     except Exception as e:
         print(f"--- Graph Error: {e} ---")
         import traceback
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from typing import Dict, Any, List, Optional
 
-from app.core.db.database import get_db
-from app.core.bot_settings import get_bot_settings_model, update_bot_settings
+from app.core.db.database import async_get_db
+from app.core.bot_settings import async_get_bot_settings_model, async_update_bot_settings
+from app.middleware.client_cache_middleware import not_modified
 from app.models.bot_settings import BotSettings
 from pydantic import BaseModel
 
@@ -21,6 +23,8 @@ class AdvancedSettings(BaseModel):
     language: Optional[str] = None
     tone: Optional[str] = None
     max_message_length: Optional[int] = None
+    # Intent to "template" or "llm", see app.services.graph_service.replies
+    reply_modes: Optional[Dict[str, str]] = None
 
 
 class BotSettingsUpdate(BaseModel):
@@ -33,6 +37,7 @@ class BotSettingsUpdate(BaseModel):
 
 class BotSettingsResponse(BaseModel):
     id: int
+    version: int = 0
     bot_name: str
     welcome_message: str
     fallback_message: str
@@ -41,17 +46,18 @@ class BotSettingsResponse(BaseModel):
 
 
 @router.get("/bot-settings", response_model=BotSettingsResponse)
-def get_settings(db: Session = Depends(get_db)):
+async def get_settings(db: AsyncSession = Depends(async_get_db), _not_modified: None = Depends(not_modified)):
     """
     Get the current bot settings
     """
     try:
         # Try to get settings from database
-        settings = get_bot_settings_model(db)
+        settings = await async_get_bot_settings_model(db)
         
         # Convert to response model
         return BotSettingsResponse(
             id=settings.id,
+            version=settings.version,
             bot_name=settings.bot_name,
             welcome_message=settings.welcome_message,
             fallback_message=settings.fallback_message,
@@ -64,7 +70,7 @@ def get_settings(db: Session = Depends(get_db)):
         from app.core.bot_settings import get_bot_settings_from_file
         
         # Get settings from file
-        file_settings = get_bot_settings_from_file()
+        file_settings = await run_in_threadpool(get_bot_settings_from_file)
         
         # Convert to response model
         return BotSettingsResponse(
@@ -78,15 +84,12 @@ def get_settings(db: Session = Depends(get_db)):
 
 
 @router.put("/bot-settings", response_model=BotSettingsResponse)
-def update_settings(settings_update: BotSettingsUpdate, db: Session = Depends(get_db)):
+async def update_settings(settings_update: BotSettingsUpdate, db: AsyncSession = Depends(async_get_db)):
     """
     Update bot settings
     """
     try:
         # Try to update settings in database
-        # Get current settings
-        current_settings = get_bot_settings_model(db)
-        
         # Prepare quick actions and advanced settings
         quick_actions = None
         if settings_update.quick_actions:
@@ -97,7 +100,7 @@ def update_settings(settings_update: BotSettingsUpdate, db: Session = Depends(ge
             advanced_settings = settings_update.advanced_settings.dict()
         
         # Update settings
-        success = update_bot_settings(
+        success = await async_update_bot_settings(
             db=db,
             bot_name=settings_update.bot_name,
             welcome_message=settings_update.welcome_message,
@@ -110,11 +113,12 @@ def update_settings(settings_update: BotSettingsUpdate, db: Session = Depends(ge
             raise HTTPException(status_code=500, detail="Failed to update bot settings")
         
         # Get updated settings
-        updated_settings = get_bot_settings_model(db)
+        updated_settings = await async_get_bot_settings_model(db)
         
         # Convert to response model
         return BotSettingsResponse(
             id=updated_settings.id,
+            version=updated_settings.version,
             bot_name=updated_settings.bot_name,
             welcome_message=updated_settings.welcome_message,
             fallback_message=updated_settings.fallback_message,
@@ -140,13 +144,13 @@ def update_settings(settings_update: BotSettingsUpdate, db: Session = Depends(ge
             settings_dict["advanced_settings"] = settings_update.advanced_settings.dict()
         
         # Update file-based settings
-        success = file_update_bot_settings(None, **settings_dict)
+        success = await run_in_threadpool(file_update_bot_settings, db=None, **settings_dict)
         
         if not success:
             raise HTTPException(status_code=500, detail="Failed to update bot settings in file")
         
         # Get updated settings from file
-        file_settings = get_bot_settings_from_file()
+        file_settings = await run_in_threadpool(get_bot_settings_from_file)
         
         # Convert to response model
         return BotSettingsResponse(
@@ -1,8 +1,6 @@
 from fastapi import APIRouter, Request, Depends, HTTPException
 from fastapi.responses import HTMLResponse
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
-from app.core.db.database import get_db
 from app.api.deps import get_current_user
 import os
 
@@ -14,8 +12,7 @@ templates = Jinja2Templates(directory=templates_path)
 
 @router.get("/coupon-management", response_class=HTMLResponse)
 async def coupon_management_page(
-    request: Request,
-    db: Session = Depends(get_db)
+    request: Request
 ):
     """Render the coupon management page."""
     # For development purposes, authentication is temporarily disabled
@@ -29,8 +26,7 @@ async def coupon_management_page(
 
 @router.get("/coupon-test", response_class=HTMLResponse)
 async def coupon_test_page(
-    request: Request,
-    db: Session = Depends(get_db)
+    request: Request
 ):
     """Render the coupon test page for testing the coupon API."""
     
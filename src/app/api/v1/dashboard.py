@@ -7,11 +7,11 @@ import json
 from pathlib import Path
 import uuid
 from datetime import datetime
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 # Import bot settings utility
-from app.core.bot_settings import get_bot_settings, save_bot_settings, update_bot_settings, get_bot_settings_model
-from app.core.db.database import get_db
+from app.core.bot_settings import async_get_bot_settings_model, async_update_bot_settings
+from app.core.db.database import async_get_db
 
 # Import templates from the centralized configuration
 from app.core.template_config import templates
@@ -132,12 +132,12 @@ async def dashboard(request: Request):
     return RedirectResponse(url="/bot-config")
 
 @router.get("/bot-config", response_class=HTMLResponse)
-async def bot_config(request: Request, db: Session = Depends(get_db)):
+async def bot_config(request: Request, db: AsyncSession = Depends(async_get_db)):
     """
     Bot configuration page
     """
     # Get bot settings from database
-    db_settings = get_bot_settings_model(db)
+    db_settings = await async_get_bot_settings_model(db)
     
     # Format settings for UI
     bot_config = format_bot_config(db_settings)
@@ -152,14 +152,14 @@ async def knowledge_base(request: Request):
     Knowledge base management page
     """
     # Import the functions from the milvus_client module
-    from app.services.milvus_client import connect_to_milvus, get_all_entries
+    from app.services.milvus_client import connect_to_milvus, get_entries_page
     
     try:
         # First try to connect to Milvus
         connect_to_milvus()
         
-        # Fetch real entries from Milvus vector store
-        vector_entries = get_all_entries()
+        # Fetch the first page of entries; the page loads further pages via /api/v1/vector-store/all
+        vector_entries, _ = get_entries_page()
         
         # Format the entries for the template
         formatted_entries = []
@@ -256,13 +256,10 @@ class BotConfigUpdateRequest(BaseModel):
     appearance: Optional[Dict[str, Any]] = None
 
 @router.post("/api/dashboard/bot-config")
-async def update_bot_config(config: BotConfigUpdateRequest, db: Session = Depends(get_db)):
+async def update_bot_config(config: BotConfigUpdateRequest, db: AsyncSession = Depends(async_get_db)):
     """
     Update bot configuration
     """
-    # Get current settings from database
-    db_settings = get_bot_settings_model(db)
-    
     # Prepare updated settings
     bot_name = None
     welcome_message = None
@@ -280,7 +277,7 @@ async def update_bot_config(config: BotConfigUpdateRequest, db: Session = Depend
         advanced_settings = config.advanced
     
     # Update settings in database
-    success = update_bot_settings(
+    success = await async_update_bot_settings(
         bot_name=bot_name,
         welcome_message=welcome_message,
         fallback_message=fallback_message,
@@ -1,10 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Header, File, UploadFile, Form
+from fastapi import APIRouter, Depends, HTTPException, Query, status, Header, File, UploadFile, Form
+from starlette.concurrency import run_in_threadpool
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 from app.core.security import oauth2_scheme, jwt, SECRET_KEY, ALGORITHM, TokenType
 from app.services.bot_service import BotService
 from app.services.rag import RAGService
-from app.services.milvus_client import list_collections, search_embedding, insert_embedding, drop_collection
+from app.services.knowledge_ingest import source_key
+from app.services.milvus_client import (
+    COLLECTION_NAME, list_collections, search_embedding, insert_embedding, drop_collection, delete_entries,
+    delete_source_entries, get_entries_page, has_field
+)
+from app.core.db.database import async_get_db
+from app.crud.crud_knowledge import (
+    async_create_knowledge_source, async_delete_knowledge_chunk, async_delete_knowledge_source,
+    async_get_knowledge_source, async_list_knowledge_sources
+)
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 import json
 import uuid
@@ -110,27 +121,6 @@ mock_bot_config = {
     }
 }
 
-# Database for knowledge sources (in-memory for demo purposes)
-knowledge_sources_db = [
-    {
-        "id": "ks-001",
-        "name": "Product Information",
-        "description": "Contains details about all products, specifications, and pricing.",
-        "source_type": "manual",
-        "entries": 0,
-        "last_updated": datetime.now().isoformat()
-    },
-    {
-        "id": "ks-002",
-        "name": "Shipping Policies",
-        "description": "Information about shipping methods, timeframes, and costs.",
-        "source_type": "url",
-        "url": "https://example.com/shipping",
-        "entries": 0,
-        "last_updated": datetime.now().isoformat()
-    }
-]
-
 # Mock data for analytics
 mock_analytics = {
     "total_conversations": 1285,
@@ -230,9 +220,9 @@ async def get_vector_store_entries(query: str = "", top_k: int = 10):
     """Get entries from the vector store based on a search query"""
     try:
         if not query.strip():
-            # Return all entries if no query is provided
-            from app.services.milvus_client import get_all_entries
-            all_entries = get_all_entries(limit=top_k)
+            # Return the first page of entries if no query is provided
+            from app.services.milvus_client import get_entries_page
+            all_entries, _ = get_entries_page(limit=top_k)
             
             # Format the results
             entries = []
@@ -255,12 +245,12 @@ async def get_vector_store_entries(query: str = "", top_k: int = 10):
         
         # Format the results
         entries = []
-        for i, result in enumerate(results[0]):
+        for result in results:
             entry = {
-                "id": f"vs-{result.id}",
-                "title": result.entity.get('text', '')[:50] + "...",  # Use first 50 chars as title
-                "content": result.entity.get('text', ''),
-                "similarity": float(result.distance),
+                "id": f"vs-{result.get('id')}",
+                "title": result['text'][:50] + "...",  # Use first 50 chars as title
+                "content": result['text'],
+                "similarity": result['score'],  # Calibrated relevance in [0, 1]
                 "tags": ["vector-store"],
                 "created_at": datetime.now().isoformat(),
                 "updated_at": datetime.now().isoformat()
@@ -312,52 +302,39 @@ async def check_vector_store_status():
         }
 
 @router.get("/vector-store/all", response_model=Dict[str, Any])
-async def get_all_vector_store_entries(limit: int = 100):
-    """Get all entries from the vector store"""
+async def get_all_vector_store_entries(
+    limit: int = Query(100, ge=1, le=1000),
+    page_token: Optional[str] = Query(None, description="next_page_token of the previous page"),
+):
+    """Browse the vector store one page at a time"""
+    from app.services.milvus_client import get_entries_page
+
     try:
-        print("Fetching all vector store entries...")
-        from app.services.milvus_client import get_all_entries, list_collections, COLLECTION_NAME
-        
-        # Check if collection exists
-        collections = list_collections()
-        print(f"Available collections: {collections}")
-        
-        # Return empty result if collection doesn't exist
-        if COLLECTION_NAME not in collections:
-            print(f"Collection {COLLECTION_NAME} not found")
-            return {
-                "success": True,
-                "count": 0,
-                "entries": [],
-                "message": f"Collection {COLLECTION_NAME} not found"
-            }
-        
-        # Get entries from Milvus
-        all_entries = get_all_entries(limit=limit)
-        print(f"Retrieved {len(all_entries)} entries from Milvus")
-        
-        # Format the results
-        entries = []
-        for i, entry in enumerate(all_entries):
-            print(f"Processing entry {i}: {entry}")
-            formatted_entry = {
-                "id": f"vs-{entry.get('id', i)}",
-                "title": entry.get('text', '')[:50] + "...",  # Use first 50 chars as title
-                "content": entry.get('text', ''),
-                "tags": ["vector-store"],
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat()
-            }
-            entries.append(formatted_entry)
-        
-        return {
-            "success": True,
-            "count": len(entries),
-            "entries": entries
-        }
+        all_entries, next_page_token = await run_in_threadpool(get_entries_page, limit=limit, page_token=page_token)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting all vector store entries: {str(e)}")
 
+    # Format the results
+    entries = []
+    for entry in all_entries:
+        entries.append({
+            "id": entry["id"],
+            "display_id": entry["id"],
+            "title": entry.get('text', '')[:50] + "...",  # Use first 50 chars as title
+            "content": entry.get('text', ''),
+            "language": entry.get('language', 'en'),
+            "tags": ["vector-store"],
+        })
+
+    return {
+        "success": True,
+        "count": len(entries),
+        "entries": entries,
+        "next_page_token": next_page_token
+    }
+
 @router.post("/vector-store/add", response_model=Dict[str, Any])
 async def add_to_vector_store(content: Dict[str, str]):
     """Add content to the vector store"""
@@ -378,7 +355,8 @@ async def add_to_vector_store(content: Dict[str, str]):
 
 # Knowledge entry management endpoints
 @router.get("/knowledge-entries", response_model=List[Dict[str, Any]])
-async def get_knowledge_entries(source_id: Optional[str] = None, query: Optional[str] = None):
+async def get_knowledge_entries(source_id: Optional[str] = None, query: Optional[str] = None,
+                                limit: int = Query(100, ge=1, le=1000)):
     """Get knowledge entries, optionally filtered by source ID or search query"""
     # If a query is provided, use the RAG service to search for similar entries
     if query and query.strip():
@@ -388,16 +366,16 @@ async def get_knowledge_entries(source_id: Optional[str] = None, query: Optional
             
             # Format the results
             entries = []
-            for i, result in enumerate(results[0]):
+            for result in results:
                 entry = {
-                    "id": f"vs-{result.id}",
+                    "id": f"vs-{result.get('id')}",
                     "source_id": source_id if source_id else "vector-store",
-                    "title": result.entity.get('text', '')[:50] + "...",  # Use first 50 chars as title
-                    "content": result.entity.get('text', ''),
+                    "title": result['text'][:50] + "...",  # Use first 50 chars as title
+                    "content": result['text'],
                     "tags": ["vector-store"],
                     "created_at": datetime.now().isoformat(),
                     "updated_at": datetime.now().isoformat(),
-                    "similarity": float(result.distance)
+                    "similarity": result['score']  # Calibrated relevance in [0, 1]
                 }
                 entries.append(entry)
             
@@ -407,75 +385,128 @@ async def get_knowledge_entries(source_id: Optional[str] = None, query: Optional
             print(f"Error searching vector store: {str(e)}")
             return []
     
-    # If no query, return empty list - in a real implementation, this would query a database
-    # for entries associated with the specified source_id
+    # Without a query, list the source's chunks straight from the collection
+    if source_id:
+        try:
+            if not await run_in_threadpool(has_field, COLLECTION_NAME, "source_id"):
+                return []
+            results, _ = await run_in_threadpool(
+                get_entries_page, COLLECTION_NAME, limit, None, f"source_id == {json.dumps(source_id)}"
+            )
+            return [_vector_entry(result) for result in results]
+        except Exception as e:
+            print(f"Error listing entries of source {source_id}: {str(e)}")
     return []
 
+def _vector_entry(result: Dict[str, Any]) -> Dict[str, Any]:
+    created_at = datetime.fromtimestamp(result["created_at"]).isoformat() if result.get("created_at") else None
+    return {
+        "id": f"vs-{result['id']}",
+        "source_id": result.get("source_id") or "vector-store",
+        "title": result.get("text", "")[:50] + "...",
+        "content": result.get("text", ""),
+        "tags": ["vector-store"],
+        "chunk_index": result.get("chunk_index"),
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+def _source_dict(source, entries: int = 0, last_updated: Optional[datetime] = None) -> Dict[str, Any]:
+    return {
+        "id": source.id,
+        "name": source.name,
+        "description": source.description,
+        "source_type": source.source_type,
+        "url": source.url,
+        "entries": entries,
+        "last_updated": max(filter(None, [source.updated_at, last_updated])).isoformat(),
+    }
+
+async def _require_source(db: AsyncSession, source_id: str):
+    source = await async_get_knowledge_source(db, source_id)
+    if source is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Knowledge source with ID {source_id} not found"
+        )
+    return source
+
 @router.delete("/knowledge-entries/{entry_id}", response_model=Dict[str, Any])
-async def delete_knowledge_entry(entry_id: str):
-    """Delete a knowledge entry"""
-    # In a real implementation, this would delete the entry from the vector store
-    # Currently, Milvus doesn't support deleting individual entries easily
-    # So we'll just return success for the demo
-    
-    # If the entry ID starts with 'vs-', it's from the vector store
-    if entry_id.startswith('vs-'):
-        try:
-            # In a real implementation, we would delete the entry from the vector store
-            # For now, we'll just return success
-            return {
-                "success": True,
-                "message": "Knowledge entry deleted successfully"
-            }
-        except Exception as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to delete entry from vector store: {str(e)}"
-            )
-    
-    # For other entry IDs, just return success
+async def delete_knowledge_entry(entry_id: str, db: AsyncSession = Depends(async_get_db)):
+    """Delete a knowledge entry (a chunk of the RAG collection, id "vs-<primary key>")"""
+    try:
+        milvus_id = int(entry_id.removeprefix("vs-"))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid knowledge entry ID: {entry_id}"
+        )
+
+    try:
+        await async_delete_knowledge_chunk(db, milvus_id)
+        await run_in_threadpool(delete_entries, [milvus_id], COLLECTION_NAME)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to delete entry from vector store: {str(e)}"
+        )
+
     return {
         "success": True,
         "message": "Knowledge entry deleted successfully"
     }
 
 @router.get("/knowledge-sources/{source_id}", response_model=Dict[str, Any])
-async def get_knowledge_source(source_id: str):
+async def get_knowledge_source(source_id: str, db: AsyncSession = Depends(async_get_db)):
     """Get a specific knowledge source"""
-    for source in knowledge_sources_db:
-        if source["id"] == source_id:
-            return source
-    
+    for source, entries, last_updated in await async_list_knowledge_sources(db):
+        if source.id == source_id:
+            return _source_dict(source, entries, last_updated)
+
     raise HTTPException(
         status_code=status.HTTP_404_NOT_FOUND,
         detail=f"Knowledge source with ID {source_id} not found"
     )
 
-@router.post("/knowledge-entries", response_model=KnowledgeEntryResponse)
-async def create_knowledge_entry(entry: KnowledgeEntryRequest):
-    """Create a new knowledge entry"""
-    # Find the source
-    source_found = False
-    for source in knowledge_sources_db:
-        if source["id"] == entry.source_id:
-            source_found = True
-            source["entries"] += 1
-            source["last_updated"] = datetime.now().isoformat()
-            break
-    
-    if not source_found:
+@router.delete("/knowledge-sources/{source_id}", response_model=Dict[str, Any])
+async def delete_knowledge_source(source_id: str, db: AsyncSession = Depends(async_get_db)):
+    """Delete a knowledge source and all of its chunks"""
+    deleted = await async_delete_knowledge_source(db, source_id)
+    if deleted is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Knowledge source with ID {entry.source_id} not found"
+            detail=f"Knowledge source with ID {source_id} not found"
+        )
+
+    milvus_ids, shared_ids = deleted
+    try:
+        # One filtered delete on source_id, whatever the size of the rest of the collection;
+        # vectors other sources' documents share stay
+        await run_in_threadpool(delete_source_entries, source_id, milvus_ids, COLLECTION_NAME, shared_ids)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Knowledge source deleted, but removing its entries from the vector store failed: {str(e)}"
         )
+
+    return {
+        "success": True,
+        "message": "Knowledge source deleted successfully",
+        "deleted_entries": len(milvus_ids)
+    }
+
+@router.post("/knowledge-entries", response_model=KnowledgeEntryResponse)
+async def create_knowledge_entry(entry: KnowledgeEntryRequest, db: AsyncSession = Depends(async_get_db)):
+    """Create a new knowledge entry"""
+    await _require_source(db, entry.source_id)
     
     # Add the entry to the vector store
     try:
-        # Use the RAG service to add the entry to the vector store
-        rag_service.add_text_to_milvus(entry.content)
-        
-        # Generate a unique ID for the entry
         entry_id = f"ke-{uuid.uuid4().hex[:8]}"
+        await run_in_threadpool(
+            rag_service.add_text_to_milvus, entry.content, source_key=source_key("entry", entry_id),
+            title=entry.title, source_id=entry.source_id
+        )
         
         return {
             "success": True,
@@ -490,69 +521,72 @@ async def create_knowledge_entry(entry: KnowledgeEntryRequest):
 
 # Knowledge sources endpoints
 @router.get("/knowledge-sources", response_model=List[Dict[str, Any]])
-async def get_knowledge_sources():
+async def get_knowledge_sources(db: AsyncSession = Depends(async_get_db)):
     """Get all knowledge sources"""
-    return knowledge_sources_db
+    return [_source_dict(*row) for row in await async_list_knowledge_sources(db)]
 
 @router.post("/knowledge-sources", response_model=KnowledgeSourceResponse)
-async def create_knowledge_source(source: KnowledgeSourceRequest):
+async def create_knowledge_source(source: KnowledgeSourceRequest, db: AsyncSession = Depends(async_get_db)):
     """Create a new knowledge source"""
-    # Generate a unique ID for the new source
-    source_id = f"ks-{uuid.uuid4().hex[:8]}"
-    
-    new_source = {
-        "id": source_id,
-        "name": source.name,
-        "description": source.description,
-        "source_type": source.source_type,
-        "entries": 0,
-        "last_updated": datetime.now().isoformat()
-    }
-    
-    # Add URL if provided
-    if source.url:
-        new_source["url"] = source.url
-        
-        # If URL is provided and source type is URL, process the content
+    content = None
+    if source.url and source.source_type == "url":
+        # Fetch the page before creating the source, so a bad URL leaves nothing behind
         try:
-            if source.source_type == "url":
-                # Use the RAG service to process the URL
-                # This would extract content and add it to the vector store
-                content = rag_service.retrieve_context(source.url, is_url=True)
-                if content:
-                    # Add the content to the vector store
-                    rag_service.add_text_to_milvus(content)
-                    new_source["entries"] = 1  # At least one entry was added
+            content = await run_in_threadpool(rag_service.retrieve_context, source.url, True)
         except Exception as e:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Failed to process URL: {str(e)}"
             )
-    
-    # Add the new source to the database
-    knowledge_sources_db.append(new_source)
+
+    new_source = await async_create_knowledge_source(
+        db, source.name, source.description, source.source_type, source.url
+    )
+
+    try:
+        if content:
+            # Add the content to the vector store, replacing an earlier import of the same URL
+            await run_in_threadpool(
+                rag_service.add_text_to_milvus, content, source_key=source_key("url", source.url),
+                title=source.name, source_id=new_source.id
+            )
+        elif source.content:
+            await run_in_threadpool(
+                rag_service.add_text_to_milvus, source.content, source_key=source_key("source", new_source.id),
+                title=source.name, source_id=new_source.id
+            )
+    except Exception as e:
+        # The ingest commits on its own session, which needs the source row committed first;
+        # it rolled its part back, so deleting the source leaves nothing of the request behind
+        await async_delete_knowledge_source(db, new_source.id)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Failed to process content: {str(e)}"
+        )
     
     return {
         "success": True,
         "message": "Knowledge source created successfully",
-        "source_id": source_id
+        "source_id": new_source.id
     }
 
 # Knowledge import endpoints
 @router.post("/knowledge-import/url", response_model=Dict[str, Any])
-async def import_from_url(request: ImportUrlRequest):
+async def import_from_url(request: ImportUrlRequest, db: AsyncSession = Depends(async_get_db)):
     """Import knowledge content from a URL"""
+    # Validate URL
+    parsed_url = urlparse(request.url)
+    if not parsed_url.scheme or not parsed_url.netloc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid URL format"
+        )
+    if request.source_id:
+        await _require_source(db, request.source_id)
+
     try:
-        # Validate URL
-        parsed_url = urlparse(request.url)
-        if not parsed_url.scheme or not parsed_url.netloc:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid URL format"
-            )
-        
         # Use the RAG service to extract content from the URL
-        content = rag_service.retrieve_context(request.url, is_url=True)
+        content = await run_in_threadpool(rag_service.retrieve_context, request.url, True)
         
         if not content:
             return {
@@ -560,21 +594,17 @@ async def import_from_url(request: ImportUrlRequest):
                 "message": "Could not extract content from the URL"
             }
         
-        # Add the content to the vector store
-        rag_service.add_text_to_milvus(content)
-        
-        # If a source_id was provided, update its entry count
-        if request.source_id:
-            for source in knowledge_sources_db:
-                if source["id"] == request.source_id:
-                    source["entries"] += 1
-                    source["last_updated"] = datetime.now().isoformat()
-                    break
+        # Add the content to the vector store, replacing an earlier import of the same URL
+        result = await run_in_threadpool(
+            rag_service.ingest_text, content, source_key=source_key("url", request.url), title=request.url,
+            source_id=request.source_id
+        )
         
         return {
             "success": True,
             "message": "Content imported successfully from URL",
-            "content_length": len(content)
+            "content_length": len(content),
+            **result.to_dict()
         }
     except Exception as e:
         raise HTTPException(
@@ -583,19 +613,22 @@ async def import_from_url(request: ImportUrlRequest):
         )
 
 @router.post("/knowledge-import/file", response_model=Dict[str, Any])
-async def import_from_file(file: UploadFile = File(...), source_id: Optional[str] = Form(None)):
+async def import_from_file(file: UploadFile = File(...), source_id: Optional[str] = Form(None),
+                           db: AsyncSession = Depends(async_get_db)):
     """Import knowledge content from an uploaded file"""
+    # Check file extension
+    file_ext = os.path.splitext(file.filename)[1].lower()
+    allowed_extensions = [".pdf", ".docx", ".txt", ".md", ".csv"]
+    
+    if file_ext not in allowed_extensions:
+        return {
+            "success": False,
+            "message": f"Unsupported file type. Allowed types: {', '.join(allowed_extensions)}"
+        }
+    if source_id:
+        await _require_source(db, source_id)
+
     try:
-        # Check file extension
-        file_ext = os.path.splitext(file.filename)[1].lower()
-        allowed_extensions = [".pdf", ".docx", ".txt", ".md", ".csv"]
-        
-        if file_ext not in allowed_extensions:
-            return {
-                "success": False,
-                "message": f"Unsupported file type. Allowed types: {', '.join(allowed_extensions)}"
-            }
-        
         # Read the file content
         content = await file.read()
         
@@ -611,22 +644,18 @@ async def import_from_file(file: UploadFile = File(...), source_id: Optional[str
                 "file_type": file_ext
             }
         
-        # Add the content to the vector store
-        rag_service.add_text_to_milvus(text_content)
-        
-        # If a source_id was provided, update its entry count
-        if source_id:
-            for source in knowledge_sources_db:
-                if source["id"] == source_id:
-                    source["entries"] += 1
-                    source["last_updated"] = datetime.now().isoformat()
-                    break
+        # Add the content to the vector store, replacing an earlier upload of the same file
+        result = await run_in_threadpool(
+            rag_service.ingest_text, text_content, source_key=source_key("file", file.filename),
+            title=file.filename, source_id=source_id
+        )
         
         return {
             "success": True,
             "message": "File imported successfully",
             "filename": file.filename,
-            "content_length": len(text_content) if file_ext in [".txt", ".md", ".csv"] else len(content)
+            "content_length": len(text_content),
+            **result.to_dict()
         }
     except Exception as e:
         raise HTTPException(
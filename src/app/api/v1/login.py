@@ -11,6 +11,7 @@ from ...core.exceptions.http_exceptions import UnauthorizedException
 from ...core.schemas import Token
 from ...core.security import (
     ACCESS_TOKEN_EXPIRE_MINUTES,
+    TokenType,
     authenticate_user,
     create_access_token,
     create_refresh_token,
@@ -49,7 +50,7 @@ async def refresh_access_token(request: Request, db: AsyncSession = Depends(asyn
     if not refresh_token:
         raise UnauthorizedException("Refresh token missing.")
 
-    user_data = await verify_token(refresh_token, db)
+    user_data = await verify_token(refresh_token, TokenType.REFRESH, db)
     if not user_data:
         raise UnauthorizedException("Invalid refresh token.")
 
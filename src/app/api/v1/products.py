@@ -1,29 +1,38 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, File, Form, HTTPException, Query, UploadFile
 from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from typing import List, Optional
-from app.core.db.database import get_db
-from app.schemas.product import ProductCreate, ProductUpdate, ProductResponse, ProductList
-from app.services.product import ProductService
+from app.core.db.database import async_get_db
+from app.schemas.product import ProductCountMode, ProductCreate, ProductUpdate, ProductResponse, ProductList
+from app.crud.crud_product import decode_cursor, encode_cursor
+from app.services.product import AsyncProductService
 from app.services.product_embedding import ProductEmbeddingService
+from app.services.product_import import create_import_job, detect_format, product_import_jobs, run_import_job
 from app.api.deps import get_current_user
 
 router = APIRouter(tags=["products"])
 
 
+def _search_product_embeddings(query: str, top_k: int, language: Optional[str]) -> List[dict]:
+    # Blocking Milvus and embedding calls, run in the threadpool
+    return ProductEmbeddingService().search_products(query=query, top_k=top_k, language=language)
+
+
 @router.post("/products", response_model=ProductResponse)
-def create_product(
+async def create_product(
     product: ProductCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(async_get_db)
 ):
     """Create a new product."""
     try:
-        product_service = ProductService(db)
-        db_product = product_service.create_product(product)
+        product_service = AsyncProductService(db)
+        db_product = await product_service.create_product(product)
         
         # Manually create the response dictionary with empty alternatives
         response_dict = {
             "id": db_product.id,
+            "sku": db_product.sku,
             "name": db_product.name,
             "description": db_product.description,
             "price": db_product.price,
@@ -51,78 +60,108 @@ def create_product(
         )
 
 
+@router.post("/products/import", status_code=202)
+async def import_products(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(..., description="CSV or JSONL file of products keyed by sku"),
+    file_format: Optional[str] = Form(None, description="csv or jsonl, detected from the file name if omitted"),
+):
+    """Start a bulk import; poll GET /products/import/{job_id} for progress."""
+    try:
+        file_format = detect_format(file.filename, file_format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job = await run_in_threadpool(create_import_job, file.file, file.filename, file_format)
+    background_tasks.add_task(run_import_job, job)
+    return job.to_dict()
+
+
+@router.get("/products/import/{job_id}")
+async def get_import_job(job_id: str):
+    """Progress of a bulk import."""
+    job = product_import_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job.to_dict()
+
+
+@router.post("/products/import/{job_id}/resume", status_code=202)
+async def resume_import_job(job_id: str, background_tasks: BackgroundTasks):
+    """Resume a failed bulk import from its last checkpoint."""
+    job = product_import_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    if job.progress.status in ("pending", "running", "completed"):
+        raise HTTPException(status_code=409, detail=f"Import job is {job.progress.status}")
+
+    job.progress.status = "pending"
+    background_tasks.add_task(run_import_job, job)
+    return job.to_dict()
+
+
 @router.get("/products")
-def get_products(
+async def get_products(
     skip: int = 0,
-    limit: int = 10,
+    limit: int = Query(10, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page; takes precedence over skip"),
+    count: ProductCountMode = Query(ProductCountMode.EXACT, description="How to compute total: exact, estimated or none"),
     category: Optional[str] = None,
     language: Optional[str] = Query(None, description="Filter by language (e.g., 'en', 'ar')"),
     search: Optional[str] = Query(None, description="Search term for product name or description"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(async_get_db)
 ):
-    """Get a list of products with optional filtering and search."""
+    """Get a list of products with optional filtering and search.
+    
+    Pages are ordered by id. Pass `next_cursor` from the response as `cursor` to get the
+    next page with a keyset query; `skip` still works but gets slower on deep pages.
+    With `count=exact` the total comes with the first page only, cursor pages return null.
+    """
     try:
-        print(f"DEBUG: Initializing ProductService with db: {db}")
-        product_service = ProductService(db)
-        
-        print(f"DEBUG: Getting products with skip={skip}, limit={limit}, category={category}, language={language}")
-        # Get products with filtering
-        products = product_service.get_products(skip, limit, category, language)
-        print(f"DEBUG: Retrieved {len(products) if products else 0} products")
-        
-        total = product_service.get_product_count(category, language)
-        print(f"DEBUG: Total product count: {total}")
+        product_service = AsyncProductService(db)
+        next_cursor = None
         
-        # If search term is provided, use the ProductEmbeddingService for better search
         if search and search.strip():
             search_term = search.lower().strip()
-            print(f"DEBUG: Searching products with term: {search_term}")
             
             # Use the ProductEmbeddingService for more advanced search
             try:
-                embedding_service = ProductEmbeddingService(db)
-                search_results = embedding_service.search_products(
-                    query=search_term,
-                    top_k=limit,
-                    language=language
-                )
-                
-                if search_results:
-                    print(f"DEBUG: Found {len(search_results)} products via embedding search")
-                    
-                    # Get the product IDs from the search results
-                    product_ids = [result.get('product_id') for result in search_results if result.get('product_id')]
-                    
-                    # Fetch the actual product objects from the database
-                    if product_ids:
-                        products = product_service.get_products_by_ids(product_ids)
-                        total = len(products)
-                    else:
-                        products = []
-                        total = 0
-                else:
-                    # Fallback to simple search if embedding search returns no results
-                    filtered_products = [p for p in products if 
-                                        search_term in p.name.lower() or 
-                                        (p.description and search_term in p.description.lower())]
-                    total = len(filtered_products)
-                    products = filtered_products
+                search_results = await run_in_threadpool(_search_product_embeddings, search_term, limit, language)
             except Exception as search_error:
                 print(f"DEBUG: Error in embedding search: {search_error}, falling back to simple search")
-                # Fallback to simple search
-                filtered_products = [p for p in products if 
-                                    search_term in p.name.lower() or 
-                                    (p.description and search_term in p.description.lower())]
-                total = len(filtered_products)
-                products = filtered_products
-                
-            print(f"DEBUG: After search, {len(products)} products remain")
+                search_results = []
+            
+            # Get the product IDs from the search results, best match first
+            product_ids = [result.get('product_id') for result in search_results if result.get('product_id')]
+            if product_ids:
+                rank = {product_id: i for i, product_id in enumerate(product_ids)}
+                products = sorted(await product_service.get_products_by_ids(product_ids), key=lambda p: rank[p.id])
+            else:
+                # Fallback to simple search if embedding search returns no results
+                products = await product_service.search_products_by_text(search_term, limit, language)
+            total = len(products)
+        else:
+            try:
+                cursor_id = decode_cursor(cursor) if cursor else None
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            
+            products, total, last_id = await product_service.list_products(
+                limit=limit,
+                cursor=cursor_id,
+                skip=skip,
+                category=category,
+                language=language,
+                count_mode=count
+            )
+            next_cursor = encode_cursor(last_id) if last_id is not None else None
         
         # Manually convert products to dictionaries with proper structure
         product_dicts = []
         for p in products:
             product_dict = {
                 "id": p.id,
+                "sku": p.sku,
                 "name": p.name,
                 "description": p.description,
                 "price": p.price,
@@ -141,8 +180,11 @@ def get_products(
         
         return {
             "total": total,
-            "products": product_dicts
+            "products": product_dicts,
+            "next_cursor": next_cursor
         }
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         error_trace = traceback.format_exc()
@@ -154,14 +196,14 @@ def get_products(
 
 
 @router.get("/products/{product_id}", response_model=ProductResponse)
-def get_product(
+async def get_product(
     product_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(async_get_db)
 ):
     """Get a product by ID."""
     try:
-        product_service = ProductService(db)
-        db_product = product_service.get_product(product_id)
+        product_service = AsyncProductService(db)
+        db_product = await product_service.get_product(product_id)
         
         if db_product is None:
             return JSONResponse(
@@ -170,11 +212,11 @@ def get_product(
             )
         
         # Get alternatives for this product
-        alternatives = product_service.get_product_alternatives(product_id)
+        alternatives = await product_service.get_product_alternatives(product_id)
         
         # Create response with alternatives
         response = ProductResponse.model_validate(db_product)
-        response.alternatives = alternatives
+        response.alternatives = [ProductResponse.model_validate(alternative) for alternative in alternatives]
         
         return response
     except Exception as e:
@@ -185,29 +227,30 @@ def get_product(
 
 
 @router.put("/products/{product_id}", response_model=ProductResponse)
-def update_product(
+async def update_product(
     product_id: int,
     product_update: ProductUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(async_get_db)
 ):
     """Update an existing product."""
-    product_service = ProductService(db)
-    db_product = product_service.update_product(product_id, product_update)
+    product_service = AsyncProductService(db)
+    db_product = await product_service.update_product(product_id, product_update)
     
     if db_product is None:
         raise HTTPException(status_code=404, detail="Product not found")
     
-    return db_product
+    # Validate from the loaded columns; serializing the model itself would lazy-load alternatives
+    return ProductResponse.model_validate(db_product)
 
 
 @router.delete("/products/{product_id}", response_model=dict)
-def delete_product(
+async def delete_product(
     product_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(async_get_db)
 ):
     """Soft delete a product."""
-    product_service = ProductService(db)
-    success = product_service.delete_product(product_id)
+    product_service = AsyncProductService(db)
+    success = await product_service.delete_product(product_id)
     
     if not success:
         raise HTTPException(status_code=404, detail="Product not found")
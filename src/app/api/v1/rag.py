@@ -5,6 +5,7 @@ from typing import Optional, List, Dict, Any
 from fastapi import status
 from app.services.milvus_client import get_all_entries, reset_collection
 from app.services.rag import RAGService
+from app.services.knowledge_ingest import source_key
 import os
 import tempfile
 import shutil
@@ -51,7 +52,8 @@ async def rag_context(
                     rag_service.add_to_vector_store,
                     content=text,
                     title=f"URL: {url}",
-                    tags=["url", "imported"]
+                    tags=["url", "imported"],
+                    source_key=source_key("url", str(valid_url))
                 )
                 
                 return {"source": "url", "text": text[:1000] + "..." if len(text) > 1000 else text, "added_to_vector_store": True}
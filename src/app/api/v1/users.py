@@ -5,9 +5,10 @@ from fastcrud.paginated import PaginatedListResponse, compute_offset, paginated_
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...api.dependencies import get_current_superuser, get_current_user
+from ...core.auth_cache import user_cache
 from ...core.db.database import async_get_db
 from ...core.exceptions.http_exceptions import DuplicateValueException, ForbiddenException, NotFoundException
-from ...core.security import blacklist_token, get_password_hash, oauth2_scheme
+from ...core.security import blacklist_token, hash_password, oauth2_scheme
 from ...crud.crud_tier import crud_tiers
 from ...crud.crud_users import crud_users
 from ...models.tier import Tier
@@ -30,7 +31,7 @@ async def write_user(
         raise DuplicateValueException("Username not available")
 
     user_internal_dict = user.model_dump()
-    user_internal_dict["hashed_password"] = get_password_hash(password=user_internal_dict["password"])
+    user_internal_dict["hashed_password"] = await hash_password(password=user_internal_dict["password"])
     del user_internal_dict["password"]
 
     user_internal = UserCreateInternal(**user_internal_dict)
@@ -96,6 +97,7 @@ async def patch_user(
             raise DuplicateValueException("Email is already registered")
 
     await crud_users.update(db=db, object=values, username=username)
+    user_cache.invalidate(db_user["username"], db_user["email"])
     return {"message": "User updated"}
 
 
@@ -115,6 +117,7 @@ async def erase_user(
         raise ForbiddenException()
 
     await crud_users.delete(db=db, username=username)
+    user_cache.invalidate(db_user["username"], db_user["email"])
     await blacklist_token(token=token, db=db)
     return {"message": "User deleted"}
 
@@ -126,11 +129,12 @@ async def erase_db_user(
     db: Annotated[AsyncSession, Depends(async_get_db)],
     token: str = Depends(oauth2_scheme),
 ) -> dict[str, str]:
-    db_user = await crud_users.exists(db=db, username=username)
+    db_user = await crud_users.get(db=db, schema_to_select=UserRead, username=username)
     if not db_user:
         raise NotFoundException("User not found")
 
     await crud_users.db_delete(db=db, username=username)
+    user_cache.invalidate(db_user["username"], db_user["email"])
     await blacklist_token(token=token, db=db)
     return {"message": "User deleted from the database"}
 
@@ -172,4 +176,5 @@ async def patch_user_tier(
         raise NotFoundException("Tier not found")
 
     await crud_users.update(db=db, object=values, username=username)
+    user_cache.invalidate(db_user["username"], db_user["email"])
     return {"message": f"User {db_user['name']} Tier updated"}
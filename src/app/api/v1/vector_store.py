@@ -1,7 +1,15 @@
-from fastapi import APIRouter, HTTPException
+import json
+from datetime import datetime
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Dict, Any, List
-from app.services.milvus_client import insert_embedding, get_embedding, search_embedding, get_all_entries, connect_to_milvus, reset_collection, COLLECTION_NAME
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from typing import Dict, Any, List, Literal, Optional
+from app.services.milvus_client import insert_embedding, get_embedding, search_embedding, get_entries_page, iterate_entries, connect_to_milvus, reset_collection, COLLECTION_NAME
+from app.core.db.database import async_get_db
+from app.crud.crud_knowledge import async_clear_knowledge_documents
+from app.services.vector_snapshot import dump_snapshot, list_snapshots, restore_snapshot, snapshot_path
 from pymilvus import Collection, utility
 
 router = APIRouter(tags=["vector-store"])
@@ -10,6 +18,15 @@ class VectorStoreAddRequest(BaseModel):
     text: str
     language: str = "en"  # Default to English, can be 'ar' for Arabic
 
+class SnapshotCreateRequest(BaseModel):
+    name: Optional[str] = None  # Defaults to the current timestamp
+    collections: Optional[List[str]] = None  # Defaults to the RAG and product collections
+    dtype: Literal["float32", "float16"] = "float32"
+
+class SnapshotRestoreRequest(BaseModel):
+    collections: Optional[List[str]] = None
+    drop_existing: bool = False
+
 class VectorStoreSearchRequest(BaseModel):
     query: str
     top_k: int = 5
@@ -81,15 +98,16 @@ async def search_vector_store(request: VectorStoreSearchRequest):
         results = search_embedding(embedding, request.top_k, filter_expr=filter_expr)
         
         # Extract the text results
-        texts = []
-        if results and len(results) > 0:
-            for hits in results:
-                for hit in hits:
-                    texts.append({
-                        "text": hit.entity.get("text"),
-                        "language": hit.entity.get("language", "en"),
-                        "score": hit.distance
-                    })
+        texts = [
+            {
+                "text": result["text"],
+                "language": result.get("language", "en"),
+                "score": result.get("score", 0.0),  # Calibrated relevance in [0, 1]
+                "similarity": result.get("similarity", 0.0),
+                "relevant": result.get("relevant", False),
+            }
+            for result in results
+        ]
         
         return {
             "success": True,
@@ -102,73 +120,110 @@ async def search_vector_store(request: VectorStoreSearchRequest):
         )
 
 @router.get("/vector-store/all", response_model=Dict[str, Any])
-async def get_all_vector_store_entries():
-    """Get all entries from the vector store"""
+async def get_all_vector_store_entries(
+    limit: int = Query(100, ge=1, le=1000),
+    page_token: Optional[str] = Query(None, description="next_page_token of the previous page"),
+    language: Optional[str] = Query(None, pattern=r"^[a-z]{2,10}$"),
+):
+    """Browse the vector store one page at a time"""
     try:
-        # Connect to Milvus and print debug info
         connect_to_milvus()
-        print(f"Connected to Milvus, checking collection: {COLLECTION_NAME}")
-        
-        # Check if collection exists
-        collections = utility.list_collections()
-        print(f"Available collections: {collections}")
-        
-        if COLLECTION_NAME not in collections:
-            print(f"Warning: Collection {COLLECTION_NAME} not found in Milvus")
-            return {
-                "success": False,
-                "message": f"Collection {COLLECTION_NAME} not found",
-                "count": 0,
-                "entries": []
-            }
-            
-        # Get collection stats
-        try:
-            col = Collection(COLLECTION_NAME)
-            print(f"Collection {COLLECTION_NAME} has {col.num_entities} entities")
-        except Exception as e:
-            print(f"Error getting collection stats: {e}")
-        
-        # Get all entries from the vector store
-        entries = get_all_entries()
-        print(f"Retrieved {len(entries)} entries from get_all_entries")
-        
-        # Format the entries for the response
-        formatted_entries = []
-        for i, entry in enumerate(entries, 1):
-            # Extract a clean entry number for display
-            original_id = entry.get("id", "")
-            display_id = i  # Use the enumeration index as a clean display ID
-            
-            formatted_entries.append({
-                "id": original_id,  # Keep the original ID for database operations
-                "display_id": display_id,  # Add a clean display ID for UI
-                "text": entry.get("text", ""),
-                "language": entry.get("language", "en"),
-                "title": f"Entry #{display_id}",
-                "content": entry.get("text", ""),
-                "tags": ["vector-store", entry.get("language", "en")]
-            })
-        
-        return {
-            "success": True,
-            "count": len(formatted_entries),
-            "entries": formatted_entries
-        }
+        filter_expr = f"language == '{language}'" if language else None
+        entries, next_page_token = await run_in_threadpool(
+            get_entries_page, COLLECTION_NAME, limit, page_token, filter_expr
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         import traceback
-        print(f"Error getting all vector store entries: {str(e)}\n{traceback.format_exc()}")
+        print(f"Error getting vector store entries: {str(e)}\n{traceback.format_exc()}")
         raise HTTPException(
             status_code=500,
             detail=f"Failed to get vector store entries: {str(e)}"
         )
 
+    formatted_entries = []
+    for entry in entries:
+        formatted_entries.append({
+            "id": entry["id"],
+            "display_id": entry["id"],
+            "text": entry.get("text", ""),
+            "language": entry.get("language", "en"),
+            "title": f"Entry #{entry['id']}",
+            "content": entry.get("text", ""),
+            "tags": ["vector-store", entry.get("language", "en")]
+        })
+
+    return {
+        "success": True,
+        "count": len(formatted_entries),
+        "entries": formatted_entries,
+        "next_page_token": next_page_token
+    }
+
+@router.get("/vector-store/export")
+def export_vector_store(
+    collection_name: str = Query(COLLECTION_NAME),
+    include_embeddings: bool = Query(True, description="Include vectors so the backup can be restored without re-embedding"),
+    batch_size: int = Query(1000, ge=1, le=10000),
+):
+    """Stream a whole collection as NDJSON, one entry per line, for backup"""
+    connect_to_milvus()
+    if collection_name not in utility.list_collections():
+        raise HTTPException(status_code=404, detail=f"Collection {collection_name} not found")
+
+    def ndjson_lines():
+        # Sync generator: Starlette iterates it in the threadpool, one Milvus batch at a time
+        for batch in iterate_entries(collection_name, batch_size=batch_size, include_embeddings=include_embeddings):
+            yield "".join(json.dumps(entry, ensure_ascii=False, default=float) + "\n" for entry in batch)
+
+    return StreamingResponse(
+        ndjson_lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{collection_name}.ndjson"'}
+    )
+
+@router.get("/vector-store/snapshots", response_model=Dict[str, Any])
+async def get_vector_store_snapshots():
+    """List complete snapshots with their collection manifests"""
+    snapshots = await run_in_threadpool(list_snapshots)
+    return {"success": True, "snapshots": snapshots}
+
+@router.post("/vector-store/snapshots", response_model=Dict[str, Any], status_code=202)
+async def create_vector_store_snapshot(request: SnapshotCreateRequest, background_tasks: BackgroundTasks):
+    """Dump the vector collections to a snapshot in the background"""
+    name = request.name or datetime.now().strftime("%Y%m%dT%H%M%S")
+    try:
+        if snapshot_path(name).exists():
+            raise HTTPException(status_code=409, detail=f"Snapshot {name} already exists")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    connect_to_milvus()
+    background_tasks.add_task(dump_snapshot, name, request.collections, request.dtype)
+    return {"success": True, "name": name, "message": "Snapshot started; it is listed once complete"}
+
+@router.post("/vector-store/snapshots/{name}/restore", response_model=Dict[str, Any], status_code=202)
+async def restore_vector_store_snapshot(name: str, request: SnapshotRestoreRequest, background_tasks: BackgroundTasks):
+    """Bulk insert a snapshot into Milvus in the background, without calling the embeddings API"""
+    try:
+        if not snapshot_path(name).is_dir():
+            raise HTTPException(status_code=404, detail=f"Snapshot {name} not found")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    connect_to_milvus()
+    background_tasks.add_task(restore_snapshot, name, request.collections, request.drop_existing)
+    return {"success": True, "name": name, "message": "Restore started"}
+
 @router.post("/vector-store/reset", response_model=Dict[str, Any])
-async def reset_vector_store():
+async def reset_vector_store(db: AsyncSession = Depends(async_get_db)):
     """Reset the vector store by dropping and recreating the collection"""
     try:
-        # Reset the collection
+        # Reset the collection; it is recreated with the current schema
         reset_collection()
+        # Its chunks are gone, so their fingerprints must not block re-imports
+        await async_clear_knowledge_documents(db)
         
         return {
             "success": True,
@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import UTC, datetime
+from typing import Any
+
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .config import settings
+from .db.database import local_session
+from .db.token_blacklist import TokenBlacklist
+from .logger import logging
+
+logger = logging.getLogger(__name__)
+
+
+def hash_token(token: str) -> str:
+    """Return the hex sha256 digest stored in ``token_blacklist`` in place of the raw JWT."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _utcnow() -> datetime:
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+class TokenBlacklistCache:
+    """In-process mirror of the ``token_blacklist`` table.
+
+    The table is append-only between purges, so it doubles as a revocation log: each worker
+    remembers the highest row id it has seen and only pulls newer rows, at most once every
+    ``sync_interval`` seconds. Tokens revoked by this worker are visible immediately, tokens
+    revoked by another worker within ``sync_interval``. A full reload runs on every purge to
+    pick up rows whose transaction committed after a higher id had already been read.
+
+    Parameters
+    ----------
+    sync_interval: float
+        Minimum number of seconds between two incremental syncs with the database.
+    """
+
+    def __init__(self, sync_interval: float) -> None:
+        self.sync_interval = sync_interval
+        self._revoked: dict[str, datetime] = {}
+        self._last_id = 0
+        self._last_sync: float | None = None
+        self._lock = asyncio.Lock()
+
+    def add(self, token_hash: str, expires_at: datetime) -> None:
+        self._revoked[token_hash] = expires_at
+
+    async def contains(self, token_hash: str, db: AsyncSession) -> bool:
+        await self.sync(db)
+        return token_hash in self._revoked
+
+    async def sync(self, db: AsyncSession, full: bool = False) -> None:
+        if not full and not self._is_stale():
+            return
+
+        async with self._lock:
+            if not full and not self._is_stale():
+                return
+
+            last_id = 0 if full else self._last_id
+            stmt = (
+                select(TokenBlacklist.id, TokenBlacklist.token_hash, TokenBlacklist.expires_at)
+                .where(TokenBlacklist.id > last_id)
+                .order_by(TokenBlacklist.id)
+            )
+            rows = (await db.execute(stmt)).all()
+
+            revoked = {} if full else self._revoked
+            for row in rows:
+                revoked[row.token_hash] = row.expires_at
+                last_id = row.id
+
+            self._revoked = revoked
+            self._last_id = last_id
+            self._last_sync = time.monotonic()
+
+    def prune(self, now: datetime | None = None) -> None:
+        now = now or _utcnow()
+        self._revoked = {token_hash: exp for token_hash, exp in self._revoked.items() if exp >= now}
+
+    def clear(self) -> None:
+        self._revoked = {}
+        self._last_id = 0
+        self._last_sync = None
+
+    def _is_stale(self) -> bool:
+        return self._last_sync is None or time.monotonic() - self._last_sync >= self.sync_interval
+
+
+class UserCache:
+    """Short-lived LRU of user rows keyed by the token subject (username or email).
+
+    Parameters
+    ----------
+    ttl: float
+        Seconds a cached user stays valid.
+    max_size: int
+        Maximum number of subjects kept; the least recently used entry is evicted first.
+    """
+
+    def __init__(self, ttl: float, max_size: int) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[float, dict[str, Any]]] = OrderedDict()
+
+    def get(self, subject: str) -> dict[str, Any] | None:
+        entry = self._entries.get(subject)
+        if entry is None:
+            return None
+
+        expires, user = entry
+        if expires < time.monotonic():
+            self._entries.pop(subject, None)
+            return None
+
+        self._entries.move_to_end(subject)
+        return user
+
+    def set(self, subject: str, user: dict[str, Any]) -> None:
+        if self.ttl <= 0:
+            return
+
+        self._entries[subject] = (time.monotonic() + self.ttl, user)
+        self._entries.move_to_end(subject)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *subjects: str | None) -> None:
+        for subject in subjects:
+            if subject is not None:
+                self._entries.pop(subject, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+token_blacklist_cache = TokenBlacklistCache(sync_interval=settings.TOKEN_BLACKLIST_SYNC_INTERVAL_SECONDS)
+user_cache = UserCache(ttl=settings.AUTH_USER_CACHE_TTL_SECONDS, max_size=settings.AUTH_USER_CACHE_MAX_SIZE)
+
+
+async def purge_expired_tokens() -> int:
+    """Delete blacklist rows past ``expires_at`` and resync the in-process blacklist.
+
+    Returns
+    -------
+    int
+        Number of rows removed from ``token_blacklist``.
+    """
+    now = _utcnow()
+    async with local_session() as db:
+        result = await db.execute(delete(TokenBlacklist).where(TokenBlacklist.expires_at < now))
+        await db.commit()
+        await token_blacklist_cache.sync(db, full=True)
+
+    token_blacklist_cache.prune(now)
+    return result.rowcount or 0
+
+
+async def purge_expired_tokens_periodically(interval: float) -> None:
+    while True:
+        try:
+            purged = await purge_expired_tokens()
+            if purged:
+                logger.info(f"Purged {purged} expired blacklisted tokens")
+        except Exception as e:
+            logger.error(f"Error purging expired blacklisted tokens: {e}")
+
+        await asyncio.sleep(interval)
@@ -3,15 +3,28 @@ Bot settings utility module for reading and writing bot configuration from datab
 with file-based fallback for local development
 """
 from typing import Dict, Any, List, Optional
+import asyncio
+import copy
 import json
 import os
+import threading
+from dataclasses import dataclass, field
 from pathlib import Path
 from fastapi import Depends
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+import asyncpg
 import logging
 
-from app.core.db.database import get_db
-from app.crud.crud_bot_settings import get_or_create_default_settings as db_get_settings, update_bot_settings as db_update_settings
+from app.core.db.database import get_db, local_session, sync_session
+from app.crud.crud_bot_settings import (
+    BOT_SETTINGS_CHANNEL,
+    async_get_or_create_default_settings as async_db_get_settings,
+    async_update_bot_settings as async_db_update_settings,
+    get_or_create_default_settings as db_get_settings,
+    update_bot_settings as db_update_settings,
+)
 from app.models.bot_settings import BotSettings
 
 # Set up logging
@@ -65,7 +78,7 @@ def get_bot_settings_from_file() -> Dict[str, Any]:
 
 def get_bot_settings(db: Session = None) -> Dict[str, Any]:
     """
-    Read bot settings from the database with file fallback
+    Read bot settings from the in-process cache (loaded from the database with file fallback)
     
     Args:
         db: Database session (optional)
@@ -73,26 +86,7 @@ def get_bot_settings(db: Session = None) -> Dict[str, Any]:
     Returns:
         Dict[str, Any]: The bot settings
     """
-    try:
-        if db is not None:
-            # Get or create default settings from database
-            settings = db_get_settings(db)
-            
-            # Convert to dictionary format
-            return {
-                "bot_name": settings.bot_name,
-                "welcome_message": settings.welcome_message,
-                "fallback_message": settings.fallback_message,
-                "quick_actions": settings.quick_actions or [],
-                "advanced_settings": settings.advanced_settings or {}
-            }
-        else:
-            # Fallback to file-based settings
-            return get_bot_settings_from_file()
-    except Exception as e:
-        logger.error(f"Error getting bot settings from database: {e}")
-        # Fallback to file-based settings
-        return get_bot_settings_from_file()
+    return bot_settings_cache.get(db).to_dict()
 
 
 def save_bot_settings_to_file(settings: Dict[str, Any]) -> bool:
@@ -106,8 +100,11 @@ def save_bot_settings_to_file(settings: Dict[str, Any]) -> bool:
         bool: True if successful, False otherwise
     """
     try:
-        with open(BOT_SETTINGS_FILE, 'w') as f:
+        # Write to a temp file and rename so readers never see a half-written file
+        tmp_file = BOT_SETTINGS_FILE.with_suffix(".json.tmp")
+        with open(tmp_file, 'w') as f:
             json.dump(settings, f, indent=4)
+        os.replace(tmp_file, BOT_SETTINGS_FILE)
         return True
     except Exception as e:
         logger.error(f"Error saving bot settings to file: {e}")
@@ -142,9 +139,8 @@ def save_bot_settings(settings: Dict[str, Any], db: Session = None) -> bool:
             )
             
             success = updated is not None
-            
-            # Also save to file as backup
-            save_bot_settings_to_file(settings)
+            if success:
+                bot_settings_cache.refresh(db, persist_fallback=True)
             
             return success
         else:
@@ -201,58 +197,90 @@ def update_bot_settings(
             success = updated is not None
             print(f"DB update success: {success}")
             
-            # Also update file-based settings
+            # Refresh this worker's cache right away and rewrite the file fallback once;
+            # other workers pick up the new version from the NOTIFY sent with the update
             if success:
-                current_settings = get_bot_settings_from_file()
-                if bot_name is not None:
-                    current_settings["bot_name"] = bot_name
-                if welcome_message is not None:
-                    current_settings["welcome_message"] = welcome_message
-                if fallback_message is not None:
-                    current_settings["fallback_message"] = fallback_message
-                if quick_actions is not None:
-                    current_settings["quick_actions"] = quick_actions
-                if advanced_settings is not None:
-                    if "advanced_settings" not in current_settings:
-                        current_settings["advanced_settings"] = {}
-                    current_settings["advanced_settings"].update(advanced_settings)
-                save_bot_settings_to_file(current_settings)
-                print("Updated file-based settings")
+                bot_settings_cache.refresh(db, persist_fallback=True)
             
             return success
         else:
             # Fallback to file-based settings
-            current_settings = get_bot_settings_from_file()
-            if bot_name is not None:
-                current_settings["bot_name"] = bot_name
-            if welcome_message is not None:
-                current_settings["welcome_message"] = welcome_message
-            if fallback_message is not None:
-                current_settings["fallback_message"] = fallback_message
-            if quick_actions is not None:
-                current_settings["quick_actions"] = quick_actions
-            if advanced_settings is not None:
-                if "advanced_settings" not in current_settings:
-                    current_settings["advanced_settings"] = {}
-                current_settings["advanced_settings"].update(advanced_settings)
-            return save_bot_settings_to_file(current_settings)
+            return _update_bot_settings_file(
+                bot_name, welcome_message, fallback_message, quick_actions, advanced_settings
+            )
     except Exception as e:
         logger.error(f"Error updating bot settings: {e}")
         # Fallback to file-based settings
-        current_settings = get_bot_settings_from_file()
-        if bot_name is not None:
-            current_settings["bot_name"] = bot_name
-        if welcome_message is not None:
-            current_settings["welcome_message"] = welcome_message
-        if fallback_message is not None:
-            current_settings["fallback_message"] = fallback_message
-        if quick_actions is not None:
-            current_settings["quick_actions"] = quick_actions
-        if advanced_settings is not None:
-            if "advanced_settings" not in current_settings:
-                current_settings["advanced_settings"] = {}
-            current_settings["advanced_settings"].update(advanced_settings)
-        return save_bot_settings_to_file(current_settings)
+        return _update_bot_settings_file(bot_name, welcome_message, fallback_message, quick_actions, advanced_settings)
+
+
+async def async_update_bot_settings(
+    db: AsyncSession,
+    bot_name: Optional[str] = None,
+    welcome_message: Optional[str] = None,
+    fallback_message: Optional[str] = None,
+    quick_actions: Optional[List[Dict[str, str]]] = None,
+    advanced_settings: Optional[Dict[str, Any]] = None
+) -> bool:
+    """
+    Async version of update_bot_settings for request handlers
+    
+    Args:
+        db: Async database session
+        bot_name (Optional[str]): The bot name
+        welcome_message (Optional[str]): The welcome message
+        fallback_message (Optional[str]): The fallback message
+        quick_actions (Optional[List[Dict[str, str]]]): The quick actions
+        advanced_settings (Optional[Dict[str, Any]]): Advanced settings
+        
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    try:
+        db_settings = await async_db_get_settings(db)
+        updated = await async_db_update_settings(
+            db=db,
+            bot_settings_id=db_settings.id,
+            bot_name=bot_name,
+            welcome_message=welcome_message,
+            fallback_message=fallback_message,
+            quick_actions=quick_actions,
+            advanced_settings=advanced_settings
+        )
+        
+        success = updated is not None
+        if success:
+            await bot_settings_cache.async_refresh(db, persist_fallback=True)
+        
+        return success
+    except Exception as e:
+        logger.error(f"Error updating bot settings: {e}")
+        return await asyncio.to_thread(
+            _update_bot_settings_file, bot_name, welcome_message, fallback_message, quick_actions, advanced_settings
+        )
+
+
+def _update_bot_settings_file(
+    bot_name: Optional[str],
+    welcome_message: Optional[str],
+    fallback_message: Optional[str],
+    quick_actions: Optional[List[Dict[str, str]]],
+    advanced_settings: Optional[Dict[str, Any]]
+) -> bool:
+    current_settings = get_bot_settings_from_file()
+    if bot_name is not None:
+        current_settings["bot_name"] = bot_name
+    if welcome_message is not None:
+        current_settings["welcome_message"] = welcome_message
+    if fallback_message is not None:
+        current_settings["fallback_message"] = fallback_message
+    if quick_actions is not None:
+        current_settings["quick_actions"] = quick_actions
+    if advanced_settings is not None:
+        if "advanced_settings" not in current_settings:
+            current_settings["advanced_settings"] = {}
+        current_settings["advanced_settings"].update(advanced_settings)
+    return save_bot_settings_to_file(current_settings)
 
 
 class FileBotSettings:
@@ -268,25 +296,234 @@ class FileBotSettings:
         self.advanced_settings = settings.get("advanced_settings", DEFAULT_SETTINGS["advanced_settings"])
 
 
-def get_bot_settings_model(db: Session = None) -> BotSettings:
+@dataclass(frozen=True)
+class BotSettingsSnapshot:
+    """
+    Immutable copy of the bot settings row. Exposes the same attributes as the
+    BotSettings model so it can be used anywhere the model was read.
+    """
+    id: int
+    version: int
+    bot_name: str
+    welcome_message: str
+    fallback_message: str
+    quick_actions: List[Dict[str, Any]] = field(default_factory=list)
+    advanced_settings: Dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def from_model(cls, model: BotSettings) -> "BotSettingsSnapshot":
+        return cls(
+            id=model.id,
+            version=model.version or 0,
+            bot_name=model.bot_name,
+            welcome_message=model.welcome_message,
+            fallback_message=model.fallback_message,
+            quick_actions=copy.deepcopy(model.quick_actions or []),
+            advanced_settings=copy.deepcopy(model.advanced_settings or {}),
+        )
+
+    @classmethod
+    def from_file(cls) -> "BotSettingsSnapshot":
+        file_settings = FileBotSettings(get_bot_settings_from_file())
+        return cls(
+            id=file_settings.id,
+            version=0,
+            bot_name=file_settings.bot_name,
+            welcome_message=file_settings.welcome_message,
+            fallback_message=file_settings.fallback_message,
+            quick_actions=file_settings.quick_actions or [],
+            advanced_settings=file_settings.advanced_settings or {},
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "bot_name": self.bot_name,
+            "welcome_message": self.welcome_message,
+            "fallback_message": self.fallback_message,
+            "quick_actions": copy.deepcopy(self.quick_actions),
+            "advanced_settings": copy.deepcopy(self.advanced_settings),
+        }
+
+
+class BotSettingsCache:
+    """
+    Versioned in-process copy of the bot settings.
+
+    Reads never touch the database once the first snapshot is loaded. A new snapshot
+    is built off to the side and swapped in with a single assignment, and only if its
+    version is newer than the current one, so concurrent refreshes cannot go backwards.
+    Workers learn about new versions through Postgres LISTEN/NOTIFY
+    (see `listen_for_bot_settings_changes`).
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[BotSettingsSnapshot] = None
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> Optional[int]:
+        """Current version, or None while nothing has been loaded from the database."""
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version == 0:
+            return None
+        return snapshot.version
+
+    def get(self, db: Session = None) -> BotSettingsSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.refresh(db)
+        return snapshot
+
+    def refresh(self, db: Session = None, persist_fallback: bool = False) -> BotSettingsSnapshot:
+        """
+        Reload the settings from the database and swap them in if they are newer.
+
+        Args:
+            db: Database session (optional, a short-lived one is opened if omitted)
+            persist_fallback: Also rewrite the JSON fallback file when the version changed
+
+        Returns:
+            BotSettingsSnapshot: The snapshot now being served
+        """
+        try:
+            if db is not None:
+                loaded = BotSettingsSnapshot.from_model(db_get_settings(db))
+            else:
+                with sync_session() as session:
+                    loaded = BotSettingsSnapshot.from_model(db_get_settings(session))
+        except Exception as e:
+            logger.error(f"Error loading bot settings from database: {e}")
+            if self._snapshot is not None:
+                return self._snapshot
+            loaded = BotSettingsSnapshot.from_file()
+
+        snapshot, changed = self._swap(loaded)
+        if changed and persist_fallback and snapshot.version > 0:
+            save_bot_settings_to_file(snapshot.to_dict())
+        return snapshot
+
+    async def async_get(self, db: AsyncSession = None) -> BotSettingsSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = await self.async_refresh(db)
+        return snapshot
+
+    async def async_refresh(self, db: AsyncSession = None, persist_fallback: bool = False) -> BotSettingsSnapshot:
+        """
+        Async version of refresh, loading through the async engine.
+
+        Args:
+            db: Async database session (optional, a short-lived one is opened if omitted)
+            persist_fallback: Also rewrite the JSON fallback file when the version changed
+
+        Returns:
+            BotSettingsSnapshot: The snapshot now being served
+        """
+        try:
+            if db is not None:
+                loaded = BotSettingsSnapshot.from_model(await async_db_get_settings(db))
+            else:
+                async with local_session() as session:
+                    loaded = BotSettingsSnapshot.from_model(await async_db_get_settings(session))
+        except Exception as e:
+            logger.error(f"Error loading bot settings from database: {e}")
+            if self._snapshot is not None:
+                return self._snapshot
+            loaded = await asyncio.to_thread(BotSettingsSnapshot.from_file)
+
+        snapshot, changed = self._swap(loaded)
+        if changed and persist_fallback and snapshot.version > 0:
+            await asyncio.to_thread(save_bot_settings_to_file, snapshot.to_dict())
+        return snapshot
+
+    def _swap(self, loaded: BotSettingsSnapshot) -> tuple[BotSettingsSnapshot, bool]:
+        with self._lock:
+            current = self._snapshot
+            if current is None or loaded.version > current.version:
+                self._snapshot = loaded
+                return loaded, True
+            return current, False
+
+    def is_stale(self, version: Optional[int] = None) -> bool:
+        """Whether a refresh is needed to reach `version` (always, if no version is given)."""
+        current = self._snapshot
+        return version is None or current is None or version > current.version
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshot = None
+
+
+bot_settings_cache = BotSettingsCache()
+
+
+def get_bot_settings_model(db: Session = None) -> BotSettingsSnapshot:
     """
-    Get the bot settings model directly with file fallback
+    Get the bot settings from the in-process cache
     
     Args:
-        db: Database session (optional)
+        db: Database session (optional), only used to load the first snapshot
         
     Returns:
-        BotSettings or FileBotSettings: The bot settings model
+        BotSettingsSnapshot: The current bot settings (file-based if the database is unavailable)
     """
-    try:
-        if db is not None:
-            return db_get_settings(db)
-        else:
-            # Fallback to file-based settings
-            settings = get_bot_settings_from_file()
-            return FileBotSettings(settings)
-    except Exception as e:
-        logger.error(f"Error getting bot settings model: {e}")
-        # Fallback to file-based settings
-        settings = get_bot_settings_from_file()
-        return FileBotSettings(settings)
+    return bot_settings_cache.get(db)
+
+
+async def async_get_bot_settings_model(db: AsyncSession = None) -> BotSettingsSnapshot:
+    """
+    Async version of get_bot_settings_model for request handlers
+    
+    Args:
+        db: Async database session (optional), only used to load the first snapshot
+        
+    Returns:
+        BotSettingsSnapshot: The current bot settings (file-based if the database is unavailable)
+    """
+    return await bot_settings_cache.async_get(db)
+
+
+def _asyncpg_dsn(sqlalchemy_url: str) -> str:
+    return make_url(sqlalchemy_url).set(drivername="postgresql").render_as_string(hide_password=False)
+
+
+async def listen_for_bot_settings_changes(sqlalchemy_url: str, reconnect_delay: float = 5.0) -> None:
+    """
+    Keep this worker's bot settings cache in sync by listening on BOT_SETTINGS_CHANNEL.
+
+    Runs until cancelled. After every (re)connect the cache is refreshed once, since
+    notifications sent while disconnected are lost.
+
+    Args:
+        sqlalchemy_url: Async SQLAlchemy database URL
+        reconnect_delay: Seconds to wait before reconnecting after a failure
+    """
+    # Keep references to in-flight refreshes so they are not garbage collected
+    refreshes = set()
+
+    def on_notify(connection, pid, channel, payload):
+        try:
+            version = int(payload)
+        except (TypeError, ValueError):
+            version = None
+        if bot_settings_cache.is_stale(version):
+            task = asyncio.create_task(bot_settings_cache.async_refresh())
+            refreshes.add(task)
+            task.add_done_callback(refreshes.discard)
+
+    while True:
+        connection = None
+        try:
+            connection = await asyncpg.connect(_asyncpg_dsn(sqlalchemy_url))
+            await connection.add_listener(BOT_SETTINGS_CHANNEL, on_notify)
+            await bot_settings_cache.async_refresh()
+            while not connection.is_closed():
+                await asyncio.sleep(reconnect_delay)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Bot settings listener error: {e}")
+        finally:
+            if connection is not None and not connection.is_closed():
+                await connection.close()
+        await asyncio.sleep(reconnect_delay)
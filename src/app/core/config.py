@@ -27,6 +27,15 @@ class CryptSettings(BaseSettings):
     ALGORITHM: str = config("ALGORITHM", default="HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = config("ACCESS_TOKEN_EXPIRE_MINUTES", default=30)
     REFRESH_TOKEN_EXPIRE_DAYS: int = config("REFRESH_TOKEN_EXPIRE_DAYS", default=7)
+    BCRYPT_ROUNDS: int = config("BCRYPT_ROUNDS", default=12)
+    PASSWORD_HASH_MAX_WORKERS: int = config("PASSWORD_HASH_MAX_WORKERS", default=2)
+
+
+class AuthCacheSettings(BaseSettings):
+    TOKEN_BLACKLIST_SYNC_INTERVAL_SECONDS: float = config("TOKEN_BLACKLIST_SYNC_INTERVAL_SECONDS", default=5.0)
+    TOKEN_BLACKLIST_PURGE_INTERVAL_SECONDS: int = config("TOKEN_BLACKLIST_PURGE_INTERVAL_SECONDS", default=3600)
+    AUTH_USER_CACHE_TTL_SECONDS: float = config("AUTH_USER_CACHE_TTL_SECONDS", default=30.0)
+    AUTH_USER_CACHE_MAX_SIZE: int = config("AUTH_USER_CACHE_MAX_SIZE", default=1024)
 
 
 class DatabaseSettings(BaseSettings):
@@ -64,6 +73,17 @@ class PostgresSettings(DatabaseSettings):
         return f"{self.POSTGRES_SYNC_PREFIX}{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}@{self.POSTGRES_SERVER}:{self.POSTGRES_PORT}/{self.POSTGRES_DB}"
 
 
+class DatabasePoolSettings(BaseSettings):
+    DB_POOL_SIZE: int = config("DB_POOL_SIZE", default=20)
+    DB_MAX_OVERFLOW: int = config("DB_MAX_OVERFLOW", default=10)
+    DB_POOL_TIMEOUT_SECONDS: float = config("DB_POOL_TIMEOUT_SECONDS", default=30.0)
+    DB_POOL_RECYCLE_SECONDS: int = config("DB_POOL_RECYCLE_SECONDS", default=1800)
+    DB_POOL_PRE_PING: bool = config("DB_POOL_PRE_PING", default=True)
+    DB_STATEMENT_CACHE_SIZE: int = config("DB_STATEMENT_CACHE_SIZE", default=500)
+    DB_SYNC_POOL_SIZE: int = config("DB_SYNC_POOL_SIZE", default=2)
+    DB_SYNC_MAX_OVERFLOW: int = config("DB_SYNC_MAX_OVERFLOW", default=3)
+
+
 class FirstUserSettings(BaseSettings):
     ADMIN_NAME: str = config("ADMIN_NAME", default="admin")
     ADMIN_EMAIL: str = config("ADMIN_EMAIL", default="admin@admin.com")
@@ -75,6 +95,110 @@ class TestSettings(BaseSettings):
     ...
 
 
+class CacheBackendOption(Enum):
+    REDIS = "redis"
+    MEMORY = "memory"
+
+
+class RedisCacheSettings(BaseSettings):
+    CACHE_BACKEND: CacheBackendOption = config("CACHE_BACKEND", default="memory")
+    REDIS_CACHE_HOST: str = config("REDIS_CACHE_HOST", default="localhost")
+    REDIS_CACHE_PORT: int = config("REDIS_CACHE_PORT", default=6379)
+    REDIS_CACHE_URL: str = f"redis://{REDIS_CACHE_HOST}:{REDIS_CACHE_PORT}"
+    REDIS_CACHE_MAX_CONNECTIONS: int = config("REDIS_CACHE_MAX_CONNECTIONS", default=50)
+    CACHE_MEMORY_MAX_ENTRIES: int = config("CACHE_MEMORY_MAX_ENTRIES", default=10000)
+    CACHE_LOCK_TIMEOUT_SECONDS: float = config("CACHE_LOCK_TIMEOUT_SECONDS", default=5.0)
+
+
+class ChunkingSettings(BaseSettings):
+    CHUNK_MAX_TOKENS: int = config("CHUNK_MAX_TOKENS", default=256)
+    CHUNK_OVERLAP_TOKENS: int = config("CHUNK_OVERLAP_TOKENS", default=32)
+    CHUNK_MAX_TOKENS_AR: int = config("CHUNK_MAX_TOKENS_AR", default=256)
+    CHUNK_OVERLAP_TOKENS_AR: int = config("CHUNK_OVERLAP_TOKENS_AR", default=64)
+    # Overrides of the chunking strategy per source type, e.g. "url=html,file=markdown"
+    CHUNKING_STRATEGIES: str = config("CHUNKING_STRATEGIES", default="")
+
+
+class RetrievalSettings(BaseSettings):
+    # Candidates fetched from Milvus per query, before reranking
+    RAG_FETCH_K: int = config("RAG_FETCH_K", default=50)
+    RAG_TOP_K: int = config("RAG_TOP_K", default=4)
+    # Tokens of retrieved context allowed into the prompt
+    RAG_CONTEXT_TOKEN_BUDGET: int = config("RAG_CONTEXT_TOKEN_BUDGET", default=1200)
+    # Directory with model.onnx and tokenizer.json of a cross-encoder; empty uses the lexical reranker
+    RERANKER_MODEL_DIR: str = config("RERANKER_MODEL_DIR", default="")
+    RERANKER_MAX_LENGTH: int = config("RERANKER_MAX_LENGTH", default=128)
+    RERANKER_BATCH_SIZE: int = config("RERANKER_BATCH_SIZE", default=32)
+    RERANKER_THREADS: int = config("RERANKER_THREADS", default=4)
+    RERANKER_CACHE_SIZE: int = config("RERANKER_CACHE_SIZE", default=20000)
+    # Run the knowledge base and catalog lookups while the LLM classifies the intent
+    SPECULATIVE_RETRIEVAL: bool = config("SPECULATIVE_RETRIEVAL", default=True)
+    SPECULATION_WORKERS: int = config("SPECULATION_WORKERS", default=8)
+
+
+class IntentSettings(BaseSettings):
+    # Confidence the rules or the local model need to answer without the LLM
+    INTENT_CONFIDENCE_THRESHOLD: float = config("INTENT_CONFIDENCE_THRESHOLD", default=0.85)
+    # Append classified turns to src/data/intents/traffic.jsonl as training data. Opt-in: the
+    # log keeps customer messages verbatim
+    INTENT_TRAFFIC_LOG: bool = config("INTENT_TRAFFIC_LOG", default=False)
+
+
+class ProviderSettings(BaseSettings):
+    # Registered names in app.services.providers: "openai", or "fake" for offline load tests
+    LLM_PROVIDER: str = config("LLM_PROVIDER", default="openai")
+    LLM_MODEL: str = config("LLM_MODEL", default="gpt-4o")
+    CLASSIFIER_LLM_MODEL: str = config("CLASSIFIER_LLM_MODEL", default="gpt-3.5-turbo")
+    EMBEDDING_PROVIDER: str = config("EMBEDDING_PROVIDER", default="openai")
+    # Fake backend latencies in ms: "fixed:M", "uniform:LOW:HIGH", "normal:MEAN:STD" or "lognormal:MEDIAN:SIGMA"
+    FAKE_LLM_LATENCY: str = config("FAKE_LLM_LATENCY", default="lognormal:700:0.4")
+    FAKE_EMBEDDING_LATENCY: str = config("FAKE_EMBEDDING_LATENCY", default="lognormal:120:0.3")
+    FAKE_LLM_RESPONSE_WORDS: int = config("FAKE_LLM_RESPONSE_WORDS", default=60)
+    FAKE_EMBEDDING_DIM: int = config("FAKE_EMBEDDING_DIM", default=3072)
+    FAKE_SEED: int = config("FAKE_SEED", default=0)
+
+
+class OpenAILimitSettings(BaseSettings):
+    # Requests and tokens per minute per model, "model=RPM:TPM,..."; other models use the defaults
+    OPENAI_RATE_LIMITS: str = config(
+        "OPENAI_RATE_LIMITS",
+        default="gpt-4o=500:30000,gpt-3.5-turbo=3500:200000,text-embedding-3-large=3000:1000000",
+    )
+    OPENAI_DEFAULT_RPM: int = config("OPENAI_DEFAULT_RPM", default=500)
+    OPENAI_DEFAULT_TPM: int = config("OPENAI_DEFAULT_TPM", default=30000)
+    # The limits are enforced per process: each of this many processes sharing the API key
+    # (gunicorn workers times replicas) gets an equal share. Defaults to gunicorn's WEB_CONCURRENCY
+    OPENAI_LIMIT_PROCESSES: int = config("OPENAI_LIMIT_PROCESSES", default=config("WEB_CONCURRENCY", default=1))
+    # Concurrent requests per model; the limit adapts between the bounds (AIMD)
+    OPENAI_INITIAL_CONCURRENCY: int = config("OPENAI_INITIAL_CONCURRENCY", default=8)
+    OPENAI_MIN_CONCURRENCY: int = config("OPENAI_MIN_CONCURRENCY", default=1)
+    OPENAI_MAX_CONCURRENCY: int = config("OPENAI_MAX_CONCURRENCY", default=64)
+    # How long a call may wait for a rate limit or concurrency slot before failing
+    OPENAI_QUEUE_TIMEOUT_SECONDS: float = config("OPENAI_QUEUE_TIMEOUT_SECONDS", default=30.0)
+    OPENAI_MAX_RETRIES: int = config("OPENAI_MAX_RETRIES", default=4)
+    # Completion tokens reserved for chat calls without max_tokens, settled on the actual usage
+    OPENAI_COMPLETION_TOKENS_ESTIMATE: int = config("OPENAI_COMPLETION_TOKENS_ESTIMATE", default=256)
+
+
+class DeadlineSettings(BaseSettings):
+    # Time budget of a bot turn; LLM and embedding calls time out when it runs out
+    BOT_TURN_DEADLINE_SECONDS: float = config("BOT_TURN_DEADLINE_SECONDS", default=20.0)
+    # Duplicate a chat request that is slower than the model's recent latency percentile
+    LLM_HEDGING: bool = config("LLM_HEDGING", default=True)
+    # Model or deployment the duplicate goes to; empty for the same one
+    LLM_HEDGE_MODEL: str = config("LLM_HEDGE_MODEL", default="")
+    CLASSIFIER_LLM_HEDGE_MODEL: str = config("CLASSIFIER_LLM_HEDGE_MODEL", default="")
+    LLM_HEDGE_PERCENTILE: float = config("LLM_HEDGE_PERCENTILE", default=0.95)
+    # Latencies a model needs on record before its requests are hedged
+    LLM_HEDGE_MIN_SAMPLES: int = config("LLM_HEDGE_MIN_SAMPLES", default=20)
+    LLM_HEDGE_WORKERS: int = config("LLM_HEDGE_WORKERS", default=64)
+
+
+class CoalescingSettings(BaseSettings):
+    # Share one upstream call between identical concurrent embedding and temperature-0 chat requests
+    REQUEST_COALESCING: bool = config("REQUEST_COALESCING", default=True)
+
+
 class ClientSideCacheSettings(BaseSettings):
     CLIENT_CACHE_MAX_AGE: int = config("CLIENT_CACHE_MAX_AGE", default=60)
 
@@ -93,8 +217,9 @@ class EnvironmentSettings(BaseSettings):
     ENVIRONMENT: EnvironmentOption = config("ENVIRONMENT", default="local")
 
 
-class Settings(AppSettings, PostgresSettings, CryptSettings, FirstUserSettings, TestSettings,
-    ClientSideCacheSettings, DefaultRateLimitSettings, EnvironmentSettings, ):
+class Settings(AppSettings, PostgresSettings, DatabasePoolSettings, CryptSettings, AuthCacheSettings, FirstUserSettings,
+    TestSettings, RedisCacheSettings, ChunkingSettings, RetrievalSettings, IntentSettings, ProviderSettings,
+    OpenAILimitSettings, DeadlineSettings, CoalescingSettings, ClientSideCacheSettings, DefaultRateLimitSettings, EnvironmentSettings, ):
     pass
 
     MILVUS_URI: str = os.getenv("MILVUS_URI", "")
@@ -12,14 +12,35 @@ class Base(DeclarativeBase, MappedAsDataclass):
 
 
 # Get PostgreSQL connection parameters from settings
-# Async database connection
+# Async database connection, used by every request path
 DATABASE_URL = settings.sqlalchemy_async_url
-async_engine = create_async_engine(DATABASE_URL, echo=False, future=True)
+async_engine = create_async_engine(
+    DATABASE_URL,
+    echo=False,
+    future=True,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    # asyncpg prepares every statement; keep the prepared statements per connection
+    # so repeated queries skip the parse/plan round trip
+    connect_args={"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
+)
 local_session = sessionmaker(bind=async_engine, class_=AsyncSession, expire_on_commit=False)
 
-# Sync database connection (for bot settings and other non-async operations)
+# Sync database connection, only for scripts, migrations and the LangGraph bot nodes.
+# Kept deliberately small so it cannot compete with the async pool for connections.
 SYNC_DATABASE_URL = settings.sqlalchemy_sync_url
-sync_engine = create_engine(SYNC_DATABASE_URL, echo=False, future=True)
+sync_engine = create_engine(
+    SYNC_DATABASE_URL,
+    echo=False,
+    future=True,
+    pool_size=settings.DB_SYNC_POOL_SIZE,
+    max_overflow=settings.DB_SYNC_MAX_OVERFLOW,
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
 sync_session = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
 
 
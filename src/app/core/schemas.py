@@ -58,7 +58,7 @@ class TokenData(BaseModel):
 
 
 class TokenBlacklistBase(BaseModel):
-    token: str
+    token_hash: str
     expires_at: datetime
 
 
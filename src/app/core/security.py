@@ -1,3 +1,5 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from enum import Enum
 from datetime import UTC, datetime, timedelta
 from typing import Any, Literal
@@ -8,15 +10,26 @@ from jose import JWTError, jwt
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..crud.crud_users import crud_users
+from .auth_cache import hash_token, token_blacklist_cache
 from .config import settings
 from .db.crud_token_blacklist import crud_token_blacklist
+from .logger import logging
 from .schemas import TokenBlacklistCreate, TokenData
 
+logger = logging.getLogger(__name__)
+
 
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.ALGORITHM
 ACCESS_TOKEN_EXPIRE_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
 REFRESH_TOKEN_EXPIRE_DAYS = settings.REFRESH_TOKEN_EXPIRE_DAYS
+BCRYPT_ROUNDS = settings.BCRYPT_ROUNDS
+
+# bcrypt releases the GIL, so hashing in a small dedicated pool keeps the event loop free without
+# letting a burst of logins take over the default threadpool used by sync endpoints.
+password_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_MAX_WORKERS, thread_name_prefix="password-hash"
+)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/login")
 
@@ -26,15 +39,32 @@ class TokenType(str, Enum):
     REFRESH = "refresh"
 
 async def verify_password(plain_password: str, hashed_password: str) -> bool:
-    correct_password: bool = bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+    loop = asyncio.get_running_loop()
+    correct_password: bool = await loop.run_in_executor(
+        password_hash_executor, bcrypt.checkpw, plain_password.encode(), hashed_password.encode()
+    )
     return correct_password
 
 
 def get_password_hash(password: str) -> str:
-    hashed_password: str = bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+    """Hash a password with the configured bcrypt cost. Blocking; use `hash_password` on the event loop."""
+    hashed_password: str = bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
     return hashed_password
 
 
+async def hash_password(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_hash_executor, get_password_hash, password)
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """Whether a stored bcrypt hash was made with a cost factor other than `BCRYPT_ROUNDS`."""
+    try:
+        return int(hashed_password.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return False
+
+
 async def authenticate_user(username_or_email: str, password: str, db: AsyncSession) -> dict[str, Any] | Literal[False]:
     if "@" in username_or_email:
         db_user: dict | None = await crud_users.get(db=db, email=username_or_email, is_deleted=False)
@@ -47,6 +77,14 @@ async def authenticate_user(username_or_email: str, password: str, db: AsyncSess
     elif not await verify_password(password, db_user["hashed_password"]):
         return False
 
+    if password_needs_rehash(db_user["hashed_password"]):
+        try:
+            new_hash = await hash_password(password)
+            await crud_users.update(db=db, object={"hashed_password": new_hash}, id=db_user["id"])
+            db_user["hashed_password"] = new_hash
+        except Exception as e:
+            logger.error(f"Failed to rehash password for user {db_user['id']}: {e}")
+
     return db_user
 
 
@@ -89,7 +127,7 @@ async def verify_token(token: str, expected_token_type: TokenType, db: AsyncSess
     TokenData | None
         TokenData instance if the token is valid, None otherwise.
     """
-    is_blacklisted = await crud_token_blacklist.exists(db, token=token)
+    is_blacklisted = await token_blacklist_cache.contains(hash_token(token), db)
     if is_blacklisted:
         return None
 
@@ -120,23 +158,27 @@ async def blacklist_tokens(access_token: str, refresh_token: str, db: AsyncSessi
         Database session for performing database operations.
     """
     for token in [access_token, refresh_token]:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        expires_at = datetime.fromtimestamp(payload.get("exp"))
-        await crud_token_blacklist.create(
-            db, 
-            object=TokenBlacklistCreate(
-                token=token,
-                expires_at=expires_at
-            )
-        )
+        await blacklist_token(token, db)
+
 
 async def blacklist_token(token: str, db: AsyncSession) -> None:
+    """Record a token's sha256 hash in ``token_blacklist`` and in this worker's blacklist cache.
+
+    Parameters
+    ----------
+    token: str
+        The token to blacklist.
+    db: AsyncSession
+        Database session for performing database operations.
+    """
     payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-    expires_at = datetime.fromtimestamp(payload.get("exp"))
+    expires_at = datetime.fromtimestamp(payload.get("exp"), UTC).replace(tzinfo=None)
+    token_hash = hash_token(token)
     await crud_token_blacklist.create(
-        db, 
+        db,
         object=TokenBlacklistCreate(
-            token=token,
+            token_hash=token_hash,
             expires_at=expires_at
         )
     )
+    token_blacklist_cache.add(token_hash, expires_at)
@@ -1,3 +1,4 @@
+import asyncio
 from collections.abc import AsyncGenerator, Callable
 from contextlib import _AsyncGeneratorContextManager, asynccontextmanager
 from typing import Any
@@ -10,24 +11,48 @@ from fastapi.openapi.utils import get_openapi
 from fastapi.templating import Jinja2Templates
 
 from ..api.dependencies import get_current_superuser
-from ..middleware.client_cache_middleware import ClientCacheMiddleware
+from ..middleware.client_cache_middleware import ClientCacheMiddleware, default_cache_policies
 from ..models import *
+from .auth_cache import purge_expired_tokens_periodically
+from .bot_settings import bot_settings_cache, listen_for_bot_settings_changes
 from .config import (
     AppSettings,
+    AuthCacheSettings,
+    CacheBackendOption,
     ClientSideCacheSettings,
     DatabaseSettings,
     EnvironmentOption,
     EnvironmentSettings,
+    PostgresSettings,
+    RedisCacheSettings,
     settings,
 )
 from .db.database import Base
 from .db.database import async_engine as engine
+from .utils import cache
 
 # -------------- database --------------
 async def create_tables() -> None:
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
 
+# -------------- cache --------------
+def create_cache_backend(settings: RedisCacheSettings) -> None:
+    if settings.CACHE_BACKEND == CacheBackendOption.REDIS:
+        cache.backend = cache.RedisCacheBackend.from_url(
+            settings.REDIS_CACHE_URL, max_connections=settings.REDIS_CACHE_MAX_CONNECTIONS
+        )
+    else:
+        cache.backend = cache.InMemoryCacheBackend(max_entries=settings.CACHE_MEMORY_MAX_ENTRIES)
+    cache.lock_timeout = settings.CACHE_LOCK_TIMEOUT_SECONDS
+
+
+async def close_cache_backend() -> None:
+    if cache.backend is not None:
+        await cache.backend.close()
+        cache.backend = None
+
+
 # -------------- application --------------
 async def set_threadpool_tokens(number_of_tokens: int = 100) -> None:
     limiter = anyio.to_thread.current_default_thread_limiter()
@@ -37,6 +62,8 @@ def lifespan_factory(
     settings: (
         DatabaseSettings
         | AppSettings
+        | AuthCacheSettings
+        | RedisCacheSettings
         | ClientSideCacheSettings
         | EnvironmentSettings
     ),
@@ -53,11 +80,34 @@ def lifespan_factory(
 
         await set_threadpool_tokens()
 
+        if isinstance(settings, RedisCacheSettings):
+            create_cache_backend(settings)
+
+        bot_settings_listener = None
+        if isinstance(settings, PostgresSettings):
+            await bot_settings_cache.async_refresh()
+            bot_settings_listener = asyncio.create_task(
+                listen_for_bot_settings_changes(settings.sqlalchemy_async_url)
+            )
+
+        purge_task = None
+        if isinstance(settings, AuthCacheSettings):
+            purge_task = asyncio.create_task(
+                purge_expired_tokens_periodically(settings.TOKEN_BLACKLIST_PURGE_INTERVAL_SECONDS)
+            )
+
         try:
             initialization_complete.set()
             yield
         finally:
-            pass
+            if purge_task is not None:
+                purge_task.cancel()
+
+            if bot_settings_listener is not None:
+                bot_settings_listener.cancel()
+
+            if isinstance(settings, RedisCacheSettings):
+                await close_cache_backend()
 
     return lifespan
 
@@ -67,6 +117,8 @@ def create_application(
     settings: (
         DatabaseSettings
         | AppSettings
+        | AuthCacheSettings
+        | RedisCacheSettings
         | ClientSideCacheSettings
         | EnvironmentSettings
     ),
@@ -89,6 +141,9 @@ def create_application(
 
         - AppSettings: Configures basic app metadata like name, description, contact, and license info.
         - DatabaseSettings: Adds event handlers for initializing database tables during startup.
+        - PostgresSettings: Loads the bot settings cache and listens for changes from other workers.
+        - AuthCacheSettings: Starts the background purge of expired blacklisted tokens.
+        - RedisCacheSettings: Sets up the Redis or in-memory backend used by the `cache` decorator.
         - ClientSideCacheSettings: Integrates middleware for client-side caching.
         - EnvironmentSettings: Conditionally sets documentation URLs and integrates custom routes for API documentation
           based on the environment type.
@@ -131,7 +186,10 @@ def create_application(
     from app.core.template_config import templates
 
     if isinstance(settings, ClientSideCacheSettings):
-        application.add_middleware(ClientCacheMiddleware, max_age=settings.CLIENT_CACHE_MAX_AGE)
+        policies = default_cache_policies(
+            settings.CLIENT_CACHE_MAX_AGE, bot_settings_version=lambda: bot_settings_cache.version
+        )
+        application.add_middleware(ClientCacheMiddleware, max_age=settings.CLIENT_CACHE_MAX_AGE, policies=policies)
 
     if isinstance(settings, EnvironmentSettings):
         if settings.ENVIRONMENT != EnvironmentOption.PRODUCTION:
@@ -1,15 +1,192 @@
+import asyncio
+import fnmatch
 import functools
-import json
 import re
-from collections.abc import Callable
+import secrets
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
 from typing import Any
 
+import orjson
 from fastapi import Request, Response
 from fastapi.encoders import jsonable_encoder
+from redis.asyncio import ConnectionPool, Redis
 
 from ..exceptions.cache_exceptions import CacheIdentificationInferenceError, InvalidRequestError, MissingClientError
 
 
+class CacheBackend(ABC):
+    """Storage used by the `cache` decorator. Values are opaque bytes (orjson-encoded by the decorator)."""
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None: ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, expiration: int) -> None: ...
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None: ...
+
+    @abstractmethod
+    async def delete_pattern(self, pattern: str) -> None: ...
+
+    @abstractmethod
+    async def acquire_lock(self, key: str, timeout: float) -> bool:
+        """Try to take the cross-process fill lock for `key`, held for at most `timeout` seconds."""
+
+    @abstractmethod
+    async def release_lock(self, key: str) -> None:
+        """Release the fill lock for `key` if this backend still holds it."""
+
+    async def close(self) -> None:
+        return None
+
+
+# Deletes a lock only if it still holds our token: a holder whose lock expired must not release another's
+_RELEASE_LOCK_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class RedisCacheBackend(CacheBackend):
+    """Redis backend over a shared connection pool. redis-py picks up the hiredis parser when it is installed."""
+
+    def __init__(self, client: Redis) -> None:
+        self.client = client
+        self._release_lock_script = client.register_script(_RELEASE_LOCK_SCRIPT)
+        # Token of each fill lock held by this process; `cache` runs one fill per key at a time per process
+        self._lock_tokens: dict[str, bytes] = {}
+
+    @classmethod
+    def from_url(cls, url: str, max_connections: int | None = None) -> "RedisCacheBackend":
+        pool = ConnectionPool.from_url(url, max_connections=max_connections)
+        return cls(Redis.from_pool(pool))
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.client.get(key)
+
+    async def set(self, key: str, value: bytes, expiration: int) -> None:
+        await self.client.set(key, value, ex=expiration)
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.client.delete(*keys)
+
+    async def delete_pattern(self, pattern: str) -> None:
+        batch = []
+        async for key in self.client.scan_iter(match=pattern, count=100):
+            batch.append(key)
+            if len(batch) >= 100:
+                await self.client.unlink(*batch)
+                batch = []
+        if batch:
+            await self.client.unlink(*batch)
+
+    async def acquire_lock(self, key: str, timeout: float) -> bool:
+        token = secrets.token_hex(16).encode()
+        if not await self.client.set(f"{key}:lock", token, nx=True, px=int(timeout * 1000)):
+            return False
+        self._lock_tokens[key] = token
+        return True
+
+    async def release_lock(self, key: str) -> None:
+        token = self._lock_tokens.pop(key, None)
+        if token is not None:
+            await self._release_lock_script(keys=[f"{key}:lock"], args=[token])
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """Per-process LRU with expiration, used when Redis is not configured.
+
+    Each worker keeps its own copy, so invalidations only reach the worker that served the write.
+    """
+
+    def __init__(self, max_entries: int = 10000) -> None:
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+
+    async def get(self, key: str) -> bytes | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, expiration: int) -> None:
+        self._entries[key] = (time.monotonic() + expiration, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def delete_pattern(self, pattern: str) -> None:
+        for key in [key for key in self._entries if fnmatch.fnmatchcase(key, pattern)]:
+            del self._entries[key]
+
+    async def acquire_lock(self, key: str, timeout: float) -> bool:
+        # The in-process single-flight lock in `cache` already serializes fills within this worker
+        return True
+
+    async def release_lock(self, key: str) -> None:
+        return None
+
+
+backend: CacheBackend | None = None
+lock_timeout: float = 5.0
+_fill_locks: dict[str, tuple[asyncio.Lock, int]] = {}
+
+
+@asynccontextmanager
+async def _single_flight(key: str) -> AsyncIterator[None]:
+    """Serialize cache fills for `key` within this process so a cold key triggers one backend call."""
+    lock, waiters = _fill_locks.get(key, (asyncio.Lock(), 0))
+    _fill_locks[key] = (lock, waiters + 1)
+    try:
+        async with lock:
+            yield
+    finally:
+        lock, waiters = _fill_locks[key]
+        if waiters == 1:
+            del _fill_locks[key]
+        else:
+            _fill_locks[key] = (lock, waiters - 1)
+
+
+async def _wait_for_fill(cache_key: str) -> bytes | None:
+    """Poll for a value another process is filling, giving up after `lock_timeout` seconds."""
+    if backend is None:
+        raise MissingClientError
+
+    deadline = time.monotonic() + lock_timeout
+    delay = 0.01
+    while time.monotonic() < deadline:
+        await asyncio.sleep(delay)
+        cached_data = await backend.get(cache_key)
+        if cached_data is not None:
+            return cached_data
+        delay = min(delay * 2, 0.2)
+
+    return None
+
+
 def _infer_resource_id(kwargs: dict[str, Any], resource_id_type: type | tuple[type, ...]) -> int | str:
     """Infer the resource ID from a dictionary of keyword arguments.
 
@@ -138,6 +315,25 @@ def _format_extra_data(to_invalidate_extra: dict[str, str], kwargs: dict[str, An
     return formatted_extra
 
 
+async def _delete_keys_by_pattern(pattern: str) -> None:
+    """Delete all keys that match a given pattern.
+
+    Parameters
+    ----------
+    pattern: str
+        The glob-style pattern to match keys (e.g. "user_*_posts:*").
+
+    Note
+    ----
+        With the Redis backend this uses SCAN in batches of 100 keys, so it does not block the server the way KEYS
+        would, but it still walks the whole keyspace. Prefer specific patterns.
+    """
+    if backend is None:
+        raise MissingClientError
+
+    await backend.delete_pattern(pattern)
+
+
 def cache(
     key_prefix: str,
     resource_id_name: Any = None,
@@ -146,11 +342,95 @@ def cache(
     to_invalidate_extra: dict[str, Any] | None = None,
     pattern_to_invalidate_extra: list[str] | None = None,
 ) -> Callable:
-    """Cache decorator for FastAPI endpoints. (No-op version, Redis removed)"""
+    """Cache decorator for FastAPI endpoints.
+
+    On GET requests the JSON-serializable response is stored under `{key_prefix}:{resource_id}` and served from the
+    cache until it expires; concurrent misses for the same key are collapsed into a single call to the endpoint.
+    On any other method the endpoint runs first, then the key and any extra keys/patterns are invalidated.
+
+    Parameters
+    ----------
+    key_prefix: str
+        A unique prefix to identify the cache key, may reference endpoint kwargs (e.g. "{username}_posts").
+    resource_id_name: Any, optional
+        The name of the endpoint kwarg holding the resource id. Inferred from `resource_id_type` if omitted.
+    expiration: int, optional
+        Seconds before a cached response expires. Defaults to 3600.
+    resource_id_type: Union[type, Tuple[type, ...]], default int
+        The expected type of the resource ID, used when `resource_id_name` is not given.
+    to_invalidate_extra: Dict[str, str], optional
+        Extra `{prefix: "{kwarg}"}` keys to delete on non-GET requests.
+    pattern_to_invalidate_extra: List[str], optional
+        Extra key patterns to delete on non-GET requests, e.g. ["{username}_posts:*"].
+
+    Returns
+    -------
+    Callable
+        A decorator function that can be applied to FastAPI endpoints.
+
+    Raises
+    ------
+    MissingClientError
+        If no cache backend has been configured.
+    InvalidRequestError
+        If a GET endpoint is given invalidation parameters.
+    """
+
     def wrapper(func: Callable) -> Callable:
         @functools.wraps(func)
         async def inner(request: Request, *args: Any, **kwargs: Any) -> Response:
-            # Just call the function, no caching
-            return await func(request, *args, **kwargs)
+            if backend is None:
+                raise MissingClientError
+
+            if resource_id_name:
+                resource_id = kwargs[resource_id_name]
+            else:
+                resource_id = _infer_resource_id(kwargs=kwargs, resource_id_type=resource_id_type)
+
+            formatted_key_prefix = _format_prefix(key_prefix, kwargs)
+            cache_key = f"{formatted_key_prefix}:{resource_id}"
+
+            if request.method != "GET":
+                result = await func(request, *args, **kwargs)
+                await backend.delete(cache_key)
+                if to_invalidate_extra is not None:
+                    formatted_extra = _format_extra_data(to_invalidate_extra, kwargs)
+                    await backend.delete(*(f"{prefix}:{id}" for prefix, id in formatted_extra.items()))
+
+                if pattern_to_invalidate_extra is not None:
+                    for pattern in pattern_to_invalidate_extra:
+                        formatted_pattern = _format_prefix(pattern, kwargs)
+                        await _delete_keys_by_pattern(formatted_pattern + "*")
+
+                return result
+
+            if to_invalidate_extra is not None or pattern_to_invalidate_extra is not None:
+                raise InvalidRequestError
+
+            cached_data = await backend.get(cache_key)
+            if cached_data is not None:
+                return orjson.loads(cached_data)
+
+            async with _single_flight(cache_key):
+                cached_data = await backend.get(cache_key)
+                if cached_data is not None:
+                    return orjson.loads(cached_data)
+
+                has_lock = await backend.acquire_lock(cache_key, lock_timeout)
+                if not has_lock:
+                    cached_data = await _wait_for_fill(cache_key)
+                    if cached_data is not None:
+                        return orjson.loads(cached_data)
+
+                try:
+                    result = await func(request, *args, **kwargs)
+                    await backend.set(cache_key, orjson.dumps(jsonable_encoder(result)), expiration)
+                finally:
+                    if has_lock:
+                        await backend.release_lock(cache_key)
+
+            return result
+
         return inner
+
     return wrapper
@@ -1,8 +1,48 @@
+import copy
 from typing import Dict, Any, List, Optional, Union
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.models.bot_settings import BotSettings
 
+# Postgres NOTIFY channel announcing a new bot settings version to every worker
+BOT_SETTINGS_CHANNEL = "bot_settings_changed"
+
+# Settings created the first time they are read
+DEFAULT_BOT_SETTINGS: Dict[str, Any] = {
+    "bot_name": "E-Commerce Support Bot",
+    "welcome_message": "Hello! I'm your support assistant. How can I help you today?",
+    "fallback_message": "I'm sorry, I couldn't understand your request. Could you please rephrase or select one of the quick options below?",
+    "quick_actions": [
+        {"label": "Track Order", "value": "Track my order!"},
+        {"label": "Return Item", "value": "I want to return an item"},
+        {"label": "Talk to Human", "value": "I want to talk to a human agent"}
+    ],
+    "advanced_settings": {
+        "response_time": "immediate",
+        "language": "en",
+        "tone": "friendly",
+        "max_message_length": 500
+    }
+}
+
+
+_NOTIFY_STATEMENT = text("SELECT pg_notify(:channel, :payload)")
+
+
+def notify_bot_settings_changed(db: Session, version: int) -> None:
+    """
+    Queue a NOTIFY for the new settings version. Postgres delivers it when the
+    current transaction commits, so listeners never see an uncommitted version.
+    """
+    db.execute(_NOTIFY_STATEMENT, {"channel": BOT_SETTINGS_CHANNEL, "payload": str(version)})
+
+
+async def async_notify_bot_settings_changed(db: AsyncSession, version: int) -> None:
+    """Async version of notify_bot_settings_changed."""
+    await db.execute(_NOTIFY_STATEMENT, {"channel": BOT_SETTINGS_CHANNEL, "payload": str(version)})
+
 
 def get_bot_settings(db: Session) -> Optional[BotSettings]:
     """
@@ -45,9 +85,11 @@ def create_bot_settings(
         welcome_message=welcome_message,
         fallback_message=fallback_message,
         quick_actions=quick_actions or [],
-        advanced_settings=advanced_settings or {}
+        advanced_settings=advanced_settings or {},
+        version=1
     )
     db.add(db_settings)
+    notify_bot_settings_changed(db, 1)
     db.commit()
     db.refresh(db_settings)
     return db_settings
@@ -80,34 +122,25 @@ def update_bot_settings(
     print(f"Updating bot settings with ID {bot_settings_id}")
     print(f"Advanced settings: {advanced_settings}")
     
-    db_settings = db.query(BotSettings).filter(BotSettings.id == bot_settings_id).first()
+    # Locked until the commit, so concurrent updates merge advanced_settings one after the other
+    db_settings = db.query(BotSettings).filter(BotSettings.id == bot_settings_id).with_for_update().first()
     if not db_settings:
         print(f"No bot settings found with ID {bot_settings_id}")
         return None
     
-    update_data = {}
-    if bot_name is not None:
-        update_data["bot_name"] = bot_name
-    if welcome_message is not None:
-        update_data["welcome_message"] = welcome_message
-    if fallback_message is not None:
-        update_data["fallback_message"] = fallback_message
-    if quick_actions is not None:
-        update_data["quick_actions"] = quick_actions
-    
-    if advanced_settings is not None:
-        # Merge with existing advanced settings
-        current_advanced = db_settings.advanced_settings or {}
-        print(f"Current advanced settings: {current_advanced}")
-        current_advanced.update(advanced_settings)
-        update_data["advanced_settings"] = current_advanced
-        print(f"Updated advanced settings: {current_advanced}")
+    update_data = _build_update_data(
+        db_settings, bot_name, welcome_message, fallback_message, quick_actions, advanced_settings
+    )
     
     print(f"Updating with data: {update_data}")
     
     try:
         for key, value in update_data.items():
             setattr(db_settings, key, value)
+        _increment_version(db_settings)
+        db.flush()
+        db.refresh(db_settings, ["version"])
+        notify_bot_settings_changed(db, db_settings.version)
         
         db.commit()
         db.refresh(db_settings)
@@ -119,6 +152,39 @@ def update_bot_settings(
         return None
 
 
+def _increment_version(db_settings: BotSettings) -> None:
+    # Incremented by the database rather than from the loaded value, so two overlapping
+    # updates always commit different versions and the caches pick up the later one
+    db_settings.version = func.coalesce(BotSettings.version, 0) + 1
+
+
+def _build_update_data(
+    db_settings: BotSettings,
+    bot_name: Optional[str],
+    welcome_message: Optional[str],
+    fallback_message: Optional[str],
+    quick_actions: Optional[List[Dict[str, str]]],
+    advanced_settings: Optional[Dict[str, Any]]
+) -> Dict[str, Any]:
+    update_data = {}
+    if bot_name is not None:
+        update_data["bot_name"] = bot_name
+    if welcome_message is not None:
+        update_data["welcome_message"] = welcome_message
+    if fallback_message is not None:
+        update_data["fallback_message"] = fallback_message
+    if quick_actions is not None:
+        update_data["quick_actions"] = quick_actions
+    
+    if advanced_settings is not None:
+        # Merge with existing advanced settings
+        current_advanced = dict(db_settings.advanced_settings or {})
+        current_advanced.update(advanced_settings)
+        update_data["advanced_settings"] = current_advanced
+    
+    return update_data
+
+
 def get_or_create_default_settings(db: Session) -> BotSettings:
     """
     Get the bot settings or create default ones if they don't exist
@@ -134,20 +200,81 @@ def get_or_create_default_settings(db: Session) -> BotSettings:
         return db_settings
     
     # Create default settings
-    return create_bot_settings(
-        db=db,
-        bot_name="E-Commerce Support Bot",
-        welcome_message="Hello! I'm your support assistant. How can I help you today?",
-        fallback_message="I'm sorry, I couldn't understand your request. Could you please rephrase or select one of the quick options below?",
-        quick_actions=[
-            {"label": "Track Order", "value": "Track my order!"},
-            {"label": "Return Item", "value": "I want to return an item"},
-            {"label": "Talk to Human", "value": "I want to talk to a human agent"}
-        ],
-        advanced_settings={
-            "response_time": "immediate",
-            "language": "en",
-            "tone": "friendly",
-            "max_message_length": 500
-        }
+    return create_bot_settings(db=db, **copy.deepcopy(DEFAULT_BOT_SETTINGS))
+
+
+# Async versions for request paths, built on AsyncSession
+
+async def async_get_bot_settings(db: AsyncSession) -> Optional[BotSettings]:
+    """Async version of get_bot_settings."""
+    result = await db.execute(select(BotSettings).limit(1))
+    return result.scalars().first()
+
+
+async def async_create_bot_settings(
+    db: AsyncSession,
+    bot_name: str,
+    welcome_message: str,
+    fallback_message: str,
+    quick_actions: Optional[List[Dict[str, str]]] = None,
+    advanced_settings: Optional[Dict[str, Any]] = None
+) -> BotSettings:
+    """Async version of create_bot_settings."""
+    db_settings = BotSettings(
+        bot_name=bot_name,
+        welcome_message=welcome_message,
+        fallback_message=fallback_message,
+        quick_actions=quick_actions or [],
+        advanced_settings=advanced_settings or {},
+        version=1
     )
+    db.add(db_settings)
+    await async_notify_bot_settings_changed(db, 1)
+    await db.commit()
+    await db.refresh(db_settings)
+    return db_settings
+
+
+async def async_update_bot_settings(
+    db: AsyncSession,
+    bot_settings_id: int,
+    bot_name: Optional[str] = None,
+    welcome_message: Optional[str] = None,
+    fallback_message: Optional[str] = None,
+    quick_actions: Optional[List[Dict[str, str]]] = None,
+    advanced_settings: Optional[Dict[str, Any]] = None
+) -> Optional[BotSettings]:
+    """Async version of update_bot_settings."""
+    db_settings = await db.get(BotSettings, bot_settings_id, with_for_update=True)
+    if not db_settings:
+        print(f"No bot settings found with ID {bot_settings_id}")
+        return None
+    
+    update_data = _build_update_data(
+        db_settings, bot_name, welcome_message, fallback_message, quick_actions, advanced_settings
+    )
+    
+    try:
+        for key, value in update_data.items():
+            setattr(db_settings, key, value)
+        _increment_version(db_settings)
+        await db.flush()
+        await db.refresh(db_settings, ["version"])
+        await async_notify_bot_settings_changed(db, db_settings.version)
+        
+        await db.commit()
+        await db.refresh(db_settings)
+        return db_settings
+    except Exception as e:
+        print(f"Error updating bot settings: {e}")
+        await db.rollback()
+        return None
+
+
+async def async_get_or_create_default_settings(db: AsyncSession) -> BotSettings:
+    """Async version of get_or_create_default_settings."""
+    db_settings = await async_get_bot_settings(db)
+    if db_settings:
+        return db_settings
+    
+    return await async_create_bot_settings(db=db, **copy.deepcopy(DEFAULT_BOT_SETTINGS))
@@ -1,3 +1,6 @@
+from datetime import datetime
+from sqlalchemy import delete, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models.coupon import Coupon
 from app.schemas.coupon import CouponCreate, CouponUpdate
@@ -53,4 +56,55 @@ def delete_coupon(db: Session, coupon_id: int) -> bool:
         db.delete(db_coupon)
         db.commit()
         return True
-    return False
\ No newline at end of file
+    return False
+
+async def async_create_coupon(db: AsyncSession, coupon: CouponCreate) -> Coupon:
+    db_coupon = Coupon()
+
+    db_coupon.code = coupon.code
+    db_coupon.discount = coupon.discount
+    db_coupon.description = coupon.description
+    db_coupon.is_active = coupon.is_active
+    db_coupon.expires_at = coupon.expires_at
+
+    db.add(db_coupon)
+    await db.commit()
+    await db.refresh(db_coupon)
+    return db_coupon
+
+async def async_get_coupon_by_code(db: AsyncSession, code: str) -> Optional[Coupon]:
+    result = await db.execute(select(Coupon).where(Coupon.code == code).limit(1))
+    return result.scalars().first()
+
+async def async_get_all_coupons(db: AsyncSession) -> List[Coupon]:
+    result = await db.execute(select(Coupon))
+    return list(result.scalars().all())
+
+async def async_get_active_coupons(db: AsyncSession, now: datetime) -> List[Coupon]:
+    # Filter in SQL instead of loading every coupon and filtering in Python
+    result = await db.execute(
+        select(Coupon).where(
+            Coupon.is_active.is_(True),
+            or_(Coupon.expires_at.is_(None), Coupon.expires_at > now),
+        )
+    )
+    return list(result.scalars().all())
+
+async def async_get_coupon_by_id(db: AsyncSession, coupon_id: int) -> Optional[Coupon]:
+    return await db.get(Coupon, coupon_id)
+
+async def async_update_coupon(db: AsyncSession, coupon_id: int, coupon_data: Dict[str, Any]) -> Optional[Coupon]:
+    db_coupon = await async_get_coupon_by_id(db, coupon_id)
+    if db_coupon:
+        for key in ('code', 'discount', 'description', 'is_active', 'expires_at'):
+            if key in coupon_data and coupon_data[key] is not None:
+                setattr(db_coupon, key, coupon_data[key])
+
+        await db.commit()
+        await db.refresh(db_coupon)
+    return db_coupon
+
+async def async_delete_coupon(db: AsyncSession, coupon_id: int) -> bool:
+    result = await db.execute(delete(Coupon).where(Coupon.id == coupon_id))
+    await db.commit()
+    return bool(result.rowcount)
@@ -0,0 +1,106 @@
+import uuid
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.knowledge import KnowledgeChunk, KnowledgeDocument, KnowledgeSource
+
+
+async def async_create_knowledge_source(db: AsyncSession, name: str, description: Optional[str] = None,
+                                        source_type: str = "manual", url: Optional[str] = None) -> KnowledgeSource:
+    db_source = KnowledgeSource()
+    db_source.id = f"ks-{uuid.uuid4().hex[:8]}"
+    db_source.name = name
+    db_source.description = description
+    db_source.source_type = source_type
+    db_source.url = url
+    db_source.created_at = db_source.updated_at = datetime.utcnow()
+
+    db.add(db_source)
+    await db.commit()
+    await db.refresh(db_source)
+    return db_source
+
+
+async def async_get_knowledge_source(db: AsyncSession, source_id: str) -> Optional[KnowledgeSource]:
+    return await db.get(KnowledgeSource, source_id)
+
+
+async def async_list_knowledge_sources(db: AsyncSession) -> List[Tuple[KnowledgeSource, int, Optional[datetime]]]:
+    """Every source with its number of stored chunks and the time one of its documents last changed."""
+    query = (
+        select(
+            KnowledgeSource,
+            func.coalesce(func.sum(KnowledgeDocument.chunk_count), 0),
+            func.max(KnowledgeDocument.updated_at),
+        )
+        .outerjoin(KnowledgeDocument, KnowledgeDocument.source_id == KnowledgeSource.id)
+        .group_by(KnowledgeSource.id)
+        .order_by(KnowledgeSource.created_at)
+    )
+    return [(source, int(entries), last_updated) for source, entries, last_updated in await db.execute(query)]
+
+
+async def async_get_source_milvus_ids(db: AsyncSession, source_id: str) -> List[int]:
+    query = (
+        select(KnowledgeChunk.milvus_id)
+        .join(KnowledgeDocument, KnowledgeDocument.id == KnowledgeChunk.document_id)
+        .where(KnowledgeDocument.source_id == source_id, KnowledgeChunk.milvus_id.is_not(None))
+    )
+    return list((await db.execute(query)).scalars().all())
+
+
+async def async_delete_knowledge_source(db: AsyncSession, source_id: str) -> Optional[Tuple[List[int], List[int]]]:
+    """
+    Delete a source with its documents and chunk fingerprints.
+
+    Returns the Milvus ids of the source's chunks split into those no other document points
+    to, whose vectors can go, and those shared with other sources' documents, which must
+    stay; or None if the source does not exist.
+    """
+    db_source = await async_get_knowledge_source(db, source_id)
+    if db_source is None:
+        return None
+
+    milvus_ids = list(dict.fromkeys(await async_get_source_milvus_ids(db, source_id)))
+    document_ids = select(KnowledgeDocument.id).where(KnowledgeDocument.source_id == source_id)
+    await db.execute(delete(KnowledgeChunk).where(KnowledgeChunk.document_id.in_(document_ids)))
+    await db.execute(delete(KnowledgeDocument).where(KnowledgeDocument.source_id == source_id))
+    await db.delete(db_source)
+    shared = set((await db.execute(
+        select(KnowledgeChunk.milvus_id).where(KnowledgeChunk.milvus_id.in_(milvus_ids))
+    )).scalars().all()) if milvus_ids else set()
+    await db.commit()
+    return [i for i in milvus_ids if i not in shared], [i for i in milvus_ids if i in shared]
+
+
+async def async_delete_knowledge_chunk(db: AsyncSession, milvus_id: int) -> bool:
+    """
+    Forget the fingerprints of one stored chunk, in every document sharing its vector.
+
+    Those documents are marked as changed, so re-importing them restores the chunk.
+    """
+    db_chunks = list((
+        await db.execute(select(KnowledgeChunk).where(KnowledgeChunk.milvus_id == milvus_id))
+    ).scalars().all())
+    if not db_chunks:
+        return False
+
+    for db_chunk in db_chunks:
+        await db.execute(
+            update(KnowledgeDocument)
+            .where(KnowledgeDocument.id == db_chunk.document_id)
+            .values(chunk_count=KnowledgeDocument.chunk_count - 1, content_hash="", updated_at=datetime.utcnow())
+        )
+        await db.delete(db_chunk)
+    await db.commit()
+    return True
+
+
+async def async_clear_knowledge_documents(db: AsyncSession) -> None:
+    """Forget every document and chunk fingerprint, e.g. after the RAG collection was reset; sources stay."""
+    await db.execute(delete(KnowledgeChunk))
+    await db.execute(delete(KnowledgeDocument))
+    await db.commit()
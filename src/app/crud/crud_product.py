@@ -0,0 +1,210 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Row, Select, func, literal_column, select, text, tuple_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.models.product import Product
+from app.schemas.product import ProductCountMode
+
+# Below this many rows an exact count is cheap enough to return instead of an estimate
+ESTIMATED_COUNT_MIN_ROWS = 10_000
+
+# Columns a bulk import may set; everything else keeps its current value
+IMPORT_COLUMNS = (
+    "name", "description", "price", "currency", "stock_quantity", "image_url", "category", "language", "is_active"
+)
+
+
+def encode_cursor(product_id: int) -> str:
+    """Opaque keyset cursor pointing just after `product_id`."""
+    return base64.urlsafe_b64encode(str(product_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Inverse of encode_cursor. Raises ValueError for malformed cursors."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+
+def filter_products(query: Select, category: Optional[str], language: Optional[str], is_active: bool = True) -> Select:
+    # Equality filters in the column order of ix_products_active_language_category_id
+    query = query.where(Product.is_active == is_active)
+    if language:
+        query = query.where(Product.language == language)
+    if category:
+        query = query.where(Product.category == category)
+    return query
+
+
+async def async_get_product(db: AsyncSession, product_id: int) -> Optional[Product]:
+    return await db.get(Product, product_id)
+
+
+async def async_get_products(db: AsyncSession, skip: int = 0, limit: int = 100, category: Optional[str] = None,
+                             language: Optional[str] = None, is_active: bool = True) -> List[Product]:
+    query = filter_products(select(Product), category, language, is_active).offset(skip).limit(limit)
+    return list((await db.execute(query)).scalars().all())
+
+
+async def async_get_product_count(db: AsyncSession, category: Optional[str] = None,
+                                  language: Optional[str] = None) -> int:
+    query = filter_products(select(func.count()).select_from(Product), category, language)
+    return (await db.execute(query)).scalar_one()
+
+
+async def async_get_product_alternatives(db: AsyncSession, product_id: int) -> List[Product]:
+    query = select(Product).where(Product.alternative_to_id == product_id, Product.is_active.is_(True))
+    return list((await db.execute(query)).scalars().all())
+
+
+async def async_get_products_by_ids(db: AsyncSession, product_ids: List[int]) -> List[Product]:
+    if not product_ids:
+        return []
+
+    query = select(Product).where(Product.id.in_(product_ids), Product.is_active.is_(True))
+    return list((await db.execute(query)).scalars().all())
+
+
+async def async_search_products_by_text(db: AsyncSession, search: str, limit: int = 10,
+                                        language: Optional[str] = None) -> List[Product]:
+    query = filter_products(select(Product), None, language).where(
+        Product.name.icontains(search, autoescape=True) | Product.description.icontains(search, autoescape=True)
+    )
+    return list((await db.execute(query.order_by(Product.id).limit(limit))).scalars().all())
+
+
+async def async_list_products(
+    db: AsyncSession,
+    limit: int = 10,
+    cursor: Optional[int] = None,
+    skip: int = 0,
+    category: Optional[str] = None,
+    language: Optional[str] = None,
+    count_mode: ProductCountMode = ProductCountMode.EXACT
+) -> Tuple[List[Product], Optional[int], Optional[int]]:
+    """
+    Get one page of active products ordered by id.
+
+    With a cursor the page starts right after that id (keyset pagination), so deep
+    pages cost the same as the first one; `skip` is only used without a cursor.
+    The exact total comes with pages without a cursor, in the same query through
+    count(*) OVER (); cursor pages skip it, so walking the pages never rescans
+    every matching row.
+
+    Args:
+        db: Database session
+        limit: Page size
+        cursor: Last product id of the previous page
+        skip: Rows to skip when no cursor is given (OFFSET pagination)
+        category: Optional category filter
+        language: Optional language filter
+        count_mode: How to compute the total
+
+    Returns:
+        Tuple of (products, total or None, last id of the page if there is a next page).
+        The total is None with count_mode NONE, and with EXACT when a cursor is given.
+    """
+    if count_mode == ProductCountMode.EXACT and cursor is None:
+        # The window runs over the filtered rows before the page is cut, so the
+        # page and its total come back in a single round trip
+        counted = filter_products(select(Product, func.count().over().label("total")), category, language).subquery()
+        product = aliased(Product, counted)
+        query = select(product, counted.c.total)
+    else:
+        product = Product
+        query = filter_products(select(Product), category, language)
+
+    if cursor is not None:
+        query = query.where(product.id > cursor)
+    elif skip:
+        query = query.offset(skip)
+
+    # One extra row tells whether there is a next page
+    rows = (await db.execute(query.order_by(product.id).limit(limit + 1))).all()
+    products = [row[0] for row in rows[:limit]]
+    next_cursor = products[-1].id if len(rows) > limit else None
+
+    if count_mode == ProductCountMode.EXACT:
+        if cursor is not None:
+            # Cursor pages continue a walk whose first page already carried the total
+            total = None
+        elif rows:
+            total = rows[0].total
+        elif not skip:
+            total = 0
+        else:
+            # Past the last page there is no row to carry the window count
+            total = await async_get_product_count(db, category, language)
+    elif count_mode == ProductCountMode.ESTIMATED:
+        total = await async_estimate_product_count(db, category, language)
+    else:
+        total = None
+
+    return products, total, next_cursor
+
+
+async def async_estimate_product_count(db: AsyncSession, category: Optional[str] = None,
+                                       language: Optional[str] = None) -> int:
+    """
+    Estimate the number of matching products without scanning them.
+
+    Uses the planner's row estimate, which Postgres derives from pg_class.reltuples
+    and the column statistics. Small or never-analyzed tables get an exact count.
+    """
+    reltuples = (await db.execute(
+        text("SELECT reltuples FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+        {"table": Product.__tablename__}
+    )).scalar()
+    if reltuples is None or reltuples < ESTIMATED_COUNT_MIN_ROWS:
+        return await async_get_product_count(db, category, language)
+
+    query = filter_products(select(Product.id), category, language)
+    # Filter values stay bound parameters, only the statement's SQL is spliced into the EXPLAIN
+    compiled = query.compile(dialect=postgresql.dialect(paramstyle="named"))
+    plan = (await db.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"), compiled.params)).scalar()
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def async_upsert_products(db: AsyncSession, rows: List[Dict[str, Any]]) -> Sequence[Row]:
+    """
+    Insert or update a batch of products by SKU with a single multi-row statement.
+
+    Rows whose imported columns are unchanged are left alone and not returned, so
+    re-running an import only touches (and re-embeds) what actually changed. The
+    caller commits.
+
+    Args:
+        db: Database session
+        rows: Product rows with `sku` and the IMPORT_COLUMNS; SKUs must be unique within the batch
+
+    Returns:
+        The inserted or changed rows with all product columns plus `inserted`
+        (False when an existing product was updated)
+    """
+    if not rows:
+        return []
+
+    now = datetime.now().isoformat()
+    values = [{**row, "created_at": now, "updated_at": now} for row in rows]
+
+    table = Product.__table__
+    stmt = pg_insert(table).values(values)
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.sku],
+        set_={**{column: excluded[column] for column in IMPORT_COLUMNS}, "updated_at": excluded.updated_at},
+        where=tuple_(*(table.c[column] for column in IMPORT_COLUMNS)).is_distinct_from(
+            tuple_(*(excluded[column] for column in IMPORT_COLUMNS))
+        ),
+    ).returning(*table.c, literal_column("(xmax = 0)").label("inserted"))
+
+    return (await db.execute(stmt)).all()
@@ -1,56 +1,200 @@
-from fastapi import FastAPI, Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+import hashlib
+import re
+from collections.abc import Callable
+from dataclasses import dataclass
 
+from fastapi import HTTPException, Request
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-class ClientCacheMiddleware(BaseHTTPMiddleware):
-    """Middleware to set the `Cache-Control` header for client-side caching on all responses.
+NO_STORE = "no-store"
+MAX_VERSIONED_ETAGS = 4096
+# Scope key holding the ETag a versioned revalidation can be answered with (see `not_modified`)
+NOT_MODIFIED_ETAG = "client_cache.not_modified_etag"
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """How responses for a route may be cached by clients.
+
+    Attributes
+    ----------
+    cache_control: str
+        Value of the `Cache-Control` header, unless the endpoint already set one.
+    etag: bool
+        Whether to compute a weak ETag for 200 GET responses and answer matching `If-None-Match` with 304.
+    version: Callable[[], str | int | None] | None
+        Optional cheap lookup of the current version of the resource. When given, the ETag of the last response is
+        remembered per URL together with this version, and as long as the version has not changed, a matching
+        `If-None-Match` is answered with 304 by the route's `not_modified` dependency, after its other dependencies
+        (authentication included) ran but before the endpoint body. Only use it with versions that are consistent
+        across workers.
+    """
+
+    cache_control: str
+    etag: bool = False
+    version: Callable[[], str | int | None] | None = None
+
+
+def default_cache_policies(
+    max_age: int, bot_settings_version: Callable[[], str | int | None] | None = None
+) -> list[tuple[str, CachePolicy]]:
+    """Per-route policies, matched in order against the request path. Anything unmatched is `no-store`.
+
+    Only `/bot-settings` has a version, so only its revalidations skip the endpoint. Products and knowledge sources
+    have no version shared by the workers yet: their endpoint still runs and the body is hashed before a 304, which
+    saves the transfer to the client but not the query and serialization.
+    """
+    revalidate = CachePolicy(cache_control="private, no-cache", etag=True)
+    bot_settings = CachePolicy(cache_control="private, no-cache", etag=True, version=bot_settings_version)
+    return [
+        (r"^/static/", CachePolicy(cache_control=f"public, max-age={max_age}")),
+        (r"^/favicon\.ico$", CachePolicy(cache_control=f"public, max-age={max_age}")),
+        (r"^/api/v1/products(/\d+)?/?$", revalidate),
+        (r"^/api/v1/bot-settings/?$", bot_settings),
+        (r"^/api/v1/knowledge-sources(/[^/]+)?/?$", revalidate),
+    ]
+
+
+async def not_modified(request: Request) -> None:
+    """FastAPI dependency answering a revalidation with 304 when the client's ETag is known to be current.
+
+    Only has an effect on routes with a versioned `CachePolicy`. Declare it after the route's authentication
+    dependencies (e.g. as its last parameter) so they run first; the endpoint body is then skipped.
+    """
+    etag = request.scope.get(NOT_MODIFIED_ETAG)
+    if etag is not None:
+        raise HTTPException(status_code=304, headers={"ETag": etag})
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+class ClientCacheMiddleware:
+    """Pure ASGI middleware that sets `Cache-Control` per route and handles ETag revalidation.
+
+    Non-GET requests and routes without a policy get `Cache-Control: no-store`, so chat replies, user data and
+    writes are never cached by browsers or proxies. Routes with an ETag policy get a weak ETag computed from the
+    response body, and clients that send a matching `If-None-Match` get an empty 304 instead of the body. Unless the
+    policy has a `version`, the endpoint runs and its body is buffered and hashed for every revalidation.
 
     Parameters
     ----------
-    app: FastAPI
-        The FastAPI application instance.
+    app: ASGIApp
+        The ASGI application to wrap.
     max_age: int, optional
-        Duration (in seconds) for which the response should be cached. Defaults to 60 seconds.
+        Duration (in seconds) static assets may be cached for. Defaults to 60 seconds.
+    policies: list[tuple[str, CachePolicy]], optional
+        `(path regex, policy)` pairs checked in order. Defaults to `default_cache_policies(max_age)`.
 
     Attributes
     ----------
     max_age: int
-        Duration (in seconds) for which the response should be cached.
-
-    Methods
-    -------
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
-        Process the request and set the `Cache-Control` header in the response.
-
-    Note
-    ----
-        - The `Cache-Control` header instructs clients (e.g., browsers)
-        to cache the response for the specified duration.
+        Duration (in seconds) static assets may be cached for.
     """
 
-    def __init__(self, app: FastAPI, max_age: int = 60) -> None:
-        super().__init__(app)
+    def __init__(self, app: ASGIApp, max_age: int = 60, policies: list[tuple[str, CachePolicy]] | None = None) -> None:
+        self.app = app
         self.max_age = max_age
+        if policies is None:
+            policies = default_cache_policies(max_age)
+        self.policies = [(re.compile(pattern), policy) for pattern, policy in policies]
+        self._versioned_etags: dict[tuple[str, bytes], tuple[str | int, str]] = {}
+
+    def policy_for(self, method: str, path: str) -> CachePolicy | None:
+        if method not in ("GET", "HEAD"):
+            return None
+
+        for pattern, policy in self.policies:
+            if pattern.match(path):
+                return policy
+
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        policy = self.policy_for(scope["method"], scope["path"])
+        if policy is None or not policy.etag or scope["method"] != "GET":
+            await self.app(scope, receive, self._with_cache_control(send, policy))
+            return
+
+        await self._handle_etag(scope, receive, send, policy)
+
+    def _with_cache_control(self, send: Send, policy: CachePolicy | None) -> Send:
+        cache_control = policy.cache_control if policy is not None else NO_STORE
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if "cache-control" not in headers:
+                    headers["Cache-Control"] = cache_control
+            await send(message)
+
+        return send_wrapper
+
+    async def _handle_etag(self, scope: Scope, receive: Receive, send: Send, policy: CachePolicy) -> None:
+        if_none_match = Headers(scope=scope).get("if-none-match")
+        url_key = (scope["path"], scope.get("query_string", b""))
+
+        version = policy.version() if policy.version is not None else None
+        if if_none_match and version is not None:
+            known = self._versioned_etags.get(url_key)
+            if known is not None and known[0] == version and _etag_matches(if_none_match, known[1]):
+                # Not answered here: the route's dependencies, authentication included, must run first
+                scope = {**scope, NOT_MODIFIED_ETAG: known[1]}
+
+        start_message: Message | None = None
+        body_parts: list[bytes] = []
+
+        async def buffer_response(message: Message) -> None:
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+            elif message["type"] == "http.response.body":
+                body_parts.append(message.get("body", b""))
+
+        await self.app(scope, receive, buffer_response)
+        if start_message is None:
+            return
+
+        headers = MutableHeaders(scope=start_message)
+        if "cache-control" not in headers:
+            headers["Cache-Control"] = policy.cache_control
+
+        body = b"".join(body_parts)
+        if start_message["status"] != 200:
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        etag = f'W/"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        headers["ETag"] = etag
+        if version is not None:
+            if len(self._versioned_etags) >= MAX_VERSIONED_ETAGS:
+                self._versioned_etags.clear()
+            self._versioned_etags[url_key] = (version, etag)
+
+        if if_none_match and _etag_matches(if_none_match, etag):
+            await self._send_not_modified(send, etag, policy)
+            return
+
+        await send(start_message)
+        await send({"type": "http.response.body", "body": body})
 
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
-        """Process the request and set the `Cache-Control` header in the response.
-
-        Parameters
-        ----------
-        request: Request
-            The incoming request.
-        call_next: RequestResponseEndpoint
-            The next middleware or route handler in the processing chain.
-
-        Returns
-        -------
-        Response
-            The response object with the `Cache-Control` header set.
-
-        Note
-        ----
-            - This method is automatically called by Starlette for processing the request-response cycle.
-        """
-        response: Response = await call_next(request)
-        response.headers["Cache-Control"] = f"public, max-age={self.max_age}"
-        return response
+    async def _send_not_modified(self, send: Send, etag: str, policy: CachePolicy) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 304,
+                "headers": [(b"etag", etag.encode()), (b"cache-control", policy.cache_control.encode())],
+            }
+        )
+        await send({"type": "http.response.body", "body": b""})
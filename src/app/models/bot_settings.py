@@ -16,3 +16,6 @@ class BotSettings(Base):
     
     # Additional configuration options can be added here
     advanced_settings = Column(JSON, nullable=True)
+
+    # Bumped on every update; cached copies and ETags are keyed on it
+    version = Column(Integer, nullable=False, default=1, server_default="1")
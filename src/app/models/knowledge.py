@@ -0,0 +1,55 @@
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Integer, String, Text
+from app.core.db.database import Base
+from datetime import datetime
+
+
+class KnowledgeSource(Base):
+    """A named group of documents managed from the dashboard, e.g. "Shipping Policies"."""
+    __tablename__ = "knowledge_sources"
+
+    # "ks-" followed by hex digits; stored on every chunk of the source in the RAG collection
+    id = Column(String(32), primary_key=True, index=True)
+    name = Column(String(255), nullable=False)
+    description = Column(Text, nullable=True)
+    source_type = Column(String(20), nullable=False, default="manual")
+    url = Column(String(2048), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class KnowledgeDocument(Base):
+    """A versioned source document (URL, file, text or product) whose chunks are in the RAG collection."""
+    __tablename__ = "knowledge_documents"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Identifies the source across re-imports, e.g. "url:https://...", "file:faq.md", "product:12"
+    source_key = Column(String(512), nullable=False, unique=True, index=True)
+    source_id = Column(String(32), ForeignKey("knowledge_sources.id", ondelete="CASCADE"), nullable=True, index=True)
+    title = Column(String(255), nullable=True)
+    # Hash of the normalized chunks; an identical re-import is a no-op
+    content_hash = Column(String(64), nullable=False)
+    version = Column(Integer, nullable=False, default=1)
+    chunk_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
+class KnowledgeChunk(Base):
+    """Fingerprints of one chunk of a document, used to share exact and skip near duplicates at ingest time."""
+    __tablename__ = "knowledge_chunks"
+
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("knowledge_documents.id", ondelete="CASCADE"), nullable=False, index=True)
+    chunk_index = Column(Integer, nullable=False)
+    # sha256 of the normalized text; documents with the same chunk share its vector (same milvus_id)
+    content_hash = Column(String(64), nullable=False, index=True)
+    # 64-bit SimHash (stored signed) and its four 16-bit bands; any chunk within 3 bits
+    # of another shares at least one band with it, so the bands are the lookup index
+    simhash = Column(BigInteger, nullable=False)
+    simhash_band0 = Column(Integer, nullable=False, index=True)
+    simhash_band1 = Column(Integer, nullable=False, index=True)
+    simhash_band2 = Column(Integer, nullable=False, index=True)
+    simhash_band3 = Column(Integer, nullable=False, index=True)
+    # Primary key of the chunk in the RAG collection; the vector is deleted with the last row pointing to it
+    milvus_id = Column(BigInteger, nullable=True, index=True)
+    language = Column(String(10), nullable=True)
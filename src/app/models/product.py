@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, Boolean, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.core.db.database import Base
 from typing import List, Optional
@@ -8,8 +8,14 @@ from datetime import datetime
 class Product(Base):
     """Product model for e-commerce items."""
     __tablename__ = "products"
+    __table_args__ = (
+        # Matches the listing filters and the keyset order of GET /products
+        Index("ix_products_active_language_category_id", "is_active", "language", "category", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
+    # Stable catalog identifier, used as the upsert key by bulk imports
+    sku = Column(String(64), nullable=True, unique=True, index=True)
     name = Column(String(255), nullable=False, index=True)
     description = Column(Text, nullable=True)
     price = Column(Float, nullable=False)
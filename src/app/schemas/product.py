@@ -1,10 +1,19 @@
 from pydantic import BaseModel, Field, HttpUrl
 from typing import Optional, List
 from datetime import datetime
+from enum import Enum
+
+
+class ProductCountMode(str, Enum):
+    """How GET /products computes `total`."""
+    EXACT = "exact"  # count(*) OVER () on pages without a cursor, cursor pages return no total
+    ESTIMATED = "estimated"  # planner estimate, exact only for small tables
+    NONE = "none"  # no total, cheapest for infinite scroll
 
 
 class ProductBase(BaseModel):
     """Base product schema with common attributes."""
+    sku: Optional[str] = Field(None, max_length=64)
     name: str
     description: Optional[str] = None
     price: float
@@ -23,6 +32,7 @@ class ProductCreate(ProductBase):
 
 class ProductUpdate(BaseModel):
     """Schema for updating an existing product."""
+    sku: Optional[str] = Field(None, max_length=64)
     name: Optional[str] = None
     description: Optional[str] = None
     price: Optional[float] = None
@@ -75,7 +85,27 @@ class ProductResponse(ProductInDB):
 ProductResponse.model_rebuild()
 
 
+class ProductImportRow(BaseModel):
+    """One product row of a bulk import file, matched to existing products by SKU."""
+    sku: str = Field(..., min_length=1, max_length=64)
+    name: str = Field(..., min_length=1, max_length=255)
+    description: Optional[str] = None
+    price: float
+    currency: str = Field("USD", max_length=3)
+    stock_quantity: int = 0
+    image_url: Optional[str] = Field(None, max_length=255)
+    category: Optional[str] = Field(None, max_length=100)
+    language: str = Field("en", max_length=10)
+    is_active: bool = True
+
+
 class ProductList(BaseModel):
-    """Schema for a list of products."""
-    total: int
+    """
+    Schema for a page of products.
+
+    `total` is None with count=none, and with count=exact on pages requested with a
+    cursor: the total comes with the first page of a walk only.
+    """
+    total: Optional[int] = None
     products: List[ProductResponse]
+    next_cursor: Optional[str] = None
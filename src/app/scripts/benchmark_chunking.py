@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+"""
+Measure chunking throughput and chunk sizes on large documents.
+
+Runs every registered chunking strategy (and, for comparison, the character-based
+RecursiveCharacterTextSplitter the RAG service used before) over the given files, or
+over a generated English/Arabic markdown document of --size-mb megabytes, and reports
+MB/s, chunk count and the largest chunk in tokens and UTF-8 bytes.
+
+Usage:
+    python src/app/scripts/benchmark_chunking.py [--size-mb 10] [--language en|ar] [--repeat 3]
+    python src/app/scripts/benchmark_chunking.py --files docs/faq.md page.html [--strategies markdown html]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Callable, List, Tuple
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from app.services.chunking import CHUNKERS, get_chunker, get_token_counter
+from app.services.milvus_client import TEXT_MAX_BYTES
+
+SENTENCES = {
+    "en": [
+        "Standard shipping takes three to five business days within the country.",
+        "Items can be returned within thirty days of delivery for a full refund.",
+        "Electronics include a one-year manufacturer warranty against defects.",
+        "Orders over fifty dollars ship for free, smaller orders pay a flat fee.",
+        "Gift cards never expire and can be combined with most promotions.",
+    ],
+    "ar": [
+        "تستغرق عملية الشحن القياسية من ثلاثة إلى خمسة أيام عمل داخل الدولة.",
+        "يمكن إرجاع المنتجات خلال ثلاثين يومًا من الاستلام مع استرداد كامل المبلغ.",
+        "تأتي الأجهزة الإلكترونية مع ضمان من الشركة المصنعة لمدة عام واحد.",
+        "الشحن مجاني للطلبات التي تزيد عن خمسين دولارًا.",
+        "لا تنتهي صلاحية بطاقات الهدايا ويمكن استخدامها مع معظم العروض.",
+    ],
+}
+
+
+def generate_document(size_mb: float, language: str, seed: int = 0) -> str:
+    """Markdown with nested headings, paragraphs and lists, about `size_mb` MB of UTF-8."""
+    rng = random.Random(seed)
+    sentences = SENTENCES[language]
+    parts, size, section = [], 0, 0
+    while size < size_mb * 1024 * 1024:
+        section += 1
+        block = [f"# Section {section}\n"]
+        for sub in range(rng.randint(1, 4)):
+            block.append(f"## Topic {section}.{sub}\n")
+            for _ in range(rng.randint(1, 5)):
+                block.append(" ".join(rng.choice(sentences) for _ in range(rng.randint(2, 12))) + "\n")
+            if rng.random() < 0.3:
+                block.append("\n".join(f"- {rng.choice(sentences)}" for _ in range(rng.randint(2, 6))) + "\n")
+        text = "\n".join(block) + "\n"
+        parts.append(text)
+        size += len(text.encode("utf-8"))
+    return "".join(parts)
+
+
+def recursive_character_splitter(language: str) -> Callable[[str], List[str]]:
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    chunk_size, chunk_overlap = (600, 200) if language == "ar" else (800, 150)
+    return RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap).split_text
+
+
+def run(name: str, split: Callable[[str], List[str]], documents: List[str], repeat: int) -> Tuple[str, ...]:
+    total_bytes = sum(len(document.encode("utf-8")) for document in documents)
+    timings, chunks = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = [chunk for document in documents for chunk in split(document)]
+        timings.append(time.perf_counter() - start)
+
+    counter = get_token_counter()
+    tokens = counter.count_batch(chunks) if chunks else [0]
+    sizes = [len(chunk.encode("utf-8")) for chunk in chunks] or [0]
+    seconds = statistics.median(timings)
+    return (
+        name,
+        f"{total_bytes / 1024 / 1024 / seconds:.2f}",
+        f"{seconds:.3f}",
+        str(len(chunks)),
+        f"{statistics.mean(tokens):.0f}",
+        str(max(tokens)),
+        str(max(sizes)),
+        str(sum(size > TEXT_MAX_BYTES for size in sizes)),
+    )
+
+
+def main(args: argparse.Namespace) -> None:
+    if args.files:
+        documents = []
+        for path in args.files:
+            with open(path, encoding="utf-8") as f:
+                documents.append(f.read())
+    else:
+        documents = [generate_document(args.size_mb, args.language)]
+
+    counter = get_token_counter()
+    print(f"{len(documents)} document(s), {sum(len(d.encode('utf-8')) for d in documents) / 1024 / 1024:.1f} MB, "
+          f"language {args.language}, {'tiktoken' if counter.exact else 'estimated'} token counts")
+
+    rows = [("strategy", "MB/s", "seconds", "chunks", "mean tok", "max tok", "max bytes", f"> {TEXT_MAX_BYTES} B")]
+    for strategy in args.strategies or sorted(CHUNKERS):
+        rows.append(run(strategy, get_chunker(strategy, args.language).split, documents, args.repeat))
+    if not args.no_baseline:
+        rows.append(run("recursive-chars", recursive_character_splitter(args.language), documents, args.repeat))
+
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    for row in rows:
+        print("  ".join(value.rjust(width) for value, width in zip(row, widths)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", nargs="+", help="Documents to chunk (default: a generated document)")
+    parser.add_argument("--size-mb", type=float, default=10.0, help="Size of the generated document")
+    parser.add_argument("--language", choices=sorted(SENTENCES), default="en",
+                        help="Language of the generated document and of the chunk limits")
+    parser.add_argument("--strategies", nargs="+", choices=sorted(CHUNKERS), help="Strategies to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per strategy; the median is reported")
+    parser.add_argument("--no-baseline", action="store_true", help="Skip the character-based splitter")
+    main(parser.parse_args())
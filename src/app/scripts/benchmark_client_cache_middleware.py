@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+"""
+Benchmark the per-request overhead of ClientCacheMiddleware.
+
+Compares a bare app, the previous BaseHTTPMiddleware implementation and the current
+pure ASGI middleware (no-store route, ETag route, and ETag route answered with 304).
+Requests go straight through the ASGI interface, so the numbers are middleware cost only.
+
+Usage:
+    python src/app/scripts/benchmark_client_cache_middleware.py --requests 5000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import httpx
+from fastapi import FastAPI, Request, Response
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+
+from app.middleware.client_cache_middleware import ClientCacheMiddleware
+
+PRODUCTS = [{"id": i, "name": f"Product {i}", "price": 9.99 + i, "stock_quantity": i % 7} for i in range(50)]
+
+
+class LegacyClientCacheMiddleware(BaseHTTPMiddleware):
+    """The implementation ClientCacheMiddleware replaced, kept here only as the baseline."""
+
+    def __init__(self, app: FastAPI, max_age: int = 60) -> None:
+        super().__init__(app)
+        self.max_age = max_age
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        response: Response = await call_next(request)
+        response.headers["Cache-Control"] = f"public, max-age={self.max_age}"
+        return response
+
+
+def build_app(middleware: type | None) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/api/v1/products")
+    async def products() -> dict:
+        return {"products": PRODUCTS, "total": len(PRODUCTS)}
+
+    @app.post("/api/v1/message")
+    async def message() -> dict:
+        return {"reply": "Hello! How can I help you today?"}
+
+    if middleware is not None:
+        app.add_middleware(middleware, max_age=60)
+    return app
+
+
+async def measure(app: FastAPI, method: str, path: str, n: int, headers: dict | None = None) -> list[float]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(100):
+            await client.request(method, path, headers=headers)
+
+        timings = []
+        for _ in range(n):
+            start = time.perf_counter()
+            await client.request(method, path, headers=headers)
+            timings.append(time.perf_counter() - start)
+        return timings
+
+
+def report(name: str, timings: list[float], baseline: float | None = None) -> float:
+    mean = statistics.fmean(timings) * 1e6
+    p99 = statistics.quantiles(timings, n=100)[98] * 1e6
+    overhead = f"  overhead {mean - baseline:+8.1f} us" if baseline is not None else ""
+    print(f"{name:<42} mean {mean:8.1f} us  p99 {p99:8.1f} us{overhead}")
+    return mean
+
+
+async def main(n: int) -> None:
+    bare, legacy, current = build_app(None), build_app(LegacyClientCacheMiddleware), build_app(ClientCacheMiddleware)
+
+    print(f"=== {n} requests per case ===")
+    base_get = report("GET  /products  no middleware", await measure(bare, "GET", "/api/v1/products", n))
+    report("GET  /products  BaseHTTPMiddleware", await measure(legacy, "GET", "/api/v1/products", n), base_get)
+    report("GET  /products  ASGI (ETag, 200)", await measure(current, "GET", "/api/v1/products", n), base_get)
+
+    response = await httpx.AsyncClient(transport=httpx.ASGITransport(app=current), base_url="http://bench").get(
+        "/api/v1/products"
+    )
+    headers = {"If-None-Match": response.headers["etag"]}
+    report("GET  /products  ASGI (ETag, 304)", await measure(current, "GET", "/api/v1/products", n, headers), base_get)
+
+    base_post = report("POST /message   no middleware", await measure(bare, "POST", "/api/v1/message", n))
+    report("POST /message   BaseHTTPMiddleware", await measure(legacy, "POST", "/api/v1/message", n), base_post)
+    report("POST /message   ASGI (no-store)", await measure(current, "POST", "/api/v1/message", n), base_post)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per case")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests))
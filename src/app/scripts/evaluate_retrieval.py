@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+"""
+Offline evaluation of vector search: recall, MRR and latency per metric, and score calibration.
+
+Queries are read from a JSONL file of {"query": ..., "language": ..., "relevant": [...]}
+where `relevant` lists passages (or distinctive substrings of them); a result is relevant
+if its text contains one of them, ignoring case and whitespace. The corpus is either a
+JSONL file of {"text": ..., "language": ...}, embedded with the app's embedding model, or
+the live collection, read with its stored vectors.
+
+Every metric choice is scored by exact (brute force) search in numpy:
+    l2             squared L2 distance of the raw vectors (the old index)
+    ip             inner product of the raw vectors
+    ip-normalized  inner product of unit vectors, i.e. cosine (the current index)
+With --milvus the same vectors are also loaded into a temporary collection per metric,
+so recall and latency include the IVF_FLAT index.
+
+The cosine scores of the top --calibration-depth results per query are then used to fit
+the collection's score calibration (see score_calibration); --write stores it.
+
+Usage:
+    python src/app/scripts/evaluate_retrieval.py --queries src/data/eval/retrieval_queries.jsonl \\
+        --corpus src/data/eval/retrieval_corpus.jsonl [--k 5] [--milvus]
+    python src/app/scripts/evaluate_retrieval.py --queries my_queries.jsonl --collection rag_embeddings --write
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Sequence, Set, Tuple
+
+import numpy as np
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from app.services.milvus_client import (
+    COLLECTION_NAME,
+    INDEX_PARAMS,
+    SEARCH_NPROBE,
+    connect_to_milvus,
+    create_collection,
+    drop_collection,
+    iterate_entries,
+    normalize_vectors,
+)
+from app.services.score_calibration import fit_calibration, save_calibration
+
+METRICS = ("l2", "ip", "ip-normalized")
+# Texts per embeddings API call
+EMBED_BATCH_SIZE = 256
+
+
+def load_jsonl(path: str) -> List[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _normalize_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def relevant_sets(queries: Sequence[dict], corpus: Sequence[str]) -> List[Set[int]]:
+    """Indices of the corpus passages relevant to each query."""
+    passages = [_normalize_text(text) for text in corpus]
+    sets = []
+    for query in queries:
+        needles = [_normalize_text(needle) for needle in query.get("relevant", []) if needle.strip()]
+        sets.append({i for i, passage in enumerate(passages) if any(needle in passage for needle in needles)})
+    return sets
+
+
+def embed_texts(texts: Sequence[str]) -> np.ndarray:
+    from app.services.embedding import EmbeddingService
+
+    embedder = EmbeddingService()
+    vectors = []
+    for start in range(0, len(texts), EMBED_BATCH_SIZE):
+        vectors.extend(embedder.embed_batch(list(texts[start:start + EMBED_BATCH_SIZE])))
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def load_collection_corpus(collection_name: str) -> Tuple[List[str], np.ndarray]:
+    texts, vectors = [], []
+    for batch in iterate_entries(collection_name, include_embeddings=True, output_fields=["text", "embedding"]):
+        for entry in batch:
+            texts.append(entry["text"])
+            vectors.append(entry["embedding"])
+    return texts, np.asarray(vectors, dtype=np.float32)
+
+
+def brute_force_search(metric: str, corpus: np.ndarray, queries: np.ndarray,
+                       k: int) -> Tuple[np.ndarray, np.ndarray, List[float]]:
+    """Top `k` indices and raw scores per query, best first, and the search time of each query in ms."""
+    if metric == "ip-normalized":
+        corpus, queries = normalize_vectors(corpus), normalize_vectors(queries)
+    corpus_norms = (corpus ** 2).sum(axis=1)
+    k = min(k, len(corpus))
+
+    indices, scores, latencies = [], [], []
+    for query in queries:
+        start = time.perf_counter()
+        if metric == "l2":
+            query_scores = corpus_norms - 2 * corpus @ query + query @ query
+            top = np.argpartition(query_scores, k - 1)[:k]
+            top = top[np.argsort(query_scores[top])]
+        else:
+            query_scores = corpus @ query
+            top = np.argpartition(-query_scores, k - 1)[:k]
+            top = top[np.argsort(-query_scores[top])]
+        latencies.append((time.perf_counter() - start) * 1000)
+        indices.append(top)
+        scores.append(query_scores[top])
+    return np.asarray(indices), np.asarray(scores), latencies
+
+
+def milvus_search(metric: str, corpus: np.ndarray, queries: np.ndarray,
+                  k: int) -> Tuple[List[List[int]], List[List[float]], List[float]]:
+    """Like brute_force_search, through an IVF_FLAT index in a temporary collection."""
+    from pymilvus import Collection
+
+    collection_name = f"eval_{metric.replace('-', '_')}"
+    if metric == "ip-normalized":
+        corpus, queries = normalize_vectors(corpus), normalize_vectors(queries)
+    metric_type = "L2" if metric == "l2" else "IP"
+
+    drop_collection(collection_name)
+    create_collection(collection_name, dim=corpus.shape[1])
+    col = Collection(collection_name)
+    try:
+        # create_collection indexes by METRIC_TYPE; swap in this metric's index
+        col.release()
+        col.drop_index()
+        # Insert the vectors as they are: insert_embeddings would normalize them
+        for start in range(0, len(corpus), 1000):
+            batch = corpus[start:start + 1000]
+            col.insert([{"embedding": vector.tolist(), "text": str(start + i), "language": "en"}
+                        for i, vector in enumerate(batch)])
+        col.flush()
+        col.create_index("embedding", {**INDEX_PARAMS, "metric_type": metric_type})
+        col.load()
+
+        indices, scores, latencies = [], [], []
+        for query in queries:
+            start = time.perf_counter()
+            hits = col.search(data=[query.tolist()], anns_field="embedding", limit=k, output_fields=["text"],
+                              param={"metric_type": metric_type, "params": {"nprobe": SEARCH_NPROBE}})[0]
+            latencies.append((time.perf_counter() - start) * 1000)
+            indices.append([int(hit.entity.get("text")) for hit in hits])
+            scores.append([hit.distance for hit in hits])
+        return indices, scores, latencies
+    finally:
+        drop_collection(collection_name)
+
+
+def evaluate(indices: Sequence[Sequence[int]], relevant: Sequence[Set[int]], latencies: Sequence[float],
+             k: int) -> Dict[str, float]:
+    """Mean recall@k and MRR@k over the queries with relevant passages, and latency percentiles."""
+    recalls, reciprocal_ranks = [], []
+    for top, relevant_indices in zip(indices, relevant):
+        if not relevant_indices:
+            continue
+        top = list(top[:k])
+        recalls.append(len(relevant_indices.intersection(top)) / len(relevant_indices))
+        rank = next((position for position, index in enumerate(top, 1) if index in relevant_indices), None)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+    ordered = sorted(latencies)
+    return {
+        f"recall@{k}": statistics.mean(recalls) if recalls else 0.0,
+        f"mrr@{k}": statistics.mean(reciprocal_ranks) if reciprocal_ranks else 0.0,
+        "p50 ms": ordered[len(ordered) // 2],
+        "p95 ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+    }
+
+
+def calibration_pairs(indices: Sequence[Sequence[int]], scores: Sequence[Sequence[float]],
+                      relevant: Sequence[Set[int]]) -> Tuple[List[float], List[bool]]:
+    similarities, labels = [], []
+    for top, top_scores, relevant_indices in zip(indices, scores, relevant):
+        if not relevant_indices:
+            continue
+        similarities.extend(float(score) for score in top_scores)
+        labels.extend(int(index) in relevant_indices for index in top)
+    return similarities, labels
+
+
+def main(args: argparse.Namespace) -> None:
+    queries = load_jsonl(args.queries)
+    if args.corpus:
+        corpus_rows = load_jsonl(args.corpus)
+        texts = [row["text"] for row in corpus_rows]
+        corpus = embed_texts(texts)
+    else:
+        connect_to_milvus()
+        texts, corpus = load_collection_corpus(args.collection)
+    if not len(corpus):
+        sys.exit("The corpus is empty")
+
+    relevant = relevant_sets(queries, texts)
+    unlabelled = sum(1 for indices in relevant if not indices)
+    print(f"{len(queries)} queries ({unlabelled} without a relevant passage, skipped), {len(texts)} passages, "
+          f"dim {corpus.shape[1]}")
+    query_vectors = embed_texts([query["query"] for query in queries])
+
+    searches: List[Tuple[str, Callable]] = [(metric, brute_force_search) for metric in METRICS]
+    if args.milvus:
+        connect_to_milvus()
+        searches += [(f"{metric} (milvus)", milvus_search) for metric in METRICS]
+
+    depth = max(args.k, args.calibration_depth)
+    rows, cosine_results = [], None
+    for name, search in searches:
+        indices, scores, latencies = search(name.split(" ")[0], corpus, query_vectors, depth)
+        if name == "ip-normalized":
+            cosine_results = (indices, scores)
+        rows.append((name, evaluate(indices, relevant, latencies, args.k)))
+
+    header = ["metric", *rows[0][1]]
+    table = [header] + [[name, *(f"{value:.3f}" for value in metrics.values())] for name, metrics in rows]
+    widths = [max(len(row[i]) for row in table) for i in range(len(header))]
+    for row in table:
+        print("  ".join(value.rjust(width) for value, width in zip(row, widths)))
+
+    similarities, labels = calibration_pairs(*cosine_results, relevant)
+    try:
+        calibration = fit_calibration(similarities, labels)
+    except ValueError as e:
+        sys.exit(f"Cannot calibrate: {e}")
+    print(f"Calibration for {args.collection}: relevance = sigmoid({calibration.slope:.3f} * cosine "
+          f"{calibration.intercept:+.3f}), threshold {calibration.threshold:.3f} "
+          f"(F1 {calibration.fit['f1']:.3f} on {calibration.fit['pairs']} pairs)")
+    if args.write:
+        print(f"Written to {save_calibration(args.collection, calibration)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", required=True, help="Labelled queries (JSONL)")
+    parser.add_argument("--corpus", help="Passages to search (JSONL); default: the collection's entries")
+    parser.add_argument("--collection", default=COLLECTION_NAME,
+                        help="Collection to read the corpus from and to calibrate")
+    parser.add_argument("--k", type=int, default=5, help="Cut-off for recall and MRR")
+    parser.add_argument("--calibration-depth", type=int, default=20,
+                        help="Results per query used to fit the calibration")
+    parser.add_argument("--milvus", action="store_true", help="Also search through Milvus indexes")
+    parser.add_argument("--write", action="store_true", help="Store the calibration for the collection")
+    main(parser.parse_args())
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+"""
+Bulk import products from a CSV or JSONL file.
+
+Rows are matched to existing products by `sku`: new SKUs are inserted, changed rows
+are updated and identical rows are skipped. Inserted and changed products are
+embedded into the RAG and product collections. Progress is checkpointed after every
+batch to "<file>.checkpoint.json"; running the same command again after an
+interruption resumes from there.
+
+Required columns: sku, name, price. Optional: description, currency, stock_quantity,
+image_url, category, language, is_active.
+
+Usage:
+    python src/app/scripts/import_products.py products.csv
+    python src/app/scripts/import_products.py products.jsonl --batch-size 2000 --embed-concurrency 8
+    python src/app/scripts/import_products.py products.csv --skip-embeddings --no-resume
+"""
+import argparse
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from app.services.product_import import ImportProgress, ProductImporter
+
+
+def print_progress(progress: ImportProgress) -> None:
+    print(
+        f"[{progress.status}] read {progress.rows_read} (skipped {progress.rows_skipped}), "
+        f"inserted {progress.rows_inserted}, updated {progress.rows_updated}, "
+        f"unchanged {progress.rows_unchanged}, invalid {progress.rows_invalid}, "
+        f"embedded {progress.rows_embedded} | {progress.rows_per_second:.0f} rows/s, {progress.elapsed:.1f}s"
+    )
+
+
+async def main(args: argparse.Namespace) -> int:
+    importer = ProductImporter(
+        batch_size=args.batch_size,
+        embed_batch_size=args.embed_batch_size,
+        embed_concurrency=args.embed_concurrency,
+        embed=not args.skip_embeddings,
+        checkpoint_path=args.checkpoint,
+        on_progress=print_progress,
+    )
+    progress = await importer.run(args.file, file_format=args.format, resume=not args.no_resume)
+
+    for error in progress.errors:
+        print(f"  invalid {error}")
+    if progress.status != "completed":
+        print(f"Import failed: {progress.error}. Run the same command again to resume.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("file", type=Path, help="CSV or JSONL file to import")
+    parser.add_argument("--format", choices=["csv", "jsonl"],
+                        help="File format, detected from the extension if omitted")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per database statement (max 2000)")
+    parser.add_argument("--embed-batch-size", type=int, default=256, help="Products per embeddings API call")
+    parser.add_argument("--embed-concurrency", type=int, default=4, help="Embedding calls in flight at once")
+    parser.add_argument("--checkpoint", type=Path, help="Checkpoint file (default: <file>.checkpoint.json)")
+    parser.add_argument("--no-resume", action="store_true", help="Ignore an existing checkpoint and start over")
+    parser.add_argument("--skip-embeddings", action="store_true", help="Only load Postgres, do not touch Milvus")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,125 @@
+#!/usr/bin/env python
+"""
+Load test the database-backed read endpoints and watch Postgres connection usage.
+
+Fires requests at a running server with a fixed number of concurrent clients
+(200 by default) while sampling `pg_stat_activity` for the application database,
+then reports latency percentiles per path and the peak number of server
+connections (total and active). Compare the peak against
+DB_POOL_SIZE + DB_MAX_OVERFLOW per worker to size the pool.
+
+Usage:
+    python src/app/scripts/load_test_db_pool.py --base-url http://localhost:8000 --concurrency 200 --requests 4000
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from collections import defaultdict
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import asyncpg
+import httpx
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+
+DEFAULT_PATHS = ["/api/v1/products?limit=20", "/api/v1/coupon/", "/api/v1/bot-settings"]
+
+CONNECTIONS_QUERY = """
+SELECT count(*) AS total, count(*) FILTER (WHERE state = 'active') AS active
+FROM pg_stat_activity
+WHERE datname = current_database() AND pid <> pg_backend_pid()
+"""
+
+
+async def sample_connections(dsn: str, interval: float, samples: list[tuple[int, int]], stop: asyncio.Event) -> None:
+    connection = await asyncpg.connect(dsn)
+    try:
+        while not stop.is_set():
+            row = await connection.fetchrow(CONNECTIONS_QUERY)
+            samples.append((row["total"], row["active"]))
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=interval)
+            except TimeoutError:
+                pass
+    finally:
+        await connection.close()
+
+
+async def run_clients(
+    base_url: str, paths: list[str], concurrency: int, total: int
+) -> tuple[dict[str, list[float]], dict[str, int], float]:
+    timings: dict[str, list[float]] = defaultdict(list)
+    errors: dict[str, int] = defaultdict(int)
+    counter = iter(range(total))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60.0) as client:
+
+        async def worker() -> None:
+            for i in counter:
+                path = paths[i % len(paths)]
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code >= 400:
+                        errors[path] += 1
+                except httpx.HTTPError:
+                    errors[path] += 1
+                timings[path].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    return timings, errors, elapsed
+
+
+def report(timings: dict[str, list[float]], errors: dict[str, int], elapsed: float,
+           samples: list[tuple[int, int]]) -> None:
+    total = sum(len(t) for t in timings.values())
+    print(f"=== {total} requests in {elapsed:.2f}s ({total / elapsed:.0f} req/s) ===")
+    for path, path_timings in timings.items():
+        ms = sorted(t * 1000 for t in path_timings)
+        quantiles = statistics.quantiles(ms, n=100)
+        print(
+            f"{path:<32} n={len(ms):<6} p50 {quantiles[49]:7.1f} ms  p95 {quantiles[94]:7.1f} ms  "
+            f"p99 {quantiles[98]:7.1f} ms  max {ms[-1]:7.1f} ms  errors {errors.get(path, 0)}"
+        )
+
+    print(f"\nConfigured async pool per worker: pool_size={settings.DB_POOL_SIZE} "
+          f"max_overflow={settings.DB_MAX_OVERFLOW} statement_cache={settings.DB_STATEMENT_CACHE_SIZE}")
+    if samples:
+        print(f"Postgres connections: peak total {max(s[0] for s in samples)}, "
+              f"peak active {max(s[1] for s in samples)}, "
+              f"mean active {statistics.fmean(s[1] for s in samples):.1f} ({len(samples)} samples)")
+
+
+async def main(args: argparse.Namespace) -> None:
+    dsn = make_url(settings.sqlalchemy_sync_url).set(drivername="postgresql").render_as_string(hide_password=False)
+    samples: list[tuple[int, int]] = []
+    stop = asyncio.Event()
+    sampler = asyncio.create_task(sample_connections(dsn, args.sample_interval, samples, stop))
+
+    try:
+        timings, errors, elapsed = await run_clients(args.base_url, args.paths, args.concurrency, args.requests)
+    finally:
+        stop.set()
+        await sampler
+
+    report(timings, errors, elapsed, samples)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000", help="Server to load")
+    parser.add_argument("--concurrency", type=int, default=200, help="Concurrent clients")
+    parser.add_argument("--requests", type=int, default=4000, help="Total requests, spread over the paths")
+    parser.add_argument("--sample-interval", type=float, default=0.1, help="Seconds between pg_stat_activity samples")
+    parser.add_argument("--paths", nargs="+", default=DEFAULT_PATHS, help="GET paths to request in turn")
+    asyncio.run(main(parser.parse_args()))
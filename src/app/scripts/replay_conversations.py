@@ -0,0 +1,321 @@
+#!/usr/bin/env python
+"""
+Replay multi-turn conversations through the bot and score every turn.
+
+Conversations are read from a JSONL file of
+    {"id": ..., "language": "en" | "ar", "turns": [{"user": ..., "expect": {"intent": ..., "contains": [...]}}]}
+Each conversation is played turn by turn, carrying its history like a chat session, through
+    graph        the LangGraph bot behind /bot/message (graph_app), under the turn deadline
+    bot_service  the rule-based BotService.process_message
+with --concurrency conversations in flight at once.
+
+With --providers fake, LLM and embedding calls go to the fake providers (see
+providers/fake.py) with the --fake-llm-latency and --fake-embedding-latency distributions,
+so a replay needs no API key and measures the app rather than OpenAI. Milvus must be
+running either way; RAGService connects to it on import.
+
+Per turn the harness records the latency, the LLM calls and tokens (only calls that reach
+a provider, so hedged and coalesced calls are not counted twice), the retrieval hits and
+the answer match: whether the intent is the expected one, and the share of the expected
+substrings found in the reply, ignoring case and whitespace. Turns go to --output as JSON
+lines; the summary is printed as JSON and written to --summary.
+
+Usage:
+    python src/app/scripts/replay_conversations.py --conversations src/data/eval/conversations.jsonl \\
+        --providers fake --concurrency 16 --repeat 10 --output turns.jsonl --summary summary.json
+    python src/app/scripts/replay_conversations.py --conversations my_sessions.jsonl --engine bot_service --db
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+ENGINES = ("graph", "bot_service")
+# _llm_type of the chat models that wrap another one
+WRAPPER_MODELS = {"hedged", "coalesced"}
+
+
+def load_jsonl(path: str) -> List[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def _normalize_text(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _percentile(values: Sequence[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))] if ordered else 0.0
+
+
+class LLMUsage(BaseCallbackHandler):
+    """LLM calls and tokens of one turn, counting only the calls that reach a provider."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._runs: set = set()
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.cached_tokens = 0
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID,
+                            invocation_params: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+        if (invocation_params or {}).get("_type") in WRAPPER_MODELS:
+            return
+        with self._lock:
+            self._runs.add(run_id)
+            self.calls += 1
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            if run_id not in self._runs:
+                return
+            self._runs.discard(run_id)
+            for generations in response.generations:
+                for generation in generations:
+                    usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                    self.input_tokens += usage.get("input_tokens") or 0
+                    self.output_tokens += usage.get("output_tokens") or 0
+                    self.cached_tokens += (usage.get("input_token_details") or {}).get("cache_read") or 0
+
+    def to_dict(self) -> Dict[str, int]:
+        with self._lock:
+            return {"llm_calls": self.calls, "input_tokens": self.input_tokens,
+                    "output_tokens": self.output_tokens, "cached_tokens": self.cached_tokens}
+
+
+def answer_match(expect: Optional[dict], reply: str, intent: Optional[str]) -> Dict[str, Any]:
+    """
+    Score a reply against a turn's expectations.
+
+    Returns:
+        intent_match (None without an expected intent or when the engine reports none),
+        contains (share of the expected substrings in the reply, None without any) and
+        match, the mean of the two that apply (None if neither does)
+    """
+    expect = expect or {}
+    intent_match = None
+    if expect.get("intent") and intent is not None:
+        intent_match = intent == expect["intent"]
+    contains = None
+    needles = [_normalize_text(needle) for needle in expect.get("contains", []) if needle.strip()]
+    if needles:
+        text = _normalize_text(reply or "")
+        contains = sum(needle in text for needle in needles) / len(needles)
+    scores = [float(score) for score in (intent_match, contains) if score is not None]
+    return {"intent_match": intent_match, "contains": contains,
+            "match": statistics.mean(scores) if scores else None}
+
+
+def retrieval_hits(final_state: Dict[str, Any]) -> Optional[int]:
+    """Knowledge base entries used by a graph turn, None if the turn did not search."""
+    action_result = final_state.get("action_result") or {}
+    result = action_result.get("knowledge_base_query") if isinstance(action_result, dict) else None
+    if not isinstance(result, dict):
+        return None
+    if not result.get("found"):
+        return 0
+    return result.get("entries", 1)
+
+
+async def run_graph_turn(message: str, conversation: dict, session: Dict[str, Any],
+                         usage: LLMUsage) -> Dict[str, Any]:
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    from app.core.config import settings
+    from app.services.graph_service.graph import graph_app
+    from app.services.providers import deadline_scope
+
+    history = session.setdefault("messages", [])
+    state = {
+        "messages": history,
+        "user_message": message,
+        "intent": None,
+        "retrieved_context": None,
+        "action_result": None,
+        "language": conversation.get("language", "en"),
+        "session_id": session["session_id"],
+        "db": session.get("db"),
+        "frustration_count": 0,
+        "last_error": None,
+    }
+    with deadline_scope(settings.BOT_TURN_DEADLINE_SECONDS):
+        final_state = await graph_app.ainvoke(state, config={"callbacks": [usage]})
+
+    messages = final_state.get("messages") or []
+    if messages and isinstance(messages[-1], AIMessage):
+        reply = messages[-1].content
+    else:
+        reply = final_state.get("response") or ""
+        messages = history + [HumanMessage(content=message), AIMessage(content=reply)]
+    session["messages"] = messages
+    return {"reply": reply, "intent": final_state.get("intent"), "retrieval_hits": retrieval_hits(final_state)}
+
+
+async def run_bot_service_turn(message: str, conversation: dict, session: Dict[str, Any],
+                               usage: LLMUsage) -> Dict[str, Any]:
+    from langchain_core.runnables import RunnableLambda
+
+    from app.services.bot_service import BotService
+
+    service = BotService(session.get("db"))
+    state = session.setdefault("state", {"language": conversation.get("language", "en")})
+    # A runnable, so LangChain calls made inside report to `usage`
+    turn = RunnableLambda(lambda text: service.process_message(text, state))
+    # Set by process_message when it searched the knowledge base
+    state.pop("retrieval_hits", None)
+    reply, _, additional_data, confidence = await turn.ainvoke(message, config={"callbacks": [usage]})
+    return {"reply": reply, "intent": None, "retrieval_hits": state.pop("retrieval_hits", None),
+            "confidence": confidence,
+            "data": sorted(additional_data or {})}
+
+
+TURN_RUNNERS = {"graph": run_graph_turn, "bot_service": run_bot_service_turn}
+
+
+async def replay_conversation(conversation: dict, run: int, args: argparse.Namespace) -> List[Dict[str, Any]]:
+    session: Dict[str, Any] = {"session_id": f"replay-{conversation.get('id', 'conversation')}-{run}"}
+    if args.db:
+        from app.core.db.database import sync_session
+
+        session["db"] = sync_session()
+    run_turn = TURN_RUNNERS[args.engine]
+    rows = []
+    try:
+        for index, turn in enumerate(conversation["turns"]):
+            usage = LLMUsage()
+            row: Dict[str, Any] = {"conversation": conversation.get("id"), "run": run, "turn": index,
+                                   "language": conversation.get("language", "en"), "user": turn["user"]}
+            start = time.perf_counter()
+            try:
+                row.update(await run_turn(turn["user"], conversation, session, usage))
+                row["error"] = None
+            except Exception as e:
+                row.update({"reply": None, "intent": None, "retrieval_hits": None, "error": f"{type(e).__name__}: {e}"})
+            row["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+            row.update(usage.to_dict())
+            if row["error"]:
+                # Counted as an error, not scored; later turns depend on this one
+                row.update({"intent_match": None, "contains": None, "match": None})
+                rows.append(row)
+                break
+            row.update(answer_match(turn.get("expect"), row["reply"], row["intent"]))
+            rows.append(row)
+    finally:
+        if session.get("db") is not None:
+            session["db"].close()
+    return rows
+
+
+def summarize(rows: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+    """Latency percentiles, LLM usage, retrieval hits and match scores of the replayed turns."""
+    latencies = [row["latency_ms"] for row in rows if not row["error"]]
+    intent_matches = [row["intent_match"] for row in rows if row["intent_match"] is not None]
+    contains = [row["contains"] for row in rows if row["contains"] is not None]
+    matches = [row["match"] for row in rows if row["match"] is not None]
+    searched = [row["retrieval_hits"] for row in rows if row["retrieval_hits"] is not None]
+    return {
+        "turns": len(rows),
+        "errors": sum(1 for row in rows if row["error"]),
+        "latency_ms": {"p50": _percentile(latencies, 0.5), "p95": _percentile(latencies, 0.95),
+                       "max": max(latencies, default=0.0),
+                       "mean": round(statistics.mean(latencies), 1) if latencies else 0.0},
+        **{key: sum(row[key] for row in rows)
+           for key in ("llm_calls", "input_tokens", "output_tokens", "cached_tokens")},
+        "llm_calls_per_turn": round(sum(row["llm_calls"] for row in rows) / len(rows), 2) if rows else 0.0,
+        "retrieval_turns": len(searched),
+        "retrieval_hits": sum(searched),
+        "intent_accuracy": round(statistics.mean(intent_matches), 3) if intent_matches else None,
+        "contains": round(statistics.mean(contains), 3) if contains else None,
+        "match": round(statistics.mean(matches), 3) if matches else None,
+    }
+
+
+def configure_providers(args: argparse.Namespace) -> None:
+    """Select the providers through the environment, before the app's settings are loaded."""
+    if args.providers != "fake":
+        return
+    os.environ["LLM_PROVIDER"] = "fake"
+    os.environ["EMBEDDING_PROVIDER"] = "fake"
+    os.environ["FAKE_LLM_LATENCY"] = args.fake_llm_latency
+    os.environ["FAKE_EMBEDDING_LATENCY"] = args.fake_embedding_latency
+    # Some services build an OpenAI client on import; fake runs never call it
+    os.environ.setdefault("OPENAI_API_KEY", "unused")
+
+
+async def replay(conversations: Sequence[dict], args: argparse.Namespace) -> List[Dict[str, Any]]:
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def bounded(conversation: dict, run: int) -> List[Dict[str, Any]]:
+        async with semaphore:
+            return await replay_conversation(conversation, run, args)
+
+    results = await asyncio.gather(*(bounded(conversation, run)
+                                     for run in range(args.repeat) for conversation in conversations))
+    return [row for rows in results for row in rows]
+
+
+def main(args: argparse.Namespace) -> None:
+    configure_providers(args)
+    conversations = load_jsonl(args.conversations)
+    if not conversations:
+        sys.exit("No conversations to replay")
+    print(f"Replaying {len(conversations)} conversations x {args.repeat} through {args.engine} "
+          f"({args.providers} providers, concurrency {args.concurrency})", file=sys.stderr)
+
+    start = time.perf_counter()
+    rows = asyncio.run(replay(conversations, args))
+    wall_seconds = time.perf_counter() - start
+
+    summary: Dict[str, Any] = {"engine": args.engine, "providers": args.providers,
+                               "conversations": len(conversations) * args.repeat,
+                               "wall_seconds": round(wall_seconds, 2), **summarize(rows)}
+    summary["by_language"] = {language: summarize([row for row in rows if row["language"] == language])
+                              for language in sorted({row["language"] for row in rows})}
+    if args.engine == "graph":
+        from app.services.graph_service.prompts import prompt_cache_stats
+        from app.services.providers import coalescing_stats, hedging_stats
+
+        summary.update({"hedging": hedging_stats(), "coalescing": coalescing_stats(),
+                        "prompt_cache": prompt_cache_stats()})
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            for row in rows:
+                f.write(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+    if args.summary:
+        with open(args.summary, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2, default=str)
+    print(json.dumps(summary, ensure_ascii=False, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", required=True, help="Conversations to replay (JSONL)")
+    parser.add_argument("--engine", choices=ENGINES, default="graph", help="Bot implementation to replay through")
+    parser.add_argument("--concurrency", type=int, default=8, help="Conversations replayed at once")
+    parser.add_argument("--repeat", type=int, default=1, help="Times to replay the corpus")
+    parser.add_argument("--providers", choices=("configured", "fake"), default="configured",
+                        help="Use the configured LLM and embedding providers, or the fake ones")
+    parser.add_argument("--fake-llm-latency", default="lognormal:700:0.4",
+                        help="Latency distribution of the fake chat model")
+    parser.add_argument("--fake-embedding-latency", default="lognormal:120:0.3",
+                        help="Latency distribution of the fake embedding provider")
+    parser.add_argument("--db", action="store_true", help="Give each conversation a database session")
+    parser.add_argument("--output", help="File to write the turns to (JSONL)")
+    parser.add_argument("--summary", help="File to write the summary to (JSON)")
+    main(parser.parse_args())
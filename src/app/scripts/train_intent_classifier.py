@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+"""
+Train and evaluate the local intent classifier.
+
+Training data is the seed set (src/data/intents/seed.jsonl) plus the turns the LLM
+classified in production (src/data/intents/traffic.jsonl, written when INTENT_TRAFFIC_LOG
+is enabled), the latest label winning for repeated messages. A stratified hold-out split is used to report:
+
+- accuracy and per-intent precision/recall of the model on its own
+- for the tiered classifier (rules, then model) at the confidence threshold: how many
+  turns it answers without the LLM, how accurate those answers are, and the latency of
+  each tier
+
+The model is then retrained on all the data and saved to src/data/intents/intent_model.npz,
+where the app picks it up on its next start.
+
+Usage:
+    python src/app/scripts/train_intent_classifier.py [--threshold 0.85] [--test-fraction 0.2] [--dry-run]
+    python src/app/scripts/train_intent_classifier.py --data extra_labels.jsonl --no-traffic
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from app.core.config import settings
+from app.services.intent_classifier import (
+    INTENTS,
+    MODEL_FILE,
+    SEED_FILE,
+    TRAFFIC_LOG,
+    IntentClassifier,
+    IntentModel,
+    load_examples,
+    normalize_text,
+)
+
+
+def load_training_data(paths: Sequence[Path], traffic: bool) -> List[Tuple[str, str]]:
+    by_text: Dict[str, Tuple[str, str]] = {}
+    for path in paths:
+        for text, intent in load_examples(path):
+            by_text[normalize_text(text)] = (text, intent)
+    if traffic:
+        for text, intent in load_examples(TRAFFIC_LOG, tiers=["llm"]):
+            by_text[normalize_text(text)] = (text, intent)
+    return list(by_text.values())
+
+
+def stratified_split(examples: Sequence[Tuple[str, str]], test_fraction: float,
+                     seed: int) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    by_intent = defaultdict(list)
+    for example in examples:
+        by_intent[example[1]].append(example)
+    rng = random.Random(seed)
+    train, test = [], []
+    for intent_examples in by_intent.values():
+        rng.shuffle(intent_examples)
+        cut = int(round(len(intent_examples) * test_fraction)) if len(intent_examples) > 1 else 0
+        test.extend(intent_examples[:cut])
+        train.extend(intent_examples[cut:])
+    return train, test
+
+
+def print_table(rows: List[List[str]]) -> None:
+    widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+    for row in rows:
+        print("  ".join(value.rjust(width) for value, width in zip(row, widths)))
+
+
+def evaluate(model: IntentModel, test: Sequence[Tuple[str, str]], threshold: float) -> None:
+    texts = [text for text, _ in test]
+    truth = [intent for _, intent in test]
+
+    predicted = [model.predict(text)[0] for text in texts]
+    accuracy = sum(p == t for p, t in zip(predicted, truth)) / len(test)
+    print(f"\nModel alone: accuracy {accuracy:.3f} on {len(test)} held-out turns")
+    rows = [["intent", "precision", "recall", "support"]]
+    for intent in INTENTS:
+        support = truth.count(intent)
+        predicted_count = predicted.count(intent)
+        hits = sum(p == t == intent for p, t in zip(predicted, truth))
+        if support or predicted_count:
+            rows.append([intent, f"{hits / predicted_count:.2f}" if predicted_count else "-",
+                         f"{hits / support:.2f}" if support else "-", str(support)])
+    print_table(rows)
+
+    classifier = IntentClassifier(model, threshold=threshold)
+    answered = defaultdict(lambda: [0, 0])
+    for text, intent in test:
+        prediction = classifier.classify(text)
+        tier = prediction.tier if prediction else "llm"
+        answered[tier][0] += 1
+        answered[tier][1] += bool(prediction and prediction.intent == intent)
+
+    local = answered["rules"][0] + answered["model"][0]
+    correct = answered["rules"][1] + answered["model"][1]
+    print(f"\nTiered at threshold {threshold}: {local / len(test):.1%} answered locally, "
+          f"{correct / max(local, 1):.1%} of those correct, {answered['llm'][0]} left to the LLM")
+    rows = [["tier", "answered", "accuracy", "calls", "p50 ms", "p95 ms"]]
+    stats = classifier.stats()
+    for tier in ("rules", "model"):
+        count, hits = answered[tier]
+        tier_stats = stats[tier]
+        rows.append([tier, str(count), f"{hits / count:.2f}" if count else "-", str(tier_stats["calls"]),
+                     f"{tier_stats.get('p50_ms', 0):.3f}", f"{tier_stats.get('p95_ms', 0):.3f}"])
+    rows.append(["llm", str(answered["llm"][0]), "-", "-", "-", "-"])
+    print_table(rows)
+
+
+def main(args: argparse.Namespace) -> None:
+    examples = load_training_data([Path(path) for path in args.data], traffic=not args.no_traffic)
+    if len({intent for _, intent in examples}) < 2:
+        sys.exit("Need labelled examples of at least two intents")
+    counts = defaultdict(int)
+    for _, intent in examples:
+        counts[intent] += 1
+    print(f"{len(examples)} examples: " + ", ".join(f"{intent} {count}" for intent, count in sorted(counts.items())))
+
+    train, test = stratified_split(examples, args.test_fraction, args.seed)
+    if test:
+        start = time.perf_counter()
+        model = IntentModel.train(*zip(*train), epochs=args.epochs)
+        print(f"Trained on {len(train)} examples in {time.perf_counter() - start:.2f}s, "
+              f"{len(model.vocabulary)} features")
+        evaluate(model, test, args.threshold)
+
+    if args.dry_run:
+        return
+    model = IntentModel.train(*zip(*examples), epochs=args.epochs)
+    print(f"\nModel trained on all {len(examples)} examples saved to {model.save(Path(args.output))}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", nargs="+", default=[str(SEED_FILE)],
+                        help="Labelled JSONL files of {\"text\", \"intent\"} (default: the seed set)")
+    parser.add_argument("--no-traffic", action="store_true", help="Leave out the LLM-labelled traffic log")
+    parser.add_argument("--threshold", type=float, default=settings.INTENT_CONFIDENCE_THRESHOLD,
+                        help="Confidence needed to answer without the LLM")
+    parser.add_argument("--test-fraction", type=float, default=0.2, help="Share of each intent held out")
+    parser.add_argument("--epochs", type=int, default=300, help="Training epochs")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed of the split")
+    parser.add_argument("--output", default=str(MODEL_FILE), help="Where to save the model")
+    parser.add_argument("--dry-run", action="store_true", help="Evaluate only, do not save a model")
+    main(parser.parse_args())
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""
+Dump and restore the vector collections without re-embedding anything.
+
+Snapshots are written to src/data/snapshots/<name>/<collection>/ as a memory-mappable
+embedding.npy, the scalar fields in entries.jsonl.zst and a manifest.json with the
+embedding model and dimension.
+
+Usage:
+    python src/app/scripts/vector_snapshot.py dump [--name NAME] [--float16] [--collections rag_embeddings ...]
+    python src/app/scripts/vector_snapshot.py restore NAME [--drop-existing] [--collections rag_embeddings ...]
+    python src/app/scripts/vector_snapshot.py list
+"""
+import argparse
+import os
+import sys
+import time
+
+# Add the project root to the Python path
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+from app.services.milvus_client import connect_to_milvus
+from app.services.vector_snapshot import dump_snapshot, list_snapshots, restore_snapshot
+
+
+def main(args: argparse.Namespace) -> None:
+    if args.command == "list":
+        for snapshot in list_snapshots():
+            collections = ", ".join(
+                f"{m['collection']} ({m['count']} x {m['dim']} {m['dtype']})" for m in snapshot["collections"]
+            )
+            print(f"{snapshot['name']}: {collections}")
+        return
+
+    connect_to_milvus()
+    start = time.perf_counter()
+    if args.command == "dump":
+        path = dump_snapshot(args.name, args.collections, dtype="float16" if args.float16 else "float32")
+        print(f"Snapshot written to {path} in {time.perf_counter() - start:.1f}s")
+    else:
+        restored = restore_snapshot(args.name, args.collections, drop_existing=args.drop_existing, force=args.force)
+        total = sum(restored.values())
+        elapsed = time.perf_counter() - start
+        print(f"Restored {total} entries in {elapsed:.1f}s ({total / max(elapsed, 1e-9):.0f} entries/s): {restored}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    dump_parser = subparsers.add_parser("dump", help="Dump collections into a new snapshot")
+    dump_parser.add_argument("--name", help="Snapshot name (default: current timestamp)")
+    dump_parser.add_argument("--float16", action="store_true", help="Store vectors as float16 (half the size)")
+    dump_parser.add_argument("--collections", nargs="+", help="Collections to dump (default: RAG and product)")
+
+    restore_parser = subparsers.add_parser("restore", help="Bulk insert a snapshot into Milvus")
+    restore_parser.add_argument("name", help="Snapshot name")
+    restore_parser.add_argument("--collections", nargs="+", help="Only restore these collections")
+    restore_parser.add_argument("--drop-existing", action="store_true", help="Drop the collections before restoring")
+    restore_parser.add_argument("--force", action="store_true", help="Restore even if the embedding model differs")
+
+    subparsers.add_parser("list", help="List complete snapshots")
+    main(parser.parse_args())
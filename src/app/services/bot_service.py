@@ -130,10 +130,12 @@ class BotService:
         # If no specific intent is matched, use RAG to find a relevant response
         try:
             rag_results = self.rag_service.search_similar(message, top_k=1)
-            if rag_results and len(rag_results) > 0:
+            # Knowledge base entries behind the reply, for callers measuring retrieval
+            session_state["retrieval_hits"] = sum(1 for result in rag_results or [] if result.get("relevant"))
+            if rag_results and rag_results[0].get("relevant"):
                 rag_response = rag_results[0]
-                reply = f"Based on our knowledge base: {rag_response}"
-                confidence = 0.7
+                reply = f"Based on our knowledge base: {rag_response['text']}"
+                confidence = rag_response["score"]
             else:
                 # Fallback response
                 reply = "I'm not sure I understand. Could you please rephrase your question or select one of the options below?"
@@ -0,0 +1,342 @@
+"""
+Token-aware, language-aware chunking for the RAG collection.
+
+Text is cut at structural boundaries first (headings for markdown and HTML, then paragraphs,
+then sentences) and the pieces are packed greedily into chunks of at most `max_tokens`
+tokens of the embedding model and at most `max_bytes` UTF-8 bytes, the size of the Milvus
+`text` field. A chunk only ends mid-sentence when the sentence alone is over the limit.
+Consecutive chunks of a section share up to `overlap_tokens` of whole sentences, and
+chunks after the first of a section are prefixed with its heading trail.
+
+Strategies are registered by name (see register_chunker) and picked per source type
+(see strategy_for_source); CHUNKING_STRATEGIES overrides the defaults.
+"""
+import os
+import re
+from functools import cache, lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Type
+
+from app.core.config import settings
+from app.services.milvus_client import EMBEDDING_MODEL, TEXT_MAX_BYTES
+
+# Heading trail prefixed to continuation chunks, e.g. "Shipping > International"
+HEADING_SEPARATOR = " > "
+
+_SENTENCE_BOUNDARY = re.compile(
+    # After sentence punctuation (Latin, Arabic question mark, CJK), at blank lines,
+    # and before list items
+    r"(?<=[.!?؟۔。])[\"')\]]*\s+|\n\s*\n+|\n(?=\s*(?:[-*+•]|\d+[.)])\s)"
+)
+_EXTRA_BLANK_LINES = re.compile(r"\n{3,}")
+_WORD_BOUNDARY = re.compile(r"(?<=\s)(?=\S)")
+_MARKDOWN_HEADING = re.compile(r"^ {0,3}(#{1,6})\s+(.+?)\s*#*\s*$")
+_MARKDOWN_FENCE = re.compile(r"^ {0,3}(```|~~~)")
+
+
+def fit_bytes(text: str, max_bytes: int = TEXT_MAX_BYTES) -> str:
+    """Truncate `text` to at most `max_bytes` UTF-8 bytes without splitting a character."""
+    encoded = text.encode("utf-8")
+    if len(encoded) <= max_bytes:
+        return text
+    return encoded[:max_bytes].decode("utf-8", "ignore")
+
+
+class TokenCounter:
+    """
+    Counts tokens with the embedding model's tiktoken encoding.
+
+    Falls back to an estimate of one token per four UTF-8 bytes (close for English, a slight
+    overestimate for Arabic) when tiktoken or its encoding files are unavailable.
+    """
+
+    def __init__(self, model: str = EMBEDDING_MODEL):
+        self.model = model
+        self.encoding = _load_encoding(model)
+
+    @property
+    def exact(self) -> bool:
+        return self.encoding is not None
+
+    def count(self, text: str) -> int:
+        return self.count_batch([text])[0]
+
+    def count_batch(self, texts: Sequence[str]) -> List[int]:
+        if self.encoding is None:
+            return [(len(text.encode("utf-8")) + 3) // 4 for text in texts]
+        return [len(tokens) for tokens in self.encoding.encode_ordinary_batch(list(texts))]
+
+
+@cache
+def _load_encoding(model: str):
+    try:
+        import tiktoken
+
+        return tiktoken.encoding_for_model(model)
+    except Exception as e:
+        print(f"tiktoken encoding for {model} unavailable ({e}), estimating token counts from byte length")
+        return None
+
+
+@cache
+def get_token_counter(model: str = EMBEDDING_MODEL) -> TokenCounter:
+    return TokenCounter(model)
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text after sentence ends, at blank lines and before list items; joining the parts gives `text` back."""
+    return _split_at(_SENTENCE_BOUNDARY, text)
+
+
+def _split_at(pattern: re.Pattern, text: str) -> List[str]:
+    parts, start = [], 0
+    for match in pattern.finditer(text):
+        if match.end() > start:
+            parts.append(text[start:match.end()])
+            start = match.end()
+    parts.append(text[start:])
+    # Whitespace-only parts carry no content; fold them into the previous part
+    units = []
+    for part in parts:
+        if units and not part.strip():
+            units[-1] += part
+        elif part:
+            units.append(part)
+    return units
+
+
+class Chunker:
+    """Plain text: paragraphs and sentences packed into token- and byte-limited chunks."""
+
+    name = "text"
+
+    def __init__(self, max_tokens: int = 256, overlap_tokens: int = 32, max_bytes: int = TEXT_MAX_BYTES,
+                 counter: Optional[TokenCounter] = None):
+        if max_tokens < 1 or not 0 <= overlap_tokens < max_tokens:
+            raise ValueError("max_tokens must be positive and overlap_tokens smaller than max_tokens")
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+        self.max_bytes = max_bytes
+        self.counter = counter or get_token_counter()
+
+    def sections(self, text: str) -> Iterable[Tuple[str, str]]:
+        """(heading trail, body) pairs; a chunk never spans two sections."""
+        yield "", text
+
+    def split(self, text: str) -> List[str]:
+        chunks = []
+        for heading, body in self.sections(text):
+            if body.strip():
+                chunks.extend(self._pack(heading, split_sentences(body)))
+        return chunks
+
+    def _pack(self, heading: str, units: List[str]) -> List[str]:
+        prefix = f"{heading}\n" if heading else ""
+        prefix_tokens = self.counter.count(prefix) if prefix else 0
+        prefix_bytes = len(prefix.encode("utf-8"))
+        # Continuation chunks carry the heading, so their budget is smaller; keep room for content
+        if prefix_tokens > self.max_tokens // 2 or prefix_bytes > self.max_bytes // 2:
+            prefix, prefix_tokens, prefix_bytes = "", 0, 0
+
+        chunks: List[str] = []
+        current: List[Tuple[str, int, int]] = []
+        current_tokens = current_bytes = 0
+
+        def emit(parts: List[Tuple[str, int, int]]) -> None:
+            chunk = _EXTRA_BLANK_LINES.sub("\n\n", "".join(part for part, _, _ in parts).strip())
+            if chunk:
+                chunk = (prefix + chunk) if chunks and prefix else chunk
+                chunks.append(fit_bytes(chunk, self.max_bytes))
+
+        # Every chunk but the first carries the heading prefix
+        continuation_tokens = self.max_tokens - prefix_tokens
+        continuation_bytes = self.max_bytes - prefix_bytes
+        for unit, tokens, size in self._measure(units):
+            if tokens > continuation_tokens or size > continuation_bytes:
+                # A single sentence over the limit: cut it at words, then characters
+                emit(current)
+                current, current_tokens, current_bytes = [], 0, 0
+                for piece in self._split_oversized(unit, continuation_tokens, continuation_bytes):
+                    emit([(piece, 0, 0)])
+                continue
+
+            token_budget = continuation_tokens if chunks else self.max_tokens
+            byte_budget = continuation_bytes if chunks else self.max_bytes
+            if current and (current_tokens + tokens > token_budget or current_bytes + size > byte_budget):
+                emit(current)
+                current = self._overlap(current, continuation_tokens - tokens, continuation_bytes - size)
+                current_tokens = sum(t for _, t, _ in current)
+                current_bytes = sum(b for _, _, b in current)
+            current.append((unit, tokens, size))
+            current_tokens += tokens
+            current_bytes += size
+
+        emit(current)
+        return chunks
+
+    def _measure(self, units: List[str]) -> List[Tuple[str, int, int]]:
+        counts = self.counter.count_batch(units) if units else []
+        return [(unit, count, len(unit.encode("utf-8"))) for unit, count in zip(units, counts)]
+
+    def _overlap(self, parts: List[Tuple[str, int, int]], token_room: int,
+                 byte_room: int) -> List[Tuple[str, int, int]]:
+        """Trailing whole sentences of the emitted chunk to repeat at the start of the next one."""
+        tail: List[Tuple[str, int, int]] = []
+        tokens = size = 0
+        for part in reversed(parts):
+            if tokens + part[1] > min(self.overlap_tokens, token_room) or size + part[2] > byte_room:
+                break
+            tail.insert(0, part)
+            tokens += part[1]
+            size += part[2]
+        return tail
+
+    def _split_oversized(self, unit: str, max_tokens: int, max_bytes: int) -> List[str]:
+        words = _split_at(_WORD_BOUNDARY, unit)
+        pieces, current, current_tokens, current_bytes = [], "", 0, 0
+        for word, tokens, size in self._measure(words):
+            if tokens > max_tokens or size > max_bytes:
+                if current:
+                    pieces.append(current)
+                    current, current_tokens, current_bytes = "", 0, 0
+                # Guess the slice length from the word's token density, then shrink until it fits
+                slice_length = max(1, len(word) * max_tokens // max(tokens, 1))
+                while word:
+                    piece = fit_bytes(word[:slice_length], max_bytes)
+                    while len(piece) > 1 and self.counter.count(piece) > max_tokens:
+                        piece = piece[:len(piece) * 3 // 4]
+                    piece = piece or word[0]
+                    pieces.append(piece)
+                    word = word[len(piece):]
+                continue
+            if current and (current_tokens + tokens > max_tokens or current_bytes + size > max_bytes):
+                pieces.append(current)
+                current, current_tokens, current_bytes = "", 0, 0
+            current += word
+            current_tokens += tokens
+            current_bytes += size
+        if current:
+            pieces.append(current)
+        return pieces
+
+
+CHUNKERS: Dict[str, Type[Chunker]] = {}
+
+
+def register_chunker(cls: Type[Chunker]) -> Type[Chunker]:
+    """Class decorator making a chunking strategy available under `cls.name`."""
+    CHUNKERS[cls.name] = cls
+    return cls
+
+
+register_chunker(Chunker)
+
+
+@register_chunker
+class MarkdownChunker(Chunker):
+    """Markdown: ATX headings start a new section; fenced code is never read as headings."""
+
+    name = "markdown"
+
+    def sections(self, text: str) -> Iterable[Tuple[str, str]]:
+        trail: List[Tuple[int, str]] = []
+        heading, lines, in_fence = "", [], False
+        for line in text.splitlines(keepends=True):
+            if _MARKDOWN_FENCE.match(line):
+                in_fence = not in_fence
+            match = None if in_fence else _MARKDOWN_HEADING.match(line.rstrip("\n"))
+            if match:
+                # A heading directly followed by a subheading has no chunk of its own;
+                # it lives on in the subheading's trail
+                if "".join(lines[1:] if heading else lines).strip():
+                    yield heading, "".join(lines)
+                level = len(match.group(1))
+                trail = [(lvl, title) for lvl, title in trail if lvl < level] + [(level, match.group(2))]
+                heading = HEADING_SEPARATOR.join(title for _, title in trail)
+                # The heading line ends its own sentence so it is never glued to the first paragraph
+                lines = [line.rstrip("\n") + "\n\n"]
+            else:
+                lines.append(line)
+        yield heading, "".join(lines)
+
+
+@register_chunker
+class HtmlChunker(MarkdownChunker):
+    """HTML: scripts, styles and page chrome dropped, converted to markdown, then split by heading."""
+
+    name = "html"
+    ignored_tags = ["script", "style", "noscript", "nav", "header", "footer", "form", "svg"]
+
+    def sections(self, text: str) -> Iterable[Tuple[str, str]]:
+        from bs4 import BeautifulSoup
+        from markdownify import markdownify
+
+        soup = BeautifulSoup(text, "html.parser")
+        for tag in soup(self.ignored_tags):
+            tag.decompose()
+        return super().sections(markdownify(str(soup), heading_style="ATX"))
+
+
+# Default strategy per source type, the part of the source key before ":" (see knowledge_ingest.source_key)
+SOURCE_TYPE_STRATEGIES: Dict[str, str] = {
+    "text": "text",
+    "url": "text",  # pages arrive as extracted text
+    "entry": "text",
+    "source": "text",
+    "manual": "text",
+    "product": "text",
+    "file": "markdown",  # uploads are converted to markdown
+    "markdown": "markdown",
+    "html": "html",
+}
+FILE_EXTENSION_STRATEGIES: Dict[str, str] = {
+    ".md": "markdown",
+    ".markdown": "markdown",
+    ".html": "html",
+    ".htm": "html",
+    ".txt": "text",
+    ".csv": "text",
+}
+
+
+def _strategy_overrides() -> Dict[str, str]:
+    overrides = {}
+    for item in settings.CHUNKING_STRATEGIES.split(","):
+        source_type, _, strategy = item.partition("=")
+        if source_type.strip() and strategy.strip():
+            overrides[source_type.strip()] = strategy.strip()
+    return overrides
+
+
+def strategy_for_source(key: Optional[str]) -> str:
+    """Chunking strategy for a source key such as "url:https://..." or "file:faq.md"."""
+    if not key:
+        return "text"
+    source_type, _, value = key.partition(":")
+    overrides = _strategy_overrides()
+    if source_type in overrides:
+        return overrides[source_type]
+    if source_type == "file":
+        extension = os.path.splitext(value)[1].lower()
+        if extension in FILE_EXTENSION_STRATEGIES:
+            return FILE_EXTENSION_STRATEGIES[extension]
+    return SOURCE_TYPE_STRATEGIES.get(source_type, "text")
+
+
+def language_limits(language: str) -> Tuple[int, int]:
+    """(max_tokens, overlap_tokens) for a language."""
+    if language == "ar":
+        return settings.CHUNK_MAX_TOKENS_AR, settings.CHUNK_OVERLAP_TOKENS_AR
+    return settings.CHUNK_MAX_TOKENS, settings.CHUNK_OVERLAP_TOKENS
+
+
+@lru_cache(maxsize=32)
+def get_chunker(strategy: str = "text", language: str = "en") -> Chunker:
+    if strategy not in CHUNKERS:
+        raise ValueError(f"Unknown chunking strategy {strategy!r}, expected one of {sorted(CHUNKERS)}")
+    max_tokens, overlap_tokens = language_limits(language)
+    return CHUNKERS[strategy](max_tokens=max_tokens, overlap_tokens=overlap_tokens)
+
+
+def chunk_text(text: str, language: str = "en", strategy: str = "text") -> List[str]:
+    """Split `text` into chunks that fit the embedding model and the Milvus text field."""
+    return get_chunker(strategy, language).split(text)
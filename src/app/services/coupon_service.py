@@ -1,15 +1,27 @@
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Union
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from datetime import datetime
 from app.models.coupon import Coupon
-from app.crud.crud_coupon import get_all_coupons, get_coupon_by_code
+from app.crud.crud_coupon import (
+    async_get_active_coupons,
+    async_get_coupon_by_code,
+    get_all_coupons,
+    get_coupon_by_code,
+)
 
 # In-memory store of assigned coupons (session_id -> coupon_code)
 # In a production environment, this would be stored in a database
 user_coupon_assignments: Dict[str, str] = {}
 
 class CouponService:
-    def __init__(self, db: Session):
+    """
+    Coupon lookups and per-session assignment.
+
+    The sync methods take a `Session` (used by the LangGraph nodes); the `async_*`
+    methods take an `AsyncSession` and are the ones to use from request handlers.
+    """
+    def __init__(self, db: Union[Session, AsyncSession]):
         self.db = db
         
     @staticmethod
@@ -47,12 +59,7 @@ class CouponService:
         Get a coupon by its code if it's active and hasn't expired
         """
         coupon = get_coupon_by_code(self.db, code)
-        now = datetime.utcnow()
-        
-        if coupon and coupon.is_active and (coupon.expires_at is None or coupon.expires_at > now):
-            return coupon
-        
-        return None
+        return coupon if self._is_valid(coupon) else None
         
     def request_coupon(self, session_id: str, requested_code: str) -> dict:
         """
@@ -66,25 +73,53 @@ class CouponService:
         - assigned_code: The code of the previously assigned coupon (if any)
         """
         # Check if user already has a coupon
-        if self.has_received_coupon(session_id):
-            assigned_code = self.get_assigned_coupon(session_id)
-            assigned_coupon = self.get_coupon_by_code(assigned_code)
-            
-            if assigned_coupon:
-                return {
-                    "success": False,
-                    "coupon": self.format_coupon_for_display(assigned_coupon),
-                    "message": "already_assigned",
-                    "already_assigned": True,
-                    "assigned_code": assigned_code
-                }
-            else:
-                # The previously assigned coupon is no longer valid
-                # We'll allow them to get a new one by continuing
-                pass
+        assigned_code = self.get_assigned_coupon(session_id)
+        assigned_coupon = self.get_coupon_by_code(assigned_code) if assigned_code else None
+        if assigned_coupon:
+            return self._already_assigned_result(assigned_coupon)
+        
+        # A previously assigned coupon that is no longer valid does not block a new one,
+        # so check if the requested coupon exists and is valid
+        return self._assign_result(session_id, self.get_coupon_by_code(requested_code))
+    
+    async def async_get_active_coupons(self) -> List[Coupon]:
+        """
+        Get all active coupons that haven't expired (async version of get_active_coupons)
+        """
+        return await async_get_active_coupons(self.db, datetime.utcnow())
+    
+    async def async_get_coupon_by_code(self, code: str) -> Optional[Coupon]:
+        """
+        Get a coupon by its code if it's active and hasn't expired (async version of get_coupon_by_code)
+        """
+        coupon = await async_get_coupon_by_code(self.db, code)
+        return coupon if self._is_valid(coupon) else None
+    
+    async def async_request_coupon(self, session_id: str, requested_code: str) -> dict:
+        """
+        Request a specific coupon for a user (async version of request_coupon)
+        """
+        assigned_code = self.get_assigned_coupon(session_id)
+        assigned_coupon = await self.async_get_coupon_by_code(assigned_code) if assigned_code else None
+        if assigned_coupon:
+            return self._already_assigned_result(assigned_coupon)
         
-        # Check if the requested coupon exists and is valid
-        coupon = self.get_coupon_by_code(requested_code)
+        return self._assign_result(session_id, await self.async_get_coupon_by_code(requested_code))
+    
+    @staticmethod
+    def _is_valid(coupon: Optional[Coupon]) -> bool:
+        return bool(coupon and coupon.is_active and (coupon.expires_at is None or coupon.expires_at > datetime.utcnow()))
+    
+    def _already_assigned_result(self, assigned_coupon: Coupon) -> dict:
+        return {
+            "success": False,
+            "coupon": self.format_coupon_for_display(assigned_coupon),
+            "message": "already_assigned",
+            "already_assigned": True,
+            "assigned_code": assigned_coupon.code
+        }
+    
+    def _assign_result(self, session_id: str, coupon: Optional[Coupon]) -> dict:
         if not coupon:
             return {
                 "success": False,
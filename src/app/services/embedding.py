@@ -1,17 +1,32 @@
-import os
-import openai
+from typing import Optional
+
+import numpy as np
 import langdetect
 
-OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+from app.services.providers import EmbeddingProvider, get_embedding_provider
+
 # Use a model that has strong multilingual capabilities
 EMBEDDING_MODEL = "text-embedding-3-large"  # Better multilingual support than ada-002
 
-# Use the new OpenAI client
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
+
+def shorten_embedding(embedding: list[float], dim: int) -> list[float]:
+    """Cut a text-embedding-3 vector down to `dim` dimensions.
+    
+    These models are trained so that a truncated, re-normalized vector is equivalent to
+    requesting `dimensions=dim` from the API, so one call can serve collections of
+    different sizes.
+    """
+    vector = np.asarray(embedding[:dim], dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    if norm > 0:
+        vector = vector / norm
+    return vector.tolist()
 
 class EmbeddingService:
-    def __init__(self, model: str = EMBEDDING_MODEL):
+    def __init__(self, model: str = EMBEDDING_MODEL, provider: Optional[EmbeddingProvider] = None):
         self.model = model
+        # The configured provider (EMBEDDING_PROVIDER, see app.services.providers)
+        self.provider = provider or get_embedding_provider()
     
     def detect_language(self, text: str) -> str:
         """Detect the language of the input text.
@@ -38,8 +53,20 @@ class EmbeddingService:
         print(f"Embedding text in detected language: {lang}")
         
         # Generate embeddings (same process for all languages with multilingual model)
-        response = client.embeddings.create(
-            input=text,
-            model=self.model
-        )
-        return response.data[0].embedding
\ No newline at end of file
+        return self.provider.embed(text, self.model)
+    
+    def embed_batch(self, texts: list[str]) -> list[list[float]]:
+        """Generate embeddings for many texts with a single API call.
+        
+        Args:
+            texts: Non-empty texts, at most 2048 per call
+            
+        Returns:
+            One embedding per text, in input order
+        """
+        if not texts:
+            return []
+        if any(not text or not text.strip() for text in texts):
+            raise ValueError("Cannot embed empty text")
+        
+        return self.provider.embed_batch(texts, self.model)
@@ -1,12 +1,13 @@
-import os
-from langchain_openai import ChatOpenAI
 from app.core.config import settings
+from app.services.providers import coalesced_chat_model, get_llm_provider, hedged_chat_model
 
-# Ensure OPENAI_API_KEY is set in your .env or environment
-OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
+# Chat models of the configured provider (LLM_PROVIDER, see app.services.providers), with
+# slow requests hedged (LLM_HEDGING, see providers/hedging.py) and identical concurrent
+# requests coalesced (REQUEST_COALESCING, see providers/coalescing.py)
+provider = get_llm_provider()
 
-# Choose your model
-llm = ChatOpenAI(model="gpt-4o", temperature=0, api_key=OPENAI_API_KEY)
+llm = coalesced_chat_model(hedged_chat_model(provider, settings.LLM_MODEL, settings.LLM_HEDGE_MODEL))
 
 # You might want a separate, cheaper/faster model for classification
-classifier_llm = ChatOpenAI(model="gpt-3.5-turbo", temperature=0, api_key=OPENAI_API_KEY)
+classifier_llm = coalesced_chat_model(
+    hedged_chat_model(provider, settings.CLASSIFIER_LLM_MODEL, settings.CLASSIFIER_LLM_HEDGE_MODEL))
@@ -1,20 +1,22 @@
 from .state import ConversationState
-from .tools import tools
+from .tools import tools, retrieval_pipeline
+from app.services.retrieval import format_context
 from .llm import llm, classifier_llm
 from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
-from langchain.tools.render import format_tool_to_openai_function
 import json
 import re
+import time
 from datetime import datetime
 from app.crud.crud_coupon import get_coupon_by_code, get_all_coupons
 from app.services.coupon_service import CouponService
 from sqlalchemy.orm import Session
 from .history import save_history, load_history
-
-# Helper to convert tools for LLM function calling
-functions = [format_tool_to_openai_function(t) for t in tools]
-llm_with_tools = llm.bind_functions(functions)
-classifier_llm_with_tools = classifier_llm.bind_functions(functions)
+from app.services.intent_classifier import INTENTS, get_intent_classifier, log_turn
+from app.core.config import settings
+from .speculation import CATALOG, KNOWLEDGE_BASE, Speculation
+from .prompts import invoke_prompt
+from .replies import LLM, order_status_reply, render, reply_mode, structured_reply
+from app.core.bot_settings import get_bot_settings_model
 
 # Define the edges for the graph flow
 from .edges import route_based_on_intent
@@ -27,44 +29,37 @@ def detect_frustration(user_message: str) -> bool:
     return False
 
 
+def _bot_settings(db: Session = None):
+    """The bot settings, or None if they cannot be read (the replies then use their defaults)."""
+    try:
+        return get_bot_settings_model(db)
+    except Exception as e:
+        print(f"--- Could not read bot settings, using default replies: {e} ---")
+        return None
+
+
+def _reply_mode(intent, bot_settings) -> str:
+    """Reply mode of `intent` (see replies.py), with the overrides of the bot settings."""
+    return reply_mode(intent, bot_settings.advanced_settings if bot_settings else None)
+
+
 def frustration_node(state: ConversationState):
-    """Handles user frustration using LLM to generate an empathetic response and offer appropriate help."""
+    """Handles user frustration with an empathetic response offering appropriate help, from a template or the LLM."""
     print("--- Node: Frustration ---")
     user_message = state['user_message']
     messages = state['messages']
     frustration_count = state.get('frustration_count', 0)
     language = state.get('language', 'en')
     
-    # Create a history string for context
-    history_str = "\n".join([f"{m.type}: {m.content}" for m in messages[-5:]])  # Last 5 messages for context
-    
-    # Create a prompt for the LLM to generate an empathetic response
-    prompt = f"""You are a helpful customer service AI for an e-commerce store.
-    The user is showing signs of frustration. Based on the conversation history and their message,
-    generate an empathetic response that acknowledges their frustration and offers appropriate help.
-    
-    Conversation History:
-    {history_str}
-    
-    User's Message: "{user_message}"
-    
-    Frustration Level: {'High' if frustration_count > 1 else 'Moderate'}
-    
-    Guidelines:
-    1. Be empathetic and acknowledge their feelings
-    2. Offer specific help based on what they're trying to accomplish
-    3. If frustration level is High, offer to connect them with a human agent
-    4. Keep your response concise and helpful
-    5. Don't apologize excessively
-    
-    Your response:
-    """
-    
-    # Use the LLM to generate a response
-    response = llm.invoke(prompt)
-    
-    # Set the bot message to the LLM's response
-    state['bot_message'] = response.content.strip()
+    if _reply_mode("frustration", _bot_settings(state.get('db'))) == LLM:
+        # Use the LLM to generate an empathetic response. The whole history is sent, not the last few
+        # messages: a sliding window would change the prompt prefix every turn and miss the cache
+        response = invoke_prompt(llm, "frustration", history=messages, user_message=user_message,
+                                 frustration_level='High' if frustration_count > 1 else 'Moderate')
+        state['bot_message'] = response.content.strip()
+    else:
+        # Offer a human agent once frustration is high, as the LLM is told to
+        state['bot_message'] = render("frustration_high" if frustration_count > 1 else "frustration", language)
     
     # If frustration count is high, mark for potential human handoff
     if frustration_count > 2:
@@ -74,43 +69,20 @@ def frustration_node(state: ConversationState):
 
 
 def manager_approval_node(state: ConversationState):
-    """Handles requests that require manager approval, such as refunds, using LLM to generate a contextual response."""
+    """Handles requests that require manager approval, such as refunds, with a template or LLM-generated response."""
     print("--- Node: Manager Approval ---")
     user_message = state['user_message']
     messages = state['messages']
     language = state.get('language', 'en')
     intent = state.get('intent', 'refund_request')
     
-    # Create a history string for context
-    history_str = "\n".join([f"{m.type}: {m.content}" for m in messages[-5:]])  # Last 5 messages for context
-    
-    # Use LLM to analyze the refund request and generate an appropriate response
-    prompt = f"""You are a helpful customer service AI for an e-commerce store.
-    The user has made a request that requires manager approval (likely a refund or special discount).
-    
-    Conversation History:
-    {history_str}
-    
-    User's Message: "{user_message}"
-    
-    Request Type: {intent}
-    
-    Task:
-    Generate a response that:
-    1. Acknowledges their request specifically
-    2. Explains that this type of request requires manager approval
-    3. Informs them that Ahmad (the manager) will be notified
-    4. Sets clear expectations about next steps and timing
-    5. Is professional but empathetic
-    
-    Your response:
-    """
-    
-    # Use the LLM to generate a response
-    response = llm.invoke(prompt)
-    
-    # Set the bot message to the LLM's response
-    state['bot_message'] = response.content.strip()
+    if _reply_mode("manager_approval", _bot_settings(state.get('db'))) == LLM:
+        # Use the LLM to generate a response, with the whole history (see frustration_node)
+        response = invoke_prompt(llm, "manager_approval", history=messages, user_message=user_message,
+                                 request_type=intent)
+        state['bot_message'] = response.content.strip()
+    else:
+        state['bot_message'] = render("manager_approval", language)
     state['manager_approval_required'] = True
     
     # Extract and store details about the refund request for the manager
@@ -155,36 +127,10 @@ def manager_approval_node(state: ConversationState):
 # Define frustration detection functions
 # We'll use these in the classify_intent_node function
 
-def classify_intent_node(state: ConversationState):
-    """Classifies the user's intent based on the latest message and detects frustration."""
-    print("--- Node: Classify Intent ---")
-    user_message = state['user_message']
-    messages = state['messages']
-    language = state.get('language', 'en')  # Get language from state
-    
-    # Create a history string for the LLM prompt
-    history_str = "\n".join([f"{m.type}: {m.content}" for m in messages])
-    
-    # Define possible intents including coupon_query
-    possible_intents = "'order_status', 'knowledge_base_query', 'product_availability', 'coupon_query', 'greeting', 'refund_request', 'other'"
-    
-    # Create a comprehensive prompt for the LLM to classify intent and detect frustration
-    prompt = f"""Analyze the following user message in the context of the conversation history.
-    Conversation History:
-    {history_str}
-    
-    User Message: "{user_message}"
-    
-    Tasks:
-    1. Classify the user's primary intent. Choose ONE from the following list: {possible_intents}.
-    2. Determine if the user is expressing significant frustration (e.g., anger, annoyance, dissatisfaction). Answer 'yes' or 'no'.
-    
-    Format your response as a JSON object with two fields: 'intent' and 'is_frustrated'.
-    Example: {{'intent': 'product_availability', 'is_frustrated': 'no'}}
-    """
-
-    # Use the classifier LLM to analyze the message
-    response = classifier_llm.invoke(prompt)
+def _classify_intent_with_llm(user_message: str, messages: list):
+    """Intent and frustration of the latest message, judged by the classifier LLM."""
+    # Use the classifier LLM to classify intent and detect frustration
+    response = invoke_prompt(classifier_llm, "classify_intent", history=messages, user_message=user_message)
     response_content = response.content.strip()
     
     try:
@@ -199,11 +145,53 @@ def classify_intent_node(state: ConversationState):
         is_frustrated = False
     
     # Basic validation/cleanup
-    allowed_intents = ['order_status', 'knowledge_base_query', 'product_availability', 'coupon_query', 'greeting', 'refund_request', 'other']
-    if intent not in allowed_intents:
+    if intent not in INTENTS:
         print(f"--- Classified intent '{intent}' not in allowed list, defaulting to 'knowledge_base_query'. ---")
         intent = 'knowledge_base_query'
     
+    return intent, is_frustrated
+
+
+def _start_speculation(user_message: str, language: str) -> Speculation:
+    """Start the lookups action_node may need for the raw message, before the intent is known."""
+    from app.services.product_embedding import ProductEmbeddingService
+
+    return Speculation({
+        KNOWLEDGE_BASE: lambda: retrieval_pipeline.retrieve(user_message, language=language),
+        # Vector matches only; action_node checks them against the database
+        CATALOG: lambda: ProductEmbeddingService().search_products(user_message, top_k=3, language=language),
+    })
+
+
+def classify_intent_node(state: ConversationState):
+    """Classifies the user's intent based on the latest message and detects frustration.
+
+    The local rules and model (see intent_classifier) answer confident turns; the LLM
+    classifies the rest, and those turns are logged as training data. While the LLM runs,
+    the knowledge base and catalog lookups run speculatively (see speculation.py).
+    """
+    print("--- Node: Classify Intent ---")
+    user_message = state['user_message']
+    messages = state['messages']
+    language = state.get('language', 'en')  # Get language from state
+    
+    classifier = get_intent_classifier()
+    prediction = classifier.classify(user_message)
+    speculation = None
+    if prediction:
+        print(f"--- Classified locally by {prediction.tier} ({prediction.confidence:.2f}) "
+              f"in {prediction.latency_ms:.2f} ms ---")
+        intent, is_frustrated = prediction.intent, False
+    else:
+        if settings.SPECULATIVE_RETRIEVAL:
+            speculation = _start_speculation(user_message, language)
+        start = time.perf_counter()
+        intent, is_frustrated = _classify_intent_with_llm(user_message, messages)
+        latency_ms = (time.perf_counter() - start) * 1000
+        classifier.record_llm(latency_ms)
+        print(f"--- Classified by LLM in {latency_ms:.0f} ms ---")
+        log_turn(user_message, intent, "llm", language=language)
+    
     print(f"--- Classified Intent: {intent} ---")
     print(f"--- Frustration Detected: {is_frustrated} ---")
     
@@ -211,27 +199,18 @@ def classify_intent_node(state: ConversationState):
     if intent == 'refund_request':
         print("--- Detected refund request, routing to manager approval ---")
         # Use LLM to verify this is indeed a refund request that needs approval
-        verification_prompt = f"""Analyze this user message and determine if it's a refund request that requires manager approval.
-        
-        User Message: "{user_message}"
-        
-        Consider:
-        1. Is the user explicitly asking for a refund?
-        2. Are they describing a problem that would typically result in a refund?
-        3. Is the request complex or outside standard policy?
-        
-        Answer with only 'yes' if manager approval is needed, or 'no' if this can be handled by automated systems.
-        """
-        
-        verification_response = classifier_llm.invoke(verification_prompt)
+        verification_response = invoke_prompt(classifier_llm, "refund_verification", user_message=user_message)
         needs_approval = verification_response.content.strip().lower() == 'yes'
         
         if needs_approval:
-            return {"intent": "manager_approval"}
+            intent = "manager_approval"
         else:
             # If it's a simpler refund request that doesn't need approval
             print("--- Refund request can be handled automatically ---")
-            return {"intent": "knowledge_base_query"}
+            intent = "knowledge_base_query"
+        if speculation:
+            speculation.keep(intent)
+        return {"intent": intent, "speculation": speculation}
     
     # Track frustration count
     frustration_count = state.get('frustration_count', 0)
@@ -240,7 +219,9 @@ def classify_intent_node(state: ConversationState):
         state['frustration_count'] = frustration_count
         print(f"--- Incremented frustration. New count: {frustration_count} ---")
     
-    return {"intent": intent, "frustration_count": frustration_count}
+    if speculation:
+        speculation.keep(intent)
+    return {"intent": intent, "frustration_count": frustration_count, "speculation": speculation}
 
 
 def order_status_node(state: ConversationState):
@@ -256,11 +237,7 @@ def order_status_node(state: ConversationState):
         print(f"--- Using extracted order number: {extracted_order_number} ---")
         return process_order_status(extracted_order_number, language)
     # If no order number was extracted, ask the user to provide one
-    if language == 'ar':
-        response = "يرجى تقديم رقم الطلب الخاص بك حتى أتمكن من التحقق من حالته."
-    else:
-        response = "Please provide your order number so I can check its status."
-
+    response = render("order_number_missing", language)
     return {"action_result": {"order_status": {"found": False, "message": response}}}
 
 
@@ -276,49 +253,11 @@ def process_order_status(order_number, language):
     }
     
     # Check if the order exists
-    if order_number in orders:
-        order = orders[order_number]
-        status = order["status"]
-        
-        # Format the response based on the order status and language
-        if language == "ar":
-            # Arabic responses
-            if status == "shipped":
-                response = f"تم شحن طلبك رقم {order_number}. رقم التتبع الخاص بك هو {order['tracking_number']}. تاريخ التسليم المتوقع هو {order['estimated_delivery']}."
-            elif status == "processing":
-                response = f"طلبك رقم {order_number} قيد المعالجة. تاريخ الشحن المتوقع هو {order['estimated_ship_date']}."
-            elif status == "delivered":
-                response = f"تم تسليم طلبك رقم {order_number} في {order['delivery_date']}."
-            elif status == "cancelled":
-                response = f"تم إلغاء طلبك رقم {order_number}. السبب: {order['cancel_reason']}."
-            elif status == "pending":
-                response = f"طلبك رقم {order_number} معلق. حالة الدفع: {order['payment_status']}."
-            else:
-                response = f"حالة طلبك رقم {order_number} هي: {status}."
-        else:
-            # English responses (default)
-            if status == "shipped":
-                response = f"Your order #{order_number} has been shipped. Your tracking number is {order['tracking_number']}. Estimated delivery date is {order['estimated_delivery']}."
-            elif status == "processing":
-                response = f"Your order #{order_number} is being processed. Estimated ship date is {order['estimated_ship_date']}."
-            elif status == "delivered":
-                response = f"Your order #{order_number} was delivered on {order['delivery_date']}."
-            elif status == "cancelled":
-                response = f"Your order #{order_number} has been cancelled. Reason: {order['cancel_reason']}."
-            elif status == "pending":
-                response = f"Your order #{order_number} is pending. Payment status: {order['payment_status']}."
-            else:
-                response = f"The status of your order #{order_number} is: {status}."
-        
-        return {"action_result": {"order_status": {"found": True, "status": status, "message": response}}}
-    else:
-        # Order not found
-        if language == "ar":
-            response = f"عذراً، لم أتمكن من العثور على معلومات للطلب رقم {order_number}. يرجى التحقق من رقم الطلب والمحاولة مرة أخرى."
-        else:
-            response = f"Sorry, I couldn't find information for order #{order_number}. Please verify your order number and try again."
-
-        return {"action_result": {"order_status": {"found": False, "message": response}}}
+    order = orders.get(order_number)
+    response = order_status_reply(order_number, order, language)
+    if order:
+        return {"action_result": {"order_status": {"found": True, "status": order["status"], "message": response}}}
+    return {"action_result": {"order_status": {"found": False, "message": response}}}
 
 
 def action_node(state: ConversationState):
@@ -330,6 +269,8 @@ def action_node(state: ConversationState):
     entity_type = state.get('entity_type')
     language = state.get('language', 'en')  # Default to English if not set
     mild_frustration = state.get('mild_frustration', False)  # Check if user has mild frustration
+    db = state.get('db')
+    speculation = state.get('speculation')
     
     # First, extract necessary entities based on intent
     entity_result = decide_tool_or_fetch_data_node(state)
@@ -363,12 +304,9 @@ def action_node(state: ConversationState):
 
     if intent == 'knowledge_base_query' or intent == 'other':
         print("--- Using RAG tool for knowledge base query ---")
-        # Use the RAG tool to search for relevant information
+        # Over-fetch, rerank and budget the knowledge base chunks for the prompt
         try:
-            from app.services.rag import search_knowledge_base
-            from app.db.session import get_db
-            db = next(get_db())
-            
+            alternative_queries = []
             # If there's mild frustration, use LLM to reformulate the query for better results
             if mild_frustration:
                 print("--- Detected mild frustration, reformulating query for better results ---")
@@ -383,57 +321,24 @@ def action_node(state: ConversationState):
                 reformulation_response = classifier_llm.invoke(reformulation_prompt)
                 reformulated_query = reformulation_response.content.strip()
                 print(f"--- Reformulated query: '{reformulated_query}' ---")
-                
-                # Search with both the original and reformulated queries for better coverage
-                results_original = search_knowledge_base(user_message, db, language=language)
-                results_reformulated = search_knowledge_base(reformulated_query, db, language=language)
-                
-                # Combine and deduplicate results
-                seen_ids = set()
-                combined_results = []
-                
-                # Process original results first (they might be more directly relevant)
-                for result in results_original:
-                    result_id = result.get("id")
-                    if result_id not in seen_ids:
-                        seen_ids.add(result_id)
-                        combined_results.append(result)
-                
-                # Then add unique reformulated results
-                for result in results_reformulated:
-                    result_id = result.get("id")
-                    if result_id not in seen_ids:
-                        seen_ids.add(result_id)
-                        combined_results.append(result)
-                
-                results = combined_results
-            else:
-                # Standard search without reformulation
-                results = search_knowledge_base(user_message, db, language=language)
-            
-            if results and len(results) > 0:
-                # Store the search results in the state
-                state['kb_results'] = results
+                # Searched alongside the original; results are merged by chunk id and reranked together
+                alternative_queries.append(reformulated_query)
+
+            # Retrieved for the raw message while the intent was classified
+            results = speculation.result(KNOWLEDGE_BASE) if speculation and not alternative_queries else None
+            if results is None:
+                results = retrieval_pipeline.retrieve(user_message, alternative_queries, language=language)
+            if results:
                 print(f"--- Found {len(results)} relevant knowledge base entries ---")
-                
-                # Format the results for display
-                formatted_results = []
-                for result in results:
-                    formatted_results.append({
-                        "title": result.get("title", "Untitled"),
-                        "content": result.get("content", ""),
-                        "score": result.get("score", 0.0)
-                    })
-                    
-                state['kb_formatted_results'] = formatted_results
-            else:
-                print("--- No relevant knowledge base entries found ---")
-                state['kb_results'] = []
-                state['kb_formatted_results'] = []
+                return {
+                    "retrieved_context": format_context(results),
+                    "action_result": {intent: {"found": True, "entries": len(results)}}
+                }
+            print("--- No relevant knowledge base entries found ---")
+            return {"retrieved_context": None, "action_result": {intent: {"found": False}}}
         except Exception as e:
             print(f"--- Error searching knowledge base: {e} ---")
-            state['kb_results'] = []
-            state['kb_formatted_results'] = []
+            return {"retrieved_context": None, "action_result": {intent: {"found": False}}}
     elif intent == 'product_availability':
         tool_to_call = tool_map.get('product_availability_checker')
         # For product availability, we'll use the extracted product name
@@ -460,7 +365,9 @@ def action_node(state: ConversationState):
                 from app.services.product_search import ProductSearchService
                 product_search = ProductSearchService(db)
                 print(f"--- Searching for product: '{product_name}' ---")
-                found, product_info = product_search.search_product_by_name(product_name)
+                # Vector matches of the raw message, found while the intent was classified
+                vector_search = (lambda: speculation.result(CATALOG)) if speculation else None
+                found, product_info = product_search.search_product_by_name(product_name, vector_search=vector_search)
                 print(f"--- Search result: found={found}, product_info={product_info} ---")
 
                 if found:
@@ -531,221 +438,41 @@ def generate_response_node(state: ConversationState):
     # We won't use session_id in this function anymore
     # The history will be saved in the API endpoint
 
-    # Special handling for order status results
-    if intent == 'order_status' and action_result and 'order_status' in action_result:
-        order_result = action_result['order_status']
-        response_text = order_result['message']
-
-        # Add to history
-        updated_messages = messages + [HumanMessage(content=user_message_content),
-                                       AIMessage(content=response_text)]
-
-        # If order was found, include order_info in the return value
-        if order_result.get('found', False) and 'order_info' in order_result:
-            return {"response": response_text, "order_info": order_result['order_info'],
-                    "messages": updated_messages}
-        else:
-            return {"response": response_text, "messages": updated_messages}
-
-    # Special handling for coupon query results
-    if intent == 'coupon_query' and action_result and 'coupon_query' in action_result:
-        coupon_result = action_result['coupon_query']
-        query_type = coupon_result.get('query_type', 'general_query')
-        
-        # Handle specific coupon code queries
-        if query_type == 'specific_code':
-            if coupon_result.get('found', False) and 'coupon' in coupon_result:
-                coupon = coupon_result['coupon']
-                if language == 'ar':
-                    response_text = f"نعم، لدينا كوبون {coupon['code']}! يمنحك خصمًا بنسبة {coupon['discount']}%."
-                    if coupon.get('description'):
-                        response_text += f" {coupon['description']}"
-                    if coupon.get('expires_at'):
-                        response_text += f" هذا الكوبون صالح حتى {coupon['expires_at']}."
-                else:
-                    response_text = f"Yes, we have the coupon {coupon['code']}! It gives you a {coupon['discount']}% discount."
-                    if coupon.get('description'):
-                        response_text += f" {coupon['description']}"
-                    if coupon.get('expires_at'):
-                        response_text += f" This coupon is valid until {coupon['expires_at']}."
-            else:
-                # Coupon code not found
-                code = coupon_result.get('code', '')
-                if language == 'ar':
-                    response_text = f"عذرًا، الكوبون {code} غير صالح أو غير متوفر. الرجاء التحقق من الرمز والمحاولة مرة أخرى، أو اسأل عن الكوبونات المتاحة لدينا."
-                else:
-                    response_text = f"Sorry, the coupon {code} is invalid or unavailable. Please check the code and try again, or ask about our available coupons."
-        
-        # Handle list all coupons queries
-        elif query_type == 'list_all':
-            if coupon_result.get('found', False) and 'coupons' in coupon_result and len(coupon_result['coupons']) > 0:
-                coupons = coupon_result['coupons']
-                if language == 'ar':
-                    response_text = "هذه هي الكوبونات المتاحة حاليًا:\n\n"
-                else:
-                    response_text = "Here are our currently available coupons:\n\n"
-                
-                for i, coupon in enumerate(coupons, 1):
-                    if language == 'ar':
-                        response_text += f"{i}. {coupon['code']} - خصم {coupon['discount']}%"
-                        if coupon.get('description'):
-                            response_text += f" - {coupon['description']}"
-                        if coupon.get('expires_at'):
-                            response_text += f" (صالح حتى {coupon['expires_at']})"
-                    else:
-                        response_text += f"{i}. {coupon['code']} - {coupon['discount']}% discount"
-                        if coupon.get('description'):
-                            response_text += f" - {coupon['description']}"
-                        if coupon.get('expires_at'):
-                            response_text += f" (valid until {coupon['expires_at']})"
-                    response_text += "\n"
-            else:
-                # No coupons available
-                if language == 'ar':
-                    response_text = "عذرًا، ليس لدينا أي كوبونات متاحة حاليًا. يرجى التحقق مرة أخرى في وقت لاحق."
-                else:
-                    response_text = "Sorry, we don't have any coupons available at the moment. Please check back later."
-        
-        # Handle general coupon queries
-        else:  # general_query
-            has_coupons = coupon_result.get('has_coupons', False)
-            if has_coupons:
-                count = coupon_result.get('count', 0)
-                if language == 'ar':
-                    response_text = f"نعم، لدينا {count} كوبون(ات) متاحة حاليًا. هل ترغب في معرفة التفاصيل؟"
-                else:
-                    response_text = f"Yes, we have {count} coupon(s) available right now. Would you like to know the details?"
-            else:
-                if language == 'ar':
-                    response_text = "عذرًا، ليس لدينا أي كوبونات متاحة حاليًا. يرجى التحقق مرة أخرى في وقت لاحق."
-                else:
-                    response_text = "Sorry, we don't have any coupons available at the moment. Please check back later."
-        
-        # Add to history
-        updated_messages = messages + [HumanMessage(content=user_message_content),
-                                      AIMessage(content=response_text)]
-        
-        return {"response": response_text, "messages": updated_messages}
-    
-    # Special handling for product availability results
-    if intent == 'product_availability' and action_result and 'product_availability' in action_result:
-        product_result = action_result['product_availability']
-
-        # Check if we found multiple products
-        if product_result.get('multiple_products', False) and 'products' in product_result:
-            products = product_result['products']
-            if language == 'ar':
-                response_text = "لقد وجدت المنتجات التالية في مخزوننا:\n\n"
-            else:
-                response_text = "I found the following products in our inventory:\n\n"
-
-            # Format product list
-            for i, product in enumerate(products, 1):
-                if language == 'ar':
-                    response_text += f"{i}. {product['name']} - {product['price']} {product['currency']} - "
-                    response_text += "متوفر" if product['stock'] > 0 else "غير متوفر"
-                    if product['description']:
-                        response_text += f" - {product['description']}"
-                    response_text += "\n"
-                else:
-                    response_text += f"{i}. {product['name']} - {product['price']} {product['currency']} - "
-                    response_text += "In Stock" if product['stock'] > 0 else "Out of Stock"
-                    if product['description']:
-                        response_text += f" - {product['description']}"
-                    response_text += "\n"
-
-            if language == 'ar':
-                response_text += "\nهل ترغب في معرفة المزيد عن أي من هذه المنتجات؟"
-            else:
-                response_text += "\nWould you like to know more about any of these products?"
-
-            # Add to history - using messages from state
-            updated_messages = messages + [HumanMessage(content=user_message_content),
-                                           AIMessage(content=response_text)]
-            # Return the updated messages to be saved in the API endpoint
-
-            return {"response": response_text, "products": products, "messages": updated_messages}
-
-        # Check if we found a specific product
-        elif product_result.get('found', False) and 'product' in product_result:
-            product = product_result['product']
-
-            if language == 'ar':
-                if product.get('stock', 0) > 0:
-                    response_text = f"نعم، لدينا {product['product_name']} في المخزون! يوجد حاليًا {product['stock']} وحدة متاحة بسعر {product['price']} {product.get('currency', 'USD')}."
-                else:
-                    response_text = f"عذرًا، {product['product_name']} غير متوفر حاليًا. هل ترغب في إشعارك عندما يكون متاحًا مرة أخرى؟"
-            else:
-                if product.get('stock', 0) > 0:
-                    response_text = f"Yes, we have {product['product_name']} in stock! There are currently {product['stock']} units available at {product['price']} {product.get('currency', 'USD')}."
-                else:
-                    response_text = f"I'm sorry, but {product['product_name']} is currently out of stock. Would you like me to notify you when it's back in stock?"
-
-            # Add description if available
-            if product.get('description') and product['description'].strip():
-                if language == 'ar':
-                    response_text += f"\n\nوصف المنتج: {product['description']}"
-                else:
-                    response_text += f"\n\nProduct description: {product['description']}"
-
-            # Add to history - using messages from state
-            updated_messages = messages + [HumanMessage(content=user_message_content),
-                                           AIMessage(content=response_text)]
-            # Return the updated messages to be saved in the API endpoint
-
-            return {"response": response_text, "product": product, "messages": updated_messages}
-
-        # No products found
-        elif not product_result.get('found', False):
-            # Use the message from the product_result if available
-            if 'message' in product_result:
-                response_text = product_result['message']
-            else:
-                if language == 'ar':
-                    response_text = "عذرًا، لا نبيع هذا المنتج."
-                else:
-                    response_text = "No, we don't sell this product."
-
-            # Add to history - using messages from state
-            updated_messages = messages + [HumanMessage(content=user_message_content),
-                                           AIMessage(content=response_text)]
-            # Return the updated messages to be saved in the API endpoint
-
-            return {"response": response_text, "messages": updated_messages}
+    # Replies already written by frustration_node or manager_approval_node
+    reply = state.get('bot_message')
+    extra = {}
+    # Structured results are answered from the localized templates, unless the bot
+    # settings switch the intent to LLM replies
+    if not reply:
+        bot_settings = _bot_settings(state.get('db'))
+        if _reply_mode(intent, bot_settings) != LLM:
+            rendered = structured_reply(intent, action_result, language, bot_settings)
+            if rendered:
+                reply, extra = rendered
+    if reply:
+        print(f"--- Reply for intent '{intent}' needs no LLM call ---")
+        updated_messages = messages + [HumanMessage(content=user_message_content), AIMessage(content=reply)]
+        return {"response": reply, **extra, "messages": updated_messages}
 
     # Regular handling for other intents
-    # Prepare prompt for LLM
-    prompt_context = ""
+    # Prepare the variable part of the prompt, which goes after the instructions and history
+    prompt_context = []
     if context:
-        prompt_context += f"\n\nRelevant Information from Knowledge Base:\n{context}"
+        prompt_context.append(f"Relevant Information from Knowledge Base:\n{context}")
     if action_result:
         # Convert dict result to string for the prompt
         action_result_str = json.dumps(action_result, indent=2)
-        prompt_context += f"\n\nResult from Action ({intent}):\n{action_result_str}"
+        prompt_context.append(f"Result from Action ({intent}):\n{action_result_str}")
 
-    # Add the current user message to the history for the LLM call
+    # Add the current user message to the history
     current_history = messages + [HumanMessage(content=user_message_content)]
 
-    # Construct the prompt
-    prompt = f"""You are a helpful e-commerce customer support assistant.
-    Answer the user's query based on the conversation history and the provided context or action results.
-    Be concise and helpful. If you performed an action, summarize the result clearly.
-    If relevant information was found in the knowledge base, use it to answer.
-    If the intent was a greeting, respond politely.
-    
-    Remember to support both English and Arabic languages. If the user's message is in Arabic, respond in Arabic.
-    If you cannot answer, politely say so.
-
-    Conversation History:
-    {[f'{m.type}: {m.content}' for m in current_history]}
-    {prompt_context}
-
-    Assistant Response:"""
-
-    print(f"--- Generating response with prompt: {prompt[:300]}... ---")
+    print(f"--- Generating response with {len(messages)} history messages and "
+          f"{sum(map(len, prompt_context))} characters of context ---")
 
     # Invoke the main LLM
-    response = llm.invoke(prompt)
+    response = invoke_prompt(llm, "generate_response", history=messages, user_message=user_message_content,
+                             context="\n\n".join(prompt_context) or "No knowledge base information or action results.")
     ai_response_content = response.content
 
     print(f"--- Generated AI Response: {ai_response_content} ---")
@@ -777,16 +504,7 @@ def decide_tool_or_fetch_data_node(state: ConversationState):
     # Different entity extraction based on intent
     if intent == 'product_availability':
         # Extract product name from user message
-        prompt = f"""Extract the product name from the following user message. 
-        The user is asking about product availability.
-        
-        User message: "{user_message}"
-        
-        Return ONLY the product name as a simple string, without any additional text, quotes, or formatting.
-        If no specific product is mentioned, return "general product query".
-        """
-        
-        response = classifier_llm.invoke(prompt)
+        response = invoke_prompt(classifier_llm, "extract_product_name", user_message=user_message)
         product_name = response.content.strip()
         print(f"--- Extracted product name: '{product_name}' ---")
         
@@ -797,17 +515,7 @@ def decide_tool_or_fetch_data_node(state: ConversationState):
         
     elif intent == 'order_status':
         # Extract order number from user message
-        prompt = f"""Extract the order number from the following user message.
-        The user is asking about order status.
-        
-        User message: "{user_message}"
-        
-        Return ONLY the order number as a simple string, without any additional text or formatting.
-        If the message contains just a number, that's likely the order number.
-        If no order number is mentioned, return "unknown".
-        """
-        
-        response = classifier_llm.invoke(prompt)
+        response = invoke_prompt(classifier_llm, "extract_order_number", user_message=user_message)
         order_number = response.content.strip()
         
         # If the response is just a number, use it directly
@@ -833,30 +541,7 @@ def decide_tool_or_fetch_data_node(state: ConversationState):
                 
     elif intent == 'coupon_query':
         # Extract coupon code from user message with improved guidance
-        prompt = f"""Extract the coupon code from the following user message, if one exists.
-        The user is asking about a coupon or discount.
-        
-        User message: "{user_message}"
-        
-        Guidelines for extraction:
-        1. A coupon code is typically a specific promotional code like SUMMER20, DISCOUNT50, etc.
-        2. Common English words (like CAN, GET, HAVE, etc.) are NOT coupon codes.
-        3. If the user is asking about what coupons are available or what discounts they can get, there is NO specific coupon code.
-        4. Only extract a code if the user is explicitly referring to a specific coupon code.
-        
-        Your response should be ONE of these options:
-        - If a specific coupon code is mentioned, return ONLY that code in uppercase
-        - If the user is asking about available coupons or what coupons they can get, return "LIST_ALL"
-        - If the user is asking a general question about coupons without mentioning a specific code, return "GENERAL_COUPON_QUERY"
-        
-        Examples:
-        - "Do you have a SUMMER20 coupon?" → "SUMMER20"
-        - "What coupons do you have?" → "LIST_ALL"
-        - "Can I get a discount?" → "GENERAL_COUPON_QUERY"
-        - "What coupon can I get from you?" → "LIST_ALL"
-        """
-        
-        response = classifier_llm.invoke(prompt)
+        response = invoke_prompt(classifier_llm, "extract_coupon_code", user_message=user_message)
         coupon_code = response.content.strip().upper()
         print(f"--- Extracted coupon code or query type: '{coupon_code}' ---")
         
@@ -0,0 +1,199 @@
+"""
+Prompt templates of the bot graph, built once at import.
+
+Every template starts with a static system message, then the conversation history, and
+ends with the turn's variable content (user message, retrieved context). Providers cache
+prompt prefixes (OpenAI from 1024 tokens on, in 128-token steps), so the instructions and
+the earlier turns of a session are only processed once; interleaving the user message in
+the middle of the instructions, as f-strings did, made every prompt a cache miss.
+
+invoke_prompt() records the input and cached tokens the API reports for every call;
+prompt_cache_stats() has them per prompt.
+"""
+import threading
+from typing import Any, Dict
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+from app.services.intent_classifier import INTENTS
+
+_HISTORY = MessagesPlaceholder("history", optional=True)
+_USER_MESSAGE = ("human", 'User message: "{user_message}"')
+# Part of the static prefix, so not a template variable
+_POSSIBLE_INTENTS = ", ".join(f"'{intent}'" for intent in INTENTS)
+
+FRUSTRATION = ChatPromptTemplate.from_messages([
+    ("system", """You are a helpful customer service AI for an e-commerce store.
+The user is showing signs of frustration. Based on the conversation history and their message,
+generate an empathetic response that acknowledges their frustration and offers appropriate help.
+
+Guidelines:
+1. Be empathetic and acknowledge their feelings
+2. Offer specific help based on what they're trying to accomplish
+3. If frustration level is High, offer to connect them with a human agent
+4. Keep your response concise and helpful
+5. Don't apologize excessively"""),
+    _HISTORY,
+    ("human", 'Frustration level: {frustration_level}\n\nUser message: "{user_message}"'),
+])
+
+MANAGER_APPROVAL = ChatPromptTemplate.from_messages([
+    ("system", """You are a helpful customer service AI for an e-commerce store.
+The user has made a request that requires manager approval (likely a refund or special discount).
+
+Generate a response that:
+1. Acknowledges their request specifically
+2. Explains that this type of request requires manager approval
+3. Informs them that Ahmad (the manager) will be notified
+4. Sets clear expectations about next steps and timing
+5. Is professional but empathetic"""),
+    _HISTORY,
+    ("human", 'Request type: {request_type}\n\nUser message: "{user_message}"'),
+])
+
+CLASSIFY_INTENT = ChatPromptTemplate.from_messages([
+    ("system", """Analyze the latest user message in the context of the conversation history.
+
+Tasks:
+1. Classify the user's primary intent. Choose ONE from the following list: """ + _POSSIBLE_INTENTS + """.
+2. Determine if the user is expressing significant frustration (e.g., anger, annoyance, dissatisfaction).
+   Answer 'yes' or 'no'.
+
+Format your response as a JSON object with two fields: 'intent' and 'is_frustrated'.
+Example: {{"intent": "product_availability", "is_frustrated": "no"}}"""),
+    _HISTORY,
+    _USER_MESSAGE,
+])
+
+REFUND_VERIFICATION = ChatPromptTemplate.from_messages([
+    ("system", """Analyze the user message and determine if it's a refund request that requires manager approval.
+
+Consider:
+1. Is the user explicitly asking for a refund?
+2. Are they describing a problem that would typically result in a refund?
+3. Is the request complex or outside standard policy?
+
+Answer with only 'yes' if manager approval is needed, or 'no' if this can be handled by automated systems."""),
+    _USER_MESSAGE,
+])
+
+EXTRACT_PRODUCT_NAME = ChatPromptTemplate.from_messages([
+    ("system", """Extract the product name from the user message. The user is asking about product availability.
+
+Return ONLY the product name as a simple string, without any additional text, quotes, or formatting.
+If no specific product is mentioned, return "general product query"."""),
+    _USER_MESSAGE,
+])
+
+EXTRACT_ORDER_NUMBER = ChatPromptTemplate.from_messages([
+    ("system", """Extract the order number from the user message. The user is asking about order status.
+
+Return ONLY the order number as a simple string, without any additional text or formatting.
+If the message contains just a number, that's likely the order number.
+If no order number is mentioned, return "unknown"."""),
+    _USER_MESSAGE,
+])
+
+EXTRACT_COUPON_CODE = ChatPromptTemplate.from_messages([
+    ("system", """Extract the coupon code from the user message, if one exists.
+The user is asking about a coupon or discount.
+
+Guidelines for extraction:
+1. A coupon code is typically a specific promotional code like SUMMER20, DISCOUNT50, etc.
+2. Common English words (like CAN, GET, HAVE, etc.) are NOT coupon codes.
+3. If the user is asking about what coupons are available or what discounts they can get,
+   there is NO specific coupon code.
+4. Only extract a code if the user is explicitly referring to a specific coupon code.
+
+Your response should be ONE of these options:
+- If a specific coupon code is mentioned, return ONLY that code in uppercase
+- If the user is asking about available coupons or what coupons they can get, return "LIST_ALL"
+- If the user is asking a general question about coupons without mentioning a specific code,
+  return "GENERAL_COUPON_QUERY"
+
+Examples:
+- "Do you have a SUMMER20 coupon?" → "SUMMER20"
+- "What coupons do you have?" → "LIST_ALL"
+- "Can I get a discount?" → "GENERAL_COUPON_QUERY"
+- "What coupon can I get from you?" → "LIST_ALL\""""),
+    _USER_MESSAGE,
+])
+
+GENERATE_RESPONSE = ChatPromptTemplate.from_messages([
+    ("system", """You are a helpful e-commerce customer support assistant.
+Answer the user's query based on the conversation history and the provided context or action results.
+Be concise and helpful. If you performed an action, summarize the result clearly.
+If relevant information was found in the knowledge base, use it to answer.
+If the intent was a greeting, respond politely.
+
+Remember to support both English and Arabic languages. If the user's message is in Arabic, respond in Arabic.
+If you cannot answer, politely say so."""),
+    _HISTORY,
+    ("human", '{context}\n\nUser message: "{user_message}"'),
+])
+
+PROMPTS: Dict[str, ChatPromptTemplate] = {
+    "frustration": FRUSTRATION,
+    "manager_approval": MANAGER_APPROVAL,
+    "classify_intent": CLASSIFY_INTENT,
+    "refund_verification": REFUND_VERIFICATION,
+    "extract_product_name": EXTRACT_PRODUCT_NAME,
+    "extract_order_number": EXTRACT_ORDER_NUMBER,
+    "extract_coupon_code": EXTRACT_COUPON_CODE,
+    "generate_response": GENERATE_RESPONSE,
+}
+
+
+class PromptCacheStats:
+    """Input and cached tokens of the calls of each prompt, thread-safe."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Dict[str, int]] = {}
+
+    def record(self, name: str, input_tokens: int, cached_tokens: int) -> None:
+        with self._lock:
+            totals = self._totals.setdefault(name, {"calls": 0, "input_tokens": 0, "cached_tokens": 0})
+            totals["calls"] += 1
+            totals["input_tokens"] += input_tokens
+            totals["cached_tokens"] += cached_tokens
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            stats: Dict[str, Dict[str, Any]] = {name: dict(totals) for name, totals in self._totals.items()}
+        for totals in stats.values():
+            totals["cached_ratio"] = round(totals["cached_tokens"] / totals["input_tokens"], 3) \
+                if totals["input_tokens"] else 0.0
+        return stats
+
+
+cache_stats = PromptCacheStats()
+
+
+def invoke_prompt(model: BaseChatModel, name: str, **variables: Any) -> BaseMessage:
+    """
+    Fill the prompt `name` and send it to `model`, recording the cached share of its input.
+
+    Args:
+        model: Chat model to call
+        name: Key in PROMPTS
+        **variables: Template variables; "history" takes a list of messages
+
+    Returns:
+        The model's message
+    """
+    response = model.invoke(PROMPTS[name].format_messages(**variables))
+    usage = getattr(response, "usage_metadata", None) or {}
+    input_tokens = usage.get("input_tokens") or 0
+    if input_tokens:
+        cached_tokens = (usage.get("input_token_details") or {}).get("cache_read") or 0
+        cache_stats.record(name, input_tokens, cached_tokens)
+        print(f"--- Prompt {name}: {cached_tokens}/{input_tokens} input tokens cached "
+              f"({cached_tokens / input_tokens:.0%}) ---")
+    return response
+
+
+def prompt_cache_stats() -> Dict[str, Dict[str, Any]]:
+    return cache_stats.to_dict()
@@ -0,0 +1,314 @@
+"""
+Localized reply templates for the structured results of the bot graph.
+
+Order status, coupon and product lookups, manager approval, frustration and greetings
+are answered from the en/ar templates below, without an LLM call; only open-ended
+knowledge base answers need the LLM. Each intent's mode is "template" or "llm"
+(REPLY_MODES), and can be overridden in the bot settings:
+
+    advanced_settings = {"reply_modes": {"manager_approval": "llm", "greeting": "llm"}}
+
+An intent in "llm" mode, or a result no template covers, gets a generated reply as before.
+
+Greetings use the bot settings' welcome_message in the settings' language
+(advanced_settings["language"], English by default), and otherwise a localized
+template naming the bot (bot_name).
+"""
+from typing import Any, Dict, Optional, Tuple
+
+TEMPLATE = "template"
+LLM = "llm"
+
+# Default reply mode per intent; frustration_node's reply is under "frustration"
+REPLY_MODES: Dict[str, str] = {
+    "order_status": TEMPLATE,
+    "coupon_query": TEMPLATE,
+    "product_availability": TEMPLATE,
+    "manager_approval": TEMPLATE,
+    "frustration": TEMPLATE,
+    "greeting": TEMPLATE,
+    "knowledge_base_query": LLM,
+    "other": LLM,
+}
+
+TEMPLATES: Dict[str, Dict[str, str]] = {
+    # Order status
+    "order_shipped": {
+        "en": "Your order #{order_number} has been shipped. Your tracking number is {tracking_number}. "
+              "Estimated delivery date is {estimated_delivery}.",
+        "ar": "تم شحن طلبك رقم {order_number}. رقم التتبع الخاص بك هو {tracking_number}. "
+              "تاريخ التسليم المتوقع هو {estimated_delivery}.",
+    },
+    "order_processing": {
+        "en": "Your order #{order_number} is being processed. Estimated ship date is {estimated_ship_date}.",
+        "ar": "طلبك رقم {order_number} قيد المعالجة. تاريخ الشحن المتوقع هو {estimated_ship_date}.",
+    },
+    "order_delivered": {
+        "en": "Your order #{order_number} was delivered on {delivery_date}.",
+        "ar": "تم تسليم طلبك رقم {order_number} في {delivery_date}.",
+    },
+    "order_cancelled": {
+        "en": "Your order #{order_number} has been cancelled. Reason: {cancel_reason}.",
+        "ar": "تم إلغاء طلبك رقم {order_number}. السبب: {cancel_reason}.",
+    },
+    "order_pending": {
+        "en": "Your order #{order_number} is pending. Payment status: {payment_status}.",
+        "ar": "طلبك رقم {order_number} معلق. حالة الدفع: {payment_status}.",
+    },
+    "order_other": {
+        "en": "The status of your order #{order_number} is: {status}.",
+        "ar": "حالة طلبك رقم {order_number} هي: {status}.",
+    },
+    "order_not_found": {
+        "en": "Sorry, I couldn't find information for order #{order_number}. "
+              "Please verify your order number and try again.",
+        "ar": "عذراً، لم أتمكن من العثور على معلومات للطلب رقم {order_number}. "
+              "يرجى التحقق من رقم الطلب والمحاولة مرة أخرى.",
+    },
+    "order_number_missing": {
+        "en": "Please provide your order number so I can check its status.",
+        "ar": "يرجى تقديم رقم الطلب الخاص بك حتى أتمكن من التحقق من حالته.",
+    },
+    # Coupons
+    "coupon_found": {
+        "en": "Yes, we have the coupon {code}! It gives you a {discount}% discount.",
+        "ar": "نعم، لدينا كوبون {code}! يمنحك خصمًا بنسبة {discount}%.",
+    },
+    "coupon_valid_until": {
+        "en": " This coupon is valid until {expires_at}.",
+        "ar": " هذا الكوبون صالح حتى {expires_at}.",
+    },
+    "coupon_not_found": {
+        "en": "Sorry, the coupon {code} is invalid or unavailable. Please check the code and try again, "
+              "or ask about our available coupons.",
+        "ar": "عذرًا، الكوبون {code} غير صالح أو غير متوفر. الرجاء التحقق من الرمز والمحاولة مرة أخرى، "
+              "أو اسأل عن الكوبونات المتاحة لدينا.",
+    },
+    "coupon_list_header": {
+        "en": "Here are our currently available coupons:\n\n",
+        "ar": "هذه هي الكوبونات المتاحة حاليًا:\n\n",
+    },
+    "coupon_list_item": {
+        "en": "{index}. {code} - {discount}% discount",
+        "ar": "{index}. {code} - خصم {discount}%",
+    },
+    "coupon_list_item_valid_until": {
+        "en": " (valid until {expires_at})",
+        "ar": " (صالح حتى {expires_at})",
+    },
+    "coupons_available": {
+        "en": "Yes, we have {count} coupon(s) available right now. Would you like to know the details?",
+        "ar": "نعم، لدينا {count} كوبون(ات) متاحة حاليًا. هل ترغب في معرفة التفاصيل؟",
+    },
+    "no_coupons": {
+        "en": "Sorry, we don't have any coupons available at the moment. Please check back later.",
+        "ar": "عذرًا، ليس لدينا أي كوبونات متاحة حاليًا. يرجى التحقق مرة أخرى في وقت لاحق.",
+    },
+    # Products
+    "product_list_header": {
+        "en": "I found the following products in our inventory:\n\n",
+        "ar": "لقد وجدت المنتجات التالية في مخزوننا:\n\n",
+    },
+    "product_list_item": {
+        "en": "{index}. {name} - {price} {currency} - {availability}",
+        "ar": "{index}. {name} - {price} {currency} - {availability}",
+    },
+    "product_list_footer": {
+        "en": "\nWould you like to know more about any of these products?",
+        "ar": "\nهل ترغب في معرفة المزيد عن أي من هذه المنتجات؟",
+    },
+    "in_stock": {"en": "In Stock", "ar": "متوفر"},
+    "out_of_stock": {"en": "Out of Stock", "ar": "غير متوفر"},
+    "product_in_stock": {
+        "en": "Yes, we have {name} in stock! There are currently {stock} units available at {price} {currency}.",
+        "ar": "نعم، لدينا {name} في المخزون! يوجد حاليًا {stock} وحدة متاحة بسعر {price} {currency}.",
+    },
+    "product_out_of_stock": {
+        "en": "I'm sorry, but {name} is currently out of stock. "
+              "Would you like me to notify you when it's back in stock?",
+        "ar": "عذرًا، {name} غير متوفر حاليًا. هل ترغب في إشعارك عندما يكون متاحًا مرة أخرى؟",
+    },
+    "product_description": {
+        "en": "\n\nProduct description: {description}",
+        "ar": "\n\nوصف المنتج: {description}",
+    },
+    "product_not_found": {
+        "en": "No, we don't sell this product.",
+        "ar": "عذرًا، لا نبيع هذا المنتج.",
+    },
+    # Conversation
+    "manager_approval": {
+        "en": "Thank you for letting us know. Requests like this one need a manager's approval, so I've passed "
+              "it on to Ahmad, our manager. You'll hear back within one business day; there's nothing else "
+              "you need to do in the meantime.",
+        "ar": "شكرًا لإخبارنا. هذا النوع من الطلبات يحتاج إلى موافقة المدير، لذلك قمت بإحالته إلى أحمد، مدير "
+              "المتجر. ستتلقى ردًا خلال يوم عمل واحد، ولا تحتاج إلى القيام بأي شيء آخر في هذه الأثناء.",
+    },
+    "frustration": {
+        "en": "I understand this has been frustrating, and I want to get it sorted for you. Could you tell me "
+              "your order number or the product you're asking about, so I can look into it right away?",
+        "ar": "أتفهم أن هذا الأمر كان مزعجًا، وأريد مساعدتك في حله. هل يمكنك إخباري برقم طلبك أو المنتج الذي "
+              "تسأل عنه حتى أتحقق من الأمر فورًا؟",
+    },
+    "frustration_high": {
+        "en": "I'm sorry this still isn't resolved. I can connect you with a member of our support team who "
+              "can take it from here. Would you like me to do that?",
+        "ar": "يؤسفني أن المشكلة لم تُحل بعد. يمكنني توصيلك بأحد أعضاء فريق الدعم لمتابعة طلبك. هل تريد "
+              "أن أقوم بذلك؟",
+    },
+    "greeting": {
+        "en": "Hello! How can I help you today? I can check your order status, find products and tell you "
+              "about our current coupons.",
+        "ar": "مرحبًا! كيف يمكنني مساعدتك اليوم؟ يمكنني التحقق من حالة طلبك والبحث عن المنتجات وإخبارك "
+              "بالكوبونات المتاحة.",
+    },
+    "greeting_named": {
+        "en": "Hello! I'm {bot_name}. How can I help you today? I can check your order status, find products "
+              "and tell you about our current coupons.",
+        "ar": "مرحبًا! أنا {bot_name}. كيف يمكنني مساعدتك اليوم؟ يمكنني التحقق من حالة طلبك والبحث عن المنتجات "
+              "وإخبارك بالكوبونات المتاحة.",
+    },
+}
+
+
+def render(template: str, language: Optional[str] = "en", /, **values: Any) -> str:
+    """Template `template` in `language` (English if it has no translation), filled with `values`."""
+    translations = TEMPLATES[template]
+    return translations.get(language or "en", translations["en"]).format(**values)
+
+
+def reply_mode(intent: Optional[str], advanced_settings: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Reply mode of `intent`: "template" or "llm".
+
+    Args:
+        intent: Intent, or "frustration" for frustration_node
+        advanced_settings: Bot settings' advanced_settings; their "reply_modes" override REPLY_MODES
+
+    Returns:
+        The mode; intents without one get "llm"
+    """
+    overrides = (advanced_settings or {}).get("reply_modes") or {}
+    mode = overrides.get(intent) or REPLY_MODES.get(intent or "", LLM)
+    return mode if mode in (TEMPLATE, LLM) else LLM
+
+
+def greeting_reply(language: Optional[str] = "en", bot_settings: Optional[Any] = None) -> str:
+    """
+    Greeting in `language`.
+
+    Args:
+        language: Language of the conversation
+        bot_settings: Bot settings (see app.core.bot_settings), if they could be read
+
+    Returns:
+        The settings' welcome_message if it is set and written in the conversation's language,
+        else the greeting template, with the bot's name if it has one
+    """
+    if bot_settings is None:
+        return render("greeting", language)
+    settings_language = (bot_settings.advanced_settings or {}).get("language") or "en"
+    if bot_settings.welcome_message and settings_language == (language or "en"):
+        return bot_settings.welcome_message
+    if bot_settings.bot_name:
+        return render("greeting_named", language, bot_name=bot_settings.bot_name)
+    return render("greeting", language)
+
+
+def order_status_reply(order_number: str, order: Optional[Dict[str, Any]], language: Optional[str] = "en") -> str:
+    """Reply for `order` (None if it does not exist)."""
+    if order is None:
+        return render("order_not_found", language, order_number=order_number)
+    status = order["status"]
+    name = f"order_{status}" if f"order_{status}" in TEMPLATES else "order_other"
+    return render(name, language, order_number=order_number, **order)
+
+
+def coupon_reply(result: Dict[str, Any], language: Optional[str] = "en") -> str:
+    """Reply for a handle_coupon_query result."""
+    query_type = result.get("query_type", "general_query")
+    if query_type == "specific_code":
+        coupon = result.get("coupon")
+        if not result.get("found", False) or not coupon:
+            return render("coupon_not_found", language, code=result.get("code", ""))
+        text = render("coupon_found", language, code=coupon["code"], discount=coupon["discount"])
+        if coupon.get("description"):
+            text += f" {coupon['description']}"
+        if coupon.get("expires_at"):
+            text += render("coupon_valid_until", language, expires_at=coupon["expires_at"])
+        return text
+    if query_type == "list_all":
+        coupons = result.get("coupons") or []
+        if not result.get("found", False) or not coupons:
+            return render("no_coupons", language)
+        text = render("coupon_list_header", language)
+        for index, coupon in enumerate(coupons, 1):
+            text += render("coupon_list_item", language, index=index, code=coupon["code"],
+                           discount=coupon["discount"])
+            if coupon.get("description"):
+                text += f" - {coupon['description']}"
+            if coupon.get("expires_at"):
+                text += render("coupon_list_item_valid_until", language, expires_at=coupon["expires_at"])
+            text += "\n"
+        return text
+    if result.get("has_coupons", False):
+        return render("coupons_available", language, count=result.get("count", 0))
+    return render("no_coupons", language)
+
+
+def product_reply(result: Dict[str, Any], language: Optional[str] = "en") -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Reply for a product availability result, or None for a found result without its product.
+
+    Returns:
+        The reply and the state keys to return with it ("products" or "product")
+    """
+    if result.get("multiple_products", False) and "products" in result:
+        products = result["products"]
+        text = render("product_list_header", language)
+        for index, product in enumerate(products, 1):
+            availability = render("in_stock" if product["stock"] > 0 else "out_of_stock", language)
+            text += render("product_list_item", language, index=index, name=product["name"], price=product["price"],
+                           currency=product["currency"], availability=availability)
+            if product["description"]:
+                text += f" - {product['description']}"
+            text += "\n"
+        text += render("product_list_footer", language)
+        return text, {"products": products}
+    if result.get("found", False) and "product" in result:
+        product = result["product"]
+        values = {"name": product["product_name"], "stock": product.get("stock", 0), "price": product["price"],
+                  "currency": product.get("currency", "USD")}
+        text = render("product_in_stock" if values["stock"] > 0 else "product_out_of_stock", language, **values)
+        if product.get("description") and product["description"].strip():
+            text += render("product_description", language, description=product["description"])
+        return text, {"product": product}
+    if not result.get("found", False):
+        return result.get("message") or render("product_not_found", language), {}
+    return None
+
+
+def structured_reply(intent: Optional[str], action_result: Optional[Dict[str, Any]], language: Optional[str] = "en",
+                     bot_settings: Optional[Any] = None) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Template reply for the action result of `intent`; greetings follow `bot_settings` (see greeting_reply).
+
+    Returns:
+        The reply and the extra state keys to return with it, or None if no template covers
+        the result and the LLM has to answer
+    """
+    if intent == "greeting" and not action_result:
+        return greeting_reply(language, bot_settings), {}
+    result = (action_result or {}).get(intent or "")
+    if not isinstance(result, dict):
+        return None
+    if intent == "order_status":
+        if not result.get("message"):
+            return None
+        extra = {"order_info": result["order_info"]} if result.get("found", False) and "order_info" in result else {}
+        return result["message"], extra
+    if intent == "coupon_query":
+        return coupon_reply(result, language), {}
+    if intent == "product_availability":
+        return product_reply(result, language)
+    return None
@@ -0,0 +1,156 @@
+"""
+Speculative lookups, run while the classifier LLM decides the intent of a turn.
+
+classify_intent_node starts the knowledge base retrieval and the catalog lookup (the
+product vector index) for the raw user message in a thread pool before it calls the LLM.
+Once the intent is known, the lookup that serves it is kept and the others are cancelled:
+queued ones never start, running ones finish in the background and their results are
+dropped (the Milvus and embedding clients cannot be interrupted). action_node then takes
+the kept result instead of doing the lookup itself.
+
+The saving of a turn is the time the lookup took minus the time the turn still had to
+wait for it when it was needed; speculation_stats() reports it along with hits and waste.
+"""
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional
+
+from app.core.config import settings
+
+KNOWLEDGE_BASE = "knowledge_base"
+CATALOG = "catalog"
+
+# Lookup that serves each intent; intents not listed use none
+INTENT_LOOKUPS = {
+    "knowledge_base_query": KNOWLEDGE_BASE,
+    "other": KNOWLEDGE_BASE,
+    "product_availability": CATALOG,
+}
+
+# Turns kept for the p50/p95 in speculation_stats()
+SAVINGS_WINDOW = 1000
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=settings.SPECULATION_WORKERS,
+                                               thread_name_prefix="speculation")
+    return _executor
+
+
+class SpeculationStats:
+    """Counters and savings of all turns, thread-safe."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.started = 0
+        self.used = 0
+        self.cancelled = 0
+        self.failed = 0
+        # Work done by lookups whose results were thrown away
+        self.wasted_ms = 0.0
+        self._savings: Deque[float] = deque(maxlen=SAVINGS_WINDOW)
+
+    def record(self, **counts: float) -> None:
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def record_saving(self, saved_ms: float) -> None:
+        with self._lock:
+            self.used += 1
+            self._savings.append(saved_ms)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            savings = sorted(self._savings)
+            stats = {"started": self.started, "used": self.used, "cancelled": self.cancelled,
+                     "failed": self.failed, "wasted_ms": round(self.wasted_ms, 1)}
+        if savings:
+            stats["saved_p50_ms"] = round(savings[len(savings) // 2], 1)
+            stats["saved_p95_ms"] = round(savings[min(len(savings) - 1, int(len(savings) * 0.95))], 1)
+            stats["saved_total_ms"] = round(sum(savings), 1)
+        return stats
+
+
+stats = SpeculationStats()
+
+
+class Speculation:
+    """
+    Lookups of one turn, started immediately in the speculation thread pool.
+
+    Args:
+        lookups: Name to zero-argument function
+    """
+
+    def __init__(self, lookups: Dict[str, Callable[[], Any]], executor: Optional[ThreadPoolExecutor] = None) -> None:
+        executor = executor or _get_executor()
+        self._durations: Dict[str, float] = {}
+        self._kept: Optional[str] = None
+        # Each lookup runs with a copy of the turn's context, for its deadline
+        self._futures: Dict[str, Future] = {
+            name: executor.submit(contextvars.copy_context().run, self._run, name, lookup)
+            for name, lookup in lookups.items()
+        }
+        stats.record(started=len(self._futures))
+
+    def _run(self, name: str, lookup: Callable[[], Any]) -> Any:
+        start = time.perf_counter()
+        try:
+            return lookup()
+        finally:
+            self._durations[name] = (time.perf_counter() - start) * 1000
+
+    def keep(self, intent: Optional[str]) -> Optional[str]:
+        """Keep the lookup serving `intent` and cancel the others; returns the kept lookup's name."""
+        self._kept = INTENT_LOOKUPS.get(intent or "")
+        for name, future in self._futures.items():
+            if name == self._kept:
+                continue
+            if future.cancel():
+                stats.record(cancelled=1)
+            else:
+                # Already running: let it finish and count its time as wasted
+                future.add_done_callback(lambda _, name=name: stats.record(
+                    cancelled=1, wasted_ms=self._durations.get(name, 0.0)))
+        return self._kept
+
+    def result(self, name: str, timeout: Optional[float] = None) -> Optional[Any]:
+        """
+        Result of the kept lookup `name`, waiting for it if needed.
+
+        None if `name` was not kept or the lookup failed, in which case the caller does the
+        lookup itself.
+        """
+        future = self._futures.get(name)
+        if future is None or name != self._kept:
+            return None
+        start = time.perf_counter()
+        try:
+            value = future.result(timeout=timeout)
+        except (CancelledError, Exception) as e:
+            print(f"--- Speculative {name} lookup failed: {e} ---")
+            stats.record(failed=1)
+            return None
+        waited = (time.perf_counter() - start) * 1000
+        saved = self._durations.get(name, 0.0) - waited
+        stats.record_saving(saved)
+        print(f"--- Speculative {name} lookup used: took {self._durations.get(name, 0.0):.0f} ms, "
+              f"waited {waited:.0f} ms, saved {saved:.0f} ms ---")
+        # Consumed once; a second call does the lookup again
+        self._kept = None
+        return value
+
+
+def speculation_stats() -> Dict[str, Any]:
+    return stats.to_dict()
@@ -13,3 +13,5 @@ class ConversationState(TypedDict, total=False):
     language: Optional[str]     # User's preferred language
     frustration_count: int     # Number of errors or frustration signals
     last_error: Optional[str]  # Last error message or signal
+    speculation: Optional[Any]  # Lookups started while the LLM classified the turn (see speculation.py)
+    bot_message: Optional[str]  # Reply written by frustration_node or manager_approval_node
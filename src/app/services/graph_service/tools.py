@@ -1,5 +1,6 @@
 from langchain_core.tools import tool
 from app.services.rag import RAGService
+from app.services.retrieval import RetrievalPipeline, format_context
 from typing import List, Dict, Any, Optional
 import re
 import random
@@ -11,6 +12,8 @@ from sqlalchemy.orm import Session
 
 # Initialize Services
 rag_service = RAGService()
+# Over-fetches from the RAG collection and reranks before anything reaches the prompt
+retrieval_pipeline = RetrievalPipeline(rag_service.search_similar)
 
 # Mock data for demonstration (only used as fallback)
 ORDER_STATUSES = ["Processing", "Shipped", "Delivered", "Cancelled"]
@@ -89,22 +92,12 @@ def retrieve_from_kb(query: str) -> str:
     """Searches the knowledge base for information related to the user query."""
     print(f"--- Tool: Retrieving KB context for: {query} ---")
     
-    # First attempt: Use RAG service directly
+    # First attempt: over-fetch and rerank through the retrieval pipeline
     try:
-        from app.services.rag import RAGService
-        rag_service = RAGService()
-        search_results = rag_service.search_similar(query, top_k=2)
-        
-        texts = []
-        if isinstance(search_results, list):
-            for result in search_results:
-                if isinstance(result, dict) and "text" in result:
-                    texts.append(result["text"])
-                    print(f"--- Tool: Found text result via RAG service ---")
-        
-        if texts:
-            context = "\n\n".join(texts)
-            print(f"--- Tool: Found KB context via RAG service: {len(context)} characters ---")
+        results = retrieval_pipeline.retrieve(query)
+        if results:
+            context = format_context(results)
+            print(f"--- Tool: Found KB context via RAG service: {len(results)} chunks, {len(context)} characters ---")
             return context
     except Exception as e:
         print(f"--- Tool: Error with RAG service: {e} ---")
@@ -135,31 +128,17 @@ def retrieve_from_kb(query: str) -> str:
     except Exception as e:
         print(f"--- Tool: Error with direct Milvus search: {e} ---")
     
-    # Third attempt: Use keyword matching with Milvus collection data
+    # Third attempt: keyword search, filtered inside Milvus
     try:
-        from app.services.milvus_client import list_collections, load_collection
-        
-        # Get all entries from Milvus collection
-        collection_name = "rag_embeddings"  # Default collection name
-        if collection_name in list_collections():
-            col = load_collection(collection_name)
-            # Query all entries
-            results = col.query(expr="id > 0", output_fields=["text", "id"])
-            
-            # Filter by keyword matching
-            texts = []
-            for result in results:
-                text = result.get("text", "")
-                if any(keyword.lower() in text.lower() for keyword in query.lower().split()):
-                    texts.append(text)
-                    print(f"--- Tool: Found keyword match in Milvus collection ---")
-            
-            if texts:
-                context = "\n\n".join(texts)
-                print(f"--- Tool: Found KB context via keyword matching: {len(context)} characters ---")
-                return context
+        from app.services.milvus_client import keyword_search
+
+        texts = [entry["text"] for entry in keyword_search(query, top_k=3) if entry.get("text")]
+        if texts:
+            context = "\n\n".join(texts)
+            print(f"--- Tool: Found KB context via keyword search: {len(context)} characters ---")
+            return context
     except Exception as e:
-        print(f"--- Tool: Error with Milvus keyword matching: {e} ---")
+        print(f"--- Tool: Error with Milvus keyword search: {e} ---")
     
     # If all attempts fail, return a message indicating no information was found
     print("--- Tool: No text results found. ---")
@@ -0,0 +1,371 @@
+"""
+Local intent classification, so that only the turns the local tiers are unsure of reach the LLM.
+
+Tiers, cheapest first:
+
+1. rules: regexes for unambiguous turns (greetings, bare order numbers, coupon questions,
+   "do you have ...", in English and Arabic), taken from the bot's keyword heuristics
+2. model: TF-IDF over words and character n-grams with multinomial logistic regression,
+   in numpy, trained by scripts/train_intent_classifier.py on the seed set and logged traffic
+3. llm: classify_intent_node's LLM prompt, when neither tier reaches INTENT_CONFIDENCE_THRESHOLD
+
+Messages that look frustrated always go to the LLM, which also judges frustration.
+Turns the LLM classifies are appended to the traffic log and become training data.
+"""
+import json
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter, deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+INTENTS = [
+    "order_status", "knowledge_base_query", "product_availability", "coupon_query", "greeting",
+    "refund_request", "other",
+]
+
+INTENT_DIR = Path(__file__).parent.parent.parent / "data" / "intents"
+SEED_FILE = INTENT_DIR / "seed.jsonl"
+MODEL_FILE = INTENT_DIR / "intent_model.npz"
+TRAFFIC_LOG = INTENT_DIR / "traffic.jsonl"
+
+TIERS = ("rules", "model", "llm")
+# Latency samples kept per tier for the p50/p95 in IntentClassifier.stats()
+LATENCY_WINDOW = 1000
+
+_WORD_PATTERN = re.compile(r"\w+")
+_DIGITS = re.compile(r"\d")
+# Arabic diacritics and tatweel
+_ARABIC_MARKS = re.compile(r"[\u064b-\u0652\u0640]")
+
+_GREETING = (r"hi|hello|hey|hiya|good (?:morning|afternoon|evening)|مرحبا|مرحباً|اهلا|أهلا|هلا|"
+             r"السلام عليكم|صباح الخير|مساء الخير")
+
+RULES: List[Tuple[str, "re.Pattern[str]", float]] = [
+    ("greeting", re.compile(rf"^(?:{_GREETING})(?:\s+(?:there|bot|team))?[\s!.,?؟]*$"), 0.99),
+    ("order_status", re.compile(r"^(?:order\s*)?#?\s*\d{4,}\s*[?؟.]?$"), 0.97),
+    ("order_status", re.compile(r"\border\s*(?:#|number|no\.?|id)\s*:?\s*\d+"
+                                r"|\b(?:where is|track|status of)\b.*\border\b"
+                                r"|رقم الطلب|تتبع (?:طلبي|الطلب|الشحنة)|أين طلبي|وين طلبي"), 0.95),
+    ("coupon_query", re.compile(r"\b(?:coupons?|promo ?codes?|discount codes?|voucher)\b"
+                                r"|كوبون|رمز ترويجي|كود خصم"), 0.95),
+    ("refund_request", re.compile(r"\b(?:refund|money back)\b|استرداد|استرجاع (?:المبلغ|أموالي)"), 0.9),
+    # Questions about policies, which conflict with (and so veto) e.g. the refund rule
+    ("knowledge_base_query", re.compile(r"\bpolic(?:y|ies)\b|سياسة"), 0.9),
+    ("product_availability", re.compile(r"\bdo you (?:have|sell|carry)\b|\bin stock\b"
+                                        r"|هل (?:لديكم|عندكم)|متوفر|منتجات|بضائع|سلع"), 0.9),
+]
+
+FRUSTRATION = re.compile(
+    r"!{2,}|\b(?:worst|terrible|ridiculous|useless|unacceptable|angry|furious|awful|scam|stupid)\b"
+    r"|غاضب|مستاء|سيء|سيئ|زفت|مهزلة"
+)
+
+
+def normalize_text(text: str) -> str:
+    """Lower case, NFKC, no Arabic diacritics and single spaces."""
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = _ARABIC_MARKS.sub("", text)
+    return " ".join(text.split())
+
+
+def extract_features(text: str) -> List[str]:
+    """Words, word bigrams and character 3-4 grams of the normalized text, with digits folded."""
+    text = _DIGITS.sub("0", normalize_text(text))
+    words = _WORD_PATTERN.findall(text)
+    features = [f"w:{word}" for word in words]
+    features.extend(f"b:{a} {b}" for a, b in zip(words, words[1:]))
+    padded = f" {text} "
+    for n in (3, 4):
+        features.extend(f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1))
+    return features
+
+
+@dataclass
+class IntentPrediction:
+    intent: str
+    confidence: float
+    tier: str
+    latency_ms: float = 0.0
+
+
+class RuleClassifier:
+    """Regex rules; answers only when the rules that match agree on one intent."""
+
+    def __init__(self, rules: Sequence[Tuple[str, "re.Pattern[str]", float]] = RULES) -> None:
+        self.rules = rules
+
+    def predict(self, text: str) -> Optional[Tuple[str, float]]:
+        text = normalize_text(text)
+        matches: Dict[str, float] = {}
+        for intent, pattern, confidence in self.rules:
+            if pattern.search(text):
+                matches[intent] = max(confidence, matches.get(intent, 0.0))
+        if len(matches) != 1:
+            return None
+        return next(iter(matches.items()))
+
+
+class IntentModel:
+    """
+    TF-IDF (sublinear term frequency, L2-normalized rows) and multinomial logistic regression.
+
+    Args:
+        vocabulary: Feature to column
+        idf: Inverse document frequency per column
+        weights: (columns, labels) coefficients
+        bias: Intercept per label
+        labels: Intent of each output
+    """
+
+    def __init__(self, vocabulary: Dict[str, int], idf: np.ndarray, weights: np.ndarray, bias: np.ndarray,
+                 labels: Sequence[str]) -> None:
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.weights = weights
+        self.bias = bias
+        self.labels = list(labels)
+
+    @classmethod
+    def train(cls, texts: Sequence[str], labels: Sequence[str], epochs: int = 300, learning_rate: float = 0.5,
+              l2: float = 1e-4, min_df: int = 1) -> "IntentModel":
+        """
+        Fit the vocabulary, IDF and coefficients.
+
+        Full-batch gradient descent with Adam on the cross-entropy; the features are sparse,
+        so the data is kept as (row, column, value) triples rather than a dense matrix.
+        """
+        documents = [Counter(extract_features(text)) for text in texts]
+        document_frequency = Counter(feature for document in documents for feature in document)
+        features = sorted(feature for feature, count in document_frequency.items() if count >= min_df)
+        vocabulary = {feature: column for column, feature in enumerate(features)}
+        n = len(documents)
+        idf = np.array([math.log((1 + n) / (1 + document_frequency[feature])) + 1 for feature in features],
+                       dtype=np.float32)
+
+        label_names = sorted(set(labels))
+        y = np.array([label_names.index(label) for label in labels])
+        model = cls(vocabulary, idf, np.zeros((len(features), len(label_names)), dtype=np.float32),
+                    np.zeros(len(label_names), dtype=np.float32), label_names)
+        rows, columns, values = model._transform(texts)
+        targets = np.eye(len(label_names), dtype=np.float32)[y]
+
+        # Gradient of the weights summed per column with reduceat over the column-sorted entries
+        order = np.argsort(columns, kind="stable")
+        sorted_rows, sorted_columns, sorted_values = rows[order], columns[order], values[order]
+        starts = np.flatnonzero(np.r_[True, sorted_columns[1:] != sorted_columns[:-1]])
+        used_columns = sorted_columns[starts]
+
+        parameters = [model.weights, model.bias]
+        moments = [np.zeros_like(p) for p in parameters]
+        velocities = [np.zeros_like(p) for p in parameters]
+        beta1, beta2 = 0.9, 0.999
+        for step in range(1, epochs + 1):
+            probabilities = model._softmax(model._logits(rows, columns, values, n))
+            error = (probabilities - targets) / n
+            weight_gradient = l2 * model.weights
+            weight_gradient[used_columns] += np.add.reduceat(sorted_values[:, None] * error[sorted_rows], starts)
+            gradients = [weight_gradient, error.sum(axis=0)]
+            for parameter, gradient, moment, velocity in zip(parameters, gradients, moments, velocities):
+                moment *= beta1
+                moment += (1 - beta1) * gradient
+                velocity *= beta2
+                velocity += (1 - beta2) * gradient ** 2
+                parameter -= (learning_rate * (moment / (1 - beta1 ** step))
+                              / (np.sqrt(velocity / (1 - beta2 ** step)) + 1e-8)).astype(np.float32)
+        return model
+
+    def _transform(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        rows, columns, values = [], [], []
+        for row, text in enumerate(texts):
+            counts = Counter(self.vocabulary[f] for f in extract_features(text) if f in self.vocabulary)
+            if not counts:
+                continue
+            cols = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            tfidf = (1 + np.log(np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))) * self.idf[cols]
+            rows.append(np.full(len(cols), row))
+            columns.append(cols)
+            values.append(tfidf / np.linalg.norm(tfidf))
+        if not rows:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        return np.concatenate(rows), np.concatenate(columns), np.concatenate(values).astype(np.float32)
+
+    def _logits(self, rows: np.ndarray, columns: np.ndarray, values: np.ndarray, n: int) -> np.ndarray:
+        logits = np.tile(self.bias, (n, 1))
+        if len(rows):
+            # _transform emits the entries row by row
+            starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+            logits[rows[starts]] += np.add.reduceat(values[:, None] * self.weights[columns], starts)
+        return logits
+
+    @staticmethod
+    def _softmax(logits: np.ndarray) -> np.ndarray:
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        """(texts, labels) probabilities; columns follow self.labels."""
+        return self._softmax(self._logits(*self._transform(texts), len(texts)))
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        probabilities = self.predict_proba([text])[0]
+        best = int(np.argmax(probabilities))
+        return self.labels[best], float(probabilities[best])
+
+    def save(self, path: Path = MODEL_FILE) -> Path:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        features = sorted(self.vocabulary, key=self.vocabulary.get)
+        with open(path, "wb") as f:
+            np.savez_compressed(f, features=np.array(features), idf=self.idf, weights=self.weights, bias=self.bias,
+                                labels=np.array(self.labels))
+        return path
+
+    @classmethod
+    def load(cls, path: Path = MODEL_FILE) -> "IntentModel":
+        with np.load(path) as data:
+            vocabulary = {str(feature): column for column, feature in enumerate(data["features"])}
+            return cls(vocabulary, data["idf"], data["weights"], data["bias"], [str(label) for label in data["labels"]])
+
+
+class IntentClassifier:
+    """
+    Rules, then the model; None when neither is confident enough and the LLM should decide.
+
+    Args:
+        model: Trained model, or None for rules only
+        threshold: Minimum confidence to answer locally
+    """
+
+    def __init__(self, model: Optional[IntentModel] = None, rules: Optional[RuleClassifier] = None,
+                 threshold: Optional[float] = None) -> None:
+        self.model = model
+        self.rules = rules or RuleClassifier()
+        self.threshold = settings.INTENT_CONFIDENCE_THRESHOLD if threshold is None else threshold
+        self._latencies: Dict[str, Deque[float]] = {tier: deque(maxlen=LATENCY_WINDOW) for tier in TIERS}
+        self._answered: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def classify(self, text: str) -> Optional[IntentPrediction]:
+        """The intent of `text` if a local tier is confident, else None."""
+        if FRUSTRATION.search(normalize_text(text)):
+            return None
+
+        start = time.perf_counter()
+        prediction = self.rules.predict(text)
+        latency = self._record("rules", start)
+        if prediction and prediction[1] >= self.threshold:
+            return self._answer(IntentPrediction(*prediction, tier="rules", latency_ms=latency))
+
+        if self.model is not None:
+            start = time.perf_counter()
+            prediction = self.model.predict(text)
+            latency = self._record("model", start)
+            if prediction[1] >= self.threshold:
+                return self._answer(IntentPrediction(*prediction, tier="model", latency_ms=latency))
+        return None
+
+    def record_llm(self, latency_ms: float) -> None:
+        """Record a turn the LLM classified."""
+        with self._lock:
+            self._latencies["llm"].append(latency_ms)
+            self._answered["llm"] += 1
+
+    def _record(self, tier: str, start: float) -> float:
+        latency = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self._latencies[tier].append(latency)
+        return latency
+
+    def _answer(self, prediction: IntentPrediction) -> IntentPrediction:
+        with self._lock:
+            self._answered[prediction.tier] += 1
+        return prediction
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Turns answered and p50/p95 latency per tier."""
+        with self._lock:
+            samples = {tier: sorted(latencies) for tier, latencies in self._latencies.items()}
+            answered = dict(self._answered)
+        stats = {}
+        for tier, latencies in samples.items():
+            stats[tier] = {"answered": answered.get(tier, 0), "calls": len(latencies)}
+            if latencies:
+                stats[tier]["p50_ms"] = round(latencies[len(latencies) // 2], 3)
+                stats[tier]["p95_ms"] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3)
+        return stats
+
+
+_log_lock = threading.Lock()
+
+
+def log_turn(text: str, intent: str, tier: str, confidence: Optional[float] = None, language: Optional[str] = None,
+             path: Optional[Path] = None) -> None:
+    """Append a classified turn to the traffic log (see INTENT_TRAFFIC_LOG)."""
+    if not settings.INTENT_TRAFFIC_LOG:
+        return
+    path = path or TRAFFIC_LOG
+    line = json.dumps({"text": text, "intent": intent, "tier": tier, "confidence": confidence,
+                       "language": language, "ts": int(time.time())}, ensure_ascii=False)
+    try:
+        with _log_lock:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+    except OSError as e:
+        print(f"Could not log intent traffic: {e}")
+
+
+def load_examples(path: Path, tiers: Optional[Sequence[str]] = None) -> List[Tuple[str, str]]:
+    """(text, intent) pairs of a JSONL file, optionally only those labelled by the given tiers."""
+    if not path.exists():
+        return []
+    examples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if row.get("intent") in INTENTS and (tiers is None or row.get("tier") in tiers):
+                examples.append((row["text"], row["intent"]))
+    return examples
+
+
+_classifier: Optional[IntentClassifier] = None
+_classifier_lock = threading.Lock()
+
+
+def get_intent_classifier() -> IntentClassifier:
+    """
+    The shared classifier, built once.
+
+    Uses the trained model in MODEL_FILE, or trains one on the seed set if there is none yet.
+    """
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                _classifier = IntentClassifier(_load_model())
+    return _classifier
+
+
+def _load_model() -> Optional[IntentModel]:
+    try:
+        if MODEL_FILE.exists():
+            return IntentModel.load(MODEL_FILE)
+        examples = load_examples(SEED_FILE)
+        if examples:
+            start = time.perf_counter()
+            model = IntentModel.train(*zip(*examples))
+            print(f"Trained intent model on {len(examples)} seed examples in {time.perf_counter() - start:.2f}s")
+            return model
+    except Exception as e:
+        print(f"Could not load the intent model ({e}), classifying with rules only")
+    return None
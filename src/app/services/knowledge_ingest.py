@@ -0,0 +1,401 @@
+"""
+Ingest-time deduplication and versioning for the RAG collection.
+
+Every chunk of a source document (knowledge_documents) is registered in Postgres
+(knowledge_chunks) with a content hash, a 64-bit SimHash and the Milvus id of its vector:
+
+- a chunk whose normalized text another document already stored shares that vector: it gets
+  its own row pointing to the same Milvus id, and the vector is only deleted with its last row;
+- a chunk repeated within the document is skipped;
+- a chunk within NEAR_DUPLICATE_DISTANCE bits of a chunk of the same document, or of another
+  document of the same knowledge source, is skipped as a near duplicate. Documents of different
+  sources, e.g. two products whose descriptions differ only in name and price, never are;
+- re-importing a source replaces its previous version: chunks that did not change are kept
+  without re-embedding, new chunks are embedded and inserted, and the rest are deleted.
+
+New chunks carry their knowledge source, document id, position and hash in Milvus as
+well, so a whole source or document can be removed with a single filtered delete.
+A chunk that cannot be embedded or inserted is logged and left out; the document is then
+stored without a content hash, so importing it again retries the missing chunk.
+"""
+import hashlib
+import re
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.models.knowledge import KnowledgeChunk, KnowledgeDocument
+from app.services.milvus_client import COLLECTION_NAME, delete_entries, insert_embeddings
+
+SIMHASH_BANDS = 4
+SIMHASH_BAND_BITS = 16
+# Chunks this many bits apart or closer are treated as the same text; with four 16-bit bands
+# any such pair shares at least one band, which is what the band indexes look up
+NEAR_DUPLICATE_DISTANCE = 3
+EMBED_BATCH_SIZE = 256
+# Chunk rows per DELETE ... IN, well below the bind parameter limit
+DELETE_BATCH_SIZE = 1000
+MAX_SOURCE_KEY_LENGTH = 512
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+_BIT_POSITIONS = np.arange(64, dtype=np.uint64)
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse whitespace, so formatting-only changes hash the same."""
+    return " ".join(text.lower().split())
+
+
+def content_hash(text: str) -> str:
+    """sha256 hex digest of the normalized text."""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def source_key(kind: str, value: str) -> str:
+    """Stable key of a source document, e.g. source_key("url", "https://example.com/faq")."""
+    key = f"{kind}:{value}"
+    if len(key) > MAX_SOURCE_KEY_LENGTH:
+        key = f"{kind}:sha256:{hashlib.sha256(value.encode('utf-8')).hexdigest()}"
+    return key
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over word and word-bigram features, weighted by frequency."""
+    tokens = _TOKEN_PATTERN.findall(text.lower())
+    features = Counter(tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])])
+    if not features:
+        return 0
+
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(f.encode("utf-8"), digest_size=8).digest(), "big") for f in features],
+        dtype=np.uint64,
+    )
+    weights = np.array(list(features.values()), dtype=np.int64)
+    bits = ((hashes[:, None] >> _BIT_POSITIONS) & np.uint64(1)).astype(np.int64)
+    votes = (weights[:, None] * (2 * bits - 1)).sum(axis=0)
+    return sum(1 << bit for bit in range(64) if votes[bit] > 0)
+
+
+def simhash_bands(value: int) -> List[int]:
+    mask = (1 << SIMHASH_BAND_BITS) - 1
+    return [(value >> (SIMHASH_BAND_BITS * band)) & mask for band in range(SIMHASH_BANDS)]
+
+
+def _to_signed(value: int) -> int:
+    # Postgres BIGINT is signed
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value & ((1 << 64) - 1)
+
+
+def _is_near_duplicate(value: int, others: np.ndarray) -> bool:
+    if not len(others):
+        return False
+    distances = np.bitwise_count(others ^ np.uint64(value))
+    return bool((distances <= NEAR_DUPLICATE_DISTANCE).any())
+
+
+@dataclass
+class IngestResult:
+    """What ingesting one source document did."""
+    document_id: Optional[int]
+    version: int
+    added: int = 0
+    kept: int = 0
+    removed: int = 0
+    shared: int = 0
+    duplicates: int = 0
+    near_duplicates: int = 0
+    failed: int = 0
+    unchanged: bool = False
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def _near_duplicate_candidates(db: Session, simhashes: Sequence[int], document_id: Optional[int],
+                               source_id: Optional[str]) -> np.ndarray:
+    """SimHashes of stored chunks of the source's other documents that share a band with any of `simhashes`."""
+    if not simhashes or source_id is None:
+        return np.array([], dtype=np.uint64)
+
+    band_values = [set() for _ in range(SIMHASH_BANDS)]
+    for value in simhashes:
+        for band, band_value in enumerate(simhash_bands(value)):
+            band_values[band].add(band_value)
+
+    query = (
+        select(KnowledgeChunk.simhash)
+        .join(KnowledgeDocument, KnowledgeDocument.id == KnowledgeChunk.document_id)
+        .where(KnowledgeDocument.source_id == source_id)
+        .where(or_(*(getattr(KnowledgeChunk, f"simhash_band{band}").in_(values)
+                     for band, values in enumerate(band_values))))
+    )
+    if document_id is not None:
+        query = query.where(KnowledgeChunk.document_id != document_id)
+    return np.array([_to_unsigned(value) for value in db.scalars(query)], dtype=np.uint64)
+
+
+def unreferenced_milvus_ids(db: Session, milvus_ids: Sequence[int]) -> List[int]:
+    """The ids in `milvus_ids` no chunk row points to any more, i.e. whose vectors can be deleted."""
+    if not milvus_ids:
+        return []
+    referenced = set(db.scalars(select(KnowledgeChunk.milvus_id).where(KnowledgeChunk.milvus_id.in_(milvus_ids))))
+    return [milvus_id for milvus_id in dict.fromkeys(milvus_ids) if milvus_id not in referenced]
+
+
+def _store_chunks(key: str, texts: List[str], metadata: List[dict],
+                  embed_batch: Callable[[List[str]], List[List[float]]], language: str,
+                  collection_name: str) -> List[Optional[int]]:
+    """Embed and insert chunks, returning their Milvus ids; a chunk that fails is logged and gets None."""
+    try:
+        ids = insert_embeddings(embed_batch(texts), texts, collection_name, [language] * len(texts),
+                                metadata=metadata)
+        if ids is False:
+            raise RuntimeError(f"Failed to insert chunks into {collection_name}")
+        return list(ids)
+    except Exception as e:
+        if len(texts) == 1:
+            print(f"Error storing chunk {metadata[0]['chunk_index']} of {key}, skipping it: {e}")
+            return [None]
+        print(f"Error storing {len(texts)} chunks of {key}, retrying them one at a time: {e}")
+        return [milvus_id for text, meta in zip(texts, metadata)
+                for milvus_id in _store_chunks(key, [text], [meta], embed_batch, language, collection_name)]
+
+
+def ingest_document(
+    db: Session,
+    key: str,
+    chunks: Sequence[str],
+    embed_batch: Callable[[List[str]], List[List[float]]],
+    language: str = "en",
+    title: Optional[str] = None,
+    collection_name: str = COLLECTION_NAME,
+    source_id: Optional[str] = None,
+) -> IngestResult:
+    """
+    Store the chunks of one source document, sharing or skipping duplicates and replacing its previous version.
+
+    Args:
+        db: Sync database session; committed on success
+        key: Source key of the document (see source_key)
+        chunks: The document's chunks, in order
+        embed_batch: Embeds a list of texts in one call
+        language: Language of the chunks
+        title: Display title of the document
+        collection_name: Milvus collection to store the chunks in
+        source_id: Knowledge source the document belongs to; moving a document to another
+            source re-inserts its chunks so their source_id field follows
+
+    Returns:
+        IngestResult: Counts of added, kept, shared, removed, skipped and failed chunks
+
+    Raises:
+        RuntimeError: If none of the new chunks could be stored; the previous version is kept
+    """
+    chunks = [chunk for chunk in chunks if chunk.strip()]
+    hashes = [content_hash(chunk) for chunk in chunks]
+    document_hash = hashlib.sha256("\n".join(hashes).encode("ascii")).hexdigest()
+
+    document = db.scalars(select(KnowledgeDocument).where(KnowledgeDocument.source_key == key)).one_or_none()
+    moved = document is not None and source_id is not None and document.source_id != source_id
+    if document is not None and document.content_hash == document_hash and not moved:
+        return IngestResult(document.id, document.version, kept=document.chunk_count, unchanged=True)
+
+    document_id = document.id if document is not None else None
+    own_chunks = {}
+    stored_query = select(KnowledgeChunk).where(KnowledgeChunk.content_hash.in_(hashes),
+                                                KnowledgeChunk.milvus_id.is_not(None))
+    if document_id is not None:
+        own_chunks = {
+            chunk.content_hash: chunk
+            for chunk in db.scalars(select(KnowledgeChunk).where(KnowledgeChunk.document_id == document_id))
+        }
+        stored_query = stored_query.where(KnowledgeChunk.document_id != document_id)
+    # Chunks other documents stored, whose vectors this document can point to
+    stored_elsewhere = {chunk.content_hash: chunk for chunk in db.scalars(stored_query)} if hashes else {}
+    # Chunks of the previous version that can stay in Milvus as they are
+    reusable = {} if moved else own_chunks
+
+    result = IngestResult(document_id, (document.version + 1) if document is not None else 1)
+
+    # Repeated within this document
+    seen = set()
+    candidates = []
+    for chunk, chunk_hash in zip(chunks, hashes):
+        if chunk_hash in seen:
+            result.duplicates += 1
+            continue
+        seen.add(chunk_hash)
+        stored = reusable.get(chunk_hash) or stored_elsewhere.get(chunk_hash)
+        candidates.append((chunk, chunk_hash, stored.simhash if stored is not None else None))
+
+    # Near duplicates of the source's other documents' chunks or of an earlier chunk of this version
+    new_simhashes = {chunk_hash: simhash(chunk) for chunk, chunk_hash, stored in candidates if stored is None}
+    document_source_id = source_id if source_id is not None or document is None else document.source_id
+    stored_simhashes = _near_duplicate_candidates(db, list(new_simhashes.values()), document_id, document_source_id)
+    accepted_simhashes = np.array([_to_unsigned(s) for _, _, s in candidates if s is not None], dtype=np.uint64)
+    accepted = []
+    for chunk, chunk_hash, stored in candidates:
+        if stored is None:
+            value = new_simhashes[chunk_hash]
+            if _is_near_duplicate(value, stored_simhashes) or _is_near_duplicate(value, accepted_simhashes):
+                result.near_duplicates += 1
+                continue
+            accepted_simhashes = np.append(accepted_simhashes, np.uint64(value))
+        accepted.append((chunk, chunk_hash))
+
+    shared = [(index, chunk_hash) for index, (_, chunk_hash) in enumerate(accepted)
+              if chunk_hash not in reusable and chunk_hash in stored_elsewhere]
+    new_chunks = [(index, chunk, chunk_hash) for index, (chunk, chunk_hash) in enumerate(accepted)
+                  if chunk_hash not in reusable and chunk_hash not in stored_elsewhere]
+    kept_hashes = {chunk_hash for _, chunk_hash in accepted if chunk_hash in reusable}
+    removed = [chunk for chunk_hash, chunk in own_chunks.items() if chunk_hash not in kept_hashes]
+    new_ids = []
+    try:
+        if document is None:
+            # Column-style models on the dataclass Base take no constructor arguments
+            document = KnowledgeDocument()
+            document.source_key = key
+            document.content_hash = document_hash
+            document.version = 0
+            db.add(document)
+        if source_id is not None:
+            document.source_id = source_id
+        db.flush()
+
+        created_at = int(time.time())
+        for start in range(0, len(new_chunks), EMBED_BATCH_SIZE):
+            batch = new_chunks[start:start + EMBED_BATCH_SIZE]
+            texts = [chunk for _, chunk, _ in batch]
+            metadata = [
+                {
+                    "source_id": document.source_id or "",
+                    "doc_id": document.id,
+                    "chunk_index": index,
+                    "content_hash": chunk_hash,
+                    "created_at": created_at,
+                }
+                for index, _, chunk_hash in batch
+            ]
+            new_ids.extend(_store_chunks(key, texts, metadata, embed_batch, language, collection_name))
+        result.failed = new_ids.count(None)
+        if new_chunks and result.failed == len(new_chunks):
+            raise RuntimeError(f"Failed to store any new chunk of {key} in {collection_name}")
+
+        for chunk in removed:
+            db.delete(chunk)
+        db.flush()
+
+        for index, (_, chunk_hash) in enumerate(accepted):
+            if chunk_hash in reusable:
+                reusable[chunk_hash].chunk_index = index
+        stored_chunks = [(index, chunk_hash, new_simhashes[chunk_hash], milvus_id)
+                         for (index, _, chunk_hash), milvus_id in zip(new_chunks, new_ids) if milvus_id is not None]
+        stored_chunks += [(index, chunk_hash, _to_unsigned(stored_elsewhere[chunk_hash].simhash),
+                           stored_elsewhere[chunk_hash].milvus_id) for index, chunk_hash in shared]
+        for index, chunk_hash, value, milvus_id in stored_chunks:
+            db_chunk = KnowledgeChunk()
+            db_chunk.document_id = document.id
+            db_chunk.chunk_index = index
+            db_chunk.content_hash = chunk_hash
+            db_chunk.simhash = _to_signed(value)
+            for band, band_value in enumerate(simhash_bands(value)):
+                setattr(db_chunk, f"simhash_band{band}", band_value)
+            db_chunk.milvus_id = milvus_id
+            db_chunk.language = language
+            db.add(db_chunk)
+        db.flush()
+        # Vectors other documents still point to stay in Milvus
+        removed_ids = unreferenced_milvus_ids(db, [chunk.milvus_id for chunk in removed if chunk.milvus_id is not None])
+
+        document.title = title[:255] if title else document.title
+        # Without a hash the next import of the same content is not a no-op, and retries the failed chunks
+        document.content_hash = document_hash if not result.failed else ""
+        document.version += 1
+        document.chunk_count = len(accepted) - result.failed
+        document.updated_at = datetime.utcnow()
+        db.commit()
+    except Exception:
+        db.rollback()
+        delete_entries([milvus_id for milvus_id in new_ids if milvus_id is not None], collection_name)
+        raise
+
+    # Only drop the old vectors once the new version is committed
+    delete_entries(removed_ids, collection_name)
+
+    result.document_id = document.id
+    result.version = document.version
+    result.added = len(new_chunks) - result.failed
+    result.shared = len(shared)
+    result.kept = len(kept_hashes)
+    result.removed = len(removed)
+    return result
+
+
+def delete_documents(db: Session, keys: Sequence[str], collection_name: str = COLLECTION_NAME) -> int:
+    """
+    Delete the documents with the given source keys and the vectors no other document shares.
+
+    Returns:
+        int: Number of documents deleted
+    """
+    document_ids = list(db.scalars(select(KnowledgeDocument.id).where(KnowledgeDocument.source_key.in_(keys))))
+    if not document_ids:
+        return 0
+
+    milvus_ids = list(db.scalars(select(KnowledgeChunk.milvus_id).where(
+        KnowledgeChunk.document_id.in_(document_ids), KnowledgeChunk.milvus_id.is_not(None))))
+    db.execute(delete(KnowledgeChunk).where(KnowledgeChunk.document_id.in_(document_ids)))
+    db.execute(delete(KnowledgeDocument).where(KnowledgeDocument.id.in_(document_ids)))
+    removed_ids = unreferenced_milvus_ids(db, milvus_ids)
+    db.commit()
+
+    delete_entries(removed_ids, collection_name)
+    return len(document_ids)
+
+
+def remap_milvus_ids(db: Session, new_ids: Dict[int, int], drop_missing: bool = False) -> Tuple[int, int]:
+    """
+    Point chunk rows at the vectors a snapshot restore inserted in place of the old ones.
+
+    Args:
+        db: Sync database session; committed
+        new_ids: New Milvus id of each restored vector, by its old id
+        drop_missing: Whether the old vectors are gone (the collection was dropped first). Rows
+            whose vector was not restored are then deleted and their documents marked as
+            changed, so re-importing them stores the missing chunks again.
+
+    Returns:
+        Tuple[int, int]: Number of chunk rows remapped and dropped
+    """
+    # Read every row before updating any, so a new id that equals another old id is not remapped twice
+    chunks = db.execute(
+        select(KnowledgeChunk.id, KnowledgeChunk.document_id, KnowledgeChunk.milvus_id)
+        .where(KnowledgeChunk.milvus_id.is_not(None))
+    ).all()
+    remapped = [{"id": chunk.id, "milvus_id": new_ids[chunk.milvus_id]}
+                for chunk in chunks if chunk.milvus_id in new_ids]
+    missing = [chunk for chunk in chunks if chunk.milvus_id not in new_ids] if drop_missing else []
+
+    if remapped:
+        db.execute(update(KnowledgeChunk), remapped)
+    for start in range(0, len(missing), DELETE_BATCH_SIZE):
+        db.execute(delete(KnowledgeChunk).where(
+            KnowledgeChunk.id.in_([chunk.id for chunk in missing[start:start + DELETE_BATCH_SIZE]])))
+    for document_id, count in Counter(chunk.document_id for chunk in missing).items():
+        db.execute(
+            update(KnowledgeDocument)
+            .where(KnowledgeDocument.id == document_id)
+            .values(chunk_count=KnowledgeDocument.chunk_count - count, content_hash="", updated_at=datetime.utcnow())
+        )
+    db.commit()
+    return len(remapped), len(missing)
@@ -1,9 +1,15 @@
 from pymilvus import connections, Collection, FieldSchema, CollectionSchema, DataType
 from pymilvus import utility
+import base64
+import json
 import os
-import openai
+import re
+from typing import Iterator, Optional
+import numpy as np
 
 from app.core.config import settings
+from app.services.providers import get_embedding_provider
+from app.services.score_calibration import get_calibration, similarity_from_distance
 
 MILVUS_HOST = "localhost"  # Use localhost for local development
 MILVUS_PORT = "19530"
@@ -11,10 +17,28 @@ MILVUS_PORT = "19530"
 COLLECTION_NAME = "rag_embeddings"
 EMBEDDING_DIM = 3072  # text-embedding-3-large has 3072 dimensions
 EMBEDDING_MODEL = "text-embedding-3-large"  # Updated to better multilingual model
-
-# Initialize OpenAI client
-openai.api_key = os.getenv("OPENAI_API_KEY") or getattr(settings, "OPENAI_API_KEY", "")
-
+# max_length of the text field; Milvus counts VARCHAR length in UTF-8 bytes, not characters
+TEXT_MAX_BYTES = 2048
+
+# Vectors are normalized to unit length on insert, so inner product is cosine similarity
+METRIC_TYPE = "IP"
+INDEX_PARAMS = {"index_type": "IVF_FLAT", "metric_type": METRIC_TYPE, "params": {"nlist": 128}}
+SEARCH_NPROBE = 10
+
+# Scalar fields tying each chunk to its knowledge source and document in Postgres;
+# collections created before they existed lack them (see has_field)
+CHUNK_METADATA_FIELDS = ["source_id", "doc_id", "chunk_index", "content_hash", "created_at"]
+DEFAULT_PAGE_SIZE = 100
+# Milvus rejects queries whose limit exceeds 16384
+MAX_QUERY_LIMIT = 16384
+KEYWORD_SEARCH_MAX_TERMS = 8
+# Words that match nearly every entry and would crowd out the useful candidates
+KEYWORD_STOPWORDS = {
+    "the", "and", "for", "are", "you", "your", "what", "whats", "how", "can", "does", "with",
+    "have", "about", "this", "that", "there", "which", "when", "where", "who", "why", "from",
+}
+# Language codes such as "en", "ar" or "pt-BR"; anything else is refused before reaching a filter
+LANGUAGE_CODE_PATTERN = re.compile(r"[A-Za-z]{2,8}(?:[-_][A-Za-z0-9]{1,8})*")
 
 def connect_to_milvus(alias: str = "default"):
     """
@@ -42,9 +66,19 @@ def create_collection(collection_name: str = COLLECTION_NAME, dim: int = EMBEDDI
     fields = [
         FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
         FieldSchema(name="embedding", dtype=DataType.FLOAT_VECTOR, dim=dim),
-        FieldSchema(name="text", dtype=DataType.VARCHAR, max_length=2048),
+        # Tokenized with a keyword match index so keyword search can use TEXT_MATCH
+        FieldSchema(name="text", dtype=DataType.VARCHAR, max_length=TEXT_MAX_BYTES, enable_analyzer=True, enable_match=True),
         # Add language field for multilingual support
         FieldSchema(name="language", dtype=DataType.VARCHAR, max_length=10),
+        # Knowledge source ("ks-...") and knowledge_documents.id of the chunk, so a source or a
+        # document can be deleted with one filter; defaults keep plain inserts valid
+        FieldSchema(name="source_id", dtype=DataType.VARCHAR, max_length=32, default_value=""),
+        FieldSchema(name="doc_id", dtype=DataType.INT64, default_value=0),
+        # Position of the chunk in its document when it was inserted
+        FieldSchema(name="chunk_index", dtype=DataType.INT64, default_value=0),
+        FieldSchema(name="content_hash", dtype=DataType.VARCHAR, max_length=64, default_value=""),
+        # Unix time of insertion
+        FieldSchema(name="created_at", dtype=DataType.INT64, default_value=0),
     ]
     schema = CollectionSchema(fields, description="Multilingual RAG text embeddings")
     
@@ -57,12 +91,9 @@ def create_collection(collection_name: str = COLLECTION_NAME, dim: int = EMBEDDI
     
     # Create index if it doesn't exist
     try:
-        index_params = {
-            "index_type": "IVF_FLAT",
-            "metric_type": "L2",
-            "params": {"nlist": 128}
-        }
-        collection.create_index(field_name="embedding", index_params=index_params)
+        if collection.has_index() and index_metric(collection) != METRIC_TYPE:
+            rebuild_index(collection_name)
+        collection.create_index(field_name="embedding", index_params=INDEX_PARAMS)
         print(f"Created index on collection: {collection_name}")
     except Exception as e:
         if "index already exists" in str(e).lower():
@@ -92,9 +123,9 @@ def drop_collection(collection_name: str = COLLECTION_NAME):
     if collection_name in utility.list_collections():
         utility.drop_collection(collection_name)
         
-def reset_collection(collection_name: str = COLLECTION_NAME):
+def reset_collection(collection_name: str = COLLECTION_NAME, dim: int = EMBEDDING_DIM):
     """
-    Reset the Milvus collection by dropping it and recreating it.
+    Reset the Milvus collection by dropping it and recreating it with `dim` dimensions.
     This effectively clears all embeddings.
     """
     try:
@@ -103,16 +134,11 @@ def reset_collection(collection_name: str = COLLECTION_NAME):
         print(f"Dropped collection: {collection_name}")
         
         # Create a new collection with the same schema
-        collection = create_collection(collection_name)
+        collection = create_collection(collection_name, dim)
         
         # Make sure the index is created
         try:
-            index_params = {
-                "index_type": "IVF_FLAT",
-                "metric_type": "L2",
-                "params": {"nlist": 128}
-            }
-            collection.create_index(field_name="embedding", index_params=index_params)
+            collection.create_index(field_name="embedding", index_params=INDEX_PARAMS)
             print(f"Created index on collection: {collection_name}")
         except Exception as e:
             print(f"Error creating index during reset: {e}")
@@ -142,11 +168,48 @@ def build_index(collection_name: str = COLLECTION_NAME):
 
     if not has_index:
         # Create index on the embedding field
-        index_params = {"metric_type": "L2", "index_type": "IVF_FLAT", "params": {"nlist": 128}}
-        col.create_index("embedding", index_params)
+        col.create_index("embedding", INDEX_PARAMS)
     return col
 
 
+def index_metric(col: Collection) -> str:
+    """Metric of the collection's vector index; collections created before the switch to IP use L2."""
+    try:
+        return col.index().params.get("metric_type", METRIC_TYPE).upper()
+    except Exception:
+        return METRIC_TYPE
+
+
+def rebuild_index(collection_name: str = COLLECTION_NAME) -> None:
+    """
+    Replace the vector index with one using METRIC_TYPE.
+
+    Stored vectors are not rewritten: text-embedding-3 vectors already have unit length,
+    so inner product ranks them exactly as L2 did.
+    """
+    col = Collection(collection_name)
+    previous = index_metric(col)
+    col.release()
+    col.drop_index()
+    col.create_index("embedding", INDEX_PARAMS)
+    col.load()
+    print(f"Rebuilt index on {collection_name}: {previous} -> {METRIC_TYPE}")
+
+
+def normalize_vectors(vectors) -> np.ndarray:
+    """Rows scaled to unit length (float32); all-zero rows are left as they are."""
+    matrix = np.array(vectors, dtype=np.float32, ndmin=2)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def is_degenerate_vector(vector) -> bool:
+    """All-zero or non-finite vectors, e.g. fallbacks of failed embedding calls, which must never be indexed."""
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector.size == 0 or not np.isfinite(vector).all() or not vector.any()
+
+
 def load_collection(collection_name: str = COLLECTION_NAME):
     """Load the collection into memory for search"""
     if collection_name not in list_collections():
@@ -168,6 +231,10 @@ def insert_embedding(embedding: list[float], text: str, collection_name: str = C
         collection_name: Name of the collection
         language: Language code (e.g., 'en', 'ar')
     """
+    if is_degenerate_vector(embedding):
+        print("Error: refusing to insert a zero or non-finite embedding")
+        return False
+    
     try:
         # Connect to Milvus
         connect_to_milvus()
@@ -184,7 +251,7 @@ def insert_embedding(embedding: list[float], text: str, collection_name: str = C
         # The expected format is a list of entities, where each entity is a dict of field values
         entities = [
             {
-                "embedding": embedding,  # embedding field - single vector
+                "embedding": normalize_vectors(embedding)[0].tolist(),  # embedding field - single vector
                 "text": text,           # text field - single string
                 "language": language     # language field - single string
             }
@@ -202,7 +269,8 @@ def insert_embedding(embedding: list[float], text: str, collection_name: str = C
 
 
 def insert_embeddings(embeddings: list[list[float]], texts: list[str],
-                      collection_name: str = COLLECTION_NAME, languages: list[str] = None):
+                      collection_name: str = COLLECTION_NAME, languages: list[str] = None,
+                      metadata: Optional[list[dict]] = None):
     """
     Insert multiple embeddings and their corresponding texts into the collection.
     This function is for batch insertion of multiple items.
@@ -212,6 +280,11 @@ def insert_embeddings(embeddings: list[list[float]], texts: list[str],
         texts: List of text content
         collection_name: Name of the collection
         languages: List of language codes (e.g., ['en', 'ar']). If None, defaults to 'en' for all.
+        metadata: Optional extra scalar fields per entity (see CHUNK_METADATA_FIELDS); fields
+            the collection does not have are left out
+
+    Returns:
+        List of the primary keys of the inserted entities, or False on error
     """
     if not embeddings or not texts or len(embeddings) != len(texts):
         print("Error: embeddings and texts must be non-empty lists of the same length")
@@ -223,6 +296,13 @@ def insert_embeddings(embeddings: list[list[float]], texts: list[str],
     elif len(languages) != len(texts):
         print("Error: languages list must be the same length as texts")
         languages = ['en'] * len(texts)
+    if metadata is not None and len(metadata) != len(texts):
+        print("Error: metadata list must be the same length as texts")
+        return False
+    degenerate = [i for i, embedding in enumerate(embeddings) if is_degenerate_vector(embedding)]
+    if degenerate:
+        print(f"Error: refusing to insert zero or non-finite embeddings at positions {degenerate}")
+        return False
     
     try:
         # Connect to Milvus
@@ -239,20 +319,25 @@ def insert_embeddings(embeddings: list[list[float]], texts: list[str],
         # Format data correctly for Milvus batch insertion
         # The expected format is a list of entities, where each entity is a dict of field values
         entities = []
+        schema_fields = {field.name for field in collection.schema.fields}
+        vectors = normalize_vectors(embeddings).tolist()
         
         for i in range(len(embeddings)):
-            entities.append({
-                "embedding": embeddings[i],  # embedding field - vector
+            entity = {
+                "embedding": vectors[i],  # embedding field - unit vector
                 "text": texts[i],           # text field - string
                 "language": languages[i]     # language field - string
-            })
+            }
+            if metadata is not None:
+                entity.update((key, value) for key, value in metadata[i].items() if key in schema_fields)
+            entities.append(entity)
         
         # Debug output
         print(f"Batch inserting {len(entities)} entities with embeddings")
         
         # Insert the entities
-        collection.insert(entities)
-        return True
+        result = collection.insert(entities)
+        return list(result.primary_keys)
     except Exception as e:
         print(f"Error inserting embeddings: {e}")
         return False
@@ -285,31 +370,70 @@ def insert_embeddings_with_metadata(embeddings: list[list[float]], texts: list[s
     return insert_embeddings(embeddings, texts, collection_name, languages)
 
 
-def get_embedding(text: str) -> list[float]:
+def delete_entries(ids: list[int], collection_name: str = COLLECTION_NAME) -> None:
+    """Delete entities by primary key."""
+    if not ids or collection_name not in list_collections():
+        return
+
+    Collection(collection_name).delete(expr=f"id in [{', '.join(str(int(i)) for i in ids)}]")
+
+
+def has_field(collection_name: str, field_name: str) -> bool:
+    """Whether the collection's schema has `field_name`."""
+    if collection_name not in list_collections():
+        return False
+    return any(field.name == field_name for field in Collection(collection_name).schema.fields)
+
+
+def delete_source_entries(source_id: str, ids: Optional[list[int]] = None,
+                          collection_name: str = COLLECTION_NAME, keep_ids: Optional[list[int]] = None) -> None:
     """
-    Generate embeddings for a text using OpenAI's embedding model.
+    Delete every entity of a knowledge source.
+
+    Filters on the source_id field, so the cost is proportional to the size of the source
+    rather than of the collection. Collections created before the field existed fall back
+    to deleting `ids`, the primary keys recorded for the source in knowledge_chunks.
+    `keep_ids` are entities of the source that other sources' documents share, which stay.
     """
-    try:
-        # Check if the OpenAI API key is set
-        if not openai.api_key:
-            # Use a mock embedding for testing if no API key is available
-            return [0.0] * EMBEDDING_DIM
+    if collection_name not in list_collections():
+        return
 
-        # Get embeddings from OpenAI
-        response = openai.Embedding.create(input=text, model=EMBEDDING_MODEL)
+    if has_field(collection_name, "source_id"):
+        expr = f"source_id == {json.dumps(source_id)}"
+        if keep_ids:
+            expr += f" and id not in {[int(i) for i in keep_ids]}"
+        Collection(collection_name).delete(expr=expr)
+    else:
+        delete_entries(ids or [], collection_name)
 
-        # Extract the embedding from the response
-        embedding = response["data"][0]["embedding"]
-        return embedding
-    except Exception as e:
-        print(f"Error generating embedding: {e}")
-        # Return a mock embedding in case of error
-        return [0.0] * EMBEDDING_DIM
+
+def get_embedding(text: str) -> list[float]:
+    """
+    Generate embeddings for a text with the configured embedding provider (see app.services.providers).
+
+    Errors propagate: a placeholder vector would be indexed or searched as if it were real.
+    """
+    return get_embedding_provider().embed(text, EMBEDDING_MODEL)
 
 
 def search_embedding(embedding: list[float], top_k: int = 5,
                      collection_name: str = COLLECTION_NAME,
                      filter_expr: str = None):
+    """
+    Find the entries closest to `embedding`.
+
+    Each result has the cosine `similarity`, its calibrated relevance in [0, 1] as `score`
+    and whether that reaches the collection's threshold as `relevant` (see score_calibration).
+
+    Args:
+        embedding: Query vector; normalized here, so any length works
+        top_k: Number of results to return
+        collection_name: Name of the collection to search
+        filter_expr: Optional Milvus filter, e.g. "language == 'ar'"
+
+    Returns:
+        List of result dictionaries, most similar first
+    """
     # Ensure collection exists
     if collection_name not in list_collections():
         print(f"Collection {collection_name} does not exist. Creating it.")
@@ -343,11 +467,16 @@ def search_embedding(embedding: list[float], top_k: int = 5,
                 # Pad the embedding with zeros
                 embedding = embedding + [0.0] * (expected_dim - actual_dim)
                 print(f"Padded embedding to {expected_dim} dimensions")
+        embedding = normalize_vectors(embedding)[0].tolist()
+    metric_type = index_metric(col)
+    calibration = get_calibration(collection_name)
     
     # Determine which output fields to use based on what's available in the schema
     output_fields = ["text"]
     if "language" in schema_fields:
         output_fields.append("language")
+    metadata_fields = [field for field in CHUNK_METADATA_FIELDS if field in schema_fields]
+    output_fields.extend(metadata_fields)
     
     # Perform search
     try:
@@ -355,11 +484,11 @@ def search_embedding(embedding: list[float], top_k: int = 5,
         results = col.search(
             data=[embedding], 
             anns_field="embedding",
-            param={"metric_type": "L2", "params": {"nprobe": 10}}, 
+            param={"metric_type": metric_type, "params": {"nprobe": SEARCH_NPROBE}},
             limit=top_k,
+            expr=filter_expr,
             output_fields=output_fields, 
         )
-        print(f"Search results: {results}")
         
         # Direct approach - extract text from search results
         simplified_results = []
@@ -387,15 +516,21 @@ def search_embedding(embedding: list[float], top_k: int = 5,
                             # Handle case where language field might not exist in the schema
                             language = hit.entity.get('language', 'en') if 'language' in schema_fields else 'en'
                             if text:
+                                similarity = similarity_from_distance(hit.distance, metric_type)
+                                relevance = calibration.relevance(similarity)
                                 result_dict = {
+                                    'id': hit.id,
                                     'text': text,
-                                    'score': hit.distance if hasattr(hit, 'distance') else 0.0
+                                    'similarity': similarity,
+                                    'score': relevance,
+                                    'relevant': calibration.is_relevant(relevance),
                                 }
                                 # Only add language if it exists in the schema
                                 if 'language' in schema_fields:
                                     result_dict['language'] = language
+                                for field in metadata_fields:
+                                    result_dict[field] = hit.entity.get(field)
                                 simplified_results.append(result_dict)
-                                print(f"Added text with score {hit.distance if hasattr(hit, 'distance') else 0.0}: {text[:50]}...")
                     except Exception as inner_e:
                         print(f"Error processing hit: {inner_e}")
         
@@ -424,106 +559,199 @@ def search_embedding(embedding: list[float], top_k: int = 5,
         return []
 
 
+def encode_page_token(last_id: int) -> str:
+    """Opaque page token pointing just after primary key `last_id`."""
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode().rstrip("=")
+
+
+def decode_page_token(page_token: str) -> int:
+    """Inverse of encode_page_token. Raises ValueError for malformed tokens."""
+    try:
+        return int(base64.urlsafe_b64decode(page_token + "=" * (-len(page_token) % 4)).decode())
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid page token: {page_token}") from e
+
+
+def _entry_output_fields(col: Collection, include_embeddings: bool = False) -> list[str]:
+    schema_fields = [field.name for field in col.schema.fields]
+    output_fields = ["id", "text"]
+    if "language" in schema_fields:
+        output_fields.append("language")
+    output_fields.extend(field for field in CHUNK_METADATA_FIELDS if field in schema_fields)
+    if include_embeddings:
+        output_fields.append("embedding")
+    return output_fields
+
+
+def _with_default_language(entries: list[dict]) -> list[dict]:
+    for entry in entries:
+        entry.setdefault("language", "en")
+    return entries
+
+
+def get_entries_page(collection_name: str = COLLECTION_NAME, limit: int = DEFAULT_PAGE_SIZE,
+                     page_token: Optional[str] = None, filter_expr: Optional[str] = None):
+    """
+    Get one page of entries, ordered by primary key.
+
+    Pages are addressed by primary key cursor (`id > last id`), so every page costs
+    the same no matter how deep it is.
+
+    Args:
+        collection_name: Name of the collection to query
+        limit: Maximum number of entries in the page
+        page_token: Token returned with the previous page, None for the first page
+        filter_expr: Optional extra Milvus filter, e.g. "language == 'ar'"
+
+    Returns:
+        Tuple of (entries, next_page_token); next_page_token is None on the last page
+
+    Raises:
+        ValueError: If page_token is malformed
+    """
+    last_id = decode_page_token(page_token) if page_token else 0
+    if collection_name not in list_collections():
+        return [], None
+
+    col = load_collection(collection_name)
+    limit = max(1, min(limit, MAX_QUERY_LIMIT - 1))
+    expr = f"id > {last_id}"
+    if filter_expr:
+        expr = f"({expr}) and ({filter_expr})"
+
+    # Query results come back in primary key order; fetch one extra row to know if there is a next page
+    results = col.query(expr=expr, output_fields=_entry_output_fields(col), limit=limit + 1)
+    entries = _with_default_language(results[:limit])
+    next_page_token = encode_page_token(entries[-1]["id"]) if len(results) > limit else None
+    return entries, next_page_token
+
+
+def iterate_entries(collection_name: str = COLLECTION_NAME, batch_size: int = 1000,
+                    filter_expr: Optional[str] = None, include_embeddings: bool = False,
+                    output_fields: Optional[list[str]] = None) -> Iterator[list[dict]]:
+    """
+    Iterate over all entries of a collection in batches, using a Milvus query iterator.
+
+    Only one batch is held in memory at a time, so this works for collections of any size.
+
+    Args:
+        collection_name: Name of the collection to read
+        batch_size: Entries fetched per round trip
+        filter_expr: Optional Milvus filter
+        include_embeddings: Whether to include the embedding vectors
+        output_fields: Fields to return instead of id, text, language (and embedding)
+
+    Yields:
+        Lists of entry dictionaries
+    """
+    if collection_name not in list_collections():
+        return
+
+    col = load_collection(collection_name)
+    iterator = col.query_iterator(
+        batch_size=batch_size,
+        expr=filter_expr,
+        output_fields=output_fields or _entry_output_fields(col, include_embeddings),
+    )
+    try:
+        while True:
+            batch = iterator.next()
+            if not batch:
+                break
+            yield _with_default_language(list(batch))
+    finally:
+        iterator.close()
+
+
 def get_all_entries(collection_name: str = COLLECTION_NAME, limit: int = 1000):
     """
-    Get all entries from the Milvus collection.
-    
+    Get up to `limit` entries from the Milvus collection.
+
+    Prefer get_entries_page for browsing and iterate_entries for reading a whole collection.
+
     Args:
         collection_name: Name of the collection to query
         limit: Maximum number of entries to return
-        
+
     Returns:
         List of dictionaries containing the entries
     """
-    # Print all available collections for debugging
     all_collections = list_collections()
-    print(f"Available collections: {all_collections}")
-    
-    # Check if the collection exists in Milvus
     if collection_name not in all_collections:
         print(f"Warning: Collection '{collection_name}' not found in Milvus. Available collections: {all_collections}")
-        # Try to find any collection that might contain embeddings
         if all_collections:
-            alt_collection = all_collections[0]
-            print(f"Trying alternative collection: {alt_collection}")
-            return get_all_entries(alt_collection, limit)
-        else:
-            print("No collections found in Milvus")
-            create_collection(collection_name)
-            return []
-    
+            return get_all_entries(all_collections[0], limit)
+        create_collection(collection_name)
+        return []
+
     try:
-        # Get collection and ensure it has an index
-        col = Collection(collection_name)
-        print(f"Opened collection: {collection_name}")
-        
-        # Print collection info
-        try:
-            schema = col.schema
-            print(f"Collection schema: {schema}")
-            num_entities = col.num_entities
-            print(f"Collection has {num_entities} entities")
-        except Exception as e:
-            print(f"Error getting collection info: {e}")
-        
-        # Check if collection has an index
-        try:
-            index_info = col.index().info
-            print(f"Index info: {index_info}")
-            if not index_info:
-                # Create index if it doesn't exist
-                try:
-                    index_params = {
-                        "index_type": "IVF_FLAT",
-                        "metric_type": "L2",
-                        "params": {"nlist": 128}
-                    }
-                    col.create_index(field_name="embedding", index_params=index_params)
-                    print(f"Created index on collection: {collection_name}")
-                except Exception as e:
-                    print(f"Error creating index: {e}")
-        except Exception as e:
-            print(f"Error checking index: {e}")
-        
-        # Load collection into memory
-        col.load()
-        
-        # Query all entries - use the most reliable method based on our debug findings
-        try:
-            # Get the schema fields to determine what fields are available
-            schema_fields = [field.name for field in col.schema.fields]
-            print(f"Available schema fields: {schema_fields}")
-            
-            # Determine which output fields to use based on what's available in the schema
-            output_fields = ["id", "text"]
-            if "language" in schema_fields:
-                output_fields.append("language")
-            
-            print(f"Using output fields: {output_fields}")
-            
-            # Use the standard query approach which we know works from our debug endpoint
-            results = col.query(
-                expr="id > 0",  # Query all entries
-                output_fields=output_fields,
-                limit=limit
-            )
-            
-            if results and len(results) > 0:
-                print(f"Retrieved {len(results)} entries using query")
-                
-                # Add default language if it's missing
-                if "language" not in schema_fields:
-                    for result in results:
-                        result["language"] = "en"  # Add default language
-                
-                return results
-            
-            print("No results found with standard query")
-            return []
-        except Exception as e:
-            print(f"Error querying entries: {e}")
-            return []
+        entries = []
+        for batch in iterate_entries(collection_name, batch_size=min(limit, 1000)):
+            entries.extend(batch[:limit - len(entries)])
+            if len(entries) >= limit:
+                break
+        return entries
     except Exception as e:
         print(f"Error getting all entries: {e}")
-        # Return empty results on error
         return []
+
+
+def _keyword_terms(query: str) -> list[str]:
+    terms = []
+    # Letters and digits only: a term can't close the quoted string or act as a like wildcard
+    for term in re.findall(r"[^\W_]+", query.lower().replace("'", "")):
+        if len(term) > 2 and term not in KEYWORD_STOPWORDS and term not in terms:
+            terms.append(term)
+    return terms[:KEYWORD_SEARCH_MAX_TERMS]
+
+
+def _supports_text_match(col: Collection) -> bool:
+    text_field = next((field for field in col.schema.fields if field.name == "text"), None)
+    return text_field is not None and str(text_field.params.get("enable_match", "")).lower() == "true"
+
+
+def keyword_search(query: str, top_k: int = 5, collection_name: str = COLLECTION_NAME,
+                   language: Optional[str] = None) -> list[dict]:
+    """
+    Find entries containing the words of `query`, filtered inside Milvus.
+
+    Uses the keyword match index (TEXT_MATCH) when the collection was created with one,
+    otherwise a `like` filter. Either way only the matching entries leave Milvus.
+    `like` is case-sensitive, so it looks for the lower case, capitalized and upper
+    case spelling of every word. Candidates are ranked by how many query words they
+    contain, compared case-insensitively.
+
+    Args:
+        query: Free text query
+        top_k: Maximum number of entries to return
+        collection_name: Name of the collection to search
+        language: Optional language filter
+
+    Returns:
+        List of entry dictionaries with an added `matches` count, best first
+
+    Raises:
+        ValueError: If `language` is not a language code
+    """
+    if language and not LANGUAGE_CODE_PATTERN.fullmatch(language):
+        raise ValueError(f"Invalid language code: {language!r}")
+
+    terms = _keyword_terms(query)
+    if not terms or collection_name not in list_collections():
+        return []
+
+    col = load_collection(collection_name)
+    if _supports_text_match(col):
+        expr = f"TEXT_MATCH(text, '{' '.join(terms)}')"
+    else:
+        spellings = dict.fromkeys(spelling for term in terms for spelling in (term, term.capitalize(), term.upper()))
+        expr = " or ".join(f"text like '%{spelling}%'" for spelling in spellings)
+    if language:
+        expr = f"({expr}) and language == '{language}'"
+
+    candidates = col.query(expr=expr, output_fields=_entry_output_fields(col), limit=min(top_k * 10, MAX_QUERY_LIMIT))
+    for entry in candidates:
+        text = entry.get("text", "").lower()
+        entry["matches"] = sum(1 for term in terms if term in text)
+    candidates.sort(key=lambda entry: entry["matches"], reverse=True)
+    return _with_default_language(candidates[:top_k])
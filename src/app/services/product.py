@@ -1,12 +1,73 @@
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from app.crud import crud_product
 from app.models.product import Product
-from app.schemas.product import ProductCreate, ProductUpdate
-from typing import List, Optional
+from app.schemas.product import ProductCountMode, ProductCreate, ProductUpdate
+from typing import List, Optional, Tuple
 from datetime import datetime
 from app.services.rag import RAGService
+from app.services.knowledge_ingest import source_key
 from app.services.product_embedding import ProductEmbeddingService
 
 
+def format_product_rag_text(product: Product) -> str:
+    """Detailed text representation of a product for the RAG collection."""
+    return f"""
+Product: {product.name}
+ID: {product.id}
+Category: {product.category or 'Uncategorized'}
+Price: {product.price} {product.currency}
+In Stock: {'Yes' if product.stock_quantity > 0 else 'No'}
+Stock Quantity: {product.stock_quantity} items
+Status: {'Active' if product.is_active else 'Inactive'}
+Description: {product.description or 'No description available'}
+"""
+
+
+def new_product(product: ProductCreate) -> Product:
+    """Unsaved Product built from the create payload, with both timestamps set."""
+    now = datetime.now().isoformat()
+    db_product = Product()
+    for key, value in product.model_dump().items():
+        setattr(db_product, key, value)
+    db_product.created_at = now
+    db_product.updated_at = now
+    return db_product
+
+
+def apply_product_update(db_product: Product, product_update: ProductUpdate) -> None:
+    """Set the fields present in the update payload and bump updated_at."""
+    for key, value in product_update.model_dump(exclude_unset=True).items():
+        setattr(db_product, key, value)
+    db_product.updated_at = datetime.now().isoformat()
+
+
+def add_product_to_rag(rag_service: RAGService, product: Product) -> None:
+    """Add product details to the vector store for RAG, replacing the chunk of the previous version."""
+    rag_service.add_text_to_milvus(
+        format_product_rag_text(product),
+        language=product.language,
+        source_key=source_key("product", str(product.id)),
+        title=product.name,
+    )
+
+
+def index_product(rag_service: RAGService, embedding_service: ProductEmbeddingService, product: Product) -> None:
+    """Add or refresh a product in both the RAG and the dedicated product vector store."""
+    add_product_to_rag(rag_service, product)
+    embedding_service.add_product_to_milvus(product)
+
+
+def unindex_product(rag_service: RAGService, embedding_service: ProductEmbeddingService, product: Product) -> None:
+    """Vector store side of a soft delete.
+    
+    The RAG entry is kept and updated to show the product as inactive; the product embedding is removed.
+    """
+    add_product_to_rag(rag_service, product)
+    embedding_service.remove_product_from_milvus(product.id)
+
+
 class ProductService:
     """Service for managing products in the database and vector store."""
     
@@ -34,29 +95,13 @@ class ProductService:
     
     def create_product(self, product: ProductCreate) -> Product:
         """Create a new product and add it to the vector store."""
-        # Create a new Product instance without using constructor arguments
-        db_product = Product()
-        
-        # Set attributes manually
-        db_product.name = product.name
-        db_product.description = product.description
-        db_product.price = product.price
-        db_product.currency = product.currency
-        db_product.stock_quantity = product.stock_quantity
-        db_product.image_url = product.image_url
-        db_product.category = product.category
-        db_product.language = product.language
-        db_product.alternative_to_id = product.alternative_to_id
-        db_product.created_at = datetime.now().isoformat()
-        db_product.updated_at = datetime.now().isoformat()
+        db_product = new_product(product)
         
         self.db.add(db_product)
         self.db.commit()
         self.db.refresh(db_product)
         
-        # Add product to both RAG and dedicated product vector store
-        self._add_to_vector_store(db_product)
-        self.embedding_service.add_product_to_milvus(db_product)
+        index_product(self.rag_service, self.embedding_service, db_product)
         
         return db_product
     
@@ -66,20 +111,12 @@ class ProductService:
         if not db_product:
             return None
         
-        # Update only the fields that are provided
-        update_data = product_update.model_dump(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(db_product, key, value)
-        
-        # Always update the updated_at timestamp
-        db_product.updated_at = datetime.now().isoformat()
+        apply_product_update(db_product, product_update)
         
         self.db.commit()
         self.db.refresh(db_product)
         
-        # Update product in both RAG and dedicated product vector store
-        self._add_to_vector_store(db_product)
-        self.embedding_service.add_product_to_milvus(db_product)
+        index_product(self.rag_service, self.embedding_service, db_product)
         
         return db_product
     
@@ -94,17 +131,13 @@ class ProductService:
         
         self.db.commit()
         
-        # We don't remove from RAG vector store, just update to show as inactive
-        self._add_to_vector_store(db_product)
-        
-        # Remove from the dedicated product vector store
-        self.embedding_service.remove_product_from_milvus(product_id)
+        unindex_product(self.rag_service, self.embedding_service, db_product)
         
         return True
     
     def get_product_count(self, category: Optional[str] = None, language: Optional[str] = None) -> int:
         """Get the total count of products with optional filtering."""
-        query = self.db.query(Product).filter(Product.is_active == True)
+        query = self.db.query(Product).filter(Product.is_active.is_(True))
         
         if category:
             query = query.filter(Product.category == category)
@@ -118,7 +151,7 @@ class ProductService:
         """Get alternative products for a given product."""
         return self.db.query(Product).filter(
             Product.alternative_to_id == product_id,
-            Product.is_active == True
+            Product.is_active.is_(True)
         ).all()
         
     def get_products_by_ids(self, product_ids: List[int]) -> List[Product]:
@@ -137,13 +170,13 @@ class ProductService:
             
         return self.db.query(Product).filter(
             Product.id.in_(product_ids),
-            Product.is_active == True
+            Product.is_active.is_(True)
         ).all()
         
     def find_similar_products(self, product_name: str, language: str = None, limit: int = 3) -> List[Product]:
         """Find similar products based on name similarity or category"""
         # First try to find products with similar names
-        query = self.db.query(Product).filter(Product.is_active == True)
+        query = self.db.query(Product).filter(Product.is_active.is_(True))
         
         # If language is specified, filter by language
         if language:
@@ -193,20 +226,104 @@ class ProductService:
                     return category_products
         
         return similar_products
+
+
+class AsyncProductService:
+    """Async counterpart of ProductService for request handlers.
     
-    def _add_to_vector_store(self, product: Product):
-        """Add product details to the vector store for RAG."""
-        # Create a detailed text representation of the product
-        product_text = f"""
-Product: {product.name}
-ID: {product.id}
-Category: {product.category or 'Uncategorized'}
-Price: {product.price} {product.currency}
-In Stock: {'Yes' if product.stock_quantity > 0 else 'No'}
-Stock Quantity: {product.stock_quantity} items
-Status: {'Active' if product.is_active else 'Inactive'}
-Description: {product.description or 'No description available'}
-"""
+    Database access goes through an AsyncSession so requests never hold a threadpool
+    token while waiting on Postgres. Milvus calls are blocking, so the vector store side
+    effects run in the threadpool, and the Milvus clients are only created the first
+    time a write needs them.
+    """
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self._rag_service: Optional[RAGService] = None
+        self._embedding_service: Optional[ProductEmbeddingService] = None
+    
+    async def get_product(self, product_id: int) -> Optional[Product]:
+        """Get a product by ID."""
+        return await crud_product.async_get_product(self.db, product_id)
+    
+    async def get_products(self, skip: int = 0, limit: int = 100, category: Optional[str] = None,
+                           language: Optional[str] = None, is_active: bool = True) -> List[Product]:
+        """Get a list of products with optional filtering."""
+        return await crud_product.async_get_products(self.db, skip, limit, category, language, is_active)
+    
+    async def get_product_count(self, category: Optional[str] = None, language: Optional[str] = None) -> int:
+        """Get the total count of products with optional filtering."""
+        return await crud_product.async_get_product_count(self.db, category, language)
+    
+    async def list_products(
+        self,
+        limit: int = 10,
+        cursor: Optional[int] = None,
+        skip: int = 0,
+        category: Optional[str] = None,
+        language: Optional[str] = None,
+        count_mode: ProductCountMode = ProductCountMode.EXACT
+    ) -> Tuple[List[Product], Optional[int], Optional[int]]:
+        """Get one page of active products, see crud_product.async_list_products."""
+        return await crud_product.async_list_products(self.db, limit, cursor, skip, category, language, count_mode)
+    
+    async def search_products_by_text(self, search: str, limit: int = 10, language: Optional[str] = None) -> List[Product]:
+        """Case-insensitive substring search on name and description."""
+        return await crud_product.async_search_products_by_text(self.db, search, limit, language)
+    
+    async def get_product_alternatives(self, product_id: int) -> List[Product]:
+        """Get alternative products for a given product."""
+        return await crud_product.async_get_product_alternatives(self.db, product_id)
+    
+    async def get_products_by_ids(self, product_ids: List[int]) -> List[Product]:
+        """Get active products by their IDs."""
+        return await crud_product.async_get_products_by_ids(self.db, product_ids)
+    
+    async def create_product(self, product: ProductCreate) -> Product:
+        """Create a new product and add it to the vector store."""
+        db_product = new_product(product)
+        self.db.add(db_product)
+        await self.db.commit()
+        await self.db.refresh(db_product)
+        
+        await run_in_threadpool(self._index_product, db_product)
+        return db_product
+    
+    async def update_product(self, product_id: int, product_update: ProductUpdate) -> Optional[Product]:
+        """Update an existing product."""
+        db_product = await self.get_product(product_id)
+        if not db_product:
+            return None
+        
+        apply_product_update(db_product, product_update)
+        await self.db.commit()
+        await self.db.refresh(db_product)
+        
+        await run_in_threadpool(self._index_product, db_product)
+        return db_product
+    
+    async def delete_product(self, product_id: int) -> bool:
+        """Soft delete a product by setting is_active to False."""
+        db_product = await self.get_product(product_id)
+        if not db_product:
+            return False
+        
+        db_product.is_active = False
+        db_product.updated_at = datetime.now().isoformat()
+        await self.db.commit()
         
-        # Add to vector store with the product's language
-        self.rag_service.add_text_to_milvus(product_text, language=product.language)
+        await run_in_threadpool(self._unindex_product, db_product)
+        return True
+    
+    def _vector_services(self) -> Tuple[RAGService, ProductEmbeddingService]:
+        # Runs in the threadpool: creating the services connects to Milvus
+        if self._rag_service is None:
+            self._rag_service = RAGService()
+            self._embedding_service = ProductEmbeddingService(None)
+        return self._rag_service, self._embedding_service
+    
+    def _index_product(self, product: Product) -> None:
+        index_product(*self._vector_services(), product)
+    
+    def _unindex_product(self, product: Product) -> None:
+        unindex_product(*self._vector_services(), product)
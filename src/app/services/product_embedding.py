@@ -5,21 +5,69 @@ This service handles synchronization between PostgreSQL and the Milvus vector da
 from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
 from app.models.product import Product
+from pymilvus import Collection
 from app.services.milvus_client import (
     connect_to_milvus, 
     create_collection, 
     insert_embedding, 
+    list_collections,
     search_embedding,
     get_embedding,
     drop_collection,
     reset_collection
 )
+from app.services.embedding import shorten_embedding
 import json
 
 # Define a dedicated collection name for products
 PRODUCT_COLLECTION_NAME = "product_embeddings"
 EMBEDDING_DIM = 1536  # Same dimension as the RAG embeddings
 
+
+def format_product_embedding_text(product: Product) -> str:
+    """Rich text representation of a product, used to generate its embedding."""
+    return f"""
+Product: {product.name}
+ID: {product.id}
+Category: {product.category or 'Uncategorized'}
+Price: {product.price} {product.currency}
+In Stock: {'Yes' if product.stock_quantity > 0 else 'No'}
+Stock Quantity: {product.stock_quantity} items
+Description: {product.description or 'No description available'}
+Language: {product.language or 'en'}
+"""
+
+
+def format_product_metadata(product: Product) -> str:
+    """JSON metadata stored in the `text` field of the product collection.
+    
+    `product_id` must stay the first key: delete_product_vectors matches on this prefix.
+    """
+    return json.dumps({
+        "product_id": product.id,
+        "name": product.name,
+        "price": product.price,
+        "currency": product.currency,
+        "category": product.category,
+        "stock_quantity": product.stock_quantity,
+        "is_active": product.is_active
+    })
+
+
+def delete_product_vectors(product_ids: List[int]) -> None:
+    """Delete the product collection entries of the given products."""
+    if not product_ids:
+        return
+    
+    connect_to_milvus()
+    if PRODUCT_COLLECTION_NAME not in list_collections():
+        return
+    
+    # The metadata JSON starts with the product id, so a prefix match finds its entries
+    expr = " or ".join(f'text like \'{{"product_id": {int(product_id)},%\'' for product_id in product_ids)
+    Collection(PRODUCT_COLLECTION_NAME).delete(expr)
+
+
 class ProductEmbeddingService:
     """Service for managing product embeddings in Milvus."""
     
@@ -36,77 +84,39 @@ class ProductEmbeddingService:
     
     def _format_product_for_embedding(self, product: Product) -> str:
         """Format a product for embedding generation."""
-        # Create a rich text representation of the product
-        product_text = f"""
-Product: {product.name}
-ID: {product.id}
-Category: {product.category or 'Uncategorized'}
-Price: {product.price} {product.currency}
-In Stock: {'Yes' if product.stock_quantity > 0 else 'No'}
-Stock Quantity: {product.stock_quantity} items
-Description: {product.description or 'No description available'}
-Language: {product.language or 'en'}
-"""
-        return product_text
+        return format_product_embedding_text(product)
     
     def add_product_to_milvus(self, product: Product):
         """Add a product to the Milvus vector database."""
         # Format the product as text
         product_text = self._format_product_for_embedding(product)
         
-        # Generate embedding for the product
-        embedding = get_embedding(product_text)
-        
-        # Create metadata to store with the embedding
-        metadata = {
-            "product_id": product.id,
-            "name": product.name,
-            "price": product.price,
-            "currency": product.currency,
-            "category": product.category,
-            "stock_quantity": product.stock_quantity,
-            "is_active": product.is_active
-        }
+        # Generate embedding for the product; without one the product stays unindexed
+        # until the next sync (see sync_all_products)
+        try:
+            embedding = shorten_embedding(get_embedding(product_text), EMBEDDING_DIM)
+        except Exception as e:
+            print(f"Error embedding product {product.id}, not indexed: {e}")
+            return False
         
-        # Convert metadata to string for storage
-        metadata_str = json.dumps(metadata)
+        # Create metadata to store with the embedding, as a string for storage
+        metadata_str = format_product_metadata(product)
         
         # Insert the embedding into Milvus
-        insert_embedding(
+        if not insert_embedding(
             embedding=embedding, 
             text=metadata_str, 
             collection_name=PRODUCT_COLLECTION_NAME,
             language=product.language or "en"
-        )
+        ):
+            return False
         
         print(f"Added product {product.id}: {product.name} to Milvus collection {PRODUCT_COLLECTION_NAME}")
         return True
     
     def remove_product_from_milvus(self, product_id: int):
-        """
-        Remove a product from Milvus.
-        
-        Note: Milvus doesn't support direct deletion by ID in the free version.
-        We'll need to recreate the collection and re-add all products except the one to delete.
-        """
-        # This is a workaround since Milvus doesn't support direct deletion in the free version
-        if not self.db:
-            print("Database session required to remove products from Milvus")
-            return False
-            
-        # Get all active products except the one to delete
-        products = self.db.query(Product).filter(
-            Product.id != product_id,
-            Product.is_active == True
-        ).all()
-        
-        # Reset the collection (drop and recreate)
-        reset_collection(collection_name=PRODUCT_COLLECTION_NAME)
-        
-        # Re-add all remaining products
-        for product in products:
-            self.add_product_to_milvus(product)
-            
+        """Remove a product from Milvus."""
+        delete_product_vectors([product_id])
         print(f"Removed product {product_id} from Milvus collection {PRODUCT_COLLECTION_NAME}")
         return True
     
@@ -120,28 +130,38 @@ Language: {product.language or 'en'}
             language: Optional language filter
             
         Returns:
-            List of product dictionaries
+            List of product dictionaries. Products found by vector search carry its calibrated
+            relevance as `score` and `relevant` (see score_calibration); the others score 0.
         """
         # Generate embedding for the query
-        query_embedding = get_embedding(query)
+        query_embedding = shorten_embedding(get_embedding(query), EMBEDDING_DIM)
         
         # Create language filter if specified
         filter_expr = None
         if language:
             filter_expr = f"language == '{language}'"
         
-        # Search for similar products in Milvus (this is currently not working well)
+        # Search for similar products in Milvus
         raw_results = search_embedding(
             embedding=query_embedding,
             top_k=top_k,
             collection_name=PRODUCT_COLLECTION_NAME,
             filter_expr=filter_expr
         )
-        
-        # Fallback to direct database search
+        vector_hits = {}
+        for hit in raw_results:
+            try:
+                metadata = json.loads(hit["text"])
+            except (ValueError, TypeError):
+                continue
+            if isinstance(metadata, dict) and metadata.get("product_id") is not None:
+                vector_hits.setdefault(metadata["product_id"], {
+                    **metadata, "score": hit["score"], "similarity": hit["similarity"], "relevant": hit["relevant"],
+                })
+        
+        # Without a database session, return the vector matches on their own
         if not self.db:
-            print("Database session required for product search")
-            return []
+            return list(vector_hits.values())[:top_k]
             
         # Get all active products
         all_products = self.db.query(Product).filter(Product.is_active == True)
@@ -165,7 +185,9 @@ Language: {product.language or 'en'}
                 "stock_quantity": product.stock_quantity,
                 "is_active": product.is_active,
                 "language": product.language,
-                "similarity_score": 0.5  # Default score
+                "similarity_score": 0.5,  # Default score
+                "score": vector_hits.get(product.id, {}).get("score", 0.0),
+                "relevant": vector_hits.get(product.id, {}).get("relevant", False),
             }
             
             # Calculate relevance score based on multiple factors
@@ -198,8 +220,8 @@ Language: {product.language or 'en'}
             if product_dict["similarity_score"] > 0.2:
                 products_list.append(product_dict)
         
-        # Sort by relevance (higher score = better match)
-        products_list.sort(key=lambda x: x["similarity_score"], reverse=True)
+        # Sort by relevance (higher score = better match), vector relevance breaking ties
+        products_list.sort(key=lambda x: (x["similarity_score"], x["score"]), reverse=True)
         
         # Limit to top_k results
         return products_list[:top_k]
@@ -214,10 +236,10 @@ Language: {product.language or 'en'}
             return False
             
         # Reset the collection to start fresh
-        reset_collection(collection_name=PRODUCT_COLLECTION_NAME)
+        reset_collection(collection_name=PRODUCT_COLLECTION_NAME, dim=EMBEDDING_DIM)
         
         # Get all active products
-        products = self.db.query(Product).filter(Product.is_active == True).all()
+        products = self.db.query(Product).filter(Product.is_active.is_(True)).all()
         
         # Add each product to Milvus
         for product in products:
@@ -0,0 +1,455 @@
+"""
+Bulk product import.
+
+Streams a CSV or JSONL catalog, upserts it into Postgres by SKU with one multi-row
+statement per batch, and embeds the inserted or changed products into the RAG and
+product collections in large batches. A batch is committed, and progress
+checkpointed, only after it is embedded, so an interrupted import resumes where
+it stopped without leaving products that are in Postgres but not in Milvus.
+"""
+import asyncio
+import csv
+import json
+import os
+import shutil
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Sequence, Union
+
+from pydantic import ValidationError
+
+from app.core.db.database import local_session
+from app.crud.crud_product import async_upsert_products
+from app.schemas.product import ProductImportRow
+
+# Uploaded import files and their checkpoints
+IMPORT_DIR = Path(__file__).parent.parent.parent / "data" / "imports"
+
+# asyncpg accepts at most 32767 bind parameters per statement (12 per product row)
+MAX_BATCH_SIZE = 2000
+# The embeddings endpoint accepts at most 2048 inputs per call, each product needs at least two
+MAX_EMBED_INPUTS = 2048
+MAX_EMBED_BATCH_SIZE = MAX_EMBED_INPUTS // 2
+MAX_REPORTED_ERRORS = 100
+
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+
+def detect_format(filename: Optional[str], file_format: Optional[str] = None) -> str:
+    """Return "csv" or "jsonl" from an explicit format or the file extension."""
+    if file_format:
+        if file_format not in FORMATS.values():
+            raise ValueError(f"Unsupported import format: {file_format}")
+        return file_format
+
+    suffix = Path(filename or "").suffix.lower()
+    if suffix not in FORMATS:
+        raise ValueError(f"Cannot tell the import format of {filename!r}, use .csv or .jsonl")
+    return FORMATS[suffix]
+
+
+@dataclass
+class UnreadableRecord:
+    """A JSONL line that is not valid JSON, yielded in its place so later rows keep their numbers."""
+    error: str
+
+
+def read_product_records(path: Path, file_format: str) -> Iterator[Union[Dict[str, Any], UnreadableRecord]]:
+    """Yield raw product records one at a time without loading the whole file."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if file_format == "csv":
+            for record in csv.DictReader(f):
+                # Empty CSV cells mean "not set", not an empty string
+                yield {key: (value if value != "" else None) for key, value in record.items()}
+        else:
+            for line in f:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError as e:
+                        yield UnreadableRecord(f"invalid JSON: {e}")
+
+
+@dataclass
+class ImportProgress:
+    """Counters of a running or finished import."""
+    status: str = "pending"
+    rows_read: int = 0
+    rows_skipped: int = 0
+    rows_inserted: int = 0
+    rows_updated: int = 0
+    rows_unchanged: int = 0
+    rows_invalid: int = 0
+    rows_embedded: int = 0
+    batches: int = 0
+    error: Optional[str] = None
+    errors: List[str] = field(default_factory=list)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def rows_per_second(self) -> float:
+        elapsed = self.elapsed
+        return self.rows_read / elapsed if elapsed > 0 else 0.0
+
+    def add_error(self, message: str) -> None:
+        self.rows_invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(message)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "rows_read": self.rows_read,
+            "rows_skipped": self.rows_skipped,
+            "rows_inserted": self.rows_inserted,
+            "rows_updated": self.rows_updated,
+            "rows_unchanged": self.rows_unchanged,
+            "rows_invalid": self.rows_invalid,
+            "rows_embedded": self.rows_embedded,
+            "batches": self.batches,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+            "error": self.error,
+            "errors": self.errors,
+        }
+
+
+@dataclass
+class IndexedProducts:
+    """
+    Products written to the vector store.
+
+    `milvus_ids` holds the ids of their product collection vectors, `rag_keys` the source
+    keys of the RAG documents created for newly inserted products.
+    """
+    count: int = 0
+    milvus_ids: List[int] = field(default_factory=list)
+    rag_keys: List[str] = field(default_factory=list)
+
+    def add(self, other: "IndexedProducts") -> None:
+        self.count += other.count
+        self.milvus_ids.extend(other.milvus_ids)
+        self.rag_keys.extend(other.rag_keys)
+
+
+class ProductVectorIndexer:
+    """
+    Embeds products and writes them to the RAG and product collections.
+
+    The RAG chunks and the product text of a batch are embedded in the same API call;
+    the product collection is smaller (1536 dims), so its vectors are shortened from
+    the full embedding. RAG texts go through knowledge_ingest under the same
+    "product:<id>" source key as ProductService, so re-importing a changed product
+    replaces its previous chunks. Updated products have their old product vectors
+    replaced.
+    """
+
+    def __init__(self):
+        # Imported here so reading and validating a file does not need Milvus or OpenAI
+        from app.services.embedding import EmbeddingService
+        from app.services.milvus_client import connect_to_milvus, create_collection
+        from app.services.product_embedding import EMBEDDING_DIM, PRODUCT_COLLECTION_NAME
+
+        connect_to_milvus()
+        create_collection()
+        create_collection(collection_name=PRODUCT_COLLECTION_NAME, dim=EMBEDDING_DIM)
+        self.embedder = EmbeddingService()
+
+    def index(self, products: Sequence[Any]) -> IndexedProducts:
+        """
+        Embed and store a batch of product rows (as returned by async_upsert_products).
+
+        If storing fails, what the batch already stored is discarded again.
+
+        Returns:
+            IndexedProducts: The number of products indexed and what to discard if the batch is rolled back
+        """
+        from app.core.db.database import sync_session
+        from app.services.chunking import chunk_text, strategy_for_source
+        from app.services.embedding import shorten_embedding
+        from app.services.knowledge_ingest import ingest_document, source_key
+        from app.services.milvus_client import insert_embeddings
+        from app.services.product import format_product_rag_text
+        from app.services.product_embedding import (
+            EMBEDDING_DIM,
+            PRODUCT_COLLECTION_NAME,
+            delete_product_vectors,
+            format_product_embedding_text,
+            format_product_metadata,
+        )
+
+        if not products:
+            return IndexedProducts()
+
+        languages = [product.language or "en" for product in products]
+        keys = [source_key("product", str(product.id)) for product in products]
+        rag_chunks = [chunk_text(format_product_rag_text(product), language, strategy_for_source(key))
+                      for product, language, key in zip(products, languages, keys)]
+        rag_texts = list(dict.fromkeys(chunk for chunks in rag_chunks for chunk in chunks if chunk.strip()))
+        product_texts = [format_product_embedding_text(product) for product in products]
+
+        # Long descriptions can take several chunks, so the batch may need more than one call
+        texts = rag_texts + product_texts
+        vectors = [vector for start in range(0, len(texts), MAX_EMBED_INPUTS)
+                   for vector in self.embedder.embed_batch(texts[start:start + MAX_EMBED_INPUTS])]
+        rag_vectors = dict(zip(rag_texts, vectors))
+        product_vectors = [shorten_embedding(vector, EMBEDDING_DIM) for vector in vectors[len(rag_texts):]]
+
+        indexed = IndexedProducts(len(products))
+        try:
+            with sync_session() as db:
+                for product, language, key, chunks in zip(products, languages, keys, rag_chunks):
+                    ingest_document(db, key, chunks, lambda texts: [rag_vectors[text] for text in texts],
+                                    language=language, title=product.name)
+                    if product.inserted:
+                        indexed.rag_keys.append(key)
+
+            delete_product_vectors([product.id for product in products if not product.inserted])
+            metadata = [format_product_metadata(product) for product in products]
+            milvus_ids = insert_embeddings(product_vectors, metadata, PRODUCT_COLLECTION_NAME, languages)
+            if not milvus_ids:
+                raise RuntimeError("Failed to insert product embeddings")
+            indexed.milvus_ids = milvus_ids
+        except Exception:
+            self.discard(indexed)
+            raise
+
+        return indexed
+
+    def discard(self, indexed: IndexedProducts) -> None:
+        """
+        Remove what `index` stored for a batch that was not committed.
+
+        The RAG documents of new products are deleted. Those of updated products keep the
+        new version: the old chunks are gone once it is stored, and the retried batch finds
+        it unchanged.
+        """
+        from app.core.db.database import sync_session
+        from app.services.knowledge_ingest import delete_documents
+        from app.services.milvus_client import delete_entries
+        from app.services.product_embedding import PRODUCT_COLLECTION_NAME
+
+        delete_entries(indexed.milvus_ids, PRODUCT_COLLECTION_NAME)
+        if indexed.rag_keys:
+            with sync_session() as db:
+                delete_documents(db, indexed.rag_keys)
+
+
+class ProductImporter:
+    """
+    Imports a product file in batches.
+
+    Args:
+        batch_size: Rows per Postgres statement (capped at MAX_BATCH_SIZE)
+        embed_batch_size: Products per embeddings API call (capped at MAX_EMBED_BATCH_SIZE)
+        embed_concurrency: Embedding calls in flight at once
+        embed: Whether to index products in the vector store
+        checkpoint_path: Where to record progress (defaults to "<file>.checkpoint.json")
+        on_progress: Called with the progress after every batch
+        indexer: Vector indexer to use (created on first use if omitted)
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 1000,
+        embed_batch_size: int = 256,
+        embed_concurrency: int = 4,
+        embed: bool = True,
+        checkpoint_path: Optional[Path] = None,
+        on_progress: Optional[Callable[[ImportProgress], None]] = None,
+        indexer: Optional[ProductVectorIndexer] = None,
+    ):
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self.embed_batch_size = max(1, min(embed_batch_size, MAX_EMBED_BATCH_SIZE))
+        self.embed_concurrency = max(1, embed_concurrency)
+        self.embed = embed
+        self.checkpoint_path = checkpoint_path
+        self.on_progress = on_progress
+        self.indexer = indexer
+
+    async def run(
+        self,
+        path: Path,
+        file_format: Optional[str] = None,
+        resume: bool = True,
+        progress: Optional[ImportProgress] = None,
+    ) -> ImportProgress:
+        """
+        Import `path`, resuming from its checkpoint unless `resume` is False.
+
+        Rows are matched by SKU; when a SKU appears twice in the same batch the last row wins.
+        Invalid rows are counted and reported but do not stop the import.
+
+        Returns:
+            ImportProgress: Final counters (status "completed" or "failed")
+        """
+        path = Path(path)
+        file_format = detect_format(path.name, file_format)
+        checkpoint_path = self.checkpoint_path or path.with_name(path.name + ".checkpoint.json")
+
+        progress = progress or ImportProgress()
+        progress.status = "running"
+        progress.error = None
+        progress.started_at = time.monotonic()
+        progress.finished_at = None
+
+        rows_done = self._load_checkpoint(checkpoint_path, path) if resume else 0
+        progress.rows_skipped = rows_done
+
+        try:
+            batch: Dict[str, Dict[str, Any]] = {}
+            row_number = 0
+            for row_number, record in enumerate(read_product_records(path, file_format), start=1):
+                if row_number <= rows_done:
+                    continue
+
+                progress.rows_read += 1
+                if isinstance(record, UnreadableRecord):
+                    progress.add_error(f"row {row_number}: {record.error}")
+                    continue
+                try:
+                    row = ProductImportRow.model_validate(record)
+                except ValidationError as e:
+                    progress.add_error(f"row {row_number}: {e.errors(include_url=False)}")
+                    continue
+
+                batch[row.sku] = row.model_dump()
+                if len(batch) >= self.batch_size:
+                    await self._import_batch(list(batch.values()), progress)
+                    batch = {}
+                    self._save_checkpoint(checkpoint_path, path, row_number)
+                    self._report(progress)
+
+            if batch:
+                await self._import_batch(list(batch.values()), progress)
+            self._save_checkpoint(checkpoint_path, path, row_number)
+
+            progress.status = "completed"
+            checkpoint_path.unlink(missing_ok=True)
+        except Exception as e:
+            progress.status = "failed"
+            progress.error = str(e)
+            print(f"ERROR importing products from {path}: {e}")
+        finally:
+            progress.finished_at = time.monotonic()
+            self._report(progress)
+
+        return progress
+
+    async def _import_batch(self, rows: List[Dict[str, Any]], progress: ImportProgress) -> None:
+        # The upsert is only committed once the batch is embedded: if embedding fails the
+        # session rolls back, so the resumed import still sees these rows as changed. The
+        # vectors of a batch that is not committed are deleted, so the retry does not
+        # insert them a second time.
+        async with local_session() as db:
+            changed = await async_upsert_products(db, rows)
+            indexed = await self._index(changed) if self.embed and changed else IndexedProducts()
+            try:
+                await db.commit()
+            except Exception:
+                if indexed.milvus_ids or indexed.rag_keys:
+                    await asyncio.to_thread(self.indexer.discard, indexed)
+                raise
+
+        inserted = sum(1 for row in changed if row.inserted)
+        progress.rows_inserted += inserted
+        progress.rows_updated += len(changed) - inserted
+        progress.rows_unchanged += len(rows) - len(changed)
+        progress.rows_embedded += indexed.count
+        progress.batches += 1
+
+    async def _index(self, products: Sequence[Any]) -> IndexedProducts:
+        if self.indexer is None:
+            self.indexer = await asyncio.to_thread(ProductVectorIndexer)
+
+        semaphore = asyncio.Semaphore(self.embed_concurrency)
+
+        async def index_chunk(chunk: Sequence[Any]) -> IndexedProducts:
+            async with semaphore:
+                return await asyncio.to_thread(self.indexer.index, chunk)
+
+        chunks = [products[i:i + self.embed_batch_size] for i in range(0, len(products), self.embed_batch_size)]
+        results = await asyncio.gather(*(index_chunk(chunk) for chunk in chunks), return_exceptions=True)
+
+        indexed = IndexedProducts()
+        for result in results:
+            if not isinstance(result, BaseException):
+                indexed.add(result)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            # Let the other chunks finish, then drop what they inserted with the failed batch
+            await asyncio.to_thread(self.indexer.discard, indexed)
+            raise errors[0]
+        return indexed
+
+    def _report(self, progress: ImportProgress) -> None:
+        if self.on_progress is not None:
+            self.on_progress(progress)
+
+    @staticmethod
+    def _load_checkpoint(checkpoint_path: Path, path: Path) -> int:
+        try:
+            with open(checkpoint_path) as f:
+                checkpoint = json.load(f)
+        except (OSError, ValueError):
+            return 0
+
+        # Only resume on the very same file
+        if checkpoint.get("source") != str(path.resolve()) or checkpoint.get("size") != path.stat().st_size:
+            return 0
+        return int(checkpoint.get("rows_done", 0))
+
+    @staticmethod
+    def _save_checkpoint(checkpoint_path: Path, path: Path, rows_done: int) -> None:
+        checkpoint = {"source": str(path.resolve()), "size": path.stat().st_size, "rows_done": rows_done}
+        tmp_path = checkpoint_path.with_name(checkpoint_path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, checkpoint_path)
+
+
+@dataclass
+class ImportJob:
+    """An import started through the API."""
+    id: str
+    filename: str
+    path: Path
+    file_format: str
+    progress: ImportProgress = field(default_factory=ImportProgress)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"job_id": self.id, "filename": self.filename, "format": self.file_format, **self.progress.to_dict()}
+
+
+# Import jobs of this process by id
+product_import_jobs: Dict[str, ImportJob] = {}
+
+
+def create_import_job(upload: BinaryIO, filename: str, file_format: str) -> ImportJob:
+    """Store an uploaded file under IMPORT_DIR and register a pending job for it (blocking)."""
+    job_id = uuid.uuid4().hex
+    IMPORT_DIR.mkdir(parents=True, exist_ok=True)
+    path = IMPORT_DIR / f"{job_id}.{file_format}"
+    with open(path, "wb") as f:
+        shutil.copyfileobj(upload, f)
+
+    job = ImportJob(id=job_id, filename=filename, path=path, file_format=file_format)
+    product_import_jobs[job_id] = job
+    return job
+
+
+async def run_import_job(job: ImportJob, resume: bool = True) -> None:
+    """Run or resume an import job; the uploaded file is removed once it completes."""
+    job.progress = ImportProgress()
+    progress = await ProductImporter().run(job.path, job.file_format, resume=resume, progress=job.progress)
+    if progress.status == "completed":
+        job.path.unlink(missing_ok=True)
@@ -2,7 +2,7 @@
 Product search service for the bot to find products in the database.
 This replaces the mock product data with real database queries.
 """
-from typing import List, Dict, Tuple, Any, Optional
+from typing import Callable, List, Dict, Tuple, Any, Optional
 from sqlalchemy.orm import Session
 from app.models.product import Product
 from app.services.product import ProductService
@@ -17,13 +17,16 @@ class ProductSearchService:
         self.product_service = ProductService(db)
         self.embedding_service = ProductEmbeddingService(db)
 
-    def search_product_by_name(self, query: str, language: Optional[str] = None) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    def search_product_by_name(self, query: str, language: Optional[str] = None,
+                               vector_search: Optional[Callable[[], Optional[List[Dict[str, Any]]]]] = None) -> Tuple[bool, Optional[Dict[str, Any]]]:
         """
         Search for a product by name in the database and vector store.
 
         Args:
             query: The search query (product name)
             language: Optional language filter
+            vector_search: Called when the vector store is reached; returns matches already found
+                for the query (e.g. speculatively), or None to search the vector store
 
         Returns:
             Tuple containing:
@@ -123,11 +126,13 @@ class ProductSearchService:
             # Search in the vector database with more results to analyze
             # Handle potential schema differences based on the memory about vector store issues
             try:
-                vector_results = self.embedding_service.search_products(
-                    query=query,
-                    top_k=3,  # Get top 3 matches to analyze
-                    language=language
-                )
+                vector_results = vector_search() if vector_search else None
+                if vector_results is None:
+                    vector_results = self.embedding_service.search_products(
+                        query=query,
+                        top_k=3,  # Get top 3 matches to analyze
+                        language=language
+                    )
             except Exception as schema_error:
                 # If there's a schema error (like missing language field or dimension mismatch),
                 # try without the language parameter
@@ -147,11 +152,12 @@ class ProductSearchService:
                 best_score = 0
 
                 for result in vector_results:
-                    similarity_score = result.get("score", 0)
+                    # Calibrated relevance in [0, 1] (see score_calibration)
+                    similarity_score = result.get("score", 0.0)
                     product_id = result.get("product_id")
 
-                    if not product_id or similarity_score < 0.75:
-                        continue  # Skip low similarity matches
+                    if not product_id or not result.get("relevant"):
+                        continue  # Skip matches below the collection's relevance threshold
 
                     print(f"--- Vector result: product_id={product_id}, score={similarity_score} ---")
 
@@ -0,0 +1,76 @@
+"""
+LLM and embedding providers, selected by name in the settings (LLM_PROVIDER, EMBEDDING_PROVIDER).
+
+Built in are "openai", rate limited client-side (see limiter.py), and "fake", the
+deterministic offline stand-in for load tests (see fake.py). Calls are bounded by the
+turn's deadline (deadline.py), chat requests can be hedged (hedging.py), and identical
+concurrent requests share one upstream call (coalescing.py). Other backends register a
+factory with register_llm_provider or register_embedding_provider before the bot graph
+is imported.
+"""
+import threading
+from typing import Callable, Dict, Optional
+
+from app.core.config import settings
+
+from .base import EmbeddingProvider, LLMProvider
+from .coalescing import CoalescedChatModel, CoalescedEmbeddingProvider, coalesced_chat_model, coalescing_stats
+from .deadline import DeadlineExceeded, deadline_scope, remaining
+from .fake import FakeChatModel, FakeEmbeddingProvider, FakeLLMProvider, parse_latency
+from .hedging import HedgedChatModel, hedged_chat_model, hedging_stats
+from .limiter import RateLimitTimeout, get_limiter, limiter_stats
+from .openai_provider import OpenAIEmbeddingProvider, OpenAILLMProvider
+
+LLM_PROVIDERS: Dict[str, Callable[[], LLMProvider]] = {
+    "openai": OpenAILLMProvider,
+    "fake": FakeLLMProvider,
+}
+EMBEDDING_PROVIDERS: Dict[str, Callable[[], EmbeddingProvider]] = {
+    "openai": OpenAIEmbeddingProvider,
+    "fake": FakeEmbeddingProvider,
+}
+
+_embedding_providers: Dict[str, EmbeddingProvider] = {}
+_lock = threading.Lock()
+
+
+def register_llm_provider(name: str, factory: Callable[[], LLMProvider]) -> None:
+    LLM_PROVIDERS[name] = factory
+
+
+def register_embedding_provider(name: str, factory: Callable[[], EmbeddingProvider]) -> None:
+    EMBEDDING_PROVIDERS[name] = factory
+    _embedding_providers.pop(name, None)
+
+
+def get_llm_provider(name: Optional[str] = None) -> LLMProvider:
+    """A new provider `name`, by default LLM_PROVIDER."""
+    name = name or settings.LLM_PROVIDER
+    if name not in LLM_PROVIDERS:
+        raise ValueError(f"Unknown LLM provider '{name}', expected one of {sorted(LLM_PROVIDERS)}")
+    return LLM_PROVIDERS[name]()
+
+
+def get_embedding_provider(name: Optional[str] = None) -> EmbeddingProvider:
+    """The shared provider `name`, by default EMBEDDING_PROVIDER, coalescing if REQUEST_COALESCING is on."""
+    name = name or settings.EMBEDDING_PROVIDER
+    if name not in _embedding_providers:
+        if name not in EMBEDDING_PROVIDERS:
+            raise ValueError(f"Unknown embedding provider '{name}', expected one of {sorted(EMBEDDING_PROVIDERS)}")
+        with _lock:
+            if name not in _embedding_providers:
+                provider = EMBEDDING_PROVIDERS[name]()
+                if settings.REQUEST_COALESCING:
+                    provider = CoalescedEmbeddingProvider(provider)
+                _embedding_providers[name] = provider
+    return _embedding_providers[name]
+
+
+__all__ = [
+    "LLMProvider", "EmbeddingProvider", "OpenAILLMProvider", "OpenAIEmbeddingProvider", "FakeLLMProvider",
+    "FakeEmbeddingProvider", "FakeChatModel", "parse_latency", "LLM_PROVIDERS", "EMBEDDING_PROVIDERS",
+    "register_llm_provider", "register_embedding_provider", "get_llm_provider", "get_embedding_provider",
+    "RateLimitTimeout", "get_limiter", "limiter_stats", "DeadlineExceeded", "deadline_scope", "remaining",
+    "HedgedChatModel", "hedged_chat_model", "hedging_stats", "CoalescedChatModel", "CoalescedEmbeddingProvider",
+    "coalesced_chat_model", "coalescing_stats",
+]
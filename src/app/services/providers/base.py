@@ -0,0 +1,23 @@
+from abc import ABC, abstractmethod
+from typing import List
+
+from langchain_core.language_models import BaseChatModel
+
+
+class LLMProvider(ABC):
+    """Creates the chat models of the bot graph (see graph_service/llm.py)."""
+
+    @abstractmethod
+    def chat_model(self, model: str) -> BaseChatModel:
+        """LangChain chat model for `model`, answering with temperature 0."""
+
+
+class EmbeddingProvider(ABC):
+    """Turns texts into embedding vectors for Milvus."""
+
+    @abstractmethod
+    def embed_batch(self, texts: List[str], model: str) -> List[List[float]]:
+        """One embedding per text, in input order."""
+
+    def embed(self, text: str, model: str) -> List[float]:
+        return self.embed_batch([text], model)[0]
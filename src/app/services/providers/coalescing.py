@@ -0,0 +1,178 @@
+"""
+Single-flight coalescing of identical concurrent LLM and embedding requests.
+
+When many users send the same message at once, they would all embed the same text and
+send the same classification prompt. Requests are keyed by model and a hash of their
+input; the first one goes upstream, and identical requests arriving while it is in flight
+wait for it and get (a copy of) its result, or its error. Only deterministic requests are
+coalesced: embeddings, and chat models at temperature 0.
+
+A waiter gives up at its own turn's deadline. If the shared request failed because the
+first caller's deadline passed, a waiter with budget left makes its own request.
+coalescing_stats() reports calls, upstream requests and the coalesce rate per model.
+"""
+import copy
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.core.config import settings
+
+from .base import EmbeddingProvider
+from .deadline import DeadlineExceeded, remaining
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Runs one call per key at a time; concurrent callers with the same key share its outcome."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key: str, call: Callable[[], T]) -> Tuple[T, bool]:
+        """
+        Result of `call`, or of the identical call already in flight.
+
+        Returns:
+            The result, and whether it is shared with the caller that made the call
+
+        Raises:
+            DeadlineExceeded: If the turn's deadline passes while waiting
+        """
+        with self._lock:
+            self.calls += 1
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.coalesced += 1
+        if leader:
+            try:
+                result = call()
+            except BaseException as e:
+                self._done(key)
+                future.set_exception(e)
+                raise
+            self._done(key)
+            future.set_result(result)
+            return result, False
+
+        left = remaining()
+        try:
+            return future.result(timeout=None if left is None else max(left, 0.0)), True
+        except FutureTimeout:
+            raise DeadlineExceeded("Turn deadline exceeded waiting for a coalesced request") from None
+        except DeadlineExceeded:
+            # The first caller's budget ran out, not necessarily ours
+            left = remaining()
+            if left is not None and left <= 0:
+                raise
+            return call(), False
+
+    def _done(self, key: str) -> None:
+        with self._lock:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            calls, coalesced = self.calls, self.coalesced
+        return {"calls": calls, "upstream": calls - coalesced, "coalesced": coalesced,
+                "coalesce_rate": round(coalesced / calls, 3) if calls else 0.0}
+
+
+_flights: Dict[str, SingleFlight] = {}
+_flights_lock = threading.Lock()
+
+
+def get_flight(name: str) -> SingleFlight:
+    if name not in _flights:
+        with _flights_lock:
+            if name not in _flights:
+                _flights[name] = SingleFlight()
+    return _flights[name]
+
+
+def coalescing_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: flight.stats() for name, flight in list(_flights.items())}
+
+
+def request_key(*parts: Any) -> str:
+    """Hash of the JSON of `parts` (non-JSON values by their str)."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _temperature(model: BaseChatModel) -> float:
+    # Wrappers such as HedgedChatModel answer like their primary model; providers default to 0
+    while getattr(model, "temperature", None) is None and getattr(model, "primary", None) is not None:
+        model = model.primary
+    return getattr(model, "temperature", None) or 0.0
+
+
+class CoalescedChatModel(BaseChatModel):
+    """Chat model sharing one `model` call between identical concurrent requests."""
+
+    model: BaseChatModel
+
+    @property
+    def _llm_type(self) -> str:
+        return "coalesced"
+
+    @property
+    def model_name(self) -> str:
+        return getattr(self.model, "model_name", None) or type(self.model).__name__
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None,
+                  **kwargs: Any) -> ChatResult:
+        key = request_key([(message.type, message.content) for message in messages], stop, kwargs)
+        message, shared = get_flight(f"chat:{self.model_name}").do(
+            key, lambda: self.model.invoke(messages, stop=stop, **kwargs))
+        if shared:
+            # LangChain sets ids on the messages it returns, so every caller gets its own; the
+            # tokens were only spent once, by the caller that made the request
+            message = copy.deepcopy(message)
+            if isinstance(message, AIMessage):
+                message.usage_metadata = None
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def coalesced_chat_model(model: BaseChatModel) -> BaseChatModel:
+    """`model`, coalescing identical concurrent requests if REQUEST_COALESCING is on and it is deterministic."""
+    if not settings.REQUEST_COALESCING or _temperature(model) != 0:
+        return model
+    return CoalescedChatModel(model=model)
+
+
+class CoalescedEmbeddingProvider(EmbeddingProvider):
+    """
+    Embedding provider sharing one `provider` call between identical concurrent batches.
+
+    Other attributes are those of `provider`.
+    """
+
+    def __init__(self, provider: EmbeddingProvider) -> None:
+        self.provider = provider
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "provider":
+            raise AttributeError(name)
+        return getattr(self.provider, name)
+
+    def embed_batch(self, texts: List[str], model: str) -> List[List[float]]:
+        if not texts:
+            return []
+        vectors, shared = get_flight(f"embedding:{model}").do(
+            request_key(texts), lambda: self.provider.embed_batch(texts, model))
+        return [list(vector) for vector in vectors] if shared else vectors
@@ -0,0 +1,48 @@
+"""
+Per-turn deadlines, carried through the bot graph in a context variable.
+
+The bot endpoint opens deadline_scope(BOT_TURN_DEADLINE_SECONDS) around the graph; every LLM
+and embedding call under it gets the remaining budget as its timeout and fails with
+DeadlineExceeded once the budget is spent, so one slow upstream call cannot hold a turn.
+
+LangGraph runs sync nodes in worker threads with a copy of the caller's context, so the
+deadline follows them; thread pools of our own submit through contextvars.copy_context().
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The turn's time budget ran out."""
+
+
+@contextmanager
+def deadline_scope(seconds: float) -> Iterator[float]:
+    """Deadline `seconds` from now, or the enclosing one if that is earlier."""
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left until the deadline (negative once past), or None without a deadline."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def check_deadline(what: str = "call") -> Optional[float]:
+    """Like remaining(), but raises DeadlineExceeded once the deadline has passed."""
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded(f"Turn deadline exceeded before {what}")
+    return left
@@ -0,0 +1,237 @@
+"""
+Deterministic local stand-ins for the LLM and embedding APIs, for load tests without network.
+
+Outputs depend only on the input (and FAKE_SEED): the same prompt always gets the same
+answer, and the same text the same embedding. Latencies are drawn from configurable
+distributions, seeded by the input too, so a replayed load test sleeps the same way; like
+the real backends, a call outlasting the turn's deadline raises DeadlineExceeded.
+
+FakeChatModel recognises the prompts of the bot graph (graph_service/nodes.py) and answers
+them in the format the nodes parse: intent classification is done by the local intent
+classifier, entities are taken from the user message, yes/no checks answer "no", and
+anything else gets filler text of FAKE_LLM_RESPONSE_WORDS words.
+
+FakeEmbeddingProvider hashes words and character trigrams into a unit vector, so texts
+sharing words are close, which keeps vector search results meaningful.
+"""
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+from dataclasses import dataclass
+from functools import cache
+from typing import Any, Callable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.core.config import settings
+
+from .base import EmbeddingProvider, LLMProvider
+from .deadline import DeadlineExceeded, check_deadline
+
+_WORD_PATTERN = re.compile(r"\w+")
+_USER_MESSAGE = re.compile(r'(?:user message|their query): "(.*)"\s*$', re.IGNORECASE | re.MULTILINE)
+_COUPON_CODE = re.compile(r"\b[A-Z]{2,}\d+[A-Z\d]*\b")
+
+# Words dropped from a message to get the product name it asks about
+_PRODUCT_STOP_WORDS = frozenset("""
+    a an any are available buy can do does for get have hello hi i in is it looking me need of please sell
+    stock store the there to want we you your هل لديكم عندكم يوجد متوفر متوفرة عن أريد اريد
+""".split())
+
+_FILLER_WORDS = """
+    thank you for reaching out our team is happy to help with your question about orders products shipping
+    returns and payments please let us know if there is anything else we can do for you today
+""".split()
+
+_LATENCY_KINDS = ("fixed", "uniform", "normal", "lognormal")
+
+
+def _digest(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+@dataclass(frozen=True)
+class LatencyDistribution:
+    """Latency in ms; `a` and `b` are the parameters named in parse_latency."""
+
+    kind: str
+    a: float
+    b: float = 0.0
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            value = self.a
+        elif self.kind == "uniform":
+            value = rng.uniform(self.a, self.b)
+        elif self.kind == "normal":
+            value = rng.gauss(self.a, self.b)
+        else:
+            value = self.a * rng.lognormvariate(0.0, self.b)
+        return max(value, 0.0)
+
+
+@cache
+def parse_latency(spec: str) -> LatencyDistribution:
+    """
+    Parse "fixed:MS", "uniform:LOW:HIGH", "normal:MEAN:STD" or "lognormal:MEDIAN:SIGMA" (all in ms,
+    except the dimensionless SIGMA).
+    """
+    kind, *params = spec.strip().split(":")
+    expected = 1 if kind == "fixed" else 2
+    if kind not in _LATENCY_KINDS or len(params) != expected:
+        raise ValueError(f"Invalid latency '{spec}', expected one of fixed:MS, uniform:LOW:HIGH, "
+                         f"normal:MEAN:STD or lognormal:MEDIAN:SIGMA")
+    return LatencyDistribution(kind, *(float(param) for param in params))
+
+
+def _bounded_delay(delay: float, what: str) -> float:
+    """`delay`, unless the turn's deadline comes first: then raise after sleeping until it."""
+    left = check_deadline(what)
+    if left is not None and delay > left:
+        time.sleep(left)
+        raise DeadlineExceeded(f"Turn deadline exceeded during {what}")
+    return delay
+
+
+def _user_message(prompt: str) -> str:
+    match = _USER_MESSAGE.search(prompt)
+    return match.group(1) if match else prompt
+
+
+def _classify(prompt: str) -> str:
+    from app.services.intent_classifier import FRUSTRATION, get_intent_classifier, normalize_text
+
+    message = _user_message(prompt)
+    classifier = get_intent_classifier()
+    prediction = classifier.rules.predict(message)
+    if prediction:
+        intent = prediction[0]
+    elif classifier.model:
+        intent = classifier.model.predict(message)[0]
+    else:
+        intent = "knowledge_base_query"
+    frustrated = "yes" if FRUSTRATION.search(normalize_text(message)) else "no"
+    return json.dumps({"intent": intent, "is_frustrated": frustrated})
+
+
+def _product_name(prompt: str) -> str:
+    words = [word for word in _WORD_PATTERN.findall(_user_message(prompt).lower()) if word not in _PRODUCT_STOP_WORDS]
+    return " ".join(words) or "general product query"
+
+
+def _order_number(prompt: str) -> str:
+    match = re.search(r"\d+", _user_message(prompt))
+    return match.group(0) if match else "unknown"
+
+
+def _coupon_code(prompt: str) -> str:
+    message = _user_message(prompt)
+    match = _COUPON_CODE.search(message.upper())
+    if match:
+        return match.group(0)
+    return "LIST_ALL" if re.search(r"\b(?:what|which|available|list)\b", message.lower()) else "GENERAL_COUPON_QUERY"
+
+
+def _filler(prompt: str) -> str:
+    rng = random.Random(_digest(prompt) ^ settings.FAKE_SEED)
+    words = [rng.choice(_FILLER_WORDS) for _ in range(settings.FAKE_LLM_RESPONSE_WORDS)]
+    return " ".join(words).capitalize() + "."
+
+
+# First matching prompt marker wins; the fallback is filler text
+RESPONDERS: List[Tuple[str, Callable[[str], str]]] = [
+    ("Classify the user's primary intent", _classify),
+    ("Extract the product name", _product_name),
+    ("Extract the order number", _order_number),
+    ("Extract the coupon code", _coupon_code),
+    ("reformulate", _user_message),
+    ("Answer with only 'yes'", lambda prompt: "no"),
+]
+
+
+def fake_response(prompt: str) -> str:
+    for marker, responder in RESPONDERS:
+        if marker in prompt:
+            return responder(prompt)
+    return _filler(prompt)
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model answering with fake_response() after a sampled delay."""
+
+    model_name: str = "fake"
+    latency: str = "fixed:0"
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _respond(self, messages: List[BaseMessage]) -> Tuple[ChatResult, float]:
+        prompt = "\n".join(str(message.content) for message in messages)
+        content = fake_response(prompt)
+        rng = random.Random(_digest(f"{self.model_name}\n{prompt}") ^ settings.FAKE_SEED)
+        delay = parse_latency(self.latency).sample(rng) / 1000
+        # Roughly 4 characters per token
+        usage = {"input_tokens": len(prompt) // 4 + 1, "output_tokens": len(content) // 4 + 1}
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        message = AIMessage(content=content, usage_metadata=usage, response_metadata={"model_name": self.model_name})
+        return ChatResult(generations=[ChatGeneration(message=message)]), delay
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None,
+                  **kwargs: Any) -> ChatResult:
+        result, delay = self._respond(messages)
+        time.sleep(_bounded_delay(delay, self.model_name))
+        return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None,
+                         **kwargs: Any) -> ChatResult:
+        result, delay = self._respond(messages)
+        left = check_deadline(self.model_name)
+        if left is not None and delay > left:
+            await asyncio.sleep(left)
+            raise DeadlineExceeded(f"Turn deadline exceeded during {self.model_name}")
+        await asyncio.sleep(delay)
+        return result
+
+
+class FakeLLMProvider(LLMProvider):
+    def chat_model(self, model: str) -> BaseChatModel:
+        return FakeChatModel(model_name=model, latency=settings.FAKE_LLM_LATENCY)
+
+
+class FakeEmbeddingProvider(EmbeddingProvider):
+    """
+    Feature-hashed embeddings of words and character trigrams, one call's delay per batch.
+
+    Args:
+        dim: Vector size
+        latency: Latency spec, see parse_latency
+    """
+
+    def __init__(self, dim: Optional[int] = None, latency: Optional[str] = None) -> None:
+        self.dim = dim or settings.FAKE_EMBEDDING_DIM
+        self.latency = parse_latency(latency or settings.FAKE_EMBEDDING_LATENCY)
+
+    def vector(self, text: str) -> np.ndarray:
+        words = _WORD_PATTERN.findall(text.lower())
+        padded = f" {' '.join(words)} "
+        features = words + [padded[i:i + 3] for i in range(len(padded) - 2)]
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in features:
+            digest = _digest(feature) ^ settings.FAKE_SEED
+            vector[digest % self.dim] += 1.0 if digest >> 63 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def embed_batch(self, texts: List[str], model: str) -> List[List[float]]:
+        if not texts:
+            return []
+        rng = random.Random(_digest("\n".join(texts)) ^ settings.FAKE_SEED)
+        time.sleep(_bounded_delay(self.latency.sample(rng) / 1000, "embedding"))
+        return [self.vector(text).tolist() for text in texts]
@@ -0,0 +1,231 @@
+"""
+Hedged chat requests: when a call to a model is slower than its recent tail latency, a
+duplicate goes to a secondary model or deployment, and the first answer wins.
+
+HedgedChatModel sends the primary request at once. If no answer comes within the primary
+model's LLM_HEDGE_PERCENTILE latency, it sends the secondary (LLM_HEDGE_MODEL, or the same
+model again). The loser is cancelled if it has not started; HTTP requests already in flight
+cannot be interrupted from another thread, so its result is dropped and the request ends
+with its timeout, which is the turn's remaining budget (see deadline.py).
+
+Hedging only starts once the model has LLM_HEDGE_MIN_SAMPLES latencies on record, and
+never when the hedge delay would leave the turn no budget for the duplicate, so at the
+p95 it costs about 5% more requests. hedging_stats() has per-model latency histograms of
+the primary requests and of the hedged calls, to compare the tails.
+"""
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Deque, Dict, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.core.config import settings
+
+from .base import LLMProvider
+from .deadline import DeadlineExceeded, check_deadline, remaining
+
+# Upper bounds of the histogram buckets in ms; the last bucket is unbounded
+BUCKETS_MS = (25, 50, 100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000, 64000)
+# Latencies kept for the percentiles
+LATENCY_WINDOW = 1000
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=settings.LLM_HEDGE_WORKERS, thread_name_prefix="hedging")
+    return _executor
+
+
+class LatencyHistogram:
+    """Bucketed latency counts since start, with percentiles of the last LATENCY_WINDOW latencies."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counts = [0] * (len(BUCKETS_MS) + 1)
+        self._window: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, ms: float) -> None:
+        with self._lock:
+            self._counts[bisect_left(BUCKETS_MS, ms)] += 1
+            self._window.append(ms)
+
+    def __len__(self) -> int:
+        return len(self._window)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            window = sorted(self._window)
+        if not window:
+            return None
+        return window[min(len(window) - 1, int(len(window) * q))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            window = sorted(self._window)
+        labels = [f"le_{bound}ms" for bound in BUCKETS_MS] + ["inf"]
+        stats: Dict[str, Any] = {"count": sum(counts), "buckets": dict(zip(labels, counts))}
+        if window:
+            for name, q in (("p50_ms", 0.5), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+                stats[name] = round(window[min(len(window) - 1, int(len(window) * q))], 1)
+        return stats
+
+
+class HedgeStats:
+    """Latencies and counters of one primary model, thread-safe."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # Every primary request, including the ones that lost to their hedge, so the
+        # percentile is not biased towards the fast ones
+        self.primary = LatencyHistogram()
+        # What the callers saw
+        self.hedged_calls = LatencyHistogram()
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.deadline_exceeded = 0
+
+    def count(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = {"calls": self.calls, "hedged": self.hedged, "hedge_wins": self.hedge_wins,
+                                     "deadline_exceeded": self.deadline_exceeded}
+        stats["primary_latency"] = self.primary.to_dict()
+        stats["call_latency"] = self.hedged_calls.to_dict()
+        return stats
+
+
+_stats: Dict[str, HedgeStats] = {}
+_stats_lock = threading.Lock()
+
+
+def get_hedge_stats(model: str) -> HedgeStats:
+    if model not in _stats:
+        with _stats_lock:
+            if model not in _stats:
+                _stats[model] = HedgeStats()
+    return _stats[model]
+
+
+def hedging_stats() -> Dict[str, Dict[str, Any]]:
+    return {model: model_stats.to_dict() for model, model_stats in list(_stats.items())}
+
+
+def _model_name(model: BaseChatModel) -> str:
+    return getattr(model, "model_name", None) or getattr(model, "model", None) or type(model).__name__
+
+
+class HedgedChatModel(BaseChatModel):
+    """
+    Chat model sending slow requests to `primary` again to `secondary`, first answer wins.
+
+    Streaming, tools and structured output are not hedged; use the primary model for them.
+    """
+
+    primary: BaseChatModel
+    secondary: BaseChatModel
+    percentile: float = 0.95
+    min_samples: int = 20
+
+    @property
+    def _llm_type(self) -> str:
+        return "hedged"
+
+    @property
+    def model_name(self) -> str:
+        return _model_name(self.primary)
+
+    def hedge_delay(self) -> Optional[float]:
+        """Seconds to wait for the primary before hedging, or None to not hedge."""
+        stats = get_hedge_stats(self.model_name)
+        if len(stats.primary) < self.min_samples:
+            return None
+        delay = stats.primary.percentile(self.percentile) / 1000
+        left = remaining()
+        if left is not None and delay >= left:
+            return None
+        return delay
+
+    def _submit(self, model: BaseChatModel, messages: List[BaseMessage], stop: Optional[List[str]],
+                **kwargs: Any) -> Future:
+        # Each request runs with a copy of the caller's context, for the deadline
+        context = contextvars.copy_context()
+        return _get_executor().submit(context.run, self._timed, model, messages, stop, **kwargs)
+
+    def _timed(self, model: BaseChatModel, messages: List[BaseMessage], stop: Optional[List[str]],
+               **kwargs: Any) -> BaseMessage:
+        start = time.perf_counter()
+        try:
+            return model.invoke(messages, stop=stop, **kwargs)
+        finally:
+            if model is self.primary:
+                get_hedge_stats(self.model_name).primary.record((time.perf_counter() - start) * 1000)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None,
+                  **kwargs: Any) -> ChatResult:
+        stats = get_hedge_stats(self.model_name)
+        stats.count("calls")
+        start = time.perf_counter()
+        check_deadline(self.model_name)
+        primary = self._submit(self.primary, messages, stop, **kwargs)
+        futures = [primary]
+        delay = self.hedge_delay()
+        if delay is not None:
+            done, _ = wait(futures, timeout=delay)
+            if not done:
+                print(f"--- {self.model_name}: no answer after {delay * 1000:.0f} ms, hedging to "
+                      f"{_model_name(self.secondary)} ---")
+                stats.count("hedged")
+                futures.append(self._submit(self.secondary, messages, stop, **kwargs))
+
+        error: Optional[BaseException] = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=remaining(), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    for loser in pending:
+                        loser.cancel()
+                    if future is not primary:
+                        stats.count("hedge_wins")
+                    stats.hedged_calls.record((time.perf_counter() - start) * 1000)
+                    return ChatResult(generations=[ChatGeneration(message=future.result())])
+                error = error or future.exception()
+        for future in pending:
+            future.cancel()
+
+        stats.hedged_calls.record((time.perf_counter() - start) * 1000)
+        if error is None or isinstance(error, DeadlineExceeded):
+            stats.count("deadline_exceeded")
+            raise DeadlineExceeded(f"Turn deadline exceeded during {self.model_name} call") from error
+        raise error
+
+
+def hedged_chat_model(provider: LLMProvider, model: str, hedge_model: str = "") -> BaseChatModel:
+    """
+    `model` of `provider`, hedged to `hedge_model` (default: `model` again) if LLM_HEDGING is on.
+    """
+    primary = provider.chat_model(model)
+    if not settings.LLM_HEDGING:
+        return primary
+    secondary = provider.chat_model(hedge_model) if hedge_model and hedge_model != model else primary
+    return HedgedChatModel(primary=primary, secondary=secondary, percentile=settings.LLM_HEDGE_PERCENTILE,
+                           min_samples=settings.LLM_HEDGE_MIN_SAMPLES)
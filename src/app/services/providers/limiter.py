@@ -0,0 +1,291 @@
+"""
+Client-side rate limiting of OpenAI calls, shared by all threads of the process.
+
+Each model gets one ModelLimiter (get_limiter) with:
+
+- token buckets for its requests and tokens per minute (OPENAI_RATE_LIMITS), so bursts queue
+  here instead of being answered with 429s; token reservations are estimates, settled on
+  the usage the API reports. The buckets live in the process, so every process gets
+  1/OPENAI_LIMIT_PROCESSES of the limits: set it to the number of processes sharing the
+  API key across all workers and replicas, or they jointly overrun the limit
+- an adaptive concurrency limit (AIMD): one more slot per limit's worth of successful calls,
+  halved when the API still answers 429 or is overloaded
+- a deadline per call (OPENAI_QUEUE_TIMEOUT_SECONDS, or the turn's remaining budget if
+  shorter, see deadline.py): a call that cannot start in time raises RateLimitTimeout
+  instead of queueing forever
+- retries of 429s, 5xx and connection errors, after the Retry-After the API sends, else
+  after exponential backoff with jitter; quota errors are not retried
+"""
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+import openai
+
+from app.core.config import settings
+
+from .deadline import DeadlineExceeded, check_deadline, remaining
+
+T = TypeVar("T")
+
+# Seconds of backoff of the first retry when the API sends no Retry-After, doubled per attempt
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 20.0
+# The concurrency limit is halved at most once per interval, not once per failed call in flight
+DECREASE_INTERVAL_SECONDS = 1.0
+# Queue waits kept for the p50/p95 in ModelLimiter.stats()
+WAIT_WINDOW = 1000
+
+
+class RateLimitTimeout(TimeoutError):
+    """A call could not get a rate limit or concurrency slot before its deadline."""
+
+
+def parse_rate_limits(spec: str) -> Dict[str, Tuple[int, int]]:
+    """Parse "model=RPM:TPM,..." into {model: (rpm, tpm)}."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        model, _, values = item.partition("=")
+        rpm, _, tpm = values.partition(":")
+        if not model or not rpm.isdigit() or not tpm.isdigit():
+            raise ValueError(f"Invalid rate limit '{item}', expected model=RPM:TPM")
+        limits[model.strip()] = (int(rpm), int(tpm))
+    return limits
+
+
+class TokenBucket:
+    """
+    Refills `per_minute` tokens a minute, up to `capacity` (default: one minute's worth).
+
+    Callers reserve tokens up front and may take the bucket into debt; the debt is the time
+    they have to wait.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None) -> None:
+        self.rate = per_minute / 60
+        self.capacity = capacity or per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take `amount` tokens; returns the seconds to wait until they are covered."""
+        with self._lock:
+            self._refill()
+            self._tokens -= min(amount, self.capacity)
+            return max(0.0, -self._tokens / self.rate)
+
+    def refund(self, amount: float) -> None:
+        """Give back `amount` tokens, or take more when negative."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+
+class AdaptiveConcurrency:
+    """Concurrency limit with additive increase and multiplicative decrease."""
+
+    def __init__(self, initial: int, minimum: int, maximum: int) -> None:
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.active = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self, deadline: float) -> None:
+        with self._condition:
+            while self.active >= int(self.limit):
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    raise RateLimitTimeout(f"No concurrency slot free within the deadline (limit {int(self.limit)})")
+                self._condition.wait(left)
+            self.active += 1
+
+    def release(self, congested: bool = False) -> None:
+        with self._condition:
+            self.active -= 1
+            now = time.monotonic()
+            if congested:
+                if now - self._last_decrease >= DECREASE_INTERVAL_SECONDS:
+                    self.limit = max(self.minimum, self.limit / 2)
+                    self._last_decrease = now
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        # An HTTP date; fall back to backoff
+        pass
+    return None
+
+
+def is_congestion(error: Exception) -> bool:
+    """429s and overloaded servers, which the concurrency limit backs off from."""
+    status = getattr(error, "status_code", None)
+    return status == 429 or (status is not None and status >= 500)
+
+
+def retry_delay(error: Exception, attempt: int) -> Optional[float]:
+    """Seconds to wait before retrying after `error`, or None if it is not worth retrying."""
+    if getattr(error, "code", None) == "insufficient_quota":
+        return None
+    if not (is_congestion(error) or isinstance(error, openai.APIConnectionError)):
+        return None
+    delay = _retry_after(error)
+    if delay is None:
+        delay = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt) * random.uniform(0.5, 1.0)
+    return delay
+
+
+class ModelLimiter:
+    """
+    Rate and concurrency limits of one model.
+
+    Args:
+        model: Model name, for logging
+        rpm: Requests per minute
+        tpm: Tokens per minute
+    """
+
+    def __init__(self, model: str, rpm: int, tpm: int, initial_concurrency: Optional[int] = None,
+                 min_concurrency: Optional[int] = None, max_concurrency: Optional[int] = None,
+                 max_retries: Optional[int] = None, timeout: Optional[float] = None) -> None:
+        self.model = model
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concurrency = AdaptiveConcurrency(
+            initial_concurrency or settings.OPENAI_INITIAL_CONCURRENCY,
+            min_concurrency or settings.OPENAI_MIN_CONCURRENCY,
+            max_concurrency or settings.OPENAI_MAX_CONCURRENCY,
+        )
+        self.max_retries = settings.OPENAI_MAX_RETRIES if max_retries is None else max_retries
+        self.timeout = timeout or settings.OPENAI_QUEUE_TIMEOUT_SECONDS
+        self._lock = threading.Lock()
+        self._counts = {"calls": 0, "retries": 0, "throttled": 0, "timeouts": 0, "failures": 0}
+        self._waits: Deque[float] = deque(maxlen=WAIT_WINDOW)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counts[name] += 1
+
+    def _wait_for_slot(self, tokens: int, deadline: float) -> None:
+        start = time.monotonic()
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if start + wait > deadline:
+            self.requests.refund(1)
+            self.tokens.refund(tokens)
+            self._count("timeouts")
+            raise RateLimitTimeout(f"{self.model}: rate limit frees up in {wait:.1f}s, after the deadline")
+        if wait > 0:
+            time.sleep(wait)
+        try:
+            self.concurrency.acquire(deadline)
+        except RateLimitTimeout:
+            # The call never goes out, so its rate limit reservation is given back
+            self.requests.refund(1)
+            self.tokens.refund(tokens)
+            self._count("timeouts")
+            raise
+        with self._lock:
+            self._waits.append((time.monotonic() - start) * 1000)
+
+    def call(self, request: Callable[[], T], tokens: int = 0, timeout: Optional[float] = None) -> T:
+        """
+        Run `request` within the limits, retrying it on 429s, 5xx and connection errors.
+
+        Args:
+            request: Makes the API call; it should bound its own timeout by deadline.remaining()
+            tokens: Estimated tokens of the call (prompt and completion)
+            timeout: Seconds the call may wait to start, per attempt and in total; never
+                more than the turn has left
+
+        Raises:
+            RateLimitTimeout: If the call cannot start before the deadline
+            DeadlineExceeded: If the turn's deadline passes first
+        """
+        timeout = timeout or self.timeout
+        left = check_deadline(self.model)
+        if left is not None:
+            timeout = min(timeout, left)
+        deadline = time.monotonic() + timeout
+        self._count("calls")
+        for attempt in range(self.max_retries + 1):
+            check_deadline(self.model)
+            self._wait_for_slot(tokens, deadline)
+            congested = False
+            try:
+                return request()
+            except Exception as e:
+                congested = is_congestion(e)
+                if getattr(e, "status_code", None) == 429:
+                    self._count("throttled")
+                delay = retry_delay(e, attempt)
+                if delay is None or attempt == self.max_retries or time.monotonic() + delay > deadline:
+                    self._count("failures")
+                    left = remaining()
+                    if left is not None and left <= 0:
+                        raise DeadlineExceeded(f"Turn deadline exceeded during {self.model} call") from e
+                    raise
+                print(f"--- {self.model}: {type(e).__name__}, retry {attempt + 1} in {delay:.2f}s ---")
+                self._count("retries")
+            finally:
+                self.concurrency.release(congested)
+            time.sleep(delay)
+        raise AssertionError("unreachable")
+
+    def settle(self, estimated: int, actual: Optional[int]) -> None:
+        """Correct a call's token reservation to the usage the API reported."""
+        if actual is not None:
+            self.tokens.refund(estimated - actual)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counts)
+            waits = sorted(self._waits)
+        stats["concurrency_limit"] = int(self.concurrency.limit)
+        stats["active"] = self.concurrency.active
+        if waits:
+            stats["wait_p50_ms"] = round(waits[len(waits) // 2], 1)
+            stats["wait_p95_ms"] = round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 1)
+        return stats
+
+
+_limiters: Dict[str, ModelLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(model: str) -> ModelLimiter:
+    """The shared limiter of `model`, with this process's share of its limits."""
+    if model not in _limiters:
+        with _limiters_lock:
+            if model not in _limiters:
+                rpm, tpm = parse_rate_limits(settings.OPENAI_RATE_LIMITS).get(
+                    model, (settings.OPENAI_DEFAULT_RPM, settings.OPENAI_DEFAULT_TPM))
+                processes = max(1, settings.OPENAI_LIMIT_PROCESSES)
+                _limiters[model] = ModelLimiter(model, max(1, rpm // processes), max(1, tpm // processes))
+    return _limiters[model]
+
+
+def limiter_stats() -> Dict[str, Dict[str, Any]]:
+    return {model: limiter.stats() for model, limiter in list(_limiters.items())}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count, about 4 characters per token."""
+    return len(text) // 4 + 1
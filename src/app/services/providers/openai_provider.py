@@ -0,0 +1,79 @@
+import asyncio
+import contextvars
+import threading
+from functools import partial
+from typing import Any, Dict, List, Optional
+
+import openai
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+from langchain_openai import ChatOpenAI
+
+from app.core.config import settings
+
+from .base import EmbeddingProvider, LLMProvider
+from .deadline import check_deadline
+from .limiter import estimate_tokens, get_limiter
+
+
+def _timeout_kwargs() -> Dict[str, float]:
+    """Request timeout of the turn's remaining budget, if it has a deadline."""
+    left = check_deadline()
+    return {} if left is None else {"timeout": left}
+
+
+class LimitedChatOpenAI(ChatOpenAI):
+    """ChatOpenAI whose requests go through the model's limiter (see limiter.py), which also retries."""
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None,
+                  **kwargs: Any) -> ChatResult:
+        limiter = get_limiter(self.model_name)
+        estimate = (sum(estimate_tokens(str(message.content)) for message in messages)
+                    + (self.max_tokens or settings.OPENAI_COMPLETION_TOKENS_ESTIMATE))
+        generate = super()._generate
+        result = limiter.call(lambda: generate(messages, stop, run_manager, **kwargs, **_timeout_kwargs()),
+                              tokens=estimate)
+        usage = (result.llm_output or {}).get("token_usage") or {}
+        limiter.settle(estimate, usage.get("total_tokens"))
+        return result
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None,
+                         **kwargs: Any) -> ChatResult:
+        # The limiter blocks, so async calls wait for it in the default executor, with the
+        # caller's context for the deadline
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            None, partial(context.run, self._generate, messages, stop, None, **kwargs))
+
+
+class OpenAILLMProvider(LLMProvider):
+    def chat_model(self, model: str) -> BaseChatModel:
+        return LimitedChatOpenAI(model=model, temperature=0, api_key=settings.OPENAI_API_KEY or None, max_retries=0)
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """OpenAI embeddings API through the model's limiter; the client is created on first use."""
+
+    def __init__(self) -> None:
+        self._client: Optional[openai.OpenAI] = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self) -> openai.OpenAI:
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    # Retries are left to the limiter
+                    self._client = openai.OpenAI(api_key=settings.OPENAI_API_KEY or None, max_retries=0)
+        return self._client
+
+    def embed_batch(self, texts: List[str], model: str) -> List[List[float]]:
+        if not texts:
+            return []
+        limiter = get_limiter(model)
+        estimate = sum(estimate_tokens(text) for text in texts)
+        response = limiter.call(lambda: self.client.embeddings.create(input=texts, model=model, **_timeout_kwargs()),
+                                tokens=estimate)
+        limiter.settle(estimate, getattr(response.usage, "total_tokens", None))
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
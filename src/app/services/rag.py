@@ -2,8 +2,10 @@ from langchain_community.document_loaders import WebBaseLoader
 from markitdown import MarkItDown
 from .embedding import EmbeddingService
 from .milvus_client import connect_to_milvus, create_collection, insert_embedding, search_embedding
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from .markdown_converter import MarkdownConverter
+from .chunking import chunk_text, strategy_for_source
+from .knowledge_ingest import IngestResult, content_hash, ingest_document, source_key as make_source_key
+from app.core.db.database import sync_session
 import os
 import uuid
 import langdetect
@@ -54,88 +56,58 @@ class RAGService:
         else:
             return self.get_markdown_text(source)
 
-    def add_text_to_milvus(self, text: str, language: Optional[str] = None):
+    def detect_text_language(self, text: str) -> str:
+        """Detect the language of `text`, mapped to one of the supported languages."""
+        try:
+            language = langdetect.detect(text)
+            # Map to our supported languages
+            if language not in self.supported_languages:
+                # Default to English for non-supported languages
+                language = 'ar' if language.startswith('ar') else 'en'
+        except Exception as e:
+            print(f"Language detection failed: {e}")
+            language = 'en'  # Default to English if detection fails
+        return language
+
+    def split_text(self, text: str, language: str, strategy: str = "text") -> List[str]:
+        """Split text into chunks that fit the embedding model and the Milvus `text` field (see chunking)."""
+        return chunk_text(text, language=language, strategy=strategy)
+
+    def ingest_text(self, text: str, language: Optional[str] = None, source_key: Optional[str] = None,
+                    title: Optional[str] = None, source_id: Optional[str] = None,
+                    strategy: Optional[str] = None) -> IngestResult:
+        """Chunk and store a source document, sharing or skipping duplicate chunks (see knowledge_ingest).
+
+        Args:
+            text: The document text
+            language: Language code; detected if omitted
+            source_key: Stable key of the source (see knowledge_ingest.source_key). Re-ingesting the
+                same key replaces the previous version; without one the text itself is the key.
+            title: Display title of the document
+            source_id: Knowledge source ("ks-...") the document belongs to
+            strategy: Chunking strategy; defaults to the one for the source type (see chunking)
+        """
         print(f"Adding text to Milvus, total length: {len(text)} characters")
-        
-        # Detect language if not provided
-        if not language:
-            try:
-                language = langdetect.detect(text)
-                # Map to our supported languages
-                if language not in self.supported_languages:
-                    # Default to English for non-supported languages
-                    if language.startswith('ar'):
-                        language = 'ar'
-                    else:
-                        language = 'en'
-            except Exception as e:
-                print(f"Language detection failed: {e}")
-                language = 'en'  # Default to English if detection fails
-        
-        print(f"Processing text in language: {language}")
-        
-        # Use appropriate chunk sizes based on language
-        # Arabic needs different chunking due to RTL and character complexity
-        if language == 'ar':
-            # Smaller chunks for Arabic
-            splitter = RecursiveCharacterTextSplitter(chunk_size=600, chunk_overlap=200)
-        else:
-            # Default chunking for other languages (including English)
-            splitter = RecursiveCharacterTextSplitter(chunk_size=800, chunk_overlap=150)
-        
-        # Split the text into chunks
-        chunks = splitter.split_text(text)
-        print(f"Split text into {len(chunks)} chunks for language: {language}")
-        
-        embeddings = []
-        texts = []
-        languages = []
-        metadata = []  # Initialize metadata list
-        
-        for i, chunk in enumerate(chunks):
-            if not chunk.strip():
-                continue  # skip empty or whitespace-only chunks
-                
-            # Always truncate to ensure we're under the limit
-            if len(chunk) > 2000:
-                print(f"Chunk {i} exceeds 2000 chars ({len(chunk)}), truncating")
-                chunk = chunk[:2000]  # Truncate to fit Milvus VARCHAR limit with some buffer
-                
-            # Double-check length to be absolutely sure
-            if len(chunk) > 2048:
-                print(f"Warning: Chunk {i} still exceeds 2048 chars ({len(chunk)}), truncating further")
-                chunk = chunk[:2048]
-                
-            # Add language for each chunk
-            languages.append(language)          
-            # Generate embedding for this chunk
-            try:
-                embedding = self.embedder.embed(chunk)
-                
-                # Add to our lists
-                embeddings.append(embedding)
-                texts.append(chunk)
-                
-                # Add metadata including language
-                chunk_metadata = {"language": language}
-                metadata.append(chunk_metadata)
-                
-                if i < 2 or i == len(chunks) - 1:  # Log first two chunks and last chunk
-                    print(f"Chunk {i}/{len(chunks)}: {len(chunk)} chars | Language: {language} | Preview: {chunk[:50]}...")
-            except Exception as e:
-                print(f"Error embedding chunk {i}: {e}")
-        
-        print(f"Generated {len(embeddings)} embeddings from {len(chunks)} chunks")
-        
-        # Use insert_embeddings for multiple chunks
-        if len(embeddings) > 0:
-            from .milvus_client import insert_embeddings_with_metadata
-            insert_embeddings_with_metadata(embeddings, texts, metadata)
-            print(f"Successfully inserted {len(embeddings)} chunks into vector store with language metadata")
-            return len(embeddings)
-        else:
-            print("No valid chunks to insert")
-            return 0
+        language = language or self.detect_text_language(text)
+        source_key = source_key or make_source_key("text", content_hash(text))
+        strategy = strategy or strategy_for_source(source_key)
+        chunks = self.split_text(text, language, strategy)
+        print(f"Split text into {len(chunks)} chunks for language: {language}, strategy: {strategy}")
+
+        with sync_session() as db:
+            result = ingest_document(db, source_key, chunks, self.embedder.embed_batch, language=language, title=title,
+                                     source_id=source_id)
+
+        print(f"Ingested {source_key} v{result.version}: {result.added} added, {result.kept} kept, "
+              f"{result.shared} shared, {result.removed} removed, {result.duplicates} duplicates, "
+              f"{result.near_duplicates} near duplicates, {result.failed} failed")
+        return result
+
+    def add_text_to_milvus(self, text: str, language: Optional[str] = None, source_key: Optional[str] = None,
+                           title: Optional[str] = None, source_id: Optional[str] = None) -> int:
+        """Chunk and store text, returning the number of chunks added (see ingest_text)."""
+        result = self.ingest_text(text, language=language, source_key=source_key, title=title, source_id=source_id)
+        return result.added
 
     def search_similar(self, query: str, top_k: int = 5, language: Optional[str] = None):
         """Search for similar text chunks to the query.
@@ -202,8 +174,9 @@ class RAGService:
         
         return extracted_texts
         
-    def add_to_vector_store(self, content: str, title: str = None, tags: list = None, language: Optional[str] = None):
-        """Add content to the vector store with optional title, tags, and language"""
+    def add_to_vector_store(self, content: str, title: str = None, tags: list = None, language: Optional[str] = None,
+                            source_key: Optional[str] = None):
+        """Add content to the vector store with optional title, tags, language and source key (see ingest_text)"""
         if not title:
             title = f"Content-{uuid.uuid4().hex[:8]}"
             
@@ -232,14 +205,15 @@ class RAGService:
             print(f"Warning: Very large content ({len(content)} chars) being added to vector store")
         
         # Split content into chunks and add to vector store with language metadata
-        chunks_added = self.add_text_to_milvus(content, language=language)
+        result = self.ingest_text(content, language=language, source_key=source_key, title=title)
         
         return {
             "success": True, 
             "title": title,
-            "chunks_added": chunks_added,
+            "chunks_added": result.added,
             "content_length": len(content),
-            "language": language
+            "language": language,
+            **result.to_dict()
         }
         
     def process_file(self, file_path: str, filename: str = None):
@@ -302,7 +276,8 @@ class RAGService:
             print(f"Adding file content to vector store: {len(content)} characters")
             
             # Add to vector store with chunking
-            result = self.add_to_vector_store(content, title, tags=[file_ext, "uploaded-file"])
+            result = self.add_to_vector_store(content, title, tags=[file_ext, "uploaded-file"],
+                                              source_key=make_source_key("file", title))
             
             # Clean up the temporary file
             try:
@@ -0,0 +1,250 @@
+"""
+Rerankers for retrieved chunks.
+
+OnnxCrossEncoder scores (query, chunk) pairs with a cross-encoder exported to ONNX
+(e.g. cross-encoder/mmarco-mMiniLMv2-L12-H384-v1, which covers Arabic, exported with its
+tokenizer.json), run on CPU by onnxruntime. Pairs are length-sorted and scored in padded batches, and scores are
+cached per (query, chunk), so a repeated or reformulated question only scores new chunks.
+
+Without a model (RERANKER_MODEL_DIR unset or unloadable) LexicalReranker is used: BM25
+over the candidate set, fused with the vector ranking by reciprocal rank fusion.
+"""
+import hashlib
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+# Latency samples kept for the p50/p95 in Reranker.stats()
+LATENCY_WINDOW = 1000
+
+_TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def chunk_key(candidate: Dict[str, Any]) -> str:
+    if candidate.get("id") is not None:
+        return f"id:{candidate['id']}"
+    return "text:" + hashlib.sha1(candidate.get("text", "").encode("utf-8")).hexdigest()
+
+
+class Reranker:
+    """Scores candidates for a query; higher is better."""
+
+    name = "none"
+
+    def __init__(self) -> None:
+        self._latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+
+    def score(self, query: str, candidates: Sequence[Dict[str, Any]]) -> List[float]:
+        """Scores of `candidates`, which are given in vector search order."""
+        start = time.perf_counter()
+        scores = self._score(query, candidates) if candidates else []
+        with self._lock:
+            self._latencies.append((time.perf_counter() - start) * 1000)
+        return scores
+
+    def rerank(self, query: str, candidates: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Candidates sorted by rerank score, each with it under "rerank_score"."""
+        scores = self.score(query, candidates)
+        ranked = [dict(candidate, rerank_score=float(score)) for candidate, score in zip(candidates, scores)]
+        ranked.sort(key=lambda candidate: candidate["rerank_score"], reverse=True)
+        return ranked
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return {"reranker": self.name, "calls": 0}
+        return {
+            "reranker": self.name,
+            "calls": len(latencies),
+            "p50_ms": round(latencies[len(latencies) // 2], 2),
+            "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 2),
+        }
+
+    def _score(self, query: str, candidates: Sequence[Dict[str, Any]]) -> List[float]:
+        # Keep the vector search order
+        return [-float(rank) for rank in range(len(candidates))]
+
+
+class LexicalReranker(Reranker):
+    """BM25 of the candidates against the query, fused with their vector rank (RRF)."""
+
+    name = "lexical"
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75, rrf_k: int = 60) -> None:
+        super().__init__()
+        self.k1 = k1
+        self.b = b
+        self.rrf_k = rrf_k
+
+    def _score(self, query: str, candidates: Sequence[Dict[str, Any]]) -> List[float]:
+        query_terms = set(_TOKEN_PATTERN.findall(query.lower()))
+        documents = [Counter(_TOKEN_PATTERN.findall(candidate.get("text", "").lower())) for candidate in candidates]
+        lengths = [sum(document.values()) for document in documents]
+        average_length = (sum(lengths) / len(lengths)) or 1.0
+        n = len(documents)
+        idf = {}
+        for term in query_terms:
+            containing = sum(1 for document in documents if term in document)
+            idf[term] = math.log(1 + (n - containing + 0.5) / (containing + 0.5))
+
+        bm25 = []
+        for document, length in zip(documents, lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / average_length)
+            bm25.append(sum(
+                idf[term] * document[term] * (self.k1 + 1) / (document[term] + norm)
+                for term in query_terms if term in document
+            ))
+
+        # Candidates arrive in vector order, so the vector rank is the index
+        lexical_order = sorted(range(n), key=lambda index: -bm25[index])
+        lexical_rank = {index: rank for rank, index in enumerate(lexical_order)}
+        scores = []
+        for index in range(n):
+            score = 1 / (self.rrf_k + index + 1)
+            if bm25[index] > 0:
+                score += 1 / (self.rrf_k + lexical_rank[index] + 1)
+            scores.append(score)
+        return scores
+
+
+class ScoreCache:
+    """Thread-safe LRU of (query, chunk) scores."""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._entries: OrderedDict[Tuple[str, str], float] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Tuple[str, str]) -> Optional[float]:
+        with self._lock:
+            score = self._entries.get(key)
+            if score is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return score
+
+    def set(self, key: Tuple[str, str], score: float) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = score
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+class OnnxCrossEncoder(Reranker):
+    """
+    Cross-encoder in ONNX format, run with onnxruntime on CPU.
+
+    Args:
+        model_dir: Directory containing model.onnx and tokenizer.json
+        max_length: Maximum tokens per (query, chunk) pair; longer pairs are truncated
+        batch_size: Pairs per inference call
+        threads: onnxruntime intra-op threads
+        cache_size: Scores kept in the (query, chunk) cache
+    """
+
+    name = "onnx"
+
+    def __init__(self, model_dir: str, max_length: int = 128, batch_size: int = 32, threads: int = 4,
+                 cache_size: int = 20000) -> None:
+        super().__init__()
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        model_path = Path(model_dir)
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(
+            str(model_path / "model.onnx"), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(str(model_path / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        # Pad each batch to its longest pair only, with the model's own pad token
+        if self.tokenizer.padding is None:
+            pad_token = next((token for token in ("[PAD]", "<pad>") if self.tokenizer.token_to_id(token) is not None),
+                             "[PAD]")
+            self.tokenizer.enable_padding(pad_id=self.tokenizer.token_to_id(pad_token) or 0, pad_token=pad_token)
+        self.batch_size = batch_size
+        self.cache = ScoreCache(cache_size)
+
+    def _score(self, query: str, candidates: Sequence[Dict[str, Any]]) -> List[float]:
+        query_key = hashlib.sha1(" ".join(query.lower().split()).encode("utf-8")).hexdigest()
+        keys = [(query_key, chunk_key(candidate)) for candidate in candidates]
+        scores: List[Optional[float]] = [self.cache.get(key) for key in keys]
+
+        missing = [index for index, score in enumerate(scores) if score is None]
+        # Similar lengths in a batch mean little padding
+        missing.sort(key=lambda index: len(candidates[index].get("text", "")))
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            logits = self._infer([(query, candidates[index].get("text", "")) for index in batch])
+            for index, logit in zip(batch, logits):
+                scores[index] = logit
+                self.cache.set(keys[index], logit)
+        return [float(score) for score in scores]
+
+    def _infer(self, pairs: List[Tuple[str, str]]) -> List[float]:
+        encodings = self.tokenizer.encode_batch(pairs)
+        inputs = {
+            "input_ids": np.array([encoding.ids for encoding in encodings], dtype=np.int64),
+            "attention_mask": np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64),
+            "token_type_ids": np.array([encoding.type_ids for encoding in encodings], dtype=np.int64),
+        }
+        outputs = self.session.run(None, {name: value for name, value in inputs.items() if name in self.input_names})
+        logits = outputs[0]
+        # Single relevance logit, or (not relevant, relevant) logits
+        logits = logits[:, -1] if logits.ndim == 2 else logits
+        return logits.astype(np.float64).tolist()
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "cache_hits": self.cache.hits, "cache_misses": self.cache.misses}
+
+
+_reranker: Optional[Reranker] = None
+_reranker_lock = threading.Lock()
+
+
+def get_reranker() -> Reranker:
+    """The configured reranker, loaded once; falls back to LexicalReranker if the model cannot be loaded."""
+    global _reranker
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None:
+                _reranker = _load_reranker()
+    return _reranker
+
+
+def _load_reranker() -> Reranker:
+    if settings.RERANKER_MODEL_DIR:
+        try:
+            reranker = OnnxCrossEncoder(
+                settings.RERANKER_MODEL_DIR,
+                max_length=settings.RERANKER_MAX_LENGTH,
+                batch_size=settings.RERANKER_BATCH_SIZE,
+                threads=settings.RERANKER_THREADS,
+                cache_size=settings.RERANKER_CACHE_SIZE,
+            )
+            print(f"Loaded ONNX reranker from {settings.RERANKER_MODEL_DIR}")
+            return reranker
+        except Exception as e:
+            print(f"Could not load ONNX reranker from {settings.RERANKER_MODEL_DIR} ({e}), using lexical reranking")
+    return LexicalReranker()
@@ -0,0 +1,142 @@
+"""
+Retrieval stage of the RAG pipeline.
+
+1. Over-fetch RAG_FETCH_K candidates per query (the question and any reformulations,
+   searched concurrently) and merge them by chunk id, keeping each chunk's best rank.
+2. Rerank the candidates against the question (see reranker).
+3. Drop chunks whose normalized text repeats a higher-ranked one.
+4. Keep the best RAG_TOP_K that fit in RAG_CONTEXT_TOKEN_BUDGET tokens.
+"""
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from app.core.config import settings
+from app.services.chunking import TokenCounter, get_token_counter
+from app.services.knowledge_ingest import content_hash
+from app.services.reranker import Reranker, chunk_key, get_reranker
+
+# search(query, top_k, language) -> results ordered best first, each with "text" and usually "id"
+SearchFunction = Callable[[str, int, Optional[str]], List[Dict[str, Any]]]
+
+
+class RetrievalPipeline:
+    """
+    Over-fetch, rerank, deduplicate and budget retrieved chunks.
+
+    Args:
+        search: Vector search returning results best first, e.g. RAGService.search_similar
+        reranker: Defaults to the configured reranker (see reranker.get_reranker)
+        fetch_k: Candidates fetched per query
+        top_k: Chunks returned at most
+        token_budget: Tokens of chunk text returned at most
+        counter: Token counter for the budget
+    """
+
+    def __init__(self, search: SearchFunction, reranker: Optional[Reranker] = None, fetch_k: Optional[int] = None,
+                 top_k: Optional[int] = None, token_budget: Optional[int] = None,
+                 counter: Optional[TokenCounter] = None):
+        self.search = search
+        self._reranker = reranker
+        self.fetch_k = fetch_k or settings.RAG_FETCH_K
+        self.top_k = top_k or settings.RAG_TOP_K
+        self.token_budget = token_budget or settings.RAG_CONTEXT_TOKEN_BUDGET
+        self._counter = counter
+
+    @property
+    def reranker(self) -> Reranker:
+        if self._reranker is None:
+            self._reranker = get_reranker()
+        return self._reranker
+
+    @property
+    def counter(self) -> TokenCounter:
+        if self._counter is None:
+            self._counter = get_token_counter()
+        return self._counter
+
+    def retrieve(self, query: str, alternative_queries: Sequence[str] = (), language: Optional[str] = None,
+                 top_k: Optional[int] = None, token_budget: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Best chunks for `query`, with their rerank score under "rerank_score".
+
+        Args:
+            query: The user's question; candidates are reranked against it
+            alternative_queries: Reformulations searched as well, to widen recall
+            language: Language filter passed to the search
+            top_k: Overrides the pipeline's top_k
+            token_budget: Overrides the pipeline's token budget
+
+        Returns:
+            List of result dicts, best first
+        """
+        start = time.perf_counter()
+        candidates = self.fetch([query, *alternative_queries], language)
+        fetched = time.perf_counter()
+        ranked = self.reranker.rerank(query, candidates)
+        reranked = time.perf_counter()
+        results = self.fit_budget(self.dedupe(ranked)[:top_k or self.top_k], token_budget or self.token_budget)
+        print(f"Retrieved {len(results)} of {len(candidates)} candidates: fetch {(fetched - start) * 1000:.0f} ms, "
+              f"rerank ({self.reranker.name}) {(reranked - fetched) * 1000:.1f} ms")
+        return results
+
+    def fetch(self, queries: Sequence[str], language: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Candidates of all queries merged by chunk id, ordered by their best rank in any query."""
+        queries = list(dict.fromkeys(q for q in queries if q and q.strip()))
+        if not queries:
+            return []
+        if len(queries) == 1:
+            result_lists = [self._search(queries[0], language)]
+        else:
+            # One copy of the caller's context per query, for the turn's deadline
+            contexts = [contextvars.copy_context() for _ in queries]
+            with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+                result_lists = list(executor.map(lambda context, q: context.run(self._search, q, language),
+                                                 contexts, queries))
+
+        best: Dict[str, tuple] = {}
+        for query_index, results in enumerate(result_lists):
+            for rank, result in enumerate(results):
+                if not result.get("text"):
+                    continue
+                key = chunk_key(result)
+                if key not in best or (rank, query_index) < best[key][:2]:
+                    best[key] = (rank, query_index, result)
+        return [result for _, _, result in sorted(best.values(), key=lambda item: item[:2])]
+
+    def _search(self, query: str, language: Optional[str]) -> List[Dict[str, Any]]:
+        try:
+            results = self.search(query, self.fetch_k, language)
+        except Exception as e:
+            print(f"Error searching for {query!r}: {e}")
+            return []
+        return [result for result in results or [] if isinstance(result, dict)]
+
+    @staticmethod
+    def dedupe(results: Sequence[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Drop results whose normalized text repeats an earlier one."""
+        seen = set()
+        unique = []
+        for result in results:
+            text_hash = result.get("content_hash") or content_hash(result["text"])
+            if text_hash not in seen:
+                seen.add(text_hash)
+                unique.append(result)
+        return unique
+
+    def fit_budget(self, results: Sequence[Dict[str, Any]], token_budget: int) -> List[Dict[str, Any]]:
+        """Results in order, skipping any that would take the total over `token_budget` tokens."""
+        if not results:
+            return []
+        kept, used = [], 0
+        for result, tokens in zip(results, self.counter.count_batch([result["text"] for result in results])):
+            if used + tokens <= token_budget:
+                kept.append(result)
+                used += tokens
+        return kept
+
+
+def format_context(results: Sequence[Dict[str, Any]]) -> str:
+    """Chunk texts joined for the prompt."""
+    return "\n\n".join(result["text"] for result in results)
@@ -0,0 +1,154 @@
+"""
+Calibrated relevance scores for vector search.
+
+Embeddings are normalized to unit length when they are inserted and collections are
+indexed by inner product, so the raw search score is the cosine similarity. What a given
+cosine means depends on the collection and the embedding model (text-embedding-3 scores
+related passages around 0.3-0.6), so each collection gets a logistic calibration
+(Platt scaling) mapping the cosine to a relevance in [0, 1], and a relevance threshold.
+
+Calibrations are learned from a labelled eval set by scripts/evaluate_retrieval.py and
+stored in src/data/score_calibration.json; uncalibrated collections use DEFAULT_CALIBRATION.
+"""
+import json
+import math
+import threading
+from dataclasses import asdict, dataclass, field
+from functools import cache
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+CALIBRATION_FILE = Path(__file__).parent.parent.parent / "data" / "score_calibration.json"
+
+_write_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class Calibration:
+    """relevance = sigmoid(slope * cosine + intercept); results at or above `threshold` count as relevant."""
+
+    slope: float
+    intercept: float
+    threshold: float = 0.5
+    # How the calibration was fit, for the record: eval pairs, positives, F1 at the threshold
+    fit: Dict[str, float] = field(default_factory=dict, compare=False)
+
+    def relevance(self, similarity: float) -> float:
+        z = self.slope * similarity + self.intercept
+        # Split to avoid overflow in exp for large |z|
+        if z >= 0:
+            return 1.0 / (1.0 + math.exp(-z))
+        e = math.exp(z)
+        return e / (1.0 + e)
+
+    def is_relevant(self, relevance: float) -> bool:
+        return relevance >= self.threshold
+
+
+# Relevance 0.5 at cosine 0.35, a rough midpoint for text-embedding-3 models
+DEFAULT_CALIBRATION = Calibration(slope=10.0, intercept=-3.5)
+
+
+def similarity_from_distance(distance: float, metric_type: str) -> float:
+    """
+    Cosine similarity of unit vectors from a Milvus search score.
+
+    IP and COSINE scores already are the cosine. L2 scores are squared distances, and for
+    unit vectors |a - b|^2 = 2 - 2 cos(a, b).
+    """
+    if metric_type.upper() == "L2":
+        return 1.0 - distance / 2.0
+    return float(distance)
+
+
+def fit_calibration(similarities: Sequence[float], labels: Sequence[bool], l2: float = 1e-2,
+                    iterations: int = 50) -> Calibration:
+    """
+    Fit a calibration to labelled (cosine, relevant) pairs.
+
+    Logistic regression on the cosine by Newton's method, with a small L2 penalty on the
+    slope so that perfectly separable eval sets still converge. The threshold is the
+    relevance that maximizes F1 over the pairs.
+
+    Args:
+        similarities: Cosine similarity of each (query, result) pair
+        labels: Whether each result is relevant to its query
+        l2: Penalty on the slope
+        iterations: Maximum Newton steps
+
+    Raises:
+        ValueError: If the lengths differ or the labels are all the same
+    """
+    x = np.asarray(similarities, dtype=np.float64)
+    y = np.asarray(labels, dtype=np.float64)
+    if len(x) != len(y):
+        raise ValueError("similarities and labels must have the same length")
+    if y.sum() == 0 or y.sum() == len(y):
+        raise ValueError("Calibration needs both relevant and irrelevant results")
+
+    features = np.column_stack([x, np.ones_like(x)])
+    weights = np.zeros(2)
+    penalty = np.diag([l2, 0.0])
+    for _ in range(iterations):
+        p = 1.0 / (1.0 + np.exp(-features @ weights))
+        gradient = features.T @ (p - y) + penalty @ weights
+        hessian = (features * (p * (1 - p))[:, None]).T @ features + penalty
+        step = np.linalg.solve(hessian + 1e-9 * np.eye(2), gradient)
+        weights -= step
+        if np.abs(step).max() < 1e-8:
+            break
+
+    calibration = Calibration(slope=float(weights[0]), intercept=float(weights[1]))
+    relevance = np.array([calibration.relevance(value) for value in x])
+    threshold, f1 = best_threshold(relevance, y.astype(bool))
+    return Calibration(
+        slope=calibration.slope,
+        intercept=calibration.intercept,
+        threshold=threshold,
+        fit={"pairs": int(len(x)), "positives": int(y.sum()), "f1": round(f1, 4)},
+    )
+
+
+def best_threshold(scores: np.ndarray, labels: np.ndarray) -> tuple:
+    """The score cut (score >= cut is relevant) with the best F1, and that F1."""
+    order = np.argsort(-scores)
+    sorted_scores, sorted_labels = scores[order], labels[order]
+    true_positives = np.cumsum(sorted_labels)
+    predicted = np.arange(1, len(scores) + 1)
+    f1 = 2 * true_positives / (predicted + labels.sum())
+    # Only cut between distinct scores
+    valid = np.append(sorted_scores[:-1] > sorted_scores[1:], True)
+    best = int(np.argmax(np.where(valid, f1, -1.0)))
+    return round(float(sorted_scores[best]), 6), float(f1[best])
+
+
+def load_calibrations(path: Optional[Path] = None) -> Dict[str, Calibration]:
+    """Calibrations by collection name; empty if the file does not exist."""
+    path = path or CALIBRATION_FILE
+    if not path.exists():
+        return {}
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {collection: Calibration(**values) for collection, values in data.get("collections", {}).items()}
+
+
+@cache
+def get_calibration(collection_name: str) -> Calibration:
+    """The calibration of a collection, read once per process."""
+    return load_calibrations().get(collection_name, DEFAULT_CALIBRATION)
+
+
+def save_calibration(collection_name: str, calibration: Calibration, path: Optional[Path] = None) -> Path:
+    """Store the calibration of one collection, keeping the others."""
+    path = path or CALIBRATION_FILE
+    with _write_lock:
+        calibrations = load_calibrations(path)
+        calibrations[collection_name] = calibration
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"collections": {name: asdict(value) for name, value in sorted(calibrations.items())}},
+                      f, indent=2)
+    get_calibration.cache_clear()
+    return path
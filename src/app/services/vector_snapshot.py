@@ -0,0 +1,295 @@
+"""
+Snapshots of the vector collections, restorable without calling the embeddings API.
+
+A snapshot is a directory with one sub-directory per collection:
+
+    <snapshot>/<collection>/embedding.npy      (count, dim) float32 or float16 vectors, memory-mappable
+    <snapshot>/<collection>/entries.jsonl.zst  primary key and scalar fields of each row, one JSON object per line,
+                                               same order
+    <snapshot>/<collection>/manifest.json      format version, embedding model, dim, dtype, count and fields
+
+The manifest is written last, so a collection directory without one is an incomplete dump.
+
+Restored rows get new primary keys. When the RAG collection is restored, the chunk
+registry of knowledge_ingest is remapped to them, so documents keep sharing, replacing
+and deleting their vectors.
+"""
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import orjson
+import zstandard
+from pymilvus import Collection, DataType
+
+from app.services.milvus_client import (
+    COLLECTION_NAME,
+    EMBEDDING_MODEL,
+    create_collection,
+    drop_collection,
+    is_degenerate_vector,
+    iterate_entries,
+    list_collections,
+    load_collection,
+    normalize_vectors,
+)
+
+SNAPSHOT_DIR = Path(__file__).parent.parent.parent / "data" / "snapshots"
+SNAPSHOT_FORMAT_VERSION = 1
+
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "embedding.npy"
+ENTRIES_FILE = "entries.jsonl.zst"
+
+VECTOR_DTYPES = ("float32", "float16")
+# Bytes of vector data per insert call, well below the Milvus gRPC message limit
+INSERT_BATCH_BYTES = 32 * 1024 * 1024
+SNAPSHOT_NAME_PATTERN = re.compile(r"^[\w.-]+$")
+
+
+def default_collections() -> List[str]:
+    """The RAG and product collections."""
+    # Imported here: product_embedding needs the OpenAI client, restoring does not
+    from app.services.product_embedding import PRODUCT_COLLECTION_NAME
+
+    return [COLLECTION_NAME, PRODUCT_COLLECTION_NAME]
+
+
+def snapshot_path(name: str) -> Path:
+    """Directory of the snapshot `name` under SNAPSHOT_DIR. Raises ValueError for unsafe names."""
+    if not SNAPSHOT_NAME_PATTERN.match(name) or name in (".", ".."):
+        raise ValueError(f"Invalid snapshot name: {name}")
+    return SNAPSHOT_DIR / name
+
+
+def read_manifest(collection_dir: Path) -> dict:
+    """Load and check the manifest of a dumped collection."""
+    manifest = orjson.loads((collection_dir / MANIFEST_FILE).read_bytes())
+    if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported snapshot format {manifest.get('format_version')} in {collection_dir}")
+    return manifest
+
+
+def _vector_field(col: Collection):
+    return next(field for field in col.schema.fields if field.dtype == DataType.FLOAT_VECTOR)
+
+
+def _primary_field(col: Collection):
+    return next(field for field in col.schema.fields if field.is_primary)
+
+
+def _scalar_fields(col: Collection) -> List[str]:
+    return [field.name for field in col.schema.fields if not field.is_primary and field.dtype != DataType.FLOAT_VECTOR]
+
+
+def dump_collection(collection_name: str, target_dir: Path, dtype: str = "float32", batch_size: int = 1000) -> dict:
+    """
+    Dump one collection into `target_dir`.
+
+    Vectors are written straight into a memory-mapped .npy file while the collection
+    is read with a query iterator, so memory use stays at one batch.
+
+    Args:
+        collection_name: Collection to dump
+        target_dir: Directory to write the snapshot files to
+        dtype: "float32" or "float16" (half the size, about three significant digits)
+        batch_size: Rows read per round trip
+
+    Returns:
+        dict: The manifest
+    """
+    if dtype not in VECTOR_DTYPES:
+        raise ValueError(f"Unsupported vector dtype: {dtype}")
+    if collection_name not in list_collections():
+        raise ValueError(f"Collection {collection_name} not found")
+
+    col = load_collection(collection_name)
+    vector_field = _vector_field(col)
+    primary_field = _primary_field(col).name
+    dim = int(vector_field.params["dim"])
+    fields = _scalar_fields(col)
+    count = col.query(expr="", output_fields=["count(*)"])[0]["count(*)"]
+
+    target_dir.mkdir(parents=True, exist_ok=True)
+    (target_dir / MANIFEST_FILE).unlink(missing_ok=True)
+    vectors = np.lib.format.open_memmap(target_dir / VECTORS_FILE, mode="w+", dtype=dtype, shape=(count, dim))
+
+    written = 0
+    with zstandard.open(target_dir / ENTRIES_FILE, "wb") as entries_file:
+        batches = iterate_entries(collection_name, batch_size=batch_size,
+                                  output_fields=[vector_field.name, primary_field, *fields])
+        for batch in batches:
+            # Rows inserted after counting are left for the next snapshot
+            batch = batch[:count - written]
+            if not batch:
+                break
+            end = written + len(batch)
+            vectors[written:end] = np.asarray([row[vector_field.name] for row in batch], dtype=np.float32)
+            lines = (orjson.dumps({name: row.get(name) for name in (primary_field, *fields)}) + b"\n" for row in batch)
+            entries_file.write(b"".join(lines))
+            written = end
+    vectors.flush()
+    del vectors
+
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "collection": collection_name,
+        "embedding_model": EMBEDDING_MODEL,
+        "vector_field": vector_field.name,
+        "primary_field": primary_field,
+        "dim": dim,
+        "dtype": dtype,
+        # Rows deleted while dumping leave unused rows at the end of the vector file
+        "count": written,
+        "fields": fields,
+        "created_at": datetime.now().isoformat(),
+    }
+    (target_dir / MANIFEST_FILE).write_bytes(orjson.dumps(manifest, option=orjson.OPT_INDENT_2))
+    print(f"Dumped {written} entries of {collection_name} to {target_dir}")
+    return manifest
+
+
+def _default_value(field):
+    if field.dtype == DataType.VARCHAR:
+        return ""
+    if field.dtype == DataType.BOOL:
+        return False
+    if field.dtype in (DataType.FLOAT, DataType.DOUBLE):
+        return 0.0
+    return 0
+
+
+def restore_collection(collection_dir: Path, collection_name: Optional[str] = None,
+                       drop_existing: bool = False, force: bool = False) -> int:
+    """
+    Bulk insert a dumped collection.
+
+    Vectors are read from the memory map and inserted column-wise in batches of about
+    INSERT_BATCH_BYTES and normalized to unit length. Fields the target schema has but the
+    snapshot lacks get empty values. Zero or non-finite vectors, which insert_embeddings
+    refuses too, are skipped.
+
+    Restoring the RAG collection remaps the chunk registry to the new primary keys (see
+    knowledge_ingest.remap_milvus_ids). With `drop_existing`, chunks whose vector the
+    snapshot does not hold are forgotten, so re-importing their documents stores them again.
+
+    Args:
+        collection_dir: Directory written by dump_collection
+        collection_name: Target collection (defaults to the dumped collection)
+        drop_existing: Drop the target collection first instead of appending to it
+        force: Restore even if the snapshot was made with a different embedding model
+
+    Returns:
+        int: Number of entries restored (skipped vectors excluded)
+    """
+    manifest = read_manifest(collection_dir)
+    if manifest["embedding_model"] != EMBEDDING_MODEL and not force:
+        raise ValueError(
+            f"Snapshot vectors come from {manifest['embedding_model']}, the app uses {EMBEDDING_MODEL}"
+        )
+
+    collection_name = collection_name or manifest["collection"]
+    if drop_existing:
+        drop_collection(collection_name)
+    if collection_name not in list_collections():
+        create_collection(collection_name, dim=manifest["dim"])
+
+    col = Collection(collection_name)
+    vector_field = _vector_field(col)
+    if int(vector_field.params["dim"]) != manifest["dim"]:
+        raise ValueError(f"{collection_name} has dim {vector_field.params['dim']}, the snapshot {manifest['dim']}")
+
+    count = manifest["count"]
+    vectors = np.load(collection_dir / VECTORS_FILE, mmap_mode="r")
+    insert_fields = [field for field in col.schema.fields if not (field.is_primary and field.auto_id)]
+    rows_per_batch = max(1, INSERT_BATCH_BYTES // (manifest["dim"] * 4))
+
+    primary_field = manifest.get("primary_field")
+    new_ids: Dict[int, int] = {}
+    restored = skipped = 0
+    with zstandard.open(collection_dir / ENTRIES_FILE, "rt", encoding="utf-8") as entries_file:
+        while restored + skipped < count:
+            start = restored + skipped
+            size = min(rows_per_batch, count - start)
+            entries = [orjson.loads(entries_file.readline()) for _ in range(size)]
+            batch = vectors[start:start + size]
+            keep = [i for i in range(size) if not is_degenerate_vector(batch[i])]
+            skipped += size - len(keep)
+            if not keep:
+                continue
+            columns = []
+            for field in insert_fields:
+                if field.name == vector_field.name:
+                    # Snapshots of collections indexed by L2 may hold vectors of any length
+                    columns.append(normalize_vectors(batch[keep]))
+                else:
+                    default = _default_value(field)
+                    columns.append([entries[i].get(field.name, default) for i in keep])
+            result = col.insert(columns)
+            if primary_field is not None:
+                old_ids = [entries[i].get(primary_field) for i in keep]
+                new_ids.update((old, new) for old, new in zip(old_ids, result.primary_keys) if old is not None)
+            restored += len(keep)
+
+    if skipped:
+        print(f"Skipped {skipped} zero or non-finite vectors of {collection_dir}")
+    col.flush()
+    print(f"Restored {restored} entries into {collection_name} from {collection_dir}")
+
+    if collection_name == COLLECTION_NAME and (new_ids or drop_existing):
+        remapped, dropped = _remap_knowledge_chunks(new_ids, drop_missing=drop_existing)
+        print(f"Remapped {remapped} knowledge chunks to the restored entries, forgot {dropped} without one")
+    return restored
+
+
+def _remap_knowledge_chunks(new_ids: Dict[int, int], drop_missing: bool) -> Tuple[int, int]:
+    # Imported here so dumping does not need the database
+    from app.core.db.database import sync_session
+    from app.services.knowledge_ingest import remap_milvus_ids
+
+    with sync_session() as db:
+        return remap_milvus_ids(db, new_ids, drop_missing=drop_missing)
+
+
+def dump_snapshot(name: Optional[str] = None, collections: Optional[Sequence[str]] = None,
+                  dtype: str = "float32") -> Path:
+    """Dump the given collections (default: RAG and product) into a new snapshot directory."""
+    name = name or datetime.now().strftime("%Y%m%dT%H%M%S")
+    path = snapshot_path(name)
+    for collection_name in collections or default_collections():
+        if collection_name in list_collections():
+            dump_collection(collection_name, path / collection_name, dtype=dtype)
+    return path
+
+
+def restore_snapshot(name: str, collections: Optional[Sequence[str]] = None,
+                     drop_existing: bool = False, force: bool = False) -> Dict[str, int]:
+    """Restore every (or the selected) collection of a snapshot. Returns entries restored per collection."""
+    path = snapshot_path(name)
+    if not path.is_dir():
+        raise FileNotFoundError(f"Snapshot {name} not found")
+
+    restored = {}
+    for collection_dir in sorted(path.iterdir()):
+        if not (collection_dir / MANIFEST_FILE).exists():
+            continue
+        if collections and collection_dir.name not in collections:
+            continue
+        restored[collection_dir.name] = restore_collection(collection_dir, drop_existing=drop_existing, force=force)
+    return restored
+
+
+def list_snapshots() -> List[dict]:
+    """Complete snapshots under SNAPSHOT_DIR with the manifests of their collections, newest first."""
+    if not SNAPSHOT_DIR.is_dir():
+        return []
+
+    snapshots = []
+    for path in sorted(SNAPSHOT_DIR.iterdir(), reverse=True):
+        manifests = [read_manifest(d) for d in sorted(path.iterdir()) if (d / MANIFEST_FILE).exists()] \
+            if path.is_dir() else []
+        if manifests:
+            snapshots.append({"name": path.name, "collections": manifests})
+    return snapshots
@@ -0,0 +1,40 @@
+"""Add version column to bot_settings
+
+Revision ID: add_bot_settings_version
+Revises: hash_token_blacklist
+Create Date: 2026-10-19 10:00:00
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'add_bot_settings_version'
+down_revision = 'hash_token_blacklist'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    if 'bot_settings' not in inspector.get_table_names():
+        print("bot_settings table does not exist, skipping")
+        return
+
+    columns = [column['name'] for column in inspector.get_columns('bot_settings')]
+    if 'version' not in columns:
+        print("Adding version column to bot_settings...")
+        op.add_column('bot_settings', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+    else:
+        print("bot_settings.version already exists, skipping")
+
+
+def downgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    if 'bot_settings' in inspector.get_table_names():
+        columns = [column['name'] for column in inspector.get_columns('bot_settings')]
+        if 'version' in columns:
+            op.drop_column('bot_settings', 'version')
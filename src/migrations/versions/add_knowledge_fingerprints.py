@@ -0,0 +1,79 @@
+"""Add knowledge_documents and knowledge_chunks tables
+
+Revision ID: add_knowledge_fingerprints
+Revises: add_products_sku
+Create Date: 2026-10-19 14:00:00
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'add_knowledge_fingerprints'
+down_revision = 'add_products_sku'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    tables = inspector.get_table_names()
+
+    if 'knowledge_documents' not in tables:
+        print("Creating knowledge_documents table...")
+        op.create_table(
+            'knowledge_documents',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('source_key', sa.String(512), nullable=False),
+            sa.Column('title', sa.String(255), nullable=True),
+            sa.Column('content_hash', sa.String(64), nullable=False),
+            sa.Column('version', sa.Integer(), nullable=False, server_default='1'),
+            sa.Column('chunk_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('created_at', sa.DateTime(), server_default=sa.text("CURRENT_TIMESTAMP")),
+            sa.Column('updated_at', sa.DateTime(), server_default=sa.text("CURRENT_TIMESTAMP")),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_knowledge_documents_id', 'knowledge_documents', ['id'], unique=False)
+        op.create_index('ix_knowledge_documents_source_key', 'knowledge_documents', ['source_key'], unique=True)
+    else:
+        print("knowledge_documents table already exists, skipping")
+
+    if 'knowledge_chunks' not in tables:
+        print("Creating knowledge_chunks table...")
+        op.create_table(
+            'knowledge_chunks',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('document_id', sa.Integer(), nullable=False),
+            sa.Column('chunk_index', sa.Integer(), nullable=False),
+            sa.Column('content_hash', sa.String(64), nullable=False),
+            sa.Column('simhash', sa.BigInteger(), nullable=False),
+            sa.Column('simhash_band0', sa.Integer(), nullable=False),
+            sa.Column('simhash_band1', sa.Integer(), nullable=False),
+            sa.Column('simhash_band2', sa.Integer(), nullable=False),
+            sa.Column('simhash_band3', sa.Integer(), nullable=False),
+            sa.Column('milvus_id', sa.BigInteger(), nullable=True),
+            sa.Column('language', sa.String(10), nullable=True),
+            sa.ForeignKeyConstraint(['document_id'], ['knowledge_documents.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_knowledge_chunks_id', 'knowledge_chunks', ['id'], unique=False)
+        op.create_index('ix_knowledge_chunks_document_id', 'knowledge_chunks', ['document_id'], unique=False)
+        op.create_index('ix_knowledge_chunks_content_hash', 'knowledge_chunks', ['content_hash'], unique=True)
+        for band in range(4):
+            op.create_index(
+                f'ix_knowledge_chunks_simhash_band{band}', 'knowledge_chunks', [f'simhash_band{band}'], unique=False
+            )
+    else:
+        print("knowledge_chunks table already exists, skipping")
+
+
+def downgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    tables = inspector.get_table_names()
+    if 'knowledge_chunks' in tables:
+        op.drop_table('knowledge_chunks')
+    if 'knowledge_documents' in tables:
+        op.drop_table('knowledge_documents')
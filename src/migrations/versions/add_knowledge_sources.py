@@ -0,0 +1,63 @@
+"""Add knowledge_sources table and knowledge_documents.source_id
+
+Revision ID: add_knowledge_sources
+Revises: add_knowledge_fingerprints
+Create Date: 2026-10-19 16:00:00
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'add_knowledge_sources'
+down_revision = 'add_knowledge_fingerprints'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    tables = inspector.get_table_names()
+
+    if 'knowledge_sources' not in tables:
+        print("Creating knowledge_sources table...")
+        op.create_table(
+            'knowledge_sources',
+            sa.Column('id', sa.String(32), nullable=False),
+            sa.Column('name', sa.String(255), nullable=False),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('source_type', sa.String(20), nullable=False, server_default='manual'),
+            sa.Column('url', sa.String(2048), nullable=True),
+            sa.Column('created_at', sa.DateTime(), server_default=sa.text("CURRENT_TIMESTAMP")),
+            sa.Column('updated_at', sa.DateTime(), server_default=sa.text("CURRENT_TIMESTAMP")),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_knowledge_sources_id', 'knowledge_sources', ['id'], unique=False)
+    else:
+        print("knowledge_sources table already exists, skipping")
+
+    columns = [column['name'] for column in inspector.get_columns('knowledge_documents')]
+    if 'source_id' not in columns:
+        print("Adding source_id column to knowledge_documents table...")
+        op.add_column('knowledge_documents', sa.Column('source_id', sa.String(32), nullable=True))
+        op.create_foreign_key(
+            'fk_knowledge_documents_source_id', 'knowledge_documents', 'knowledge_sources',
+            ['source_id'], ['id'], ondelete='CASCADE'
+        )
+        op.create_index('ix_knowledge_documents_source_id', 'knowledge_documents', ['source_id'], unique=False)
+    else:
+        print("source_id column already exists in knowledge_documents table, skipping")
+
+
+def downgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    columns = [column['name'] for column in inspector.get_columns('knowledge_documents')]
+    if 'source_id' in columns:
+        op.drop_index('ix_knowledge_documents_source_id', table_name='knowledge_documents')
+        op.drop_constraint('fk_knowledge_documents_source_id', 'knowledge_documents', type_='foreignkey')
+        op.drop_column('knowledge_documents', 'source_id')
+    if 'knowledge_sources' in inspector.get_table_names():
+        op.drop_table('knowledge_sources')
@@ -0,0 +1,51 @@
+"""Add composite index for product listing filters
+
+Revision ID: add_products_listing_index
+Revises: add_bot_settings_version
+Create Date: 2026-10-19 11:00:00
+
+"""
+from alembic import op
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'add_products_listing_index'
+down_revision = 'add_bot_settings_version'
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = 'ix_products_active_language_category_id'
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    if 'products' not in inspector.get_table_names():
+        print("products table does not exist, skipping")
+        return
+
+    existing_index_names = [idx['name'] for idx in inspector.get_indexes('products')]
+    if INDEX_NAME in existing_index_names:
+        print(f"Index {INDEX_NAME} already exists, skipping creation")
+        return
+
+    print(f"Creating index {INDEX_NAME}...")
+    # Build the index without locking writes on a large catalog
+    with op.get_context().autocommit_block():
+        op.create_index(
+            INDEX_NAME,
+            'products',
+            ['is_active', 'language', 'category', 'id'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+
+
+def downgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    if 'products' in inspector.get_table_names():
+        existing_index_names = [idx['name'] for idx in inspector.get_indexes('products')]
+        if INDEX_NAME in existing_index_names:
+            with op.get_context().autocommit_block():
+                op.drop_index(INDEX_NAME, table_name='products', postgresql_concurrently=True)
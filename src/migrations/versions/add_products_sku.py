@@ -0,0 +1,48 @@
+"""Add sku column to products
+
+Revision ID: add_products_sku
+Revises: add_products_listing_index
+Create Date: 2026-10-19 12:00:00
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'add_products_sku'
+down_revision = 'add_products_listing_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    if 'products' not in inspector.get_table_names():
+        print("products table does not exist, skipping")
+        return
+
+    columns = [column['name'] for column in inspector.get_columns('products')]
+    if 'sku' not in columns:
+        print("Adding sku column to products...")
+        op.add_column('products', sa.Column('sku', sa.String(64), nullable=True))
+    else:
+        print("products.sku already exists, skipping")
+
+    existing_index_names = [idx['name'] for idx in inspector.get_indexes('products')]
+    if 'ix_products_sku' not in existing_index_names:
+        # Unique so bulk imports can upsert with ON CONFLICT (sku); NULLs stay allowed
+        op.create_index('ix_products_sku', 'products', ['sku'], unique=True)
+
+
+def downgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    if 'products' in inspector.get_table_names():
+        existing_index_names = [idx['name'] for idx in inspector.get_indexes('products')]
+        if 'ix_products_sku' in existing_index_names:
+            op.drop_index('ix_products_sku', table_name='products')
+        columns = [column['name'] for column in inspector.get_columns('products')]
+        if 'sku' in columns:
+            op.drop_column('products', 'sku')
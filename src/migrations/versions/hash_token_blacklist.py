@@ -0,0 +1,59 @@
+"""Store token hashes in token_blacklist
+
+Revision ID: hash_token_blacklist
+Revises: 732f7ec2f7b1
+Create Date: 2026-10-19 09:00:00
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'hash_token_blacklist'
+down_revision = '732f7ec2f7b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    if 'token_blacklist' not in inspector.get_table_names():
+        print("Creating token_blacklist table...")
+        op.create_table(
+            'token_blacklist',
+            sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+            sa.Column('token_hash', sa.String(64), nullable=False),
+            sa.Column('expires_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('id')
+        )
+        op.create_index('ix_token_blacklist_token_hash', 'token_blacklist', ['token_hash'], unique=True)
+        return
+
+    columns = [column['name'] for column in inspector.get_columns('token_blacklist')]
+    if 'token_hash' in columns:
+        print("token_blacklist already stores token hashes, skipping")
+        return
+
+    print("Replacing raw tokens in token_blacklist with sha256 hashes...")
+    existing_index_names = [idx['name'] for idx in inspector.get_indexes('token_blacklist')]
+    if 'ix_token_blacklist_token' in existing_index_names:
+        op.drop_index('ix_token_blacklist_token', table_name='token_blacklist')
+
+    # Expired rows are useless and would only slow down the rewrite below
+    op.execute("DELETE FROM token_blacklist WHERE expires_at < (NOW() AT TIME ZONE 'utc')")
+    op.execute("UPDATE token_blacklist SET token = encode(sha256(convert_to(token, 'UTF8')), 'hex')")
+    op.alter_column('token_blacklist', 'token', new_column_name='token_hash', type_=sa.String(64))
+    op.create_index('ix_token_blacklist_token_hash', 'token_blacklist', ['token_hash'], unique=True)
+
+
+def downgrade():
+    # Hashes cannot be turned back into tokens; the column is only renamed back
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    if 'token_blacklist' in inspector.get_table_names():
+        op.drop_index('ix_token_blacklist_token_hash', table_name='token_blacklist')
+        op.alter_column('token_blacklist', 'token_hash', new_column_name='token', type_=sa.String())
+        op.create_index('ix_token_blacklist_token', 'token_blacklist', ['token'], unique=True)
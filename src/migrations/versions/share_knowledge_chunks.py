@@ -0,0 +1,49 @@
+"""Let documents share chunk vectors: non-unique knowledge_chunks.content_hash, index milvus_id
+
+Revision ID: share_knowledge_chunks
+Revises: add_knowledge_sources
+Create Date: 2026-10-19 18:00:00
+
+"""
+from alembic import op
+from sqlalchemy import inspect
+
+# revision identifiers, used by Alembic.
+revision = 'share_knowledge_chunks'
+down_revision = 'add_knowledge_sources'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    indexes = {index['name']: index for index in inspector.get_indexes('knowledge_chunks')}
+
+    if indexes.get('ix_knowledge_chunks_content_hash', {}).get('unique'):
+        print("Making knowledge_chunks.content_hash non-unique...")
+        op.drop_index('ix_knowledge_chunks_content_hash', table_name='knowledge_chunks')
+        op.create_index('ix_knowledge_chunks_content_hash', 'knowledge_chunks', ['content_hash'], unique=False)
+    else:
+        print("knowledge_chunks.content_hash is already non-unique, skipping")
+
+    if 'ix_knowledge_chunks_milvus_id' not in indexes:
+        print("Adding index on knowledge_chunks.milvus_id...")
+        op.create_index('ix_knowledge_chunks_milvus_id', 'knowledge_chunks', ['milvus_id'], unique=False)
+    else:
+        print("ix_knowledge_chunks_milvus_id already exists, skipping")
+
+
+def downgrade():
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    indexes = {index['name']: index for index in inspector.get_indexes('knowledge_chunks')}
+    if 'ix_knowledge_chunks_milvus_id' in indexes:
+        op.drop_index('ix_knowledge_chunks_milvus_id', table_name='knowledge_chunks')
+    # Shared chunks have to go before the hash can be unique again: keep the first row of each hash
+    op.execute(
+        "DELETE FROM knowledge_chunks WHERE id NOT IN "
+        "(SELECT MIN(id) FROM knowledge_chunks GROUP BY content_hash)"
+    )
+    op.drop_index('ix_knowledge_chunks_content_hash', table_name='knowledge_chunks')
+    op.create_index('ix_knowledge_chunks_content_hash', 'knowledge_chunks', ['content_hash'], unique=True)
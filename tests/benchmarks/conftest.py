@@ -0,0 +1,90 @@
+"""
+Fixtures of the hot-path benchmarks: synthetic catalogs, and the services running offline.
+
+Catalog sizes come from BENCHMARK_CATALOG_SIZES (comma separated, default "100,1000"); every
+benchmark taking `catalog_size` runs once per size. The database is an in-memory SQLite one,
+Milvus is replaced by LocalCollection and embeddings come from the fake provider, so the
+numbers are the app's own work. The synthetic data and LocalCollection are in
+tests/helpers/benchmarks.py.
+"""
+import os
+from typing import Any, Generator
+
+import numpy as np
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.db.database import Base
+from app.models.coupon import Coupon
+from app.models.knowledge import KnowledgeChunk, KnowledgeDocument, KnowledgeSource
+from app.models.product import Product
+from app.services import milvus_client
+from app.services.embedding import EmbeddingService
+from app.services.providers import FakeEmbeddingProvider
+from tests.helpers.benchmarks import LocalCollection, synthetic_coupons, synthetic_passages, synthetic_products
+
+try:
+    import pytest_benchmark  # noqa: F401
+except ImportError:
+    collect_ignore_glob = ["test_*.py"]
+
+CATALOG_SIZES = [int(size) for size in os.environ.get("BENCHMARK_CATALOG_SIZES", "100,1000").split(",")
+                 if size.strip()]
+# Small vectors: the stand-in's search is part of the measurement
+EMBEDDING_DIM = 256
+
+
+@pytest.fixture(params=CATALOG_SIZES, ids=lambda size: f"catalog={size}")
+def catalog_size(request: pytest.FixtureRequest) -> int:
+    return request.param
+
+
+@pytest.fixture
+def session_factory() -> Generator[sessionmaker, Any, None]:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[Product.__table__, Coupon.__table__, KnowledgeSource.__table__,
+                                             KnowledgeDocument.__table__, KnowledgeChunk.__table__])
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory: sessionmaker, catalog_size: int) -> Generator[Session, Any, None]:
+    session = session_factory()
+    session.bulk_insert_mappings(Product, synthetic_products(catalog_size))
+    session.bulk_insert_mappings(Coupon, synthetic_coupons(catalog_size))
+    session.commit()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def embedder() -> EmbeddingService:
+    return EmbeddingService(provider=FakeEmbeddingProvider(dim=EMBEDDING_DIM, latency="fixed:0"))
+
+
+@pytest.fixture
+def local_milvus(mocker: MockerFixture, embedder: EmbeddingService, catalog_size: int) -> LocalCollection:
+    """LocalCollection of `catalog_size` passages, searched by milvus_client.search_embedding."""
+    texts = synthetic_passages(catalog_size)
+    languages = ["ar" if i % 5 == 4 else "en" for i in range(len(texts))]
+    collection = LocalCollection(texts, languages, np.asarray(embedder.embed_batch(texts), dtype=np.float32))
+    mocker.patch.object(milvus_client, "list_collections", return_value=[milvus_client.COLLECTION_NAME])
+    mocker.patch.object(milvus_client, "build_index")
+    mocker.patch.object(milvus_client, "load_collection", return_value=collection)
+    return collection
+
+
+@pytest.fixture
+def offline_services(mocker: MockerFixture, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Lets RAGService, ProductService and BotService be built without Milvus or an API key."""
+    # markdown_converter builds an OpenAI client on import; it is never called here
+    if not os.environ.get("OPENAI_API_KEY"):
+        monkeypatch.setenv("OPENAI_API_KEY", "unused")
+    from app.services import product_embedding, rag
+
+    for module in (rag, product_embedding):
+        mocker.patch.object(module, "connect_to_milvus")
+        mocker.patch.object(module, "create_collection")
@@ -0,0 +1,37 @@
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+from pytest_mock import MockerFixture
+from sqlalchemy.orm import Session
+
+from app.services.embedding import EmbeddingService
+from tests.helpers.benchmarks import LocalCollection
+
+
+@pytest.fixture
+def bot_service(db: Session, offline_services: None, local_milvus: LocalCollection, embedder: EmbeddingService,
+                mocker: MockerFixture):
+    from app.services.bot_service import BotService
+
+    service = BotService(db)
+    mocker.patch.object(service.rag_service, "embedder", embedder)
+    mocker.patch.object(service.product_search.embedding_service, "search_products", return_value=[])
+    return service
+
+
+@pytest.mark.parametrize("route, message", [
+    ("coupon", "Do you have a promo code?"),
+    ("faq", "How much does shipping cost?"),
+    ("product", None),
+    ("knowledge_base", "What are your opening hours?"),
+])
+def test_process_message(benchmark: BenchmarkFixture, bot_service, route: str, message: str) -> None:
+    if route == "product":
+        product = bot_service.product_search.product_service.get_products(limit=1, language="en")[0]
+        message = f"Do you have the {product.name}?"
+
+    # A new session per call, so the history does not grow across rounds
+    reply, _, additional_data, _ = benchmark(lambda: bot_service.process_message(message, {"language": "en"}))
+
+    assert reply
+    if route == "product":
+        assert additional_data["products"]
@@ -0,0 +1,13 @@
+from datetime import datetime
+
+from pytest_benchmark.fixture import BenchmarkFixture
+from sqlalchemy.orm import Session
+
+from app.services.coupon_service import CouponService
+
+
+def test_get_active_coupons(benchmark: BenchmarkFixture, db: Session) -> None:
+    coupons = benchmark(CouponService(db).get_active_coupons)
+
+    now = datetime.utcnow()
+    assert coupons and all(c.is_active and (c.expires_at is None or c.expires_at > now) for c in coupons)
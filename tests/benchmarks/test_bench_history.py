@@ -0,0 +1,27 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from pytest_benchmark.fixture import BenchmarkFixture
+
+from app.services.graph_service.history import deserialize_messages, serialize_messages
+
+HISTORY_LENGTHS = [10, 100]
+
+
+def _history(length: int) -> list:
+    return [HumanMessage(content=f"Where is my order #{i}?") if i % 2 == 0 else
+            AIMessage(content=f"Your order #{i - 1} has been shipped and arrives in 3-5 business days.")
+            for i in range(length)]
+
+
+@pytest.mark.parametrize("length", HISTORY_LENGTHS)
+def test_serialize_messages(benchmark: BenchmarkFixture, length: int) -> None:
+    serialized = benchmark(serialize_messages, _history(length))
+
+    assert len(serialized) == length
+
+
+@pytest.mark.parametrize("length", HISTORY_LENGTHS)
+def test_deserialize_messages(benchmark: BenchmarkFixture, length: int) -> None:
+    messages = benchmark(deserialize_messages, serialize_messages(_history(length)))
+
+    assert messages == _history(length)
@@ -0,0 +1,34 @@
+import pytest
+from pytest_benchmark.fixture import BenchmarkFixture
+from sqlalchemy.orm import Session
+
+from app.models.product import Product
+
+
+@pytest.fixture
+def product_search(db: Session, offline_services: None):
+    from app.services.product_search import ProductSearchService
+
+    return ProductSearchService(db)
+
+
+@pytest.mark.parametrize("match", ["exact", "partial", "none"])
+def test_search_product_by_name(benchmark: BenchmarkFixture, product_search, match: str) -> None:
+    # One of the products the search looks at
+    name = product_search.product_service.get_products(limit=1, language="en")[0].name
+    query = {"exact": name, "partial": name.split()[-2], "none": "gaming keyboard"}[match]
+
+    # No product vector store: an empty result, as for a query nothing resembles
+    found, product = benchmark(product_search.search_product_by_name, query, "en", vector_search=lambda: [])
+
+    assert found == (match != "none")
+
+
+def test_find_fuzzy_match(benchmark: BenchmarkFixture, product_search, db: Session) -> None:
+    products = db.query(Product).all()
+    # A name without its number: every product by that name is as good a match
+    query = products[0].name.lower().rsplit(" ", 1)[0]
+
+    match = benchmark(product_search._find_fuzzy_match, query, products)
+
+    assert match.name.lower().startswith(query)
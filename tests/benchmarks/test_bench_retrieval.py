@@ -0,0 +1,45 @@
+from pytest_benchmark.fixture import BenchmarkFixture
+from pytest_mock import MockerFixture
+from sqlalchemy.orm import sessionmaker
+
+from app.models.knowledge import KnowledgeChunk, KnowledgeDocument, KnowledgeSource
+from app.services import knowledge_ingest
+from app.services.embedding import EmbeddingService
+from app.services.milvus_client import search_embedding
+from tests.helpers.benchmarks import LocalCollection, synthetic_passages
+
+
+def test_search_embedding(benchmark: BenchmarkFixture, local_milvus: LocalCollection,
+                          embedder: EmbeddingService) -> None:
+    query = embedder.embed("How long does express delivery take?")
+
+    results = benchmark(search_embedding, query, top_k=5, filter_expr="language == 'en'")
+
+    assert len(results) == 5
+    assert all(result["language"] == "en" for result in results)
+
+
+def test_add_text_to_milvus(benchmark: BenchmarkFixture, offline_services: None, session_factory: sessionmaker,
+                            embedder: EmbeddingService, catalog_size: int, mocker: MockerFixture) -> None:
+    from app.services import rag
+
+    next_id = iter(range(10 ** 9))
+    mocker.patch.object(knowledge_ingest, "insert_embeddings",
+                        side_effect=lambda vectors, texts, *_, **__: [next(next_id) for _ in texts])
+    mocker.patch.object(knowledge_ingest, "delete_entries")
+    mocker.patch.object(rag, "sync_session", session_factory)
+    service = rag.RAGService()
+    service.embedder = embedder
+    text = "\n\n".join(synthetic_passages(catalog_size))
+
+    def empty_store() -> None:
+        # Every round ingests the document as new, rather than finding it unchanged
+        with session_factory() as db:
+            for model in (KnowledgeChunk, KnowledgeDocument, KnowledgeSource):
+                db.query(model).delete()
+            db.commit()
+
+    added = benchmark.pedantic(service.add_text_to_milvus, args=(text,), kwargs={"language": "en"},
+                               setup=empty_store, rounds=5)
+
+    assert added > 0
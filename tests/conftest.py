@@ -8,12 +8,8 @@ from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm.session import Session
 
 from app.core.config import settings
-from app.main import app
 
-DATABASE_URI = settings.POSTGRES_URI
-DATABASE_PREFIX = settings.POSTGRES_SYNC_PREFIX
-
-sync_engine = create_engine(DATABASE_PREFIX + DATABASE_URI)
+sync_engine = create_engine(settings.sqlalchemy_sync_url)
 local_session = sessionmaker(autocommit=False, autoflush=False, bind=sync_engine)
 
 
@@ -22,6 +18,9 @@ fake = Faker()
 
 @pytest.fixture(scope="session")
 def client() -> Generator[TestClient, Any, None]:
+    # Imported lazily so unit tests that don't need the full app (and its Milvus connection) can run alone
+    from app.main import app
+
     with TestClient(app) as _client:
         yield _client
     app.dependency_overrides = {}
@@ -36,4 +35,6 @@ def db() -> Generator[Session, Any, None]:
 
 
 def override_dependency(dependency: Callable[..., Any], mocked_response: Any) -> None:
+    from app.main import app
+
     app.dependency_overrides[dependency] = lambda: mocked_response
@@ -0,0 +1,87 @@
+"""
+Synthetic data of the hot-path benchmarks, and LocalCollection, the in-memory stand-in for Milvus.
+"""
+import random
+import re
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.services import milvus_client
+
+ADJECTIVES = ["Wireless", "Classic", "Smart", "Portable", "Premium", "Compact", "Organic", "Vintage", "Ultra", "Eco"]
+MATERIALS = ["Black", "White", "Cotton", "Leather", "Steel", "Bamboo", "Glass", "Wool"]
+NOUNS = ["Headphones", "Shirt", "Watch", "Backpack", "Lamp", "Mug", "Speaker", "Jacket", "Blender", "Kettle", "Charger",
+         "Sneakers"]
+ARABIC_NOUNS = ["قميص", "ساعة", "حقيبة", "مصباح", "كوب", "سماعات", "جاكيت", "غلاية"]
+ARABIC_ADJECTIVES = ["قطني", "ذكية", "جلدية", "كلاسيكي", "لاسلكية", "صغيرة"]
+TOPICS = ["shipping", "returns", "refunds", "warranty", "payment", "membership", "orders", "gift cards"]
+WORDS = ["customers", "items", "business", "days", "policy", "support", "delivery", "store", "credit", "original",
+         "packaging", "receipt", "account", "discount", "express", "standard", "international", "fee"]
+
+
+def synthetic_products(size: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """`size` products, one in five Arabic, with unique names."""
+    rng = random.Random(seed)
+    products = []
+    for i in range(size):
+        if i % 5 == 4:
+            name, language = f"{rng.choice(ARABIC_NOUNS)} {rng.choice(ARABIC_ADJECTIVES)} {i}", "ar"
+        else:
+            name, language = f"{rng.choice(ADJECTIVES)} {rng.choice(MATERIALS)} {rng.choice(NOUNS)} {i}", "en"
+        products.append({"name": name, "description": f"{name} from our catalog",
+                         "price": round(rng.uniform(5, 500), 2), "stock_quantity": rng.choice([0, 3, 25, 120]),
+                         "category": rng.choice(NOUNS), "language": language, "sku": f"SKU-{i:06d}"})
+    return products
+
+
+def synthetic_coupons(size: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """`size` coupons: mostly active, some inactive, expired or without expiry."""
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    coupons = []
+    for i in range(size):
+        expires_at = rng.choice([None, now + timedelta(days=rng.randint(1, 90)),
+                                 now - timedelta(days=rng.randint(1, 90))])
+        coupons.append({"code": f"SAVE{i:05d}", "discount": float(rng.choice([5, 10, 15, 20, 25])),
+                        "description": f"{rng.choice(TOPICS).title()} promotion", "is_active": rng.random() < 0.8,
+                        "expires_at": expires_at})
+    return coupons
+
+
+def synthetic_passages(size: int, seed: int = 0) -> List[str]:
+    """`size` knowledge base passages of 20 to 60 words, each starting with its topic."""
+    rng = random.Random(seed)
+    return [f"{rng.choice(TOPICS).title()}: " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 60))) + "."
+            for _ in range(size)]
+
+
+class LocalCollection:
+    """In-memory stand-in for the knowledge collection: exact inner product search over unit vectors."""
+
+    def __init__(self, texts: Sequence[str], languages: Sequence[str], vectors: np.ndarray) -> None:
+        self.texts = list(texts)
+        self.languages = np.asarray(languages)
+        self.vectors = milvus_client.normalize_vectors(vectors)
+        self.schema = SimpleNamespace(fields=[
+            SimpleNamespace(name="id", params={}),
+            SimpleNamespace(name="embedding", params={"dim": vectors.shape[1]}),
+            SimpleNamespace(name="text", params={"max_length": 2048}),
+            SimpleNamespace(name="language", params={}),
+        ])
+
+    def index(self) -> SimpleNamespace:
+        return SimpleNamespace(params={"metric_type": "IP"})
+
+    def search(self, data: List[List[float]], anns_field: str, param: Dict[str, Any], limit: int,
+               expr: Optional[str] = None, output_fields: Optional[List[str]] = None) -> List[List[SimpleNamespace]]:
+        scores = self.vectors @ np.asarray(data[0], dtype=np.float32)
+        candidates = np.arange(len(self.texts))
+        language = re.fullmatch(r"language == '(\w+)'", expr or "")
+        if language:
+            candidates = candidates[self.languages == language.group(1)]
+        top = candidates[np.argsort(-scores[candidates])[:limit]]
+        return [[SimpleNamespace(id=int(i), distance=float(scores[i]),
+                                 entity={"text": self.texts[i], "language": str(self.languages[i])}) for i in top]]
@@ -0,0 +1,80 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from pytest_mock import MockerFixture
+
+from app.core.auth_cache import TokenBlacklistCache, UserCache, hash_token
+
+
+def _db_returning(mocker: MockerFixture, rows: list[SimpleNamespace]):
+    db = mocker.MagicMock()
+    db.execute = mocker.AsyncMock(return_value=mocker.MagicMock(all=mocker.MagicMock(return_value=rows)))
+    return db
+
+
+def test_hash_token_is_stable_and_not_the_token() -> None:
+    assert hash_token("abc") == hash_token("abc")
+    assert hash_token("abc") != "abc"
+    assert len(hash_token("abc")) == 64
+
+
+def test_blacklist_cache_syncs_incrementally(mocker: MockerFixture) -> None:
+    expires_at = datetime.now() + timedelta(hours=1)
+    cache = TokenBlacklistCache(sync_interval=0)
+
+    db = _db_returning(mocker, [SimpleNamespace(id=1, token_hash="a", expires_at=expires_at)])
+    assert asyncio.run(cache.contains("a", db))
+
+    db = _db_returning(mocker, [SimpleNamespace(id=2, token_hash="b", expires_at=expires_at)])
+    assert asyncio.run(cache.contains("b", db))
+    assert asyncio.run(cache.contains("a", db))
+    assert not asyncio.run(cache.contains("c", db))
+
+
+def test_blacklist_cache_skips_db_within_sync_interval(mocker: MockerFixture) -> None:
+    cache = TokenBlacklistCache(sync_interval=60)
+    db = _db_returning(mocker, [])
+
+    for _ in range(10):
+        asyncio.run(cache.contains("a", db))
+
+    assert db.execute.await_count == 1
+
+
+def test_blacklist_cache_prune_drops_expired_hashes() -> None:
+    cache = TokenBlacklistCache(sync_interval=60)
+    now = datetime.now()
+    cache.add("old", now - timedelta(seconds=1))
+    cache.add("new", now + timedelta(hours=1))
+
+    cache.prune(now)
+
+    assert "old" not in cache._revoked
+    assert "new" in cache._revoked
+
+
+def test_user_cache_expires_and_evicts(mocker: MockerFixture) -> None:
+    clock = mocker.patch("app.core.auth_cache.time.monotonic", return_value=0.0)
+    cache = UserCache(ttl=30, max_size=2)
+
+    cache.set("alice", {"username": "alice"})
+    cache.set("bob", {"username": "bob"})
+    cache.get("alice")
+    cache.set("carol", {"username": "carol"})
+    assert cache.get("bob") is None
+    assert cache.get("alice") == {"username": "alice"}
+
+    clock.return_value = 31.0
+    assert cache.get("alice") is None
+
+
+def test_user_cache_invalidate() -> None:
+    cache = UserCache(ttl=30, max_size=10)
+    cache.set("alice", {"username": "alice"})
+    cache.set("alice@example.com", {"username": "alice"})
+
+    cache.invalidate("alice", "alice@example.com", None)
+
+    assert cache.get("alice") is None
+    assert cache.get("alice@example.com") is None
@@ -0,0 +1,88 @@
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any
+
+from pytest_mock import MockerFixture
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core import bot_settings
+from app.core.bot_settings import BotSettingsCache
+from app.core.db.database import Base
+from app.crud import crud_bot_settings
+from app.models.bot_settings import BotSettings
+
+
+def _row(version: int, bot_name: str = "Support Bot") -> SimpleNamespace:
+    return SimpleNamespace(
+        id=1,
+        version=version,
+        bot_name=bot_name,
+        welcome_message="Hello!",
+        fallback_message="Sorry?",
+        quick_actions=[{"label": "Track Order", "value": "Track my order"}],
+        advanced_settings={"language": "en"},
+    )
+
+
+def test_reads_do_not_query_after_first_load(mocker: MockerFixture) -> None:
+    db_get_settings = mocker.patch.object(bot_settings, "db_get_settings", return_value=_row(3))
+    cache = BotSettingsCache()
+
+    for _ in range(100):
+        assert cache.get(db=mocker.MagicMock()).bot_name == "Support Bot"
+
+    assert db_get_settings.call_count == 1
+    assert cache.version == 3
+
+
+def test_refresh_never_goes_back_to_an_older_version(mocker: MockerFixture) -> None:
+    db_get_settings = mocker.patch.object(bot_settings, "db_get_settings", return_value=_row(5, "New"))
+    cache = BotSettingsCache()
+    cache.refresh(db=mocker.MagicMock())
+
+    db_get_settings.return_value = _row(4, "Old")
+    assert cache.refresh(db=mocker.MagicMock()).bot_name == "New"
+    assert not cache.is_stale(5)
+    assert cache.is_stale(6)
+
+
+def test_falls_back_to_file_when_database_is_down(mocker: MockerFixture) -> None:
+    mocker.patch.object(bot_settings, "db_get_settings", side_effect=RuntimeError("db down"))
+    mocker.patch.object(bot_settings, "get_bot_settings_from_file", return_value={"bot_name": "From File"})
+    cache = BotSettingsCache()
+
+    snapshot = cache.get(db=mocker.MagicMock())
+
+    assert snapshot.bot_name == "From File"
+    assert cache.version is None
+
+
+def test_overlapping_updates_commit_distinct_versions(mocker: MockerFixture, tmp_path: Path) -> None:
+    engine = create_engine(f"sqlite:///{tmp_path / 'settings.db'}")
+    Base.metadata.create_all(engine, tables=[BotSettings.__table__])
+    sessions = sessionmaker(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(BotSettings.__table__.insert(), {"id": 1, "bot_name": "Support Bot", "welcome_message": "Hello!",
+                                                      "fallback_message": "Sorry?", "version": 1})
+    notified = []
+    mocker.patch.object(crud_bot_settings, "notify_bot_settings_changed",
+                        side_effect=lambda db, version: notified.append(version))
+    build_update_data = crud_bot_settings._build_update_data
+    interleaved = []
+
+    def interleave(*args: Any) -> dict:
+        # The second update commits after the first one loaded the row, before it writes
+        if not interleaved:
+            interleaved.append(True)
+            with sessions() as other:
+                crud_bot_settings.update_bot_settings(other, 1, bot_name="Second")
+        return build_update_data(*args)
+
+    mocker.patch.object(crud_bot_settings, "_build_update_data", side_effect=interleave)
+    with sessions() as db:
+        first = crud_bot_settings.update_bot_settings(db, 1, bot_name="First")
+
+    assert notified == [2, 3]
+    assert (first.version, first.bot_name) == (3, "First")
+    engine.dispose()
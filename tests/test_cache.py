@@ -0,0 +1,187 @@
+import asyncio
+from collections.abc import Generator
+from types import SimpleNamespace
+
+import pytest
+from fakeredis import FakeServer
+from fakeredis.aioredis import FakeRedis
+
+from app.core.exceptions.cache_exceptions import InvalidRequestError, MissingClientError
+from app.core.utils import cache as cache_module
+from app.core.utils.cache import InMemoryCacheBackend, RedisCacheBackend, cache
+
+
+@pytest.fixture
+def server() -> FakeServer:
+    return FakeServer()
+
+
+@pytest.fixture
+def backend(server: FakeServer) -> Generator[RedisCacheBackend, None, None]:
+    cache_module.backend = RedisCacheBackend(FakeRedis(server=server))
+    yield cache_module.backend
+    cache_module.backend = None
+
+
+def _request(method: str) -> SimpleNamespace:
+    return SimpleNamespace(method=method)
+
+
+def _posts_endpoints(calls: list[str], delay: float = 0) -> SimpleNamespace:
+    @cache(key_prefix="{username}_posts:page_{page}", resource_id_name="username", expiration=60)
+    async def read_posts(request, username: str, page: int = 1) -> dict:
+        calls.append("read_posts")
+        await asyncio.sleep(delay)
+        return {"data": [{"id": 1, "title": f"post by {username}"}], "page": page}
+
+    @cache(key_prefix="{username}_post_cache", resource_id_name="id")
+    async def read_post(request, username: str, id: int) -> dict:
+        calls.append("read_post")
+        return {"id": id, "title": "title"}
+
+    @cache(
+        "{username}_post_cache",
+        resource_id_name="id",
+        pattern_to_invalidate_extra=["{username}_posts:*"],
+    )
+    async def patch_post(request, username: str, id: int) -> dict:
+        return {"message": "Post updated"}
+
+    return SimpleNamespace(read_posts=read_posts, read_post=read_post, patch_post=patch_post)
+
+
+def test_get_is_served_from_redis(backend: RedisCacheBackend) -> None:
+    calls: list[str] = []
+    endpoints = _posts_endpoints(calls)
+
+    async def run() -> tuple[dict, dict, int]:
+        first = await endpoints.read_posts(_request("GET"), username="alice", page=1)
+        second = await endpoints.read_posts(_request("GET"), username="alice", page=1)
+        return first, second, await backend.client.ttl("alice_posts:page_1:alice")
+
+    first, second, ttl = asyncio.run(run())
+
+    assert calls == ["read_posts"]
+    assert first == second
+    assert ttl == 60
+
+
+def test_patch_invalidates_key_and_patterns(backend: RedisCacheBackend) -> None:
+    calls: list[str] = []
+    endpoints = _posts_endpoints(calls)
+
+    async def run() -> None:
+        await endpoints.read_posts(_request("GET"), username="alice", page=1)
+        await endpoints.read_posts(_request("GET"), username="alice", page=2)
+        await endpoints.read_posts(_request("GET"), username="bob", page=1)
+        await endpoints.read_post(_request("GET"), username="alice", id=7)
+
+        await endpoints.patch_post(_request("PATCH"), username="alice", id=7)
+
+        await endpoints.read_posts(_request("GET"), username="alice", page=1)
+        await endpoints.read_posts(_request("GET"), username="bob", page=1)
+        await endpoints.read_post(_request("GET"), username="alice", id=7)
+
+    asyncio.run(run())
+
+    assert calls.count("read_posts") == 4
+    assert calls.count("read_post") == 2
+
+
+def test_to_invalidate_extra_on_delete(backend: RedisCacheBackend) -> None:
+    @cache("{username}_post_cache", resource_id_name="id", to_invalidate_extra={"{username}_posts": "{username}"})
+    async def erase_post(request, username: str, id: int) -> dict:
+        return {"message": "Post deleted"}
+
+    async def run() -> list[int]:
+        await backend.set("alice_posts:alice", b"{}", 60)
+        await backend.set("alice_post_cache:3", b"{}", 60)
+        await erase_post(_request("DELETE"), username="alice", id=3)
+        return [await backend.client.exists("alice_posts:alice"), await backend.client.exists("alice_post_cache:3")]
+
+    assert asyncio.run(run()) == [0, 0]
+
+
+def test_concurrent_misses_call_endpoint_once(backend: RedisCacheBackend) -> None:
+    calls: list[str] = []
+    endpoints = _posts_endpoints(calls, delay=0.05)
+
+    async def run() -> list[dict]:
+        return await asyncio.gather(
+            *(endpoints.read_posts(_request("GET"), username="alice", page=1) for _ in range(20))
+        )
+
+    results = asyncio.run(run())
+
+    assert calls == ["read_posts"]
+    assert all(result == results[0] for result in results)
+
+
+def test_waits_for_fill_held_by_another_process(backend: RedisCacheBackend, server: FakeServer) -> None:
+    other_process = RedisCacheBackend(FakeRedis(server=server))
+    calls: list[str] = []
+    endpoints = _posts_endpoints(calls)
+
+    async def run() -> dict:
+        assert await other_process.acquire_lock("alice_posts:page_1:alice", timeout=5)
+
+        async def fill() -> None:
+            await asyncio.sleep(0.05)
+            await other_process.set("alice_posts:page_1:alice", b'{"data": [], "page": 1}', 60)
+            await other_process.release_lock("alice_posts:page_1:alice")
+
+        result, _ = await asyncio.gather(endpoints.read_posts(_request("GET"), username="alice", page=1), fill())
+        return result
+
+    assert asyncio.run(run()) == {"data": [], "page": 1}
+    assert calls == []
+
+
+def test_expired_lock_holder_does_not_release_the_next_holder(backend: RedisCacheBackend, server: FakeServer) -> None:
+    other_process = RedisCacheBackend(FakeRedis(server=server))
+
+    async def run() -> bool:
+        assert await backend.acquire_lock("alice_posts:page_1:alice", timeout=5)
+        # The lock expires while the first holder is still filling, and another process takes it
+        await backend.client.delete("alice_posts:page_1:alice:lock")
+        assert await other_process.acquire_lock("alice_posts:page_1:alice", timeout=5)
+
+        await backend.release_lock("alice_posts:page_1:alice")
+        held = not await other_process.acquire_lock("alice_posts:page_1:alice", timeout=5)
+        await other_process.release_lock("alice_posts:page_1:alice")
+        return held and not await backend.client.exists("alice_posts:page_1:alice:lock")
+
+    assert asyncio.run(run())
+
+
+def test_get_with_invalidation_params_is_rejected(backend: RedisCacheBackend) -> None:
+    @cache("{username}_post_cache", resource_id_name="id", pattern_to_invalidate_extra=["{username}_posts:*"])
+    async def read_post(request, username: str, id: int) -> dict:
+        return {}
+
+    with pytest.raises(InvalidRequestError):
+        asyncio.run(read_post(_request("GET"), username="alice", id=1))
+
+
+def test_missing_backend_raises() -> None:
+    @cache("{username}_post_cache", resource_id_name="id")
+    async def read_post(request, username: str, id: int) -> dict:
+        return {}
+
+    with pytest.raises(MissingClientError):
+        asyncio.run(read_post(_request("GET"), username="alice", id=1))
+
+
+def test_in_memory_backend_evicts_and_matches_patterns() -> None:
+    backend = InMemoryCacheBackend(max_entries=2)
+
+    async def run() -> list[bytes | None]:
+        await backend.set("alice_posts:page_1", b"1", 60)
+        await backend.set("alice_posts:page_2", b"2", 60)
+        await backend.get("alice_posts:page_1")
+        await backend.set("bob_posts:page_1", b"3", 60)
+        evicted = await backend.get("alice_posts:page_2")
+        await backend.delete_pattern("alice_posts:*")
+        return [evicted, await backend.get("alice_posts:page_1"), await backend.get("bob_posts:page_1")]
+
+    assert asyncio.run(run()) == [None, None, b"3"]
@@ -0,0 +1,87 @@
+import pytest
+from pytest_mock import MockerFixture
+
+from app.services import chunking
+from app.services.chunking import Chunker, MarkdownChunker, fit_bytes, strategy_for_source
+from tests.helpers.tokens import WordCounter
+
+ARABIC_SENTENCE = "تستغرق عملية الشحن القياسية من ثلاثة إلى خمسة أيام عمل داخل الدولة. "
+
+
+def _sentences(n: int) -> str:
+    return " ".join(f"Sentence {i} has exactly six words." for i in range(n))
+
+
+def test_chunks_end_at_sentences_and_overlap() -> None:
+    chunks = Chunker(max_tokens=20, overlap_tokens=6, counter=WordCounter()).split(_sentences(10))
+
+    assert all(len(chunk.split()) <= 20 and chunk.endswith(".") for chunk in chunks)
+    # Each chunk starts with the last sentence of the previous one
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert previous.endswith(chunk.split(" has")[0] + " has exactly six words.")
+    assert "Sentence 9" in chunks[-1]
+
+
+def test_arabic_chunks_fit_the_byte_limit() -> None:
+    chunks = Chunker(max_tokens=1000, overlap_tokens=0, max_bytes=512, counter=WordCounter()).split(
+        ARABIC_SENTENCE * 50
+    )
+
+    assert len(chunks) > 1
+    assert all(len(chunk.encode("utf-8")) <= 512 for chunk in chunks)
+    assert all(chunk.endswith(".") for chunk in chunks)
+
+
+def test_oversized_sentence_is_cut_at_words_then_characters() -> None:
+    chunks = Chunker(max_tokens=5, overlap_tokens=0, max_bytes=40, counter=WordCounter()).split(
+        "one two three four five six seven " + "x" * 100
+    )
+
+    assert chunks[:2] == ["one two three four five", "six seven"]
+    assert "".join(chunks[2:]) == "x" * 100
+    assert all(len(chunk.encode("utf-8")) <= 40 for chunk in chunks)
+
+
+def test_markdown_chunks_follow_headings() -> None:
+    text = (
+        "# Shipping\n\n"
+        "## Domestic\n\nStandard shipping takes five days.\n\n"
+        "## International\n\n" + _sentences(6) + "\n\n"
+        "```\n# a comment, not a heading\n```\n"
+    )
+
+    chunks = MarkdownChunker(max_tokens=20, overlap_tokens=0, counter=WordCounter()).split(text)
+
+    assert chunks[0] == "## Domestic\n\nStandard shipping takes five days."
+    assert chunks[1].startswith("## International\n\nSentence 0")
+    assert all(chunk.startswith("Shipping > International\n") for chunk in chunks[2:])
+    assert "# a comment, not a heading" in chunks[-1]
+
+
+def test_html_is_split_by_heading_without_scripts() -> None:
+    html = "<script>track()</script><h1>FAQ</h1><p>Returns are free.</p><h2>Warranty</h2><p>One year.</p>"
+
+    chunks = chunking.HtmlChunker(max_tokens=50, overlap_tokens=0, counter=WordCounter()).split(html)
+
+    assert chunks == ["# FAQ\n\nReturns are free.", "## Warranty\n\nOne year."]
+
+
+def test_fit_bytes_keeps_whole_characters() -> None:
+    assert fit_bytes("شحن", 5) == "شح"
+    assert fit_bytes("ship", 10) == "ship"
+
+
+def test_strategy_for_source(mocker: MockerFixture) -> None:
+    assert strategy_for_source("file:faq.md") == "markdown"
+    assert strategy_for_source("file:page.html") == "html"
+    assert strategy_for_source("url:https://shop.test/faq") == "text"
+    assert strategy_for_source(None) == "text"
+
+    mocker.patch.object(chunking.settings, "CHUNKING_STRATEGIES", "url=html, file=text")
+    assert strategy_for_source("url:https://shop.test/faq") == "html"
+    assert strategy_for_source("file:faq.md") == "text"
+
+
+def test_unknown_strategy() -> None:
+    with pytest.raises(ValueError, match="unknown-strategy"):
+        chunking.get_chunker("unknown-strategy")
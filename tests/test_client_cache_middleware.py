@@ -0,0 +1,85 @@
+from fastapi import Depends, FastAPI, Header, HTTPException
+from fastapi.testclient import TestClient
+
+from app.middleware.client_cache_middleware import CachePolicy, ClientCacheMiddleware, not_modified
+
+
+def _authenticated(authorization: str | None = Header(default=None)) -> None:
+    if authorization != "Bearer token":
+        raise HTTPException(status_code=401)
+
+
+def _client(version: list[int] | None = None) -> tuple[TestClient, list[str]]:
+    calls: list[str] = []
+    app = FastAPI()
+
+    @app.get("/api/v1/bot-settings")
+    async def bot_settings(_user: None = Depends(_authenticated), _not_modified: None = Depends(not_modified)) -> dict:
+        calls.append("bot_settings")
+        return {"bot_name": "Assistant"}
+
+    @app.post("/api/v1/message")
+    async def message() -> dict:
+        return {"reply": "hi"}
+
+    @app.get("/api/v1/user/me/")
+    async def me() -> dict:
+        return {"username": "alice"}
+
+    policies = None
+    if version is not None:
+        policy = CachePolicy(cache_control="private, no-cache", etag=True, version=lambda: version[0])
+        policies = [(r"^/api/v1/bot-settings$", policy)]
+    app.add_middleware(ClientCacheMiddleware, max_age=60, policies=policies)
+    return TestClient(app), calls
+
+
+def test_dynamic_and_bot_endpoints_are_not_stored() -> None:
+    client, _ = _client()
+
+    assert client.post("/api/v1/message").headers["cache-control"] == "no-store"
+    assert client.get("/api/v1/user/me/").headers["cache-control"] == "no-store"
+    assert "etag" not in client.get("/api/v1/user/me/").headers
+
+
+AUTH = {"Authorization": "Bearer token"}
+
+
+def test_etag_revalidation_returns_304() -> None:
+    client, _ = _client()
+    client.headers.update(AUTH)
+
+    response = client.get("/api/v1/bot-settings")
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "private, no-cache"
+
+    revalidated = client.get("/api/v1/bot-settings", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+
+    assert client.get("/api/v1/bot-settings", headers={"If-None-Match": 'W/"stale"'}).status_code == 200
+
+
+def test_versioned_policy_skips_the_endpoint_until_version_changes() -> None:
+    version = [1]
+    client, calls = _client(version)
+    client.headers.update(AUTH)
+
+    etag = client.get("/api/v1/bot-settings").headers["etag"]
+    assert client.get("/api/v1/bot-settings", headers={"If-None-Match": etag}).status_code == 304
+    assert calls == ["bot_settings"]
+
+    version[0] = 2
+    assert client.get("/api/v1/bot-settings", headers={"If-None-Match": etag}).status_code == 304
+    assert calls == ["bot_settings", "bot_settings"]
+
+
+def test_versioned_revalidation_still_authenticates() -> None:
+    client, calls = _client([1])
+
+    etag = client.get("/api/v1/bot-settings", headers=AUTH).headers["etag"]
+
+    assert client.get("/api/v1/bot-settings", headers={"If-None-Match": etag}).status_code == 401
+    assert client.get("/api/v1/bot-settings", headers={"If-None-Match": etag, **AUTH}).status_code == 304
+    assert calls == ["bot_settings"]
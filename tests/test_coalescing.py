@@ -0,0 +1,101 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app.services.providers import FakeChatModel, FakeEmbeddingProvider, coalescing
+from app.services.providers.coalescing import (
+    CoalescedChatModel,
+    CoalescedEmbeddingProvider,
+    SingleFlight,
+    coalesced_chat_model,
+)
+
+
+@pytest.fixture(autouse=True)
+def flights(mocker: MockerFixture) -> dict:
+    return mocker.patch.dict(coalescing._flights, clear=True)
+
+
+def test_concurrent_identical_calls_share_one_upstream_call() -> None:
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    upstream = []
+
+    def call() -> str:
+        upstream.append(1)
+        started.set()
+        release.wait(5)
+        return "answer"
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        leader = executor.submit(flight.do, "key", call)
+        started.wait(5)
+        followers = [executor.submit(flight.do, "key", call) for _ in range(7)]
+        while flight.stats()["coalesced"] < 7:
+            time.sleep(0.001)
+        release.set()
+        results = [leader.result()] + [future.result() for future in followers]
+
+    assert results == [("answer", False)] + [("answer", True)] * 7
+    assert len(upstream) == 1
+    assert flight.stats() == {"calls": 8, "upstream": 1, "coalesced": 7, "coalesce_rate": 0.875}
+    # Nothing in flight any more: the next call goes upstream
+    assert flight.do("key", call) == ("answer", False)
+
+
+def test_errors_are_shared() -> None:
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def call() -> None:
+        started.set()
+        release.wait(5)
+        raise ValueError("upstream failed")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(flight.do, "key", call)
+        started.wait(5)
+        follower = executor.submit(flight.do, "key", call)
+        while flight.stats()["coalesced"] < 1:
+            time.sleep(0.001)
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(ValueError, match="upstream failed"):
+                future.result()
+
+
+def test_chat_requests_are_coalesced() -> None:
+    model = coalesced_chat_model(FakeChatModel(model_name="coalesce-test", latency="fixed:200"))
+    assert isinstance(model, CoalescedChatModel)
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        replies = list(executor.map(lambda _: model.invoke("Do you ship to Jordan?"), range(5)))
+
+    assert len({reply.content for reply in replies}) == 1
+    # Only the request that went upstream reports the tokens it used
+    assert sum(reply.usage_metadata is not None for reply in replies) == 1
+    assert coalescing.coalescing_stats()["chat:coalesce-test"]["upstream"] == 1
+
+
+def test_only_deterministic_chat_models_are_coalesced() -> None:
+    model = SimpleNamespace(temperature=0.7)
+
+    assert coalesced_chat_model(model) is model
+
+
+def test_embedding_batches_are_coalesced(mocker: MockerFixture) -> None:
+    provider = CoalescedEmbeddingProvider(FakeEmbeddingProvider(dim=8, latency="fixed:200"))
+    embed_batch = mocker.spy(provider.provider, "embed_batch")
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        vectors = list(executor.map(lambda _: provider.embed("refund policy", "m"), range(4)))
+
+    assert provider.dim == 8
+    assert embed_batch.call_count == 1
+    assert all(vector == vectors[0] for vector in vectors)
+    vectors[1][0] = 99.0
+    assert vectors[0][0] != 99.0
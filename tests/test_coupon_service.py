@@ -0,0 +1,51 @@
+import asyncio
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from pytest_mock import MockerFixture
+
+from app.core.config import settings
+from app.core.db.database import async_engine
+from app.services import coupon_service
+from app.services.coupon_service import CouponService
+
+
+def _coupon(code: str, is_active: bool = True, expires_in_days: int | None = 7) -> SimpleNamespace:
+    expires_at = datetime.utcnow() + timedelta(days=expires_in_days) if expires_in_days is not None else None
+    return SimpleNamespace(code=code, discount=10.0, description="", is_active=is_active, expires_at=expires_at)
+
+
+def test_async_engine_uses_configured_pool() -> None:
+    assert async_engine.pool.size() == settings.DB_POOL_SIZE
+    assert async_engine.pool._max_overflow == settings.DB_MAX_OVERFLOW
+    assert async_engine.pool._pre_ping == settings.DB_POOL_PRE_PING
+
+
+def test_async_request_coupon_assigns_once_per_session(mocker: MockerFixture) -> None:
+    coupons = {"SAVE10": _coupon("SAVE10"), "SAVE20": _coupon("SAVE20")}
+    mocker.patch.object(coupon_service, "user_coupon_assignments", {})
+    lookup = mocker.patch.object(
+        coupon_service, "async_get_coupon_by_code", side_effect=lambda db, code: coupons.get(code)
+    )
+    service = CouponService(db=mocker.MagicMock())
+
+    first = asyncio.run(service.async_request_coupon("session-1", "SAVE10"))
+    second = asyncio.run(service.async_request_coupon("session-1", "SAVE20"))
+
+    assert first["success"] and first["assigned_code"] == "SAVE10"
+    assert not second["success"] and second["already_assigned"] and second["assigned_code"] == "SAVE10"
+    assert lookup.call_count == 2
+
+
+def test_async_request_coupon_rejects_expired_coupon(mocker: MockerFixture) -> None:
+    mocker.patch.object(coupon_service, "user_coupon_assignments", {})
+    mocker.patch.object(
+        coupon_service, "async_get_coupon_by_code", side_effect=lambda db, code: _coupon(code, expires_in_days=-1)
+    )
+    service = CouponService(db=mocker.MagicMock())
+
+    result = asyncio.run(service.async_request_coupon("session-1", "OLD"))
+
+    assert result["message"] == "invalid_coupon"
+    assert not service.has_received_coupon("session-1")
+
@@ -0,0 +1,66 @@
+import time
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app.services.providers import FakeChatModel, deadline, hedging
+from app.services.providers.deadline import DeadlineExceeded, deadline_scope, remaining
+from app.services.providers.hedging import HedgedChatModel, LatencyHistogram
+
+
+def hedged(name: str, primary_ms: int, secondary_ms: int) -> HedgedChatModel:
+    return HedgedChatModel(primary=FakeChatModel(model_name=name, latency=f"fixed:{primary_ms}"),
+                           secondary=FakeChatModel(model_name=f"{name}-hedge", latency=f"fixed:{secondary_ms}"),
+                           min_samples=5)
+
+
+def test_deadline_scope_keeps_the_earlier_deadline() -> None:
+    assert remaining() is None
+    with deadline_scope(10):
+        with deadline_scope(60):
+            assert remaining() <= 10
+        with deadline_scope(0.01):
+            time.sleep(0.02)
+            with pytest.raises(DeadlineExceeded):
+                deadline.check_deadline()
+    assert remaining() is None
+
+
+def test_latency_histogram() -> None:
+    histogram = LatencyHistogram()
+    for ms in (10, 30, 30, 700, 100000):
+        histogram.record(ms)
+
+    stats = histogram.to_dict()
+    assert stats["count"] == 5
+    assert (stats["buckets"]["le_25ms"], stats["buckets"]["le_50ms"], stats["buckets"]["le_1000ms"],
+            stats["buckets"]["inf"]) == (1, 2, 1, 1)
+    assert stats["p50_ms"] == 30
+
+
+def test_slow_primary_is_hedged(mocker: MockerFixture) -> None:
+    mocker.patch.dict(hedging._stats, clear=True)
+    model = hedged("hedge-test", primary_ms=1000, secondary_ms=10)
+    # Not hedged without enough latencies on record
+    assert model.hedge_delay() is None
+    for _ in range(5):
+        hedging.get_hedge_stats("hedge-test").primary.record(50)
+
+    start = time.perf_counter()
+    assert model.invoke("hello").content
+    assert time.perf_counter() - start < 0.5
+
+    stats = hedging.hedging_stats()["hedge-test"]
+    assert (stats["calls"], stats["hedged"], stats["hedge_wins"]) == (1, 1, 1)
+    assert stats["call_latency"]["count"] == 1
+
+
+def test_call_fails_at_the_deadline(mocker: MockerFixture) -> None:
+    mocker.patch.dict(hedging._stats, clear=True)
+    model = hedged("deadline-test", primary_ms=1000, secondary_ms=1000)
+
+    start = time.perf_counter()
+    with deadline_scope(0.1), pytest.raises(DeadlineExceeded):
+        model.invoke("hello")
+    assert time.perf_counter() - start < 0.5
+    assert hedging.hedging_stats()["deadline-test"]["deadline_exceeded"] == 1
@@ -0,0 +1,85 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from pytest_mock import MockerFixture
+
+from app.services import intent_classifier
+from app.services.intent_classifier import IntentClassifier, IntentModel, RuleClassifier, load_examples, log_turn
+
+EXAMPLES = [
+    ("where is my order", "order_status"),
+    ("has my order shipped yet", "order_status"),
+    ("my order has not arrived", "order_status"),
+    ("what is your return policy", "knowledge_base_query"),
+    ("how long does shipping take", "knowledge_base_query"),
+    ("do you ship internationally", "knowledge_base_query"),
+    ("tell me a joke", "other"),
+    ("what is the weather today", "other"),
+    ("write me a poem", "other"),
+]
+
+
+@pytest.fixture(scope="module")
+def model() -> IntentModel:
+    return IntentModel.train(*zip(*EXAMPLES))
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Hello there!", ("greeting", 0.99)),
+    ("مرحبا", ("greeting", 0.99)),
+    ("#48213", ("order_status", 0.97)),
+    ("any promo codes?", ("coupon_query", 0.95)),
+    ("هل لديكم سماعات؟", ("product_availability", 0.9)),
+    # Greeting with a question is not a bare greeting
+    ("hello, what is your refund policy?", None),
+    ("no rule for this", None),
+])
+def test_rules(text: str, expected) -> None:
+    assert RuleClassifier().predict(text) == expected
+
+
+def test_model_learns_the_training_set(model: IntentModel) -> None:
+    assert [model.predict(text)[0] for text, _ in EXAMPLES] == [intent for _, intent in EXAMPLES]
+    np.testing.assert_allclose(model.predict_proba(["where is my order"]).sum(axis=1), 1.0, rtol=1e-5)
+
+
+def test_model_round_trip(model: IntentModel, tmp_path: Path) -> None:
+    loaded = IntentModel.load(model.save(tmp_path / "model.npz"))
+
+    assert loaded.labels == model.labels
+    texts = ["where is my parcel"]
+    np.testing.assert_allclose(loaded.predict_proba(texts), model.predict_proba(texts))
+
+
+def test_tiers(model: IntentModel) -> None:
+    classifier = IntentClassifier(model, threshold=0.5)
+
+    assert classifier.classify("hi").tier == "rules"
+    prediction = classifier.classify("has my order shipped yet")
+    assert (prediction.intent, prediction.tier) == ("order_status", "model")
+    # Frustrated turns always go to the LLM
+    assert classifier.classify("where is my order?? this is ridiculous!!") is None
+    assert IntentClassifier(model, threshold=1.0).classify("has my order shipped yet") is None
+
+    classifier.record_llm(420.0)
+    stats = classifier.stats()
+    assert (stats["rules"]["answered"], stats["model"]["answered"], stats["llm"]["answered"]) == (1, 1, 1)
+    assert stats["llm"]["p50_ms"] == 420.0
+
+
+def test_traffic_log(tmp_path: Path, mocker: MockerFixture) -> None:
+    path = tmp_path / "traffic.jsonl"
+    log_turn("hello", "greeting", "llm", path=path)
+    assert not path.exists()
+
+    mocker.patch.object(intent_classifier.settings, "INTENT_TRAFFIC_LOG", True)
+    log_turn("كم يستغرق الشحن", "knowledge_base_query", "llm", language="ar", path=path)
+    log_turn("hi", "greeting", "rules", confidence=0.99, path=path)
+    log_turn("hmm", "not_an_intent", "llm", path=path)
+
+    assert load_examples(path, tiers=["llm"]) == [("كم يستغرق الشحن", "knowledge_base_query")]
+
+    mocker.patch.object(intent_classifier.settings, "INTENT_TRAFFIC_LOG", False)
+    log_turn("hello", "greeting", "llm", path=path)
+    assert len(load_examples(path)) == 2
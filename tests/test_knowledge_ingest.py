@@ -0,0 +1,203 @@
+import asyncio
+from pathlib import Path
+from typing import Any, Generator
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy import create_engine, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.db.database import Base
+from app.crud.crud_knowledge import async_delete_knowledge_source
+from app.models.knowledge import KnowledgeChunk, KnowledgeDocument, KnowledgeSource
+from app.services import knowledge_ingest
+from app.services.knowledge_ingest import NEAR_DUPLICATE_DISTANCE, ingest_document, simhash
+
+RETURNS = (
+    "Customers can return items within 30 days of purchase for a full refund. Items must be in original "
+    "condition with tags attached, and return shipping is free for defective items."
+)
+SHIPPING = (
+    "Standard shipping takes 3-5 business days. Express shipping is available for an additional fee and "
+    "delivers within 1-2 business days, while international shipping may take 7-14 business days."
+)
+WARRANTY = (
+    "All electronics come with a 1-year manufacturer warranty covering defects in materials and "
+    "workmanship. Extended warranties are available for purchase separately at checkout."
+)
+
+
+@pytest.fixture
+def db() -> Generator[Session, Any, None]:
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[KnowledgeSource.__table__, KnowledgeDocument.__table__,
+                                             KnowledgeChunk.__table__])
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def milvus(mocker: MockerFixture) -> MagicMock:
+    next_id = iter(range(1000, 2000))
+    insert = mocker.patch.object(
+        knowledge_ingest, "insert_embeddings",
+        side_effect=lambda vectors, texts, *_, **__: [next(next_id) for _ in texts],
+    )
+    delete = mocker.patch.object(knowledge_ingest, "delete_entries")
+    return MagicMock(insert=insert, delete=delete)
+
+
+def _embed(texts: list[str]) -> list[list[float]]:
+    return [[float(len(text))] for text in texts]
+
+
+def test_reimporting_identical_document_is_a_no_op(db: Session, milvus: MagicMock) -> None:
+    first = ingest_document(db, "url:https://shop.test/faq", [RETURNS, SHIPPING], _embed)
+    second = ingest_document(db, "url:https://shop.test/faq", [RETURNS, "  " + SHIPPING.upper()], _embed)
+
+    assert (first.added, first.version) == (2, 1)
+    assert second.unchanged and second.version == 1
+    assert milvus.insert.call_count == 1
+
+
+def test_new_version_replaces_only_changed_chunks(db: Session, milvus: MagicMock) -> None:
+    ingest_document(db, "file:faq.md", [RETURNS, SHIPPING], _embed)
+    old_shipping_id = db.scalars(
+        select(KnowledgeChunk.milvus_id).where(KnowledgeChunk.content_hash == knowledge_ingest.content_hash(SHIPPING))
+    ).one()
+
+    result = ingest_document(db, "file:faq.md", [WARRANTY, RETURNS], _embed)
+
+    assert (result.version, result.added, result.kept, result.removed) == (2, 1, 1, 1)
+    assert milvus.insert.call_args.args[1] == [WARRANTY]
+    milvus.delete.assert_called_with([old_shipping_id], knowledge_ingest.COLLECTION_NAME)
+    chunks = db.scalars(select(KnowledgeChunk).order_by(KnowledgeChunk.chunk_index)).all()
+    assert [c.content_hash for c in chunks] == [knowledge_ingest.content_hash(t) for t in (WARRANTY, RETURNS)]
+
+
+def test_exact_duplicates_of_other_documents_share_their_vector(db: Session, milvus: MagicMock) -> None:
+    ingest_document(db, "url:https://shop.test/returns", [RETURNS], _embed)
+    returns_id = db.scalars(select(KnowledgeChunk.milvus_id)).one()
+
+    result = ingest_document(db, "url:https://shop.test/help", [RETURNS, RETURNS, SHIPPING], _embed)
+
+    assert (result.shared, result.duplicates, result.added) == (1, 1, 1)
+    assert milvus.insert.call_args.args[1] == [SHIPPING]
+    help_ids = db.scalars(select(KnowledgeChunk.milvus_id).where(KnowledgeChunk.document_id == result.document_id))
+    assert returns_id in set(help_ids)
+
+    # The first owner moves on: the vector stays for the second one
+    ingest_document(db, "url:https://shop.test/returns", [WARRANTY], _embed)
+    assert returns_id not in [i for call in milvus.delete.call_args_list for i in call.args[0]]
+
+    # Its last owner drops it: now it goes
+    ingest_document(db, "url:https://shop.test/help", [SHIPPING], _embed)
+    milvus.delete.assert_called_with([returns_id], knowledge_ingest.COLLECTION_NAME)
+
+
+def test_near_duplicates_are_only_skipped_within_a_source(db: Session, milvus: MagicMock) -> None:
+    near_copy = RETURNS.replace("full refund", "complete refund")
+    ingest_document(db, "url:https://shop.test/returns", [RETURNS], _embed, source_id="ks-0001")
+
+    same_source = ingest_document(db, "url:https://shop.test/help", [near_copy, SHIPPING], _embed, source_id="ks-0001")
+    same_document = ingest_document(db, "file:faq.md", [RETURNS, near_copy], _embed)
+    product = ingest_document(db, "product:2", [near_copy], _embed)
+
+    assert (same_source.near_duplicates, same_source.added) == (1, 1)
+    assert (same_document.shared, same_document.near_duplicates, same_document.added) == (1, 1, 0)
+    assert (product.near_duplicates, product.added) == (0, 1)
+
+
+def test_failing_chunk_is_skipped_and_retried_on_the_next_import(db: Session, milvus: MagicMock) -> None:
+    def embed_failing_on_shipping(texts: list[str]) -> list[list[float]]:
+        if SHIPPING in texts:
+            raise RuntimeError("embedding call failed")
+        return _embed(texts)
+
+    result = ingest_document(db, "file:faq.md", [RETURNS, SHIPPING], embed_failing_on_shipping)
+
+    assert (result.added, result.failed) == (1, 1)
+    assert [call.args[1] for call in milvus.insert.call_args_list] == [[RETURNS]]
+    assert db.scalars(select(KnowledgeDocument.chunk_count)).one() == 1
+
+    retry = ingest_document(db, "file:faq.md", [RETURNS, SHIPPING], _embed)
+
+    assert not retry.unchanged
+    assert (retry.added, retry.kept, retry.failed) == (1, 1, 0)
+
+
+def test_nothing_stored_keeps_the_previous_version(db: Session, milvus: MagicMock) -> None:
+    ingest_document(db, "file:faq.md", [RETURNS], _embed)
+
+    def embed_down(texts: list[str]) -> list[list[float]]:
+        raise RuntimeError("embedding service down")
+
+    with pytest.raises(RuntimeError):
+        ingest_document(db, "file:faq.md", [SHIPPING], embed_down)
+
+    assert db.scalars(select(KnowledgeDocument.version)).one() == 1
+    assert db.scalars(select(KnowledgeChunk.content_hash)).one() == knowledge_ingest.content_hash(RETURNS)
+    assert all(not call.args[0] for call in milvus.delete.call_args_list)
+
+
+def test_deleting_a_source_keeps_vectors_other_sources_share(tmp_path: Path, milvus: MagicMock) -> None:
+    path = tmp_path / "knowledge.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine, tables=[KnowledgeSource.__table__, KnowledgeDocument.__table__,
+                                             KnowledgeChunk.__table__])
+    with sessionmaker(bind=engine)() as db:
+        for source_id in ("ks-0001", "ks-0002"):
+            source = KnowledgeSource()
+            source.id = source.name = source_id
+            db.add(source)
+        db.commit()
+        ingest_document(db, "file:policies.md", [RETURNS, SHIPPING], _embed, source_id="ks-0001")
+        ingest_document(db, "file:help.md", [RETURNS], _embed, source_id="ks-0002")
+        returns_id, shipping_id = (
+            db.scalars(select(KnowledgeChunk.milvus_id).where(KnowledgeChunk.content_hash == content_hash)).first()
+            for content_hash in map(knowledge_ingest.content_hash, (RETURNS, SHIPPING))
+        )
+    engine.dispose()
+
+    async def delete_source() -> Any:
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+        async with AsyncSession(async_engine) as session:
+            deleted = await async_delete_knowledge_source(session, "ks-0001")
+        await async_engine.dispose()
+        return deleted
+
+    assert asyncio.run(delete_source()) == ([shipping_id], [returns_id])
+
+
+def test_chunks_carry_source_metadata(db: Session, milvus: MagicMock) -> None:
+    result = ingest_document(db, "file:faq.md", [RETURNS, SHIPPING], _embed, source_id="ks-0001")
+
+    metadata = milvus.insert.call_args.kwargs["metadata"]
+    assert [m["source_id"] for m in metadata] == ["ks-0001", "ks-0001"]
+    assert [m["doc_id"] for m in metadata] == [result.document_id] * 2
+    assert [m["chunk_index"] for m in metadata] == [0, 1]
+    assert [m["content_hash"] for m in metadata] == [knowledge_ingest.content_hash(t) for t in (RETURNS, SHIPPING)]
+
+
+def test_moving_a_document_to_another_source_reinserts_its_chunks(db: Session, milvus: MagicMock) -> None:
+    ingest_document(db, "file:faq.md", [RETURNS, SHIPPING], _embed, source_id="ks-0001")
+    old_ids = sorted(db.scalars(select(KnowledgeChunk.milvus_id)))
+
+    result = ingest_document(db, "file:faq.md", [RETURNS, SHIPPING], _embed, source_id="ks-0002")
+
+    assert (result.added, result.kept, result.removed) == (2, 0, 2)
+    assert [m["source_id"] for m in milvus.insert.call_args.kwargs["metadata"]] == ["ks-0002", "ks-0002"]
+    milvus.delete.assert_called_with(old_ids, knowledge_ingest.COLLECTION_NAME)
+    assert db.scalars(select(KnowledgeDocument.source_id)).one() == "ks-0002"
+
+
+def test_simhash_distance() -> None:
+    near = (simhash(RETURNS) ^ simhash(RETURNS.replace("full refund", "complete refund"))).bit_count()
+    far = (simhash(RETURNS) ^ simhash(SHIPPING)).bit_count()
+
+    assert near <= NEAR_DUPLICATE_DISTANCE
+    assert far > 16
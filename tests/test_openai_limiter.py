@@ -0,0 +1,133 @@
+import time
+from typing import Optional
+
+import httpx
+import openai
+import pytest
+from pytest_mock import MockerFixture
+
+from app.services import milvus_client
+from app.services.providers import limiter
+from app.services.providers.limiter import (
+    AdaptiveConcurrency,
+    ModelLimiter,
+    RateLimitTimeout,
+    TokenBucket,
+    parse_rate_limits,
+    retry_delay,
+)
+
+
+def rate_limit_error(retry_after_ms: Optional[str] = "1", code: Optional[str] = None) -> openai.RateLimitError:
+    headers = {"retry-after-ms": retry_after_ms} if retry_after_ms else {}
+    response = httpx.Response(429, headers=headers, request=httpx.Request("POST", "https://api.openai.com/v1/embeddings"))
+    return openai.RateLimitError("Rate limit reached", response=response, body={"code": code} if code else None)
+
+
+def test_parse_rate_limits() -> None:
+    assert parse_rate_limits("gpt-4o=500:30000, text-embedding-3-large=3000:1000000") == {
+        "gpt-4o": (500, 30000), "text-embedding-3-large": (3000, 1000000),
+    }
+    with pytest.raises(ValueError, match="model=RPM:TPM"):
+        parse_rate_limits("gpt-4o=500")
+
+
+def test_token_bucket_waits_once_empty() -> None:
+    bucket = TokenBucket(per_minute=60)
+
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(2) == pytest.approx(2.0, abs=0.05)
+    bucket.refund(2)
+    assert bucket.reserve(1) == pytest.approx(1.0, abs=0.05)
+
+
+def test_concurrency_is_aimd() -> None:
+    concurrency = AdaptiveConcurrency(initial=4, minimum=1, maximum=8)
+
+    for _ in range(4):
+        concurrency.acquire(time.monotonic() + 1)
+    with pytest.raises(RateLimitTimeout):
+        concurrency.acquire(time.monotonic() + 0.01)
+    concurrency.release(congested=True)
+    assert concurrency.limit == 2
+    # Halved at most once per interval
+    concurrency.release(congested=True)
+    assert concurrency.limit == 2
+    concurrency.release()
+    assert concurrency.limit == 2.5
+
+
+def test_retry_delay() -> None:
+    assert retry_delay(rate_limit_error("250"), attempt=0) == 0.25
+    assert 0.5 <= retry_delay(rate_limit_error(None), attempt=1) <= 1.0
+    assert retry_delay(rate_limit_error(code="insufficient_quota"), attempt=0) is None
+    assert retry_delay(ValueError("bad request"), attempt=0) is None
+
+
+def test_call_retries_throttled_requests(mocker: MockerFixture) -> None:
+    model_limiter = ModelLimiter("gpt-4o", rpm=600, tpm=100000, initial_concurrency=4, max_retries=2, timeout=5)
+    request = mocker.Mock(side_effect=[rate_limit_error(), rate_limit_error(), "ok"])
+
+    assert model_limiter.call(request, tokens=100) == "ok"
+
+    stats = model_limiter.stats()
+    assert (stats["calls"], stats["retries"], stats["throttled"], stats["failures"]) == (1, 2, 2, 0)
+    assert stats["concurrency_limit"] == 2
+    assert stats["active"] == 0
+
+
+def test_call_gives_up(mocker: MockerFixture) -> None:
+    model_limiter = ModelLimiter("gpt-4o", rpm=600, tpm=100000, max_retries=1, timeout=5)
+
+    with pytest.raises(openai.RateLimitError):
+        model_limiter.call(mocker.Mock(side_effect=rate_limit_error(code="insufficient_quota")))
+    # Two requests a second: the third cannot start within a 0.1s deadline
+    slow = ModelLimiter("gpt-4o", rpm=120, tpm=100000, timeout=0.1)
+    slow.requests = TokenBucket(per_minute=120, capacity=2)
+    slow.call(lambda: None)
+    slow.call(lambda: None)
+    with pytest.raises(RateLimitTimeout):
+        slow.call(lambda: None)
+    assert slow.stats()["timeouts"] == 1
+
+
+def test_get_limiter_uses_configured_limits(mocker: MockerFixture) -> None:
+    mocker.patch.dict(limiter._limiters, clear=True)
+    mocker.patch.object(limiter.settings, "OPENAI_RATE_LIMITS", "gpt-4o=60:1200")
+    mocker.patch.object(limiter.settings, "OPENAI_LIMIT_PROCESSES", 1)
+
+    assert limiter.get_limiter("gpt-4o") is limiter.get_limiter("gpt-4o")
+    assert limiter.get_limiter("gpt-4o").requests.rate == 1.0
+    assert limiter.get_limiter("other").requests.rate == limiter.settings.OPENAI_DEFAULT_RPM / 60
+
+
+def test_get_limiter_shares_the_limits_between_processes(mocker: MockerFixture) -> None:
+    mocker.patch.dict(limiter._limiters, clear=True)
+    mocker.patch.object(limiter.settings, "OPENAI_RATE_LIMITS", "gpt-4o=240:1200")
+    mocker.patch.object(limiter.settings, "OPENAI_LIMIT_PROCESSES", 4)
+
+    model_limiter = limiter.get_limiter("gpt-4o")
+
+    assert (model_limiter.requests.rate, model_limiter.tokens.rate) == (1.0, 5.0)
+
+
+def test_concurrency_timeout_refunds_the_reservation() -> None:
+    model_limiter = ModelLimiter("gpt-4o", rpm=60, tpm=6000, initial_concurrency=1, min_concurrency=1,
+                                 max_concurrency=1, timeout=0.05)
+    model_limiter.concurrency.acquire(time.monotonic() + 1)
+
+    with pytest.raises(RateLimitTimeout):
+        model_limiter.call(lambda: None, tokens=1000)
+
+    assert model_limiter.requests.reserve(60) == 0.0
+    assert model_limiter.tokens.reserve(6000) == 0.0
+    assert model_limiter.stats()["timeouts"] == 1
+
+
+def test_zero_vectors_are_never_inserted(mocker: MockerFixture) -> None:
+    collection = mocker.patch.object(milvus_client, "Collection")
+    mocker.patch.object(milvus_client, "connect_to_milvus")
+
+    assert milvus_client.insert_embeddings([[0.1, 0.2], [0.0, 0.0]], ["a", "b"]) is False
+    assert milvus_client.insert_embedding([0.0, float("nan")], "a") is False
+    collection.assert_not_called()
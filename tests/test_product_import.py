@@ -0,0 +1,264 @@
+import asyncio
+import json
+import os
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+
+from app.core.db import database
+from app.core.db.database import Base
+from app.crud.crud_product import async_upsert_products
+from app.models.knowledge import KnowledgeChunk, KnowledgeDocument, KnowledgeSource
+from app.services import knowledge_ingest, milvus_client, product_embedding, product_import
+from app.services.product_import import (
+    IndexedProducts,
+    ProductImporter,
+    ProductVectorIndexer,
+    detect_format,
+    read_product_records,
+)
+
+
+def _write_jsonl(path: Path, rows: list[dict]) -> Path:
+    path.write_text("".join(json.dumps(row) + "\n" for row in rows))
+    return path
+
+
+def _patch_db(mocker: MockerFixture, upsert_side_effect, db: SimpleNamespace | None = None) -> SimpleNamespace:
+    db = db or SimpleNamespace(commit=mocker.AsyncMock())
+    session = mocker.patch.object(product_import, "local_session")
+    session.return_value.__aenter__.return_value = db
+    return mocker.patch.object(product_import, "async_upsert_products", side_effect=upsert_side_effect)
+
+
+def _inserted(db, rows: list[dict]) -> list[SimpleNamespace]:
+    return [SimpleNamespace(inserted=True, **row) for row in rows]
+
+
+def _indexed(products) -> IndexedProducts:
+    return IndexedProducts(len(products), [hash(product.sku) for product in products],
+                           [f"product:{product.sku}" for product in products])
+
+
+def test_detect_format() -> None:
+    assert detect_format("catalog.CSV") == "csv"
+    assert detect_format("catalog.ndjson") == "jsonl"
+    assert detect_format("upload", "jsonl") == "jsonl"
+    with pytest.raises(ValueError):
+        detect_format("catalog.xlsx")
+
+
+def test_csv_empty_cells_are_none(tmp_path: Path) -> None:
+    path = tmp_path / "products.csv"
+    path.write_text("sku,name,price,description\nA-1,Shoe,9.5,\n")
+
+    assert list(read_product_records(path, "csv")) == [
+        {"sku": "A-1", "name": "Shoe", "price": "9.5", "description": None}
+    ]
+
+
+def test_upsert_skips_unchanged_rows_and_reports_inserts(mocker: MockerFixture) -> None:
+    result = mocker.MagicMock()
+    result.all.return_value = []
+    db = SimpleNamespace(execute=mocker.AsyncMock(return_value=result))
+
+    asyncio.run(async_upsert_products(db, [{"sku": "A-1", "name": "Shoe", "price": 9.5}]))
+
+    sql = str(db.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (sku) DO UPDATE" in sql
+    assert "IS DISTINCT FROM" in sql
+    assert "(xmax = 0) AS inserted" in sql
+
+
+def test_invalid_and_duplicate_rows(tmp_path: Path, mocker: MockerFixture) -> None:
+    path = _write_jsonl(tmp_path / "products.jsonl", [
+        {"sku": "A-1", "name": "Old", "price": 1},
+        {"sku": "A-2", "name": "No price"},
+        {"sku": "A-1", "name": "New", "price": 2},
+    ])
+    upsert = _patch_db(mocker, _inserted)
+
+    progress = asyncio.run(ProductImporter(embed=False).run(path))
+
+    assert progress.status == "completed"
+    assert (progress.rows_read, progress.rows_invalid, progress.rows_inserted) == (3, 1, 1)
+    assert progress.errors[0].startswith("row 2:")
+    [batch] = upsert.call_args.args[1:]
+    assert [(row["sku"], row["name"]) for row in batch] == [("A-1", "New")]
+
+
+def test_malformed_json_line_is_counted_as_invalid(tmp_path: Path, mocker: MockerFixture) -> None:
+    path = tmp_path / "products.jsonl"
+    path.write_text('{"sku": "A-1", "name": "Shoe", "price": 1}\n{"sku": "A-2", "name": \n\n'
+                    '{"sku": "A-3", "name": "Hat", "price": 2}\n')
+    upsert = _patch_db(mocker, _inserted)
+
+    progress = asyncio.run(ProductImporter(embed=False).run(path))
+
+    assert progress.status == "completed"
+    assert (progress.rows_read, progress.rows_invalid, progress.rows_inserted) == (3, 1, 2)
+    assert progress.errors[0].startswith("row 2: invalid JSON")
+    assert [row["sku"] for row in upsert.call_args.args[1]] == ["A-1", "A-3"]
+
+
+def test_failed_import_resumes_from_checkpoint(tmp_path: Path, mocker: MockerFixture) -> None:
+    path = _write_jsonl(tmp_path / "products.jsonl", [
+        {"sku": f"S-{i}", "name": f"Product {i}", "price": i} for i in range(5)
+    ])
+    checkpoint = tmp_path / "products.jsonl.checkpoint.json"
+
+    def fail_second_batch(db, rows):
+        if rows[0]["sku"] == "S-2":
+            raise RuntimeError("connection lost")
+        return _inserted(db, rows)
+
+    _patch_db(mocker, fail_second_batch)
+    progress = asyncio.run(ProductImporter(batch_size=2, embed=False).run(path))
+
+    assert progress.status == "failed"
+    assert progress.error == "connection lost"
+    assert json.loads(checkpoint.read_text())["rows_done"] == 2
+
+    upsert = _patch_db(mocker, _inserted)
+    progress = asyncio.run(ProductImporter(batch_size=2, embed=False).run(path))
+
+    assert progress.status == "completed"
+    assert (progress.rows_skipped, progress.rows_read, progress.rows_inserted) == (2, 3, 3)
+    assert [row["sku"] for call in upsert.call_args_list for row in call.args[1]] == ["S-2", "S-3", "S-4"]
+    assert not checkpoint.exists()
+
+
+def test_changed_products_are_embedded_in_batches(tmp_path: Path, mocker: MockerFixture) -> None:
+    path = _write_jsonl(tmp_path / "products.jsonl", [
+        {"sku": f"S-{i}", "name": f"Product {i}", "price": i} for i in range(5)
+    ])
+    _patch_db(mocker, _inserted)
+    indexer = mocker.MagicMock()
+    indexer.index.side_effect = _indexed
+
+    progress = asyncio.run(ProductImporter(embed_batch_size=2, indexer=indexer).run(path))
+
+    assert progress.rows_embedded == 5
+    assert sorted(len(call.args[0]) for call in indexer.index.call_args_list) == [1, 2, 2]
+
+
+def test_failed_embedding_is_not_committed_and_is_retried(tmp_path: Path, mocker: MockerFixture) -> None:
+    path = _write_jsonl(tmp_path / "products.jsonl", [
+        {"sku": f"S-{i}", "name": f"Product {i}", "price": i} for i in range(4)
+    ])
+    checkpoint = tmp_path / "products.jsonl.checkpoint.json"
+    db = SimpleNamespace(commit=mocker.AsyncMock())
+    _patch_db(mocker, _inserted, db)
+    indexer = mocker.MagicMock()
+    indexer.index.side_effect = lambda products: _indexed(products) if products[0].sku == "S-0" else 1 / 0
+
+    progress = asyncio.run(ProductImporter(batch_size=2, indexer=indexer).run(path))
+
+    assert progress.status == "failed"
+    assert db.commit.await_count == 1
+    assert (progress.rows_inserted, progress.rows_embedded) == (2, 2)
+    assert json.loads(checkpoint.read_text())["rows_done"] == 2
+
+    indexer.index.side_effect = _indexed
+    upsert = _patch_db(mocker, _inserted, db)
+    progress = asyncio.run(ProductImporter(batch_size=2, indexer=indexer).run(path))
+
+    assert progress.status == "completed"
+    assert [row["sku"] for call in upsert.call_args_list for row in call.args[1]] == ["S-2", "S-3"]
+    assert progress.rows_embedded == 2
+
+
+def test_vectors_of_an_uncommitted_batch_are_discarded(tmp_path: Path, mocker: MockerFixture) -> None:
+    path = _write_jsonl(tmp_path / "products.jsonl", [
+        {"sku": f"S-{i}", "name": f"Product {i}", "price": i} for i in range(4)
+    ])
+    db = SimpleNamespace(commit=mocker.AsyncMock(side_effect=RuntimeError("connection lost")))
+    _patch_db(mocker, _inserted, db)
+    indexer = mocker.MagicMock()
+    indexer.index.side_effect = _indexed
+
+    progress = asyncio.run(ProductImporter(embed_batch_size=2, indexer=indexer).run(path))
+
+    assert progress.status == "failed"
+    [discarded] = indexer.discard.call_args.args
+    assert discarded.count == 4
+    assert sorted(discarded.milvus_ids) == sorted(hash(f"S-{i}") for i in range(4))
+    assert sorted(discarded.rag_keys) == [f"product:S-{i}" for i in range(4)]
+
+
+def test_failed_chunk_discards_the_chunks_indexed_with_it(tmp_path: Path, mocker: MockerFixture) -> None:
+    path = _write_jsonl(tmp_path / "products.jsonl", [
+        {"sku": f"S-{i}", "name": f"Product {i}", "price": i} for i in range(4)
+    ])
+    db = SimpleNamespace(commit=mocker.AsyncMock())
+    _patch_db(mocker, _inserted, db)
+    indexer = mocker.MagicMock()
+    indexer.index.side_effect = lambda products: _indexed(products) if products[0].sku == "S-0" else 1 / 0
+
+    progress = asyncio.run(ProductImporter(embed_batch_size=2, indexer=indexer).run(path))
+
+    assert progress.status == "failed"
+    db.commit.assert_not_awaited()
+    [discarded] = indexer.discard.call_args.args
+    assert discarded.milvus_ids == [hash("S-0"), hash("S-1")]
+
+
+@pytest.fixture
+def offline_indexer(mocker: MockerFixture, monkeypatch: pytest.MonkeyPatch) -> SimpleNamespace:
+    """A ProductVectorIndexer on an in-memory knowledge registry, with Milvus and the embeddings API mocked."""
+    # markdown_converter builds an OpenAI client on import; it is never called here
+    if not os.environ.get("OPENAI_API_KEY"):
+        monkeypatch.setenv("OPENAI_API_KEY", "unused")
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[KnowledgeSource.__table__, KnowledgeDocument.__table__,
+                                             KnowledgeChunk.__table__])
+    mocker.patch.object(database, "sync_session", sessionmaker(bind=engine))
+
+    next_id = iter(range(1000, 2000))
+    mocker.patch.object(knowledge_ingest, "insert_embeddings",
+                        side_effect=lambda vectors, texts, *_, **__: [next(next_id) for _ in texts])
+    rag_delete = mocker.patch.object(knowledge_ingest, "delete_entries")
+    product_insert = mocker.patch.object(milvus_client, "insert_embeddings",
+                                         side_effect=lambda vectors, texts, *_: [next(next_id) for _ in texts])
+    product_delete = mocker.patch.object(milvus_client, "delete_entries")
+    mocker.patch.object(product_embedding, "delete_product_vectors")
+
+    indexer = ProductVectorIndexer.__new__(ProductVectorIndexer)
+    indexer.embedder = SimpleNamespace(embed_batch=lambda texts: [[1.0] * 3072 for _ in texts])
+    yield SimpleNamespace(indexer=indexer, db=sessionmaker(bind=engine)(), rag_delete=rag_delete,
+                          product_insert=product_insert, product_delete=product_delete)
+    engine.dispose()
+
+
+def _product(inserted: bool, **values) -> SimpleNamespace:
+    product = {"id": 7, "name": "Shoe", "category": None, "price": 9.5, "currency": "USD", "stock_quantity": 3,
+               "description": "Leather shoe", "language": "en", "is_active": True, "inserted": inserted}
+    return SimpleNamespace(**{**product, **values})
+
+
+def test_reimported_product_replaces_its_rag_chunk(offline_indexer: SimpleNamespace) -> None:
+    offline_indexer.indexer.index([_product(inserted=True)])
+    [old_id] = offline_indexer.db.scalars(select(KnowledgeChunk.milvus_id))
+
+    offline_indexer.indexer.index([_product(inserted=False, price=12.0)])
+
+    [document] = offline_indexer.db.scalars(select(KnowledgeDocument)).all()
+    assert (document.source_key, document.version) == ("product:7", 2)
+    assert offline_indexer.db.scalars(select(KnowledgeChunk.milvus_id)).all() != [old_id]
+    offline_indexer.rag_delete.assert_called_with([old_id], milvus_client.COLLECTION_NAME)
+
+
+def test_failed_product_insert_discards_the_new_rag_document(offline_indexer: SimpleNamespace) -> None:
+    offline_indexer.product_insert.side_effect = None
+    offline_indexer.product_insert.return_value = False
+
+    with pytest.raises(RuntimeError):
+        offline_indexer.indexer.index([_product(inserted=True)])
+
+    assert offline_indexer.db.scalars(select(KnowledgeDocument)).all() == []
+    assert offline_indexer.rag_delete.call_args.args[0] == [1000]
@@ -0,0 +1,115 @@
+import asyncio
+from collections import namedtuple
+from types import SimpleNamespace
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy.dialects import postgresql
+
+from app.crud import crud_product
+from app.crud.crud_product import async_list_products, decode_cursor, encode_cursor
+from app.schemas.product import ProductCountMode
+
+CountedRow = namedtuple("CountedRow", ["product", "total"])
+
+
+def _db(mocker: MockerFixture, rows: list) -> SimpleNamespace:
+    result = mocker.MagicMock()
+    result.all.return_value = rows
+    return SimpleNamespace(execute=mocker.AsyncMock(return_value=result))
+
+
+def _sql(db: SimpleNamespace) -> str:
+    statement = db.execute.await_args_list[0].args[0]
+    return str(statement.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+def test_cursor_round_trip() -> None:
+    assert decode_cursor(encode_cursor(123456)) == 123456
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor!", "YWJj"])
+def test_malformed_cursor_is_rejected(cursor: str) -> None:
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_cursor_page_skips_the_exact_total(mocker: MockerFixture) -> None:
+    db = _db(mocker, [(SimpleNamespace(id=i),) for i in (11, 12, 13)])
+    count = mocker.patch.object(crud_product, "async_get_product_count", return_value=42)
+
+    products, total, next_cursor = asyncio.run(
+        async_list_products(db, limit=2, cursor=10, language="en", count_mode=ProductCountMode.EXACT)
+    )
+
+    sql = _sql(db)
+    assert db.execute.await_count == 1
+    assert "OVER" not in sql
+    assert "id > 10" in sql
+    assert "OFFSET" not in sql
+    assert [p.id for p in products] == [11, 12]
+    # The first page of the walk carried the total
+    assert total is None
+    count.assert_not_awaited()
+    assert next_cursor == 12
+
+
+def test_first_page_with_exact_total_is_one_query(mocker: MockerFixture) -> None:
+    db = _db(mocker, [CountedRow(SimpleNamespace(id=i), 42) for i in (1, 2, 3)])
+    count = mocker.patch.object(crud_product, "async_get_product_count")
+
+    products, total, next_cursor = asyncio.run(
+        async_list_products(db, limit=2, category="audio", count_mode=ProductCountMode.EXACT)
+    )
+
+    assert db.execute.await_count == 1
+    assert "count(*) OVER ()" in _sql(db)
+    assert [p.id for p in products] == [1, 2]
+    assert total == 42
+    count.assert_not_awaited()
+    assert next_cursor == 2
+
+
+def test_offset_past_the_last_page_counts_separately(mocker: MockerFixture) -> None:
+    db = _db(mocker, [])
+    count = mocker.patch.object(crud_product, "async_get_product_count", return_value=42)
+
+    products, total, next_cursor = asyncio.run(async_list_products(db, limit=5, skip=50,
+                                                                   count_mode=ProductCountMode.EXACT))
+
+    assert products == [] and total == 42 and next_cursor is None
+    count.assert_awaited_once_with(db, None, None)
+
+
+def test_estimate_keeps_filter_values_bound(mocker: MockerFixture) -> None:
+    stats, plan = mocker.MagicMock(), mocker.MagicMock()
+    stats.scalar.return_value = 1e6
+    plan.scalar.return_value = [{"Plan": {"Plan Rows": 1234}}]
+    db = SimpleNamespace(execute=mocker.AsyncMock(side_effect=[stats, plan]))
+
+    assert asyncio.run(crud_product.async_estimate_product_count(db, category="10:30 kits")) == 1234
+
+    explain, params = db.execute.await_args_list[1].args
+    assert "10:30" not in str(explain) and ":category_1" in str(explain)
+    assert params["category_1"] == "10:30 kits"
+
+
+def test_last_page_has_no_next_cursor(mocker: MockerFixture) -> None:
+    db = _db(mocker, [(SimpleNamespace(id=7),)])
+
+    products, total, next_cursor = asyncio.run(async_list_products(db, limit=5, count_mode=ProductCountMode.NONE))
+
+    assert [p.id for p in products] == [7]
+    assert total is None
+    assert next_cursor is None
+    assert "OVER" not in _sql(db)
+
+
+def test_estimate_uses_exact_count_for_small_tables(mocker: MockerFixture) -> None:
+    result = mocker.MagicMock()
+    result.scalar.return_value = 500.0
+    db = SimpleNamespace(execute=mocker.AsyncMock(return_value=result))
+    exact = mocker.patch.object(crud_product, "async_get_product_count", return_value=480)
+
+    assert asyncio.run(crud_product.async_estimate_product_count(db)) == 480
+    exact.assert_awaited_once()
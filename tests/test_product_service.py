@@ -0,0 +1,129 @@
+import asyncio
+import os
+from types import ModuleType, SimpleNamespace
+from typing import Any, Awaitable, Callable, Generator
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.db.database import Base
+from app.models.product import Product
+from app.schemas.product import ProductCountMode, ProductCreate, ProductUpdate
+from app.services.knowledge_ingest import source_key
+
+
+@pytest.fixture
+def run_with_session() -> Generator[Callable[[Callable[[AsyncSession], Awaitable[Any]]], Any], Any, None]:
+    """Runs a coroutine function against an AsyncSession on a fresh in-memory SQLite database."""
+    engine = create_async_engine("sqlite+aiosqlite://")
+
+    async def setup() -> None:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all, tables=[Product.__table__])
+
+    asyncio.run(setup())
+
+    def run(work: Callable[[AsyncSession], Awaitable[Any]]) -> Any:
+        async def with_session() -> Any:
+            async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+                return await work(session)
+
+        return asyncio.run(with_session())
+
+    yield run
+    asyncio.run(engine.dispose())
+
+
+@pytest.fixture
+def product_service(monkeypatch: pytest.MonkeyPatch) -> ModuleType:
+    # markdown_converter builds an OpenAI client on import; it is never called here
+    if not os.environ.get("OPENAI_API_KEY"):
+        monkeypatch.setenv("OPENAI_API_KEY", "unused")
+    from app.services import product
+
+    return product
+
+
+@pytest.fixture
+def vector_services(mocker: MockerFixture, product_service: ModuleType) -> MagicMock:
+    """Replaces the Milvus backed services AsyncProductService creates on its first write."""
+    services = mocker.MagicMock()
+    mocker.patch.object(product_service, "RAGService", return_value=services.rag)
+    mocker.patch.object(product_service, "ProductEmbeddingService", return_value=services.embedding)
+    return services
+
+
+def test_async_product_lifecycle_on_a_real_session(run_with_session: Callable, product_service: ModuleType,
+                                                   vector_services: MagicMock) -> None:
+    AsyncProductService = product_service.AsyncProductService
+    created = run_with_session(lambda db: AsyncProductService(db).create_product(
+        ProductCreate(name="Wireless Headphones", description="Over-ear", price=99.0, stock_quantity=4)
+    ))
+    assert created.id is not None and created.is_active
+    assert created.created_at == created.updated_at
+    vector_services.embedding.add_product_to_milvus.assert_called_once_with(created)
+    rag_call = vector_services.rag.add_text_to_milvus.call_args
+    assert rag_call.kwargs["source_key"] == source_key("product", str(created.id))
+    assert "In Stock: Yes" in rag_call.args[0]
+
+    updated = run_with_session(lambda db: AsyncProductService(db).update_product(
+        created.id, ProductUpdate(stock_quantity=0)
+    ))
+    assert updated.stock_quantity == 0 and updated.name == "Wireless Headphones"
+    assert "In Stock: No" in vector_services.rag.add_text_to_milvus.call_args.args[0]
+
+    assert run_with_session(lambda db: AsyncProductService(db).delete_product(created.id))
+    vector_services.embedding.remove_product_from_milvus.assert_called_once_with(created.id)
+    assert "Status: Inactive" in vector_services.rag.add_text_to_milvus.call_args.args[0]
+
+    async def reload(db: AsyncSession) -> tuple:
+        service = AsyncProductService(db)
+        return await service.get_product(created.id), await service.get_products(), await service.get_product_count()
+
+    stored, active, count = run_with_session(reload)
+    assert stored.is_active is False and stored.stock_quantity == 0
+    assert active == [] and count == 0
+
+
+def test_async_product_reads_on_a_real_session(run_with_session: Callable, product_service: ModuleType,
+                                               vector_services: MagicMock) -> None:
+    async def seed_and_read(db: AsyncSession) -> tuple:
+        service = product_service.AsyncProductService(db)
+        headphones = await service.create_product(ProductCreate(name="Wireless Headphones", price=99.0))
+        await service.create_product(ProductCreate(name="Cotton Shirt", price=20.0, category="clothing"))
+        await service.create_product(ProductCreate(name="قميص قطني", price=20.0, language="ar"))
+        await service.create_product(ProductCreate(name="Wired Headphones", price=30.0,
+                                                   alternative_to_id=headphones.id))
+        return (
+            await service.search_products_by_text("HEADPHONES"),
+            await service.get_product_alternatives(headphones.id),
+            await service.list_products(limit=2, language="en", count_mode=ProductCountMode.NONE),
+            await service.list_products(limit=2, count_mode=ProductCountMode.EXACT),
+        )
+
+    found, alternatives, (page, total, next_cursor), (counted, exact_total, _) = run_with_session(seed_and_read)
+
+    assert [p.name for p in found] == ["Wireless Headphones", "Wired Headphones"]
+    assert [p.name for p in alternatives] == ["Wired Headphones"]
+    assert [p.name for p in page] == ["Wireless Headphones", "Cotton Shirt"]
+    assert total is None and next_cursor == page[-1].id
+    assert [p.id for p in counted] == [p.id for p in page] and exact_total == 4
+    # The Milvus clients are created once per service, not once per write
+    assert product_service.RAGService.call_count == 1
+
+
+def test_product_vectors_fit_the_product_collection(mocker: MockerFixture) -> None:
+    from app.services import product_embedding
+
+    mocker.patch.object(product_embedding, "connect_to_milvus")
+    mocker.patch.object(product_embedding, "create_collection")
+    mocker.patch.object(product_embedding, "get_embedding", return_value=[0.5] * 3072)
+    insert = mocker.patch.object(product_embedding, "insert_embedding", return_value=True)
+    product = SimpleNamespace(id=1, name="Shoe", category=None, price=9.5, currency="USD", stock_quantity=3,
+                              description=None, language="en", is_active=True)
+
+    assert product_embedding.ProductEmbeddingService().add_product_to_milvus(product)
+
+    assert len(insert.call_args.kwargs["embedding"]) == product_embedding.EMBEDDING_DIM
@@ -0,0 +1,63 @@
+import json
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from pytest_mock import MockerFixture
+
+from app.services.graph_service import prompts
+from app.services.providers import FakeChatModel
+
+
+def test_prompts_start_with_a_static_prefix() -> None:
+    history = [HumanMessage(content="hi"), AIMessage(content="Hello! How can I help?")]
+
+    first = prompts.CLASSIFY_INTENT.format_messages(history=history, user_message="where is my order 12?")
+    second = prompts.CLASSIFY_INTENT.format_messages(history=history + [HumanMessage(content="where is my order 12?"),
+                                                                        AIMessage(content="It shipped.")],
+                                                     user_message="any coupons?")
+
+    assert isinstance(first[0], SystemMessage)
+    assert first[0] == second[0]
+    # The earlier turns are a prefix too; only the latest message differs
+    assert second[:3] == first[:3]
+    assert first[-1].content == 'User message: "where is my order 12?"'
+    for name, template in prompts.PROMPTS.items():
+        assert template.messages[0].prompt.input_variables == [], name
+
+
+def test_invoke_prompt_records_cached_tokens(mocker: MockerFixture) -> None:
+    mocker.patch.object(prompts, "cache_stats", prompts.PromptCacheStats())
+    model = mocker.Mock()
+    model.invoke.side_effect = [
+        AIMessage(content="12", usage_metadata={"input_tokens": 2000, "output_tokens": 1, "total_tokens": 2001,
+                                                "input_token_details": {"cache_read": 1536}}),
+        AIMessage(content="12", usage_metadata={"input_tokens": 2000, "output_tokens": 1, "total_tokens": 2001}),
+    ]
+
+    for _ in range(2):
+        assert prompts.invoke_prompt(model, "extract_order_number", user_message="order 12").content == "12"
+
+    assert prompts.prompt_cache_stats() == {"extract_order_number": {
+        "calls": 2, "input_tokens": 4000, "cached_tokens": 1536, "cached_ratio": 0.384}}
+
+
+def test_fake_chat_model_answers_the_templates() -> None:
+    model = FakeChatModel(model_name="classifier", latency="fixed:0")
+
+    classification = prompts.invoke_prompt(model, "classify_intent", history=[HumanMessage(content="hi")],
+                                           user_message="any promo codes??? this is ridiculous")
+    assert json.loads(classification.content) == {"intent": "coupon_query", "is_frustrated": "yes"}
+    assert prompts.invoke_prompt(model, "extract_product_name",
+                                 user_message="Do you have wireless headphones?").content == "wireless headphones"
+
+
+def test_frustration_prompt_keeps_earlier_turns_as_a_prefix() -> None:
+    history = [HumanMessage(content="where is my refund?"), AIMessage(content="Let me check.")]
+    later = history + [HumanMessage(content="still nothing"), AIMessage(content="Sorry about that.")]
+
+    first = prompts.FRUSTRATION.format_messages(history=history, user_message="still nothing",
+                                                frustration_level="Moderate")
+    second = prompts.FRUSTRATION.format_messages(history=later, user_message="this is ridiculous",
+                                                 frustration_level="High")
+
+    # The nodes append to the history instead of sliding a window over it
+    assert second[:len(first) - 1] == first[:-1]
@@ -0,0 +1,78 @@
+import json
+import random
+
+import numpy as np
+import pytest
+from langchain_core.messages import HumanMessage
+from pytest_mock import MockerFixture
+
+from app.services import providers
+from app.services.embedding import EmbeddingService
+from app.services.providers import FakeChatModel, FakeEmbeddingProvider, parse_latency
+
+
+@pytest.mark.parametrize("spec, low, high", [
+    ("fixed:50", 50, 50),
+    ("uniform:100:200", 100, 200),
+    ("lognormal:500:0.3", 100, 2500),
+])
+def test_latency_samples(spec: str, low: float, high: float) -> None:
+    rng = random.Random(0)
+    samples = [parse_latency(spec).sample(rng) for _ in range(200)]
+
+    assert low <= min(samples) and max(samples) <= high
+
+
+@pytest.mark.parametrize("spec", ["fixed", "gamma:1:2", "uniform:1"])
+def test_invalid_latency(spec: str) -> None:
+    with pytest.raises(ValueError, match="Invalid latency"):
+        parse_latency(spec)
+
+
+def test_fake_embeddings_are_deterministic_unit_vectors() -> None:
+    provider = FakeEmbeddingProvider(dim=256, latency="fixed:0")
+
+    vectors = np.array(provider.embed_batch(["wireless headphones", "wireless headphones", "refund policy"], "m"))
+
+    np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, rtol=1e-5)
+    np.testing.assert_array_equal(vectors[0], vectors[1])
+    related = np.array(provider.embed("noise cancelling wireless headphones", "m"))
+    assert related @ vectors[0] > related @ vectors[2]
+
+
+def test_embedding_service_uses_the_provider() -> None:
+    service = EmbeddingService(provider=FakeEmbeddingProvider(dim=8, latency="fixed:0"))
+
+    assert len(service.embed_batch(["a", "b"])) == 2
+    with pytest.raises(ValueError):
+        service.embed(" ")
+
+
+def test_fake_chat_model_answers_the_graph_prompts() -> None:
+    model = FakeChatModel(model_name="classifier", latency="fixed:0")
+
+    classification = json.loads(model.invoke('Tasks:\n    User Message: "any promo codes??? this is ridiculous"\n'
+                                             "1. Classify the user's primary intent.").content)
+    assert classification == {"intent": "coupon_query", "is_frustrated": "yes"}
+    product = model.invoke('Extract the product name from the following user message.\n'
+                           '        User message: "Do you have wireless headphones?"\n')
+    assert product.content == "wireless headphones"
+    assert model.invoke('Extract the order number\n User message: "where is order 12345"\n').content == "12345"
+    reply = model.invoke([HumanMessage(content="Write a reply to the customer")])
+    assert reply.content == model.invoke([HumanMessage(content="Write a reply to the customer")]).content
+    assert reply.usage_metadata["output_tokens"] > 0
+
+
+def test_registry(mocker: MockerFixture) -> None:
+    mocker.patch.dict(providers.EMBEDDING_PROVIDERS)
+    mocker.patch.dict(providers._embedding_providers, clear=True)
+    mocker.patch.object(providers.settings, "EMBEDDING_PROVIDER", "tiny")
+    providers.register_embedding_provider("tiny", lambda: FakeEmbeddingProvider(dim=4, latency="fixed:0"))
+
+    provider = providers.get_embedding_provider()
+
+    assert provider is providers.get_embedding_provider("tiny")
+    assert provider.dim == 4
+    assert isinstance(providers.get_llm_provider("fake").chat_model("gpt-4o"), FakeChatModel)
+    with pytest.raises(ValueError, match="Unknown LLM provider"):
+        providers.get_llm_provider("nope")
@@ -0,0 +1,73 @@
+from typing import Any, Dict
+from uuid import uuid4
+
+import pytest
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from app.scripts.replay_conversations import LLMUsage, answer_match, retrieval_hits, summarize
+
+
+def _row(**values: Any) -> Dict[str, Any]:
+    row = {"error": None, "latency_ms": 100.0, "llm_calls": 1, "input_tokens": 100, "output_tokens": 10,
+           "cached_tokens": 0, "retrieval_hits": None, "intent_match": None, "contains": None, "match": None}
+    row.update(values)
+    return row
+
+
+def test_answer_match_scores_intent_and_substrings() -> None:
+    expect = {"intent": "knowledge_base_query", "contains": ["business days", "free"]}
+
+    assert answer_match(expect, "Shipping takes 3-5  Business\nDays.", "knowledge_base_query") == {
+        "intent_match": True, "contains": 0.5, "match": 0.75}
+    assert answer_match(expect, "", "greeting") == {"intent_match": False, "contains": 0.0, "match": 0.0}
+    # bot_service reports no intent: only the substrings are scored
+    assert answer_match(expect, "Shipping is free", None) == {"intent_match": None, "contains": 0.5, "match": 0.5}
+    assert answer_match(None, "Hello!", "greeting") == {"intent_match": None, "contains": None, "match": None}
+
+
+@pytest.mark.parametrize("final_state, expected", [
+    ({"action_result": {"knowledge_base_query": {"found": True, "entries": 3}}}, 3),
+    ({"action_result": {"knowledge_base_query": {"found": True}}}, 1),
+    ({"action_result": {"knowledge_base_query": {"found": False}}}, 0),
+    ({"action_result": {"order_status": {"found": True}}}, None),
+    ({"action_result": "tool output"}, None),
+    ({}, None),
+])
+def test_retrieval_hits(final_state: Dict[str, Any], expected: Any) -> None:
+    assert retrieval_hits(final_state) == expected
+
+
+def test_summarize_skips_errors_and_unscored_turns() -> None:
+    rows = [
+        _row(latency_ms=100.0, retrieval_hits=2, intent_match=True, contains=1.0, match=1.0),
+        _row(latency_ms=300.0, llm_calls=2, cached_tokens=64, retrieval_hits=0, intent_match=False, match=0.0),
+        _row(latency_ms=5000.0, llm_calls=0, input_tokens=0, output_tokens=0, error="TimeoutError: deadline"),
+    ]
+
+    summary = summarize(rows)
+
+    assert summary["turns"] == 3 and summary["errors"] == 1
+    assert summary["latency_ms"] == {"p50": 300.0, "p95": 300.0, "max": 300.0, "mean": 200.0}
+    assert (summary["llm_calls"], summary["input_tokens"], summary["cached_tokens"]) == (3, 200, 64)
+    assert summary["llm_calls_per_turn"] == 1.0
+    assert (summary["retrieval_turns"], summary["retrieval_hits"]) == (2, 2)
+    assert (summary["intent_accuracy"], summary["contains"], summary["match"]) == (0.5, 1.0, 0.5)
+    assert summarize([])["intent_accuracy"] is None
+
+
+def test_llm_usage_counts_provider_calls_only() -> None:
+    usage = LLMUsage()
+    wrapper, provider = uuid4(), uuid4()
+    message = AIMessage(content="ok", usage_metadata={"input_tokens": 1200, "output_tokens": 8, "total_tokens": 1208,
+                                                      "input_token_details": {"cache_read": 1024}})
+    result = LLMResult(generations=[[ChatGeneration(message=message)]])
+
+    # A hedged model wraps the provider's call: both start, and both end with the same message
+    usage.on_chat_model_start({}, [], run_id=wrapper, invocation_params={"_type": "hedged"})
+    usage.on_chat_model_start({}, [], run_id=provider, invocation_params={"_type": "openai-chat"})
+    usage.on_llm_end(result, run_id=provider)
+    usage.on_llm_end(result, run_id=wrapper)
+    usage.on_llm_end(result, run_id=provider)
+
+    assert usage.to_dict() == {"llm_calls": 1, "input_tokens": 1200, "output_tokens": 8, "cached_tokens": 1024}
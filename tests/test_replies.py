@@ -0,0 +1,80 @@
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.graph_service.replies import (
+    LLM,
+    TEMPLATE,
+    TEMPLATES,
+    greeting_reply,
+    order_status_reply,
+    render,
+    reply_mode,
+    structured_reply,
+)
+
+
+def test_every_template_is_localized() -> None:
+    for name, translations in TEMPLATES.items():
+        assert set(translations) == {"en", "ar"}, name
+
+
+def test_render_falls_back_to_english() -> None:
+    assert render("order_number_missing", "fr") == render("order_number_missing", "en")
+    assert render("coupon_found", "ar", code="SAVE10", discount=10) == "نعم، لدينا كوبون SAVE10! يمنحك خصمًا بنسبة 10%."
+
+
+def test_reply_modes_are_configurable() -> None:
+    assert reply_mode("order_status") == TEMPLATE
+    assert reply_mode("knowledge_base_query") == LLM
+    assert reply_mode("unknown_intent") == LLM
+    advanced_settings = {"reply_modes": {"order_status": "llm", "other": "template", "greeting": "bogus"}}
+    assert reply_mode("order_status", advanced_settings) == LLM
+    assert reply_mode("other", advanced_settings) == TEMPLATE
+    assert reply_mode("greeting", advanced_settings) == LLM
+
+
+def test_order_status_reply() -> None:
+    order = {"status": "shipped", "estimated_delivery": "2023-04-15", "tracking_number": "TN1"}
+
+    assert order_status_reply("1", order) == ("Your order #1 has been shipped. Your tracking number is TN1. "
+                                              "Estimated delivery date is 2023-04-15.")
+    assert order_status_reply("9", {"status": "lost"}) == "The status of your order #9 is: lost."
+    assert order_status_reply("9", None, "ar").startswith("عذراً")
+
+
+@pytest.mark.parametrize("intent, action_result, expected", [
+    ("coupon_query", {"coupon_query": {"query_type": "list_all", "found": True, "coupons": [
+        {"code": "SAVE10", "discount": 10, "description": "Spring sale", "expires_at": "2030-01-01"}]}},
+     "Here are our currently available coupons:\n\n1. SAVE10 - 10% discount - Spring sale (valid until 2030-01-01)\n"),
+    ("coupon_query", {"coupon_query": {"query_type": "general_query", "has_coupons": True, "count": 2}},
+     "Yes, we have 2 coupon(s) available right now. Would you like to know the details?"),
+    ("product_availability", {"product_availability": {"found": True, "product": {
+        "product_name": "Headphones", "stock": 0, "price": 50, "description": " "}}},
+     "I'm sorry, but Headphones is currently out of stock. Would you like me to notify you when it's back in stock?"),
+    ("product_availability", {"product_availability": {"found": False}}, "No, we don't sell this product."),
+    ("order_status", {"order_status": {"found": False, "message": "Please provide your order number."}},
+     "Please provide your order number."),
+])
+def test_structured_reply(intent: str, action_result: dict, expected: str) -> None:
+    reply, _ = structured_reply(intent, action_result)
+
+    assert reply == expected
+
+
+def test_open_ended_results_need_the_llm() -> None:
+    assert structured_reply("knowledge_base_query", {"knowledge_base_query": {"found": True, "entries": 3}}) is None
+    assert structured_reply("product_availability", {"product_availability": "tool output"}) is None
+    assert structured_reply("greeting", None, "ar") == (render("greeting", "ar"), {})
+
+
+def test_greeting_follows_the_bot_settings() -> None:
+    bot_settings = SimpleNamespace(bot_name="Sara", welcome_message="Welcome to Acme! Ask me anything.",
+                                   advanced_settings={"language": "en"})
+
+    assert structured_reply("greeting", None, "en", bot_settings) == ("Welcome to Acme! Ask me anything.", {})
+    # The welcome message is not translated; other languages get the template with the bot's name
+    assert greeting_reply("ar", bot_settings) == render("greeting_named", "ar", bot_name="Sara")
+    bot_settings.welcome_message = ""
+    assert greeting_reply("en", bot_settings).startswith("Hello! I'm Sara.")
+    assert greeting_reply("en", None) == render("greeting", "en")
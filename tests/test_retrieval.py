@@ -0,0 +1,81 @@
+from typing import Any, Dict, List, Optional
+
+from pytest_mock import MockerFixture
+
+from app.services import reranker as reranker_module
+from app.services.reranker import LexicalReranker, OnnxCrossEncoder, Reranker, ScoreCache, get_reranker
+from app.services.retrieval import RetrievalPipeline
+from tests.helpers.tokens import WordCounter
+
+
+def _result(id: int, text: str) -> Dict[str, Any]:
+    return {"id": id, "text": text, "score": float(id)}
+
+
+def _pipeline(results_by_query: Dict[str, List[Dict[str, Any]]], **kwargs: Any) -> RetrievalPipeline:
+    def search(query: str, top_k: int, language: Optional[str]) -> List[Dict[str, Any]]:
+        return results_by_query.get(query, [])[:top_k]
+
+    return RetrievalPipeline(search, reranker=Reranker(), fetch_k=50, counter=WordCounter(), **kwargs)
+
+
+def test_candidates_of_all_queries_are_merged_by_chunk_id() -> None:
+    pipeline = _pipeline({
+        "where is my refund": [_result(1, "Refunds take 5 days."), _result(2, "Returns are free.")],
+        "refund status": [_result(3, "Track refunds in your account."), _result(1, "Refunds take 5 days.")],
+    })
+
+    results = pipeline.retrieve("where is my refund", ["refund status"], top_k=10)
+
+    assert [result["id"] for result in results] == [1, 3, 2]
+
+
+def test_duplicate_texts_are_dropped_and_budget_is_respected() -> None:
+    pipeline = _pipeline({"q": [
+        _result(1, "Refunds take five days."),
+        _result(2, "refunds   take five DAYS."),
+        _result(3, " ".join(["long"] * 20)),
+        _result(4, "Returns are free."),
+    ]}, token_budget=10)
+
+    results = pipeline.retrieve("q", top_k=10)
+
+    # 4 + 3 words fit, the 20-word chunk does not
+    assert [result["id"] for result in results] == [1, 4]
+
+
+def test_lexical_reranker_promotes_keyword_matches() -> None:
+    candidates = [
+        _result(1, "Standard shipping takes three to five business days."),
+        _result(2, "Gift cards never expire."),
+        _result(3, "Our warranty covers manufacturing defects for one year."),
+    ]
+
+    ranked = LexicalReranker().rerank("how long is the warranty", candidates)
+
+    assert ranked[0]["id"] == 3
+    assert ranked[0]["rerank_score"] > ranked[1]["rerank_score"]
+
+
+def test_cross_encoder_batches_by_length_and_caches_scores(mocker: MockerFixture) -> None:
+    encoder = OnnxCrossEncoder.__new__(OnnxCrossEncoder)
+    Reranker.__init__(encoder)
+    encoder.batch_size = 2
+    encoder.cache = ScoreCache(100)
+    infer = mocker.patch.object(encoder, "_infer", side_effect=lambda pairs: [float(len(t)) for _, t in pairs])
+    candidates = [_result(1, "ccc"), _result(2, "a"), _result(3, "bb")]
+
+    assert encoder.score("Refund?", candidates) == [3.0, 1.0, 2.0]
+    assert [[text for _, text in call.args[0]] for call in infer.call_args_list] == [["a", "bb"], ["ccc"]]
+
+    # Same question, differently formatted, plus one new chunk: only the new chunk is scored
+    assert encoder.score("  refund? ", candidates + [_result(4, "dddd")]) == [3.0, 1.0, 2.0, 4.0]
+    assert infer.call_args.args[0] == [("  refund? ", "dddd")]
+    assert encoder.stats()["cache_hits"] == 3
+
+
+def test_missing_model_falls_back_to_lexical(mocker: MockerFixture, tmp_path) -> None:
+    mocker.patch.object(reranker_module.settings, "RERANKER_MODEL_DIR", str(tmp_path))
+    mocker.patch.object(reranker_module, "_reranker", None)
+
+    assert isinstance(get_reranker(), LexicalReranker)
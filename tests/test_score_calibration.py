@@ -0,0 +1,89 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from pytest_mock import MockerFixture
+
+from app.services import milvus_client, score_calibration
+from app.services.score_calibration import (
+    Calibration,
+    fit_calibration,
+    load_calibrations,
+    save_calibration,
+    similarity_from_distance,
+)
+
+
+def test_fit_calibration_separates_relevant_results() -> None:
+    rng = np.random.default_rng(0)
+    relevant = rng.normal(0.55, 0.05, 200)
+    irrelevant = rng.normal(0.25, 0.05, 400)
+
+    calibration = fit_calibration(np.concatenate([relevant, irrelevant]), [True] * 200 + [False] * 400)
+
+    assert calibration.slope > 0
+    assert calibration.relevance(0.6) > 0.95 and calibration.relevance(0.2) < 0.05
+    assert calibration.is_relevant(calibration.relevance(0.5))
+    assert not calibration.is_relevant(calibration.relevance(0.3))
+    assert calibration.fit["f1"] > 0.95
+
+
+def test_fit_calibration_needs_both_labels() -> None:
+    with pytest.raises(ValueError, match="both"):
+        fit_calibration([0.4, 0.5], [True, True])
+
+
+def test_similarity_from_distance() -> None:
+    a, b = np.array([1.0, 0.0]), np.array([0.6, 0.8])
+    squared_l2 = float(((a - b) ** 2).sum())
+
+    assert similarity_from_distance(squared_l2, "L2") == pytest.approx(float(a @ b))
+    assert similarity_from_distance(0.6, "IP") == 0.6
+
+
+def test_calibrations_round_trip(tmp_path: Path, mocker: MockerFixture) -> None:
+    path = tmp_path / "score_calibration.json"
+    mocker.patch.object(score_calibration, "CALIBRATION_FILE", path)
+    save_calibration("product_embeddings", Calibration(slope=8.0, intercept=-2.0, threshold=0.6))
+    save_calibration("rag_embeddings", Calibration(slope=12.0, intercept=-4.0, threshold=0.4, fit={"pairs": 10}))
+
+    calibrations = load_calibrations(path)
+
+    assert set(calibrations) == {"product_embeddings", "rag_embeddings"}
+    assert calibrations["rag_embeddings"].threshold == 0.4
+    assert score_calibration.get_calibration("product_embeddings").slope == 8.0
+    assert score_calibration.get_calibration("other") == score_calibration.DEFAULT_CALIBRATION
+    score_calibration.get_calibration.cache_clear()
+
+
+def test_normalize_vectors_keeps_zero_rows() -> None:
+    vectors = milvus_client.normalize_vectors([[3.0, 4.0], [0.0, 0.0]])
+
+    np.testing.assert_allclose(vectors, [[0.6, 0.8], [0.0, 0.0]])
+
+
+@pytest.mark.parametrize("metric_type, distance", [("IP", 0.5), ("L2", 1.0)])
+def test_search_returns_calibrated_scores(mocker: MockerFixture, metric_type: str, distance: float) -> None:
+    col = mocker.MagicMock()
+    col.schema = SimpleNamespace(fields=[
+        SimpleNamespace(name="id", params={}),
+        SimpleNamespace(name="embedding", params={"dim": 2}),
+        SimpleNamespace(name="text", params={}),
+    ])
+    col.index.return_value = SimpleNamespace(params={"metric_type": metric_type})
+    col.search.return_value = [[SimpleNamespace(id=7, entity={"text": "Returns are free"}, distance=distance)]]
+    mocker.patch.object(milvus_client, "list_collections", return_value=[milvus_client.COLLECTION_NAME])
+    mocker.patch.object(milvus_client, "Collection", return_value=col)
+    mocker.patch.object(milvus_client, "get_calibration", return_value=Calibration(slope=10.0, intercept=-4.0))
+
+    results = milvus_client.search_embedding([3.0, 4.0], top_k=1, filter_expr="language == 'en'")
+
+    kwargs = col.search.call_args.kwargs
+    assert kwargs["data"] == [pytest.approx([0.6, 0.8])]
+    assert kwargs["param"]["metric_type"] == metric_type
+    assert kwargs["expr"] == "language == 'en'"
+    # A squared L2 distance of 1 between unit vectors is a cosine of 0.5
+    assert results[0]["similarity"] == pytest.approx(0.5)
+    assert results[0]["score"] == pytest.approx(0.731, abs=1e-3)
+    assert results[0]["relevant"] is True
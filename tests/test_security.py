@@ -0,0 +1,86 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+from pytest_mock import MockerFixture
+
+from app.core import security
+
+
+def _blocking_checkpw(mocker: MockerFixture, release: threading.Event) -> dict:
+    """Patch bcrypt.checkpw to block until `release`, recording its threads and peak concurrency."""
+    calls = {"threads": [], "active": 0, "peak": 0, "started": threading.Event()}
+    lock = threading.Lock()
+
+    def checkpw(password: bytes, hashed_password: bytes) -> bool:
+        with lock:
+            calls["threads"].append(threading.current_thread().name)
+            calls["active"] += 1
+            calls["peak"] = max(calls["peak"], calls["active"])
+        calls["started"].set()
+        release.wait()
+        with lock:
+            calls["active"] -= 1
+        return True
+
+    mocker.patch.object(security.bcrypt, "checkpw", side_effect=checkpw)
+    return calls
+
+
+def test_verify_password_runs_off_the_event_loop(mocker: MockerFixture) -> None:
+    release = threading.Event()
+    calls = _blocking_checkpw(mocker, release)
+
+    async def run() -> bool:
+        login = asyncio.ensure_future(security.verify_password("secret", "hashed"))
+        # Only a free event loop can get here while checkpw is still blocked
+        await asyncio.get_running_loop().run_in_executor(None, calls["started"].wait)
+        assert not login.done()
+        release.set()
+        return await login
+
+    assert asyncio.run(run())
+    assert calls["threads"][0].startswith("password-hash")
+
+
+def test_login_storm_is_bounded_by_the_hash_pool(mocker: MockerFixture) -> None:
+    release = threading.Event()
+    calls = _blocking_checkpw(mocker, release)
+    mocker.patch.object(security, "password_hash_executor",
+                        ThreadPoolExecutor(max_workers=2, thread_name_prefix="password-hash"))
+
+    async def run() -> list[bool]:
+        logins = asyncio.gather(*(security.verify_password("secret", "hashed") for _ in range(6)))
+        await asyncio.get_running_loop().run_in_executor(None, calls["started"].wait)
+        release.set()
+        return await logins
+
+    assert asyncio.run(run()) == [True] * 6
+    assert calls["peak"] <= 2
+    assert all(name.startswith("password-hash") for name in calls["threads"])
+
+
+def test_password_needs_rehash_when_cost_changes(mocker: MockerFixture) -> None:
+    mocker.patch.object(security, "BCRYPT_ROUNDS", 4)
+    hashed = security.get_password_hash("secret")
+    assert not security.password_needs_rehash(hashed)
+
+    mocker.patch.object(security, "BCRYPT_ROUNDS", 5)
+    assert security.password_needs_rehash(hashed)
+    assert not security.password_needs_rehash("not-a-bcrypt-hash")
+
+
+def test_authenticate_user_rehashes_on_cost_change(mocker: MockerFixture) -> None:
+    hashed = bcrypt.hashpw(b"secret", bcrypt.gensalt(rounds=4)).decode()
+    user = {"id": 1, "username": "alice", "hashed_password": hashed}
+    mocker.patch.object(security, "BCRYPT_ROUNDS", 5)
+    mocker.patch.object(security.crud_users, "get", mocker.AsyncMock(return_value=user))
+    update = mocker.patch.object(security.crud_users, "update", mocker.AsyncMock())
+
+    result = asyncio.run(security.authenticate_user("alice", "secret", db=mocker.MagicMock()))
+
+    assert result
+    new_hash = update.await_args.kwargs["object"]["hashed_password"]
+    assert new_hash.startswith("$2b$05$")
+    assert bcrypt.checkpw(b"secret", new_hash.encode())
@@ -0,0 +1,62 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app.services.graph_service import speculation
+from app.services.graph_service.speculation import CATALOG, KNOWLEDGE_BASE, Speculation, SpeculationStats
+
+
+@pytest.fixture(autouse=True)
+def stats(mocker: MockerFixture) -> SpeculationStats:
+    return mocker.patch.object(speculation, "stats", SpeculationStats())
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        yield executor
+
+
+def test_keeps_the_lookup_of_the_intent(executor: ThreadPoolExecutor, stats: SpeculationStats) -> None:
+    release = threading.Event()
+    catalog_calls = []
+    turn = Speculation({
+        KNOWLEDGE_BASE: lambda: release.wait(5) and ["chunk"],
+        CATALOG: lambda: catalog_calls.append(1),
+    }, executor=executor)
+
+    assert turn.keep("knowledge_base_query") == KNOWLEDGE_BASE
+    release.set()
+
+    assert turn.result(KNOWLEDGE_BASE) == ["chunk"]
+    # Queued behind the knowledge base lookup on the single worker, so never started
+    assert catalog_calls == []
+    # Consumed once
+    assert turn.result(KNOWLEDGE_BASE) is None
+    assert turn.result(CATALOG) is None
+    summary = stats.to_dict()
+    assert (summary["started"], summary["used"], summary["cancelled"]) == (2, 1, 1)
+    assert "saved_p50_ms" in summary
+
+
+def test_intents_without_a_lookup_cancel_everything(stats: SpeculationStats) -> None:
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        turn = Speculation({KNOWLEDGE_BASE: lambda: ["chunk"], CATALOG: lambda: []}, executor=executor)
+
+        assert turn.keep("order_status") is None
+
+    assert turn.result(KNOWLEDGE_BASE) is None and turn.result(CATALOG) is None
+    assert stats.to_dict()["cancelled"] == 2
+
+
+def test_failed_lookup_falls_back(executor: ThreadPoolExecutor, stats: SpeculationStats) -> None:
+    def fail():
+        raise RuntimeError("milvus unavailable")
+
+    turn = Speculation({CATALOG: fail}, executor=executor)
+    turn.keep("product_availability")
+
+    assert turn.result(CATALOG) is None
+    assert stats.to_dict()["failed"] == 1
@@ -0,0 +1,148 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from pymilvus import DataType
+from pytest_mock import MockerFixture
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.db import database
+from app.core.db.database import Base
+from app.models.knowledge import KnowledgeChunk, KnowledgeDocument, KnowledgeSource
+from app.services import vector_snapshot
+from app.services.vector_snapshot import dump_collection, read_manifest, restore_collection, snapshot_path
+
+DIM = 4
+
+
+def _collection(mocker: MockerFixture, count: int = 0) -> SimpleNamespace:
+    fields = [
+        SimpleNamespace(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True, params={}),
+        SimpleNamespace(name="embedding", dtype=DataType.FLOAT_VECTOR, is_primary=False, auto_id=False,
+                        params={"dim": DIM}),
+        SimpleNamespace(name="text", dtype=DataType.VARCHAR, is_primary=False, auto_id=False, params={}),
+        SimpleNamespace(name="language", dtype=DataType.VARCHAR, is_primary=False, auto_id=False, params={}),
+    ]
+    col = mocker.MagicMock()
+    col.schema = SimpleNamespace(fields=fields)
+    col.query.return_value = [{"count(*)": count}]
+    mocker.patch.object(vector_snapshot, "list_collections", return_value=["rag_embeddings"])
+    mocker.patch.object(vector_snapshot, "load_collection", return_value=col)
+    mocker.patch.object(vector_snapshot, "Collection", return_value=col)
+    return col
+
+
+def _rows(n: int) -> list[dict]:
+    return [
+        {"embedding": [i + 0.25 * d for d in range(DIM)], "text": f"entry {i}", "language": "ar" if i % 2 else "en"}
+        for i in range(n)
+    ]
+
+
+def test_dump_and_restore_round_trip(tmp_path: Path, mocker: MockerFixture) -> None:
+    rows = _rows(5)
+    col = _collection(mocker, count=5)
+    mocker.patch.object(vector_snapshot, "iterate_entries", return_value=iter([rows[:3], rows[3:]]))
+
+    manifest = dump_collection("rag_embeddings", tmp_path)
+
+    assert read_manifest(tmp_path) == manifest
+    assert (manifest["count"], manifest["dim"], manifest["fields"]) == (5, DIM, ["text", "language"])
+    vectors = np.load(tmp_path / vector_snapshot.VECTORS_FILE, mmap_mode="r")
+    np.testing.assert_array_equal(vectors, np.asarray([row["embedding"] for row in rows], dtype=np.float32))
+
+    mocker.patch.object(vector_snapshot, "INSERT_BATCH_BYTES", 2 * DIM * 4)
+    assert restore_collection(tmp_path) == 5
+
+    inserted = [call.args[0] for call in col.insert.call_args_list]
+    assert [len(columns[1]) for columns in inserted] == [2, 2, 1]
+    embeddings = np.concatenate([columns[0] for columns in inserted])
+    # Restored as unit vectors for the inner product index
+    np.testing.assert_allclose(embeddings, vectors / np.linalg.norm(vectors, axis=1, keepdims=True), rtol=1e-6)
+    assert [text for columns in inserted for text in columns[1]] == [row["text"] for row in rows]
+    col.flush.assert_called_once()
+
+
+def test_rows_added_during_dump_are_left_out(tmp_path: Path, mocker: MockerFixture) -> None:
+    rows = _rows(4)
+    _collection(mocker, count=3)
+    mocker.patch.object(vector_snapshot, "iterate_entries", return_value=iter([rows[:2], rows[2:]]))
+
+    manifest = dump_collection("rag_embeddings", tmp_path, dtype="float16")
+
+    assert manifest["count"] == 3
+    assert np.load(tmp_path / vector_snapshot.VECTORS_FILE).dtype == np.float16
+
+
+def test_restore_refuses_other_embedding_model(tmp_path: Path, mocker: MockerFixture) -> None:
+    _collection(mocker, count=1)
+    mocker.patch.object(vector_snapshot, "iterate_entries", return_value=iter([_rows(1)]))
+    dump_collection("rag_embeddings", tmp_path)
+    mocker.patch.object(vector_snapshot, "EMBEDDING_MODEL", "another-model")
+
+    with pytest.raises(ValueError, match="another-model"):
+        restore_collection(tmp_path)
+
+
+def test_restore_skips_degenerate_vectors(tmp_path: Path, mocker: MockerFixture) -> None:
+    rows = _rows(4)
+    rows[1]["embedding"] = [0.0] * DIM
+    rows[2]["embedding"] = [float("nan")] * DIM
+    col = _collection(mocker, count=4)
+    mocker.patch.object(vector_snapshot, "iterate_entries", return_value=iter([rows]))
+    dump_collection("rag_embeddings", tmp_path)
+    mocker.patch.object(vector_snapshot, "INSERT_BATCH_BYTES", 2 * DIM * 4)
+
+    assert restore_collection(tmp_path) == 2
+
+    inserted = [call.args[0] for call in col.insert.call_args_list]
+    assert [text for columns in inserted for text in columns[1]] == ["entry 0", "entry 3"]
+    assert all(np.linalg.norm(columns[0], axis=1).min() > 0.99 for columns in inserted)
+
+
+def test_restore_remaps_knowledge_chunks_to_the_new_ids(tmp_path: Path, mocker: MockerFixture) -> None:
+    rows = [{"id": 100 + i, **row} for i, row in enumerate(_rows(3))]
+    col = _collection(mocker, count=3)
+    mocker.patch.object(vector_snapshot, "iterate_entries", return_value=iter([rows]))
+    dump_collection("rag_embeddings", tmp_path)
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine, tables=[KnowledgeSource.__table__, KnowledgeDocument.__table__,
+                                             KnowledgeChunk.__table__])
+    session = sessionmaker(bind=engine)
+    mocker.patch.object(database, "sync_session", session)
+    with session() as db:
+        db.execute(KnowledgeDocument.__table__.insert(), [
+            {"id": 1, "source_key": "url:a", "content_hash": "a", "version": 1, "chunk_count": 2},
+            {"id": 2, "source_key": "url:b", "content_hash": "b", "version": 1, "chunk_count": 2},
+        ])
+        # Document 2 shares vector 101 with document 1; its vector 999 was added after the dump
+        db.execute(KnowledgeChunk.__table__.insert(), [
+            {"document_id": document_id, "chunk_index": index, "content_hash": f"{document_id}-{index}",
+             "simhash": 0, "simhash_band0": 0, "simhash_band1": 0, "simhash_band2": 0, "simhash_band3": 0,
+             "milvus_id": milvus_id, "language": "en"}
+            for document_id, index, milvus_id in [(1, 0, 100), (1, 1, 101), (2, 0, 101), (2, 1, 999)]
+        ])
+        db.commit()
+    mocker.patch.object(vector_snapshot, "drop_collection")
+    col.insert.return_value = SimpleNamespace(primary_keys=[500, 501, 502])
+
+    assert restore_collection(tmp_path, drop_existing=True) == 3
+
+    with session() as db:
+        chunks = db.execute(select(KnowledgeChunk.document_id, KnowledgeChunk.milvus_id)
+                            .order_by(KnowledgeChunk.id)).all()
+        documents = db.execute(select(KnowledgeDocument.content_hash, KnowledgeDocument.chunk_count)
+                               .order_by(KnowledgeDocument.id)).all()
+    assert [tuple(chunk) for chunk in chunks] == [(1, 500), (1, 501), (2, 501)]
+    # The chunk without a restored vector is forgotten, so re-importing its document stores it again
+    assert [tuple(document) for document in documents] == [("a", 2), ("", 1)]
+    engine.dispose()
+
+
+@pytest.mark.parametrize("name", ["..", "../etc", "a/b", ""])
+def test_snapshot_names_stay_inside_snapshot_dir(name: str) -> None:
+    with pytest.raises(ValueError):
+        snapshot_path(name)
@@ -0,0 +1,151 @@
+from types import SimpleNamespace
+
+import pytest
+from pytest_mock import MockerFixture
+
+from app.services import milvus_client
+from app.services.milvus_client import (
+    decode_page_token,
+    encode_page_token,
+    get_entries_page,
+    iterate_entries,
+    keyword_search,
+)
+
+
+def _collection(mocker: MockerFixture, enable_match: bool = False) -> SimpleNamespace:
+    text_params = {"max_length": 2048, "enable_match": "true"} if enable_match else {"max_length": 2048}
+    fields = [
+        SimpleNamespace(name="id", params={}),
+        SimpleNamespace(name="embedding", params={"dim": 3072}),
+        SimpleNamespace(name="text", params=text_params),
+        SimpleNamespace(name="language", params={}),
+    ]
+    col = mocker.MagicMock()
+    col.schema = SimpleNamespace(fields=fields)
+    mocker.patch.object(milvus_client, "list_collections", return_value=[milvus_client.COLLECTION_NAME])
+    mocker.patch.object(milvus_client, "load_collection", return_value=col)
+    return col
+
+
+def test_page_token_round_trip() -> None:
+    assert decode_page_token(encode_page_token(449_012_345_678_901)) == 449_012_345_678_901
+    with pytest.raises(ValueError):
+        decode_page_token("not-a-token!")
+
+
+def test_page_continues_after_primary_key(mocker: MockerFixture) -> None:
+    col = _collection(mocker)
+    col.query.return_value = [{"id": i, "text": f"t{i}"} for i in (8, 9, 10)]
+
+    entries, next_page_token = get_entries_page(
+        limit=2, page_token=encode_page_token(7), filter_expr="language == 'ar'"
+    )
+
+    assert col.query.call_args.kwargs["expr"] == "(id > 7) and (language == 'ar')"
+    assert col.query.call_args.kwargs["limit"] == 3
+    assert [entry["id"] for entry in entries] == [8, 9]
+    assert entries[0]["language"] == "en"
+    assert decode_page_token(next_page_token) == 9
+
+
+def test_last_page_has_no_token(mocker: MockerFixture) -> None:
+    col = _collection(mocker)
+    col.query.return_value = [{"id": 3, "text": "t", "language": "ar"}]
+
+    entries, next_page_token = get_entries_page(limit=2)
+
+    assert col.query.call_args.kwargs["expr"] == "id > 0"
+    assert entries == [{"id": 3, "text": "t", "language": "ar"}]
+    assert next_page_token is None
+
+
+def test_iterate_entries_streams_batches_and_closes(mocker: MockerFixture) -> None:
+    col = _collection(mocker)
+    iterator = col.query_iterator.return_value
+    iterator.next.side_effect = [[{"id": 1, "text": "a"}], [{"id": 2, "text": "b"}], []]
+
+    batches = list(iterate_entries(batch_size=1, include_embeddings=True))
+
+    assert [[entry["id"] for entry in batch] for batch in batches] == [[1], [2]]
+    assert "embedding" in col.query_iterator.call_args.kwargs["output_fields"]
+    iterator.close.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    "enable_match, expected_expr",
+    [
+        (True, "TEXT_MATCH(text, 'return policy')"),
+        (False, "text like '%return%' or text like '%Return%' or text like '%RETURN%' or "
+                "text like '%policy%' or text like '%Policy%' or text like '%POLICY%'"),
+    ],
+)
+def test_keyword_search_filters_in_milvus(mocker: MockerFixture, enable_match: bool, expected_expr: str) -> None:
+    col = _collection(mocker, enable_match=enable_match)
+    col.query.return_value = [
+        {"id": 1, "text": "Our return window is 30 days"},
+        {"id": 2, "text": "The return policy covers all items"},
+    ]
+
+    results = keyword_search("What's the return policy?", top_k=1)
+
+    assert col.query.call_args.kwargs["expr"] == expected_expr
+    assert [(entry["id"], entry["matches"]) for entry in results] == [(2, 2)]
+    col.query_iterator.assert_not_called()
+
+
+def test_keyword_search_counts_matches_case_insensitively(mocker: MockerFixture) -> None:
+    col = _collection(mocker)
+    col.query.return_value = [
+        {"id": 1, "text": "Shipping is free"},
+        {"id": 2, "text": "EXPRESS SHIPPING takes two days"},
+    ]
+
+    results = keyword_search("express shipping", language="ar")
+
+    assert "text like '%Shipping%'" in col.query.call_args.kwargs["expr"]
+    assert col.query.call_args.kwargs["expr"].endswith(") and language == 'ar'")
+    assert [(entry["id"], entry["matches"]) for entry in results] == [(2, 2), (1, 1)]
+
+
+@pytest.mark.parametrize("query", ["100%_cotton", "o'reilly books"])
+def test_keyword_search_terms_cannot_alter_the_filter(mocker: MockerFixture, query: str) -> None:
+    col = _collection(mocker)
+    col.query.return_value = []
+
+    keyword_search(query)
+
+    expr = col.query.call_args.kwargs["expr"]
+    assert all(term.strip("%").isalnum() for term in expr.split("'")[1::2])
+
+
+def test_keyword_search_rejects_invalid_language(mocker: MockerFixture) -> None:
+    col = _collection(mocker)
+
+    with pytest.raises(ValueError):
+        keyword_search("return policy", language="en' or language != '")
+    col.query.assert_not_called()
+
+
+def test_keyword_search_ignores_short_words(mocker: MockerFixture) -> None:
+    col = _collection(mocker)
+
+    assert keyword_search("is it ok?") == []
+    col.query.assert_not_called()
+
+
+@pytest.mark.parametrize("has_source_field, keep_ids, expr", [
+    (True, None, 'source_id == "ks-0001"'),
+    (True, [5], 'source_id == "ks-0001" and id not in [5]'),
+    (False, [5], "id in [3, 4]"),
+])
+def test_delete_source_entries(mocker: MockerFixture, has_source_field: bool, keep_ids: list | None,
+                               expr: str) -> None:
+    col = _collection(mocker)
+    if has_source_field:
+        col.schema.fields.append(SimpleNamespace(name="source_id", params={"max_length": 32}))
+    mocker.patch.object(milvus_client, "Collection", return_value=col)
+
+    milvus_client.delete_source_entries("ks-0001", [3, 4], keep_ids=keep_ids)
+
+    col.delete.assert_called_once_with(expr=expr)